@@ -0,0 +1,85 @@
+"""Microbenchmark of key operations - file system calls of `_get_leaf_path` per operation."""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Annotated, Any
+from unittest.mock import patch
+
+import anyio
+from pydantic import Field
+
+from scruby import Scruby, ScrubyModel
+
+
+class NoCache(set):
+    """Set of branches that never remembers anything."""
+
+    def add(self, _element: Any) -> None:
+        """Do not remember the branch."""
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+async def bench(number_ops: int = 10_000, *, use_cache: bool = True) -> tuple[float, float]:
+    """Get the number of `exists` and `mkdir` calls per operation and microseconds per operation."""
+    calls: int = 0
+    orig_exists = anyio.Path.exists
+    orig_mkdir = anyio.Path.mkdir
+
+    async def exists(self: anyio.Path) -> bool:
+        nonlocal calls
+        calls += 1
+        return await orig_exists(self)
+
+    async def mkdir(self: anyio.Path, *args: Any, **kwargs: Any) -> None:
+        nonlocal calls
+        calls += 1
+        await orig_mkdir(self, *args, **kwargs)
+
+    Scruby.napalm()
+    Scruby.run(hash_reduce_left=6)
+    car_coll = Scruby(Car)
+    if not use_cache:
+        # Emulate the behavior without the cache of branches.
+        car_coll._known_branches = NoCache()
+    keys = [f"Mazda:EZ-6 {num}" for num in range(number_ops)]
+
+    with patch.object(anyio.Path, "exists", exists), patch.object(anyio.Path, "mkdir", mkdir):
+        start = time.perf_counter()
+        for key in keys:
+            await car_coll._get_leaf_path(key)
+        elapsed = time.perf_counter() - start
+    Scruby.napalm()
+    return (calls / number_ops, elapsed / number_ops * 1_000_000)
+
+
+async def main() -> None:
+    """Compare `_get_leaf_path` with and without the cache of branches."""
+    for use_cache in (False, True):
+        calls_per_op, usec_per_op = await bench(use_cache=use_cache)
+        logging.info(
+            "cache=%s: %.2f file system calls/op, %.1f us/op",
+            use_cache,
+            calls_per_op,
+            usec_per_op,
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    anyio.run(main)
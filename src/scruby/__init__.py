@@ -31,16 +31,24 @@ __all__ = (
     "Scruby",
     "ScrubyModel",
     "CryptModel",
+    "Compression",
     "ScrubyConfig",
     "ReturnType",
     "CustomTask",
+    "KeyRef",
     "Utils",
+    "Where",
+    "Q",
 )
 
 
+from scruby.compression import Compression
 from scruby.config import ScrubyConfig
 from scruby.db import Scruby
+from scruby.key_ref import KeyRef
 from scruby.mixins.find import ReturnType
 from scruby.models import CryptModel, ScrubyModel
+from scruby.query import Q
 from scruby.task import CustomTask
 from scruby.utils import Utils
+from scruby.where import Where
@@ -0,0 +1,23 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Leaf-storage backends."""
+
+from __future__ import annotations
+
+__all__ = (
+    "DbmBackend",
+    "LeafBackend",
+    "LogBackend",
+    "MemoryBackend",
+    "MmapBackend",
+    "SqliteBackend",
+)
+
+from scruby.backends.base import LeafBackend
+from scruby.backends.dbm import DbmBackend
+from scruby.backends.log import LogBackend
+from scruby.backends.memory import MemoryBackend
+from scruby.backends.mmap import MmapBackend
+from scruby.backends.sqlite import SqliteBackend
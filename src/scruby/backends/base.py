@@ -0,0 +1,310 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Abstract leaf-storage backend.
+
+A collection is sharded into branches by the crc32 hash of the key,
+each branch has one leaf - a key-value store of JSON-documents.
+The backend stores the leaves, so that faster engines can be dropped in
+without changing the methods of collection.
+
+The backend is selected with `Scruby.run(backend=...)` -
+by name (for example "dbm") or by a subclass of `LeafBackend`.
+
+Primitive operations must be implemented by the backend,
+bulk operations have default implementations and can be optimized.
+"""
+
+from __future__ import annotations
+
+__all__ = ("LeafBackend",)
+
+import atexit
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar
+
+import anyio
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from anyio.abc import TaskGroup
+
+    from scruby.config import ScrubyConfig
+    from scruby.where import Condition
+
+
+class LeafBackend(ABC):
+    """Abstract leaf-storage backend of a collection.
+
+    Leaves are addressed by the path to leaf, keys are prepared keys of documents.
+
+    Args:
+        collection_path (str): Path to collection directory.
+        config (type[ScrubyConfig]): Database settings.
+    """
+
+    # Name for `Scruby.run(backend=...)`.
+    name: ClassVar[str] = ""
+    # Leaves are stored in the directories of branches.
+    needs_branch_dirs: ClassVar[bool] = True
+    # Backends by name.
+    _registry: ClassVar[dict[str, type[LeafBackend]]] = {}
+    # Backends of collections by path to collection directory.
+    _backends: ClassVar[dict[str, LeafBackend]] = {}
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: str,
+        config: type[ScrubyConfig],
+    ) -> None:
+        self.collection_path = collection_path
+        self.mode = config.mode
+        # Keys are assigned to branches by the part before this byte, None = by the whole key.
+        # It is used by backends that derive the branch from the key (see `MmapBackend`).
+        self.branch_separator: bytes | None = None
+        self._branch_numbers: dict[str, int] = {}
+        # Task group of background tasks, it is open while some task runs (see `_start_background`).
+        self._task_group: TaskGroup | None = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """Register the backend by name."""
+        super().__init_subclass__(**kwargs)
+        if cls.name:
+            LeafBackend._registry[cls.name] = cls
+
+    @staticmethod
+    def resolve(backend: str | type[LeafBackend]) -> type[LeafBackend]:
+        """Get the backend class by name.
+
+        Args:
+            backend (str | type[LeafBackend]): Name of backend or backend class.
+
+        Returns:
+            Backend class.
+        """
+        if isinstance(backend, str):
+            backend_cls = LeafBackend._registry.get(backend)
+            if backend_cls is None:
+                names = " | ".join(repr(name) for name in LeafBackend._registry)
+                msg = f"Scruby.run(backend = {backend!r}) - Valid values: {names} or a subclass of `LeafBackend`."
+                raise ValueError(msg)
+            return backend_cls
+        if not (isinstance(backend, type) and issubclass(backend, LeafBackend)):
+            msg = f"Scruby.run(backend = {backend!r}) - The backend must be a subclass of `LeafBackend`."
+            raise TypeError(msg)
+        return backend
+
+    @classmethod
+    def of_collection(cls, collection_path: Path | str, config: type[ScrubyConfig]) -> LeafBackend:
+        """Get the backend of collection, create it if necessary.
+
+        Args:
+            collection_path (Path | str): Path to collection directory.
+            config (type[ScrubyConfig]): Database settings.
+
+        Returns:
+            Backend of collection.
+        """
+        key = str(collection_path)
+        backend = LeafBackend._backends.get(key)
+        if backend is None or type(backend) is not cls:
+            if backend is not None:
+                # Hint: The backend of the previous run is replaced by a backend of another type.
+                backend.close_sync()
+            backend = cls(key, config)
+            LeafBackend._backends[key] = backend
+        return backend
+
+    def branch_number(self, leaf_path: Path | str) -> int:
+        """Get the number of branch from the path to leaf.
+
+        For backends that store the whole collection in one place.
+
+        Args:
+            leaf_path (Path | str): Path to leaf of collection.
+
+        Returns:
+            Number of branch.
+        """
+        leaf_key = str(leaf_path)
+        branch_number = self._branch_numbers.get(leaf_key)
+        if branch_number is None:
+            segments = Path(leaf_path).relative_to(self.collection_path).parts[:-1]
+            branch_number = self._branch_numbers[leaf_key] = int("".join(segments), 16)
+        return branch_number
+
+    # Primitive operations.
+
+    async def _start_background(self, fn: Callable[..., Awaitable[Any]], *args: Any) -> None:
+        """Run the task in the task group of the backend.
+
+        The coroutine that starts the first task opens the task group and waits for it to finish,
+        the tasks started by other coroutines meanwhile join the open group -
+        background tasks do not outlive the operations of the backend and their errors are not lost.
+
+        This method is for internal use.
+        """
+        if self._task_group is not None:
+            self._task_group.start_soon(fn, *args)
+            return
+        try:
+            async with anyio.create_task_group() as task_group:
+                self._task_group = task_group
+                task_group.start_soon(fn, *args)
+        finally:
+            self._task_group = None
+
+    @abstractmethod
+    async def leaf_exists(self, leaf_path: Path | str) -> bool:
+        """Return True when the leaf exists."""
+
+    @abstractmethod
+    async def get(self, leaf_path: Path | str, key: str | bytes) -> bytes | None:
+        """Get the value of key. If the key does not exist, return None."""
+
+    @abstractmethod
+    async def set(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> None:
+        """Set key to hold the value."""
+
+    @abstractmethod
+    async def delete(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Delete the key. Return False if the key does not exist."""
+
+    @abstractmethod
+    async def keys(self, leaf_path: Path | str) -> list[bytes]:
+        """Return existing keys of the leaf."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Close the backend of collection."""
+
+    @abstractmethod
+    def close_sync(self) -> None:
+        """Synchronous method for closing the backend of collection."""
+
+    # Operations with default implementations.
+
+    async def exists(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Return True when the key exists."""
+        return await self.get(leaf_path, key) is not None
+
+    async def add(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it does not exist. Return False if the key exists."""
+        if await self.exists(leaf_path, key):
+            return False
+        await self.set(leaf_path, key, value)
+        return True
+
+    async def replace(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it exists. Return False if the key does not exist."""
+        if not await self.exists(leaf_path, key):
+            return False
+        await self.set(leaf_path, key, value)
+        return True
+
+    async def count(self, leaf_path: Path | str) -> int:
+        """Return the number of keys in the leaf."""
+        return len(await self.keys(leaf_path))
+
+    async def keys_with_prefix(self, leaf_path: Path | str, prefix: bytes) -> list[bytes]:
+        """Return existing keys of the leaf that start with the prefix.
+
+        By default all keys of the leaf are read, backends with ordered keys read only the range of prefix.
+        """
+        return [key for key in await self.keys(leaf_path) if key.startswith(prefix)]
+
+    async def items(self, leaf_path: Path | str) -> list[tuple[bytes, bytes]]:
+        """Return all pairs of key and value of the leaf."""
+        keys = await self.keys(leaf_path)
+        values = await self.get_many(leaf_path, keys)
+        return [(key, value) for key, value in zip(keys, values, strict=True) if value is not None]
+
+    async def items_where(
+        self,
+        leaf_path: Path | str,
+        conditions: tuple[Condition, ...],  # ruff:ignore[unused-method-argument]
+    ) -> list[tuple[bytes, bytes]]:
+        """Return pairs of key and value of the leaf, skipping documents that do not match the conditions.
+
+        Documents are checked again by the caller, so by default all pairs are returned.
+        """
+        return await self.items(leaf_path)
+
+    async def get_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bytes | None]:
+        """Get the values of keys, None for missing keys."""
+        return [await self.get(leaf_path, key) for key in keys]
+
+    async def exists_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bool]:
+        """Return True for each key that exists."""
+        return [await self.exists(leaf_path, key) for key in keys]
+
+    async def add_many(self, leaf_path: Path | str, items: list[tuple[str, str]]) -> list[bool]:
+        """Set the keys that do not exist. Return False for each key that exists."""
+        return [await self.add(leaf_path, key, value) for key, value in items]
+
+    async def set_many(self, leaf_path: Path | str, items: list[tuple[bytes, str]] | list[tuple[str, str]]) -> None:
+        """Set keys to hold the values."""
+        for key, value in items:
+            await self.set(leaf_path, key, value)
+
+    async def delete_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> int:
+        """Delete the keys. Return the number of deleted keys."""
+        return sum([await self.delete(leaf_path, key) for key in keys])
+
+    def clear_sync(self) -> None:
+        """Synchronous method for removing all leaves before the collection directory is deleted."""
+        self.close_sync()
+
+    @staticmethod
+    def iter_leaf_sync(leaf_path: Path | str) -> Iterator[tuple[bytes, bytes]]:
+        """Synchronous iteration over pairs of key and value of the leaf.
+
+        Used by `Scruby.run(executor="process")` - it runs in a worker process,
+        so only the leaves stored on disk can be read.
+        """
+        msg = "Scruby.run(executor = 'process') - The storage backend does not support worker processes."
+        raise NotImplementedError(msg)
+
+    # Registry of collections.
+
+    @classmethod
+    async def close_collection(cls, collection_path: Path | str) -> None:
+        """Close the backend of collection.
+
+        Args:
+            collection_path (Path | str): Path to collection directory.
+
+        Returns:
+            None.
+        """
+        backend = LeafBackend._backends.pop(str(collection_path), None)
+        if backend is not None:
+            await backend.close()
+
+    @classmethod
+    def close_all_sync(cls) -> None:
+        """Synchronous method for closing the backends of all collections."""
+        backends = list(LeafBackend._backends.values())
+        LeafBackend._backends.clear()
+        for backend in backends:
+            backend.close_sync()
+
+    @classmethod
+    def napalm_sync(cls) -> None:
+        """Delete the data of all collections that is not stored in the database directory."""
+        return
+
+    @classmethod
+    def napalm_all_sync(cls) -> None:
+        """Synchronous method for closing the backends and deleting the data of all collections."""
+        cls.close_all_sync()
+        for backend_cls in LeafBackend._registry.values():
+            backend_cls.napalm_sync()
+
+
+# Leaves must be closed to flush data to disk.
+atexit.register(LeafBackend.close_all_sync)
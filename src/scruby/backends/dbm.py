@@ -0,0 +1,245 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Storage backend based on the `dbm` module - default.
+
+Each leaf is a `leaf.dbm` database in the directory of its branch,
+new leaves are created with the flavor of `dbm` selected by `Scruby.run(dbm_flavor=...)`.
+Open leaves are kept in the LRU pool of collection,
+each operation (including bulk operations) is one round-trip to a worker thread.
+Reads open leaves read-only and do not create missing leaves.
+"""
+
+from __future__ import annotations
+
+__all__ = ("DbmBackend",)
+
+import dbm
+import operator
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, final
+
+import anyio
+
+from scruby.backends.base import LeafBackend
+from scruby.backends.records import prefix_end
+from scruby.leaf_pool import LeafPool
+
+if TYPE_CHECKING:
+    from scruby.config import ScrubyConfig
+
+
+@final
+class DbmBackend(LeafBackend):
+    """Storage backend based on the `dbm` module.
+
+    Args:
+        collection_path (str): Path to collection directory.
+        config (type[ScrubyConfig]): Database settings.
+    """
+
+    name: ClassVar[str] = "dbm"
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: str,
+        config: type[ScrubyConfig],
+    ) -> None:
+        super().__init__(collection_path, config)
+        self.dbm_flavor = config.dbm_flavor
+        self.leaf_pool = LeafPool(
+            config.max_open_leaves,
+            config.leaf_idle_timeout,
+            config.mode,
+            config.dbm_flavor,
+            config.dbm_tuning,
+        )
+
+    async def _run(self, leaf_path: Path | str, fn: Any, *args: Any) -> Any:
+        """Run a synchronous function with the dbm object of the leaf in a worker thread.
+
+        This method is for internal use.
+        """
+        async with self.leaf_pool.leaf(leaf_path) as leaf:
+            return await leaf.run(fn, *args)
+
+    async def _read(self, leaf_path: Path | str, default: Any, fn: Any, *args: Any) -> Any:
+        """Run a synchronous function with the read-only dbm object of the leaf.
+
+        If the leaf does not exist, return the default value.
+
+        This method is for internal use.
+        """
+        try:
+            async with self.leaf_pool.leaf(leaf_path, readonly=True) as leaf:
+                return await leaf.run(fn, *args)
+        except FileNotFoundError:
+            return default
+
+    async def leaf_exists(self, leaf_path: Path | str) -> bool:
+        """Return True when the leaf exists."""
+        if await anyio.Path(leaf_path).exists():
+            return True
+        # Hint: The "ndbm" and "dumb" flavors add extensions to the file names.
+        if self.dbm_flavor in ("ndbm", "dumb"):
+            return await anyio.to_thread.run_sync(dbm.whichdb, str(leaf_path)) is not None
+        return False
+
+    async def get(self, leaf_path: Path | str, key: str | bytes) -> bytes | None:
+        """Get the value of key. If the key does not exist, return None."""
+        return await self._read(leaf_path, None, _get, key)
+
+    async def set(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> None:
+        """Set key to hold the value."""
+        await self._run(leaf_path, _set, key, value)
+
+    async def delete(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Delete the key. Return False if the key does not exist."""
+        return await self._run(leaf_path, _delete, key)
+
+    async def keys(self, leaf_path: Path | str) -> list[bytes]:
+        """Return existing keys of the leaf."""
+        return await self._read(leaf_path, [], _keys)
+
+    async def keys_with_prefix(self, leaf_path: Path | str, prefix: bytes) -> list[bytes]:
+        """Return existing keys of the leaf that start with the prefix.
+
+        Leaves of the `sqlite3` flavor read the range of keys, other flavors read all keys of the leaf.
+        """
+        return await self._read(leaf_path, [], _keys_with_prefix, prefix)
+
+    async def exists(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Return True when the key exists."""
+        return await self._read(leaf_path, False, operator.contains, key)
+
+    async def add(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it does not exist. Return False if the key exists."""
+        return await self._run(leaf_path, _add, key, value)
+
+    async def replace(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it exists. Return False if the key does not exist."""
+        return await self._run(leaf_path, _replace, key, value)
+
+    async def count(self, leaf_path: Path | str) -> int:
+        """Return the number of keys in the leaf."""
+        return await self._read(leaf_path, 0, len)
+
+    async def items(self, leaf_path: Path | str) -> list[tuple[bytes, bytes]]:
+        """Return all pairs of key and value of the leaf."""
+        return await self._read(leaf_path, [], _items)
+
+    async def get_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bytes | None]:
+        """Get the values of keys, None for missing keys."""
+        return await self._read(leaf_path, [None] * len(keys), _get_many, keys)
+
+    async def exists_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bool]:
+        """Return True for each key that exists."""
+        return await self._read(leaf_path, [False] * len(keys), _exists_many, keys)
+
+    async def add_many(self, leaf_path: Path | str, items: list[tuple[str, str]]) -> list[bool]:
+        """Set the keys that do not exist. Return False for each key that exists."""
+        return await self._run(leaf_path, _add_many, items)
+
+    async def set_many(self, leaf_path: Path | str, items: list[tuple[bytes, str]] | list[tuple[str, str]]) -> None:
+        """Set keys to hold the values."""
+        await self._run(leaf_path, _set_many, items)
+
+    async def delete_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> int:
+        """Delete the keys. Return the number of deleted keys."""
+        return await self._run(leaf_path, _delete_many, keys)
+
+    async def close(self) -> None:
+        """Close open leaves of collection."""
+        await self.leaf_pool.close()
+
+    def close_sync(self) -> None:
+        """Synchronous method for closing open leaves of collection."""
+        self.leaf_pool.close_sync()
+
+    @staticmethod
+    def iter_leaf_sync(leaf_path: Path | str) -> Iterator[tuple[bytes, bytes]]:
+        """Synchronous iteration over pairs of key and value of the leaf.
+
+        It runs in a worker process.
+        """
+        if dbm.whichdb(str(leaf_path)) is None:
+            return
+        with dbm.open(str(leaf_path), "r") as leaf_db:
+            # Hint: `dbm.gnu` objects do not support iteration.
+            for key in leaf_db.keys():  # ruff:ignore[in-dict-keys]
+                yield (key, leaf_db[key])
+
+
+# Functions run in a worker thread and receive the dbm object.
+
+
+def _get(db: Any, key: str | bytes) -> bytes | None:
+    return db.get(key)
+
+
+def _set(db: Any, key: str | bytes, value: str | bytes) -> None:
+    db[key] = value
+
+
+def _delete(db: Any, key: str | bytes) -> bool:
+    if key not in db:
+        return False
+    del db[key]
+    return True
+
+
+def _keys(db: Any) -> list[bytes]:
+    return db.keys()
+
+
+def _keys_with_prefix(db: Any, prefix: bytes) -> list[bytes]:
+    if type(db).__module__ != "dbm.sqlite3":
+        return [key for key in db.keys() if key.startswith(prefix)]  # ruff:ignore[in-dict-keys]
+    # Hint: `dbm.sqlite3` keeps the keys in a unique index and does not expose its connection.
+    end = prefix_end(prefix)
+    if end is None:
+        rows = db._cx.execute("SELECT key FROM Dict WHERE key >= ?", (prefix,))
+    else:
+        rows = db._cx.execute("SELECT key FROM Dict WHERE key >= ? AND key < ?", (prefix, end))
+    return [row[0] for row in rows]
+
+
+def _add(db: Any, key: str | bytes, value: str | bytes) -> bool:
+    if key in db:
+        return False
+    db[key] = value
+    return True
+
+
+def _replace(db: Any, key: str | bytes, value: str | bytes) -> bool:
+    if key not in db:
+        return False
+    db[key] = value
+    return True
+
+
+def _items(db: Any) -> list[tuple[bytes, bytes]]:
+    return [(key, db[key]) for key in db.keys()]  # ruff:ignore[in-dict-keys]
+
+
+def _get_many(db: Any, keys: list[str] | list[bytes]) -> list[bytes | None]:
+    return [db.get(key) for key in keys]
+
+
+def _exists_many(db: Any, keys: list[str] | list[bytes]) -> list[bool]:
+    return [key in db for key in keys]
+
+
+def _add_many(db: Any, items: list[tuple[str, str]]) -> list[bool]:
+    return [_add(db, key, value) for key, value in items]
+
+
+def _set_many(db: Any, items: list[tuple[bytes, str]] | list[tuple[str, str]]) -> None:
+    for key, value in items:
+        db[key] = value
+
+
+def _delete_many(db: Any, keys: list[str] | list[bytes]) -> int:
+    return sum(_delete(db, key) for key in keys)
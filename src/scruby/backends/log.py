@@ -0,0 +1,628 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Log-structured storage backend.
+
+Each leaf is an append-only data file `leaf.log` in the directory of its branch
+and an in-memory index of keys to the offsets of values.
+Inserts, updates and deletes are sequential appends, scans read the data file sequentially.
+
+- Record of data file - crc32, operation (set | delete), length of key, length of value, key, value.
+- The index is saved to the hint file `leaf.hint` when the leaf is closed and after compaction,
+  when the leaf is opened, the index is loaded from the hint file and the tail of data file is replayed.
+- When the share of dead records (overwritten and deleted) exceeds `log_compaction_threshold`,
+  the live records are rewritten to a new data file in a worker thread,
+  operations on the leaf continue meanwhile.
+- Reads and writes of a leaf run in worker threads, one at a time per leaf.
+
+Hint: The index lives in the process - only one process should write to the database.
+"""
+
+from __future__ import annotations
+
+__all__ = ("LogBackend",)
+
+import contextlib
+import os
+import struct
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, final
+
+import anyio
+import anyio.to_thread
+
+from scruby.backends.base import LeafBackend
+from scruby.backends.records import (
+    OP_DELETE,
+    OP_SET,
+    RECORD_HEADER,
+    iter_records,
+    pack_record,
+    pread_all,
+    sorted_with_prefix,
+    to_bytes,
+)
+
+if TYPE_CHECKING:
+    from scruby.config import ScrubyConfig
+
+# Size of data file covered by the hint file.
+_HINT_HEADER = struct.Struct("<Q")
+# Length of key, offset of value, length of value.
+_HINT_ENTRY = struct.Struct("<IQI")
+# Result of a method of the leaf that was closed before the call.
+_CLOSED = object()
+
+
+@final
+class _LogLeaf:
+    """Open leaf - the data file and the index of keys.
+
+    This class is for internal use.
+    """
+
+    __slots__ = (
+        "closed",
+        "compaction",
+        "data_path",
+        "dead_bytes",
+        "fd",
+        "hint_path",
+        "index",
+        "limiter",
+        "mode",
+        "size",
+        "sorted_keys",
+    )
+
+    def __init__(self, data_path: Path, mode: int) -> None:
+        self.data_path = data_path
+        self.hint_path = data_path.with_suffix(".hint")
+        self.mode = mode
+        # Key -> (offset of value, length of value).
+        self.index: dict[bytes, tuple[int, int]] = {}
+        self.size: int = 0
+        # Size of overwritten and deleted records.
+        self.dead_bytes: int = 0
+        # Sorted keys, built by the first read of keys by prefix.
+        self.sorted_keys: list[bytes] | None = None
+        # It is set when the running compaction is finished.
+        self.compaction: anyio.Event | None = None
+        self.closed: bool = False
+        # Hint: A single token - the methods of leaf run in worker threads one at a time.
+        self.limiter = anyio.CapacityLimiter(1)
+        # Remove the data file of interrupted compaction.
+        data_path.with_suffix(".compact").unlink(missing_ok=True)
+        self.fd = os.open(data_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, mode)
+        self._load()
+
+    def _load(self) -> None:
+        """Load the index from the hint file and replay the tail of data file."""
+        file_size = os.fstat(self.fd).st_size
+        start = 0
+        with contextlib.suppress(FileNotFoundError, struct.error):
+            hint = self.hint_path.read_bytes()
+            (covered_size,) = _HINT_HEADER.unpack_from(hint, 0)
+            if covered_size <= file_size:
+                index: dict[bytes, tuple[int, int]] = {}
+                position = _HINT_HEADER.size
+                live_bytes = 0
+                while position < len(hint):
+                    key_length, value_offset, value_length = _HINT_ENTRY.unpack_from(hint, position)
+                    position += _HINT_ENTRY.size
+                    key = hint[position : position + key_length]
+                    position += key_length
+                    index[key] = (value_offset, value_length)
+                    live_bytes += RECORD_HEADER.size + key_length + value_length
+                self.index = index
+                self.dead_bytes = covered_size - live_bytes
+                start = covered_size
+        self.size = start
+        self._replay(pread_all(self.fd, start, file_size - start), start)
+        if self.size < file_size:
+            # Cut off the torn record of interrupted write.
+            os.ftruncate(self.fd, self.size)
+
+    def _replay(self, buffer: bytes, base_offset: int) -> None:
+        """Apply the records of buffer to the index."""
+        for op, key, value_offset, value_length, record_size in iter_records(buffer, base_offset):
+            old = self.index.pop(key, None)
+            if old is not None:
+                self.dead_bytes += RECORD_HEADER.size + len(key) + old[1]
+            if op == OP_SET:
+                self.index[key] = (value_offset, value_length)
+            else:
+                # The tombstone itself is dead.
+                self.dead_bytes += record_size
+            self.size += record_size
+
+    def get(self, key: bytes) -> bytes | None:
+        """Get the value of key."""
+        position = self.index.get(key)
+        if position is None:
+            return None
+        return pread_all(self.fd, *position)
+
+    def get_many(self, keys: list[bytes]) -> list[bytes | None]:
+        """Get the values of keys, None for missing keys."""
+        return [self.get(key) for key in keys]
+
+    def add_many(self, items: list[tuple[bytes, bytes]]) -> list[bool]:
+        """Append the records of keys that do not exist. Return False for each key that exists."""
+        results: list[bool] = []
+        new_items: dict[bytes, bytes] = {}
+        for key, value in items:
+            added = key not in self.index and key not in new_items
+            if added:
+                new_items[key] = value
+            results.append(added)
+        self.set_many(list(new_items.items()))
+        return results
+
+    def replace(self, key: bytes, value: bytes) -> bool:
+        """Append the record of key only if it exists. Return False if the key does not exist."""
+        if key not in self.index:
+            return False
+        self.set_many([(key, value)])
+        return True
+
+    def set_many(self, items: list[tuple[bytes, bytes]]) -> None:
+        """Append the records of keys with one write."""
+        records = bytearray()
+        for key, value in items:
+            offset = self.size + len(records)
+            records += pack_record(OP_SET, key, value)
+            old = self.index.get(key)
+            if old is not None:
+                self.dead_bytes += RECORD_HEADER.size + len(key) + old[1]
+            elif self.sorted_keys is not None:
+                insort(self.sorted_keys, key)
+            self.index[key] = (offset + RECORD_HEADER.size + len(key), len(value))
+        self._append(records)
+
+    def delete_many(self, keys: list[bytes]) -> int:
+        """Append the tombstones of existing keys with one write."""
+        records = bytearray()
+        deleted = 0
+        for key in keys:
+            old = self.index.pop(key, None)
+            if old is not None:
+                record = pack_record(OP_DELETE, key)
+                records += record
+                self.dead_bytes += RECORD_HEADER.size + len(key) + old[1] + len(record)
+                deleted += 1
+                if self.sorted_keys is not None:
+                    del self.sorted_keys[bisect_left(self.sorted_keys, key)]
+        self._append(records)
+        return deleted
+
+    def _append(self, records: bytes | bytearray) -> None:
+        """Append records to the data file."""
+        if records:
+            os.write(self.fd, records)
+            self.size += len(records)
+
+    def keys_with_prefix(self, prefix: bytes) -> list[bytes]:
+        """Keys with the prefix, the sorted keys are built by the first call."""
+        if self.sorted_keys is None:
+            self.sorted_keys = sorted(self.index)
+        return sorted_with_prefix(self.sorted_keys, prefix)
+
+    def items(self) -> list[tuple[bytes, bytes]]:
+        """Read all pairs of key and value with one sequential read of data file."""
+        if not self.index:
+            return []
+        buffer = pread_all(self.fd, 0, self.size)
+        return [
+            (key, buffer[value_offset : value_offset + value_length])
+            for key, (value_offset, value_length) in self.index.items()
+        ]
+
+    def snapshot(self) -> tuple[dict[bytes, tuple[int, int]], int]:
+        """Copy of the index and size of data file for compaction."""
+        return (dict(self.index), self.size)
+
+    def swap(
+        self,
+        new_fd: int,
+        new_index: dict[bytes, tuple[int, int]],
+        new_size: int,
+        covered_size: int,
+        compact_path: Path,
+    ) -> None:
+        """Copy the tail appended during rewriting to the new data file and replace the data file with it."""
+        if self.closed:
+            os.close(new_fd)
+            compact_path.unlink(missing_ok=True)
+            return
+        tail = pread_all(self.fd, covered_size, self.size - covered_size)
+        dead_bytes = 0
+        for op, key, value_offset, value_length, record_size in iter_records(tail, covered_size):
+            old = new_index.pop(key, None)
+            if old is not None:
+                dead_bytes += RECORD_HEADER.size + len(key) + old[1]
+            if op == OP_SET:
+                new_index[key] = (value_offset - covered_size + new_size, value_length)
+            else:
+                dead_bytes += record_size
+        os.write(new_fd, tail)
+        # Hint: The old hint file does not match the new data file.
+        self.hint_path.unlink(missing_ok=True)
+        compact_path.replace(self.data_path)
+        os.close(self.fd)
+        self.fd = new_fd
+        # Hint: The new index has the same keys, so the sorted keys stay valid.
+        self.index = new_index
+        self.size = new_size + len(tail)
+        self.dead_bytes = dead_bytes
+        with contextlib.suppress(OSError):
+            self.write_hint(self.index, self.size)
+
+    def write_hint(self, index: dict[bytes, tuple[int, int]], covered_size: int) -> None:
+        """Atomically save the index to the hint file."""
+        entries = bytearray(_HINT_HEADER.pack(covered_size))
+        for key, (value_offset, value_length) in index.items():
+            entries += _HINT_ENTRY.pack(len(key), value_offset, value_length)
+            entries += key
+        tmp_path = self.hint_path.with_suffix(".hint.tmp")
+        tmp_path.write_bytes(entries)
+        tmp_path.replace(self.hint_path)
+
+    def close(self) -> None:
+        """Save the hint file and close the data file."""
+        if self.closed:
+            return
+        self.closed = True
+        with contextlib.suppress(OSError):
+            self.write_hint(self.index, self.size)
+        os.close(self.fd)
+
+
+def _call_open(leaf: _LogLeaf, fn: Callable[..., Any], *args: Any) -> Any:
+    """Call the method of leaf, unless the leaf was closed - runs in a worker thread."""
+    return _CLOSED if leaf.closed else fn(leaf, *args)
+
+
+def _write_live(fd: int, new_fd: int, index: dict[bytes, tuple[int, int]]) -> tuple[dict[bytes, tuple[int, int]], int]:
+    """Copy live records to the new data file.
+
+    Returns:
+        New index and size of new data file.
+    """
+    new_index: dict[bytes, tuple[int, int]] = {}
+    records = bytearray()
+    size = 0
+    for key, (value_offset, value_length) in index.items():
+        value = pread_all(fd, value_offset, value_length)
+        new_index[key] = (size + len(records) + RECORD_HEADER.size + len(key), value_length)
+        records += pack_record(OP_SET, key, value)
+        # Sequential writes in large chunks.
+        if len(records) >= 1 << 20:
+            os.write(new_fd, records)
+            size += len(records)
+            records.clear()
+    os.write(new_fd, records)
+    size += len(records)
+    return (new_index, size)
+
+
+def _rewrite_live(
+    fd: int,
+    index: dict[bytes, tuple[int, int]],
+    compact_path: Path,
+    mode: int,
+) -> tuple[int, dict[bytes, tuple[int, int]], int]:
+    """Rewrite live records to a new data file - runs in a worker thread.
+
+    Returns:
+        Descriptor of new data file, new index and size of new data file.
+    """
+    new_fd = os.open(compact_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_APPEND, mode)
+    try:
+        new_index, size = _write_live(fd, new_fd, index)
+    except BaseException:
+        os.close(new_fd)
+        compact_path.unlink(missing_ok=True)
+        raise
+    return (new_fd, new_index, size)
+
+
+@final
+class LogBackend(LeafBackend):
+    """Log-structured storage backend.
+
+    Args:
+        collection_path (str): Path to collection directory.
+        config (type[ScrubyConfig]): Database settings.
+    """
+
+    name: ClassVar[str] = "log"
+    # Leaves smaller than this number of bytes are not compacted.
+    min_compaction_size: ClassVar[int] = 1 << 16
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: str,
+        config: type[ScrubyConfig],
+    ) -> None:
+        super().__init__(collection_path, config)
+        self.max_open_leaves = max(config.max_open_leaves, 1)
+        self.compaction_threshold = config.log_compaction_threshold
+        self.leaves: OrderedDict[str, _LogLeaf] = OrderedDict()
+        # Leaves that are being closed - they are reopened only after closing.
+        self._closing: dict[str, anyio.Event] = {}
+        self._open_lock = anyio.Lock()
+
+    @staticmethod
+    def _data_path(leaf_path: Path | str) -> Path:
+        """Get the path to data file of leaf.
+
+        This method is for internal use.
+        """
+        return Path(leaf_path).with_suffix(".log")
+
+    async def _leaf(self, leaf_path: Path | str, create: bool = False) -> _LogLeaf | None:
+        """Get the open leaf, open it if necessary.
+
+        If the leaf does not exist and `create` is False, return None.
+
+        This method is for internal use.
+        """
+        leaf_key = str(leaf_path)
+        while (closing := self._closing.get(leaf_key)) is not None:
+            await closing.wait()
+        leaf = self.leaves.get(leaf_key)
+        if leaf is None:
+            async with self._open_lock:
+                leaf = self.leaves.get(leaf_key)
+                if leaf is None:
+                    data_path = self._data_path(leaf_path)
+                    if not create and not await anyio.Path(data_path).exists():
+                        return None
+                    leaf = await anyio.to_thread.run_sync(_LogLeaf, data_path, self.mode)
+                    self.leaves[leaf_key] = leaf
+                    await self._close_over_limit()
+        else:
+            self.leaves.move_to_end(leaf_key)
+        return leaf
+
+    async def _run(self, leaf_path: Path | str, create: bool, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run the method of leaf in a worker thread, the methods of a leaf run one at a time.
+
+        If the leaf does not exist and `create` is False, return None.
+        If the leaf was closed by another coroutine meanwhile, it is reopened.
+
+        This method is for internal use.
+        """
+        while True:
+            leaf = await self._leaf(leaf_path, create)
+            if leaf is None:
+                return None
+            result = await anyio.to_thread.run_sync(_call_open, leaf, fn, *args, limiter=leaf.limiter)
+            if result is not _CLOSED:
+                return result
+
+    async def _close_over_limit(self) -> None:
+        """Close the least recently used leaves over the limit.
+
+        This method is for internal use.
+        """
+        for leaf_key, leaf in list(self.leaves.items()):
+            if len(self.leaves) <= self.max_open_leaves:
+                break
+            # Leaves under compaction are closed after it.
+            if leaf.compaction is None and self.leaves.get(leaf_key) is leaf:
+                await self._close_leaf(leaf_key, leaf)
+
+    async def _close_leaf(self, leaf_key: str, leaf: _LogLeaf) -> None:
+        """Remove the leaf from the open leaves and close it after the running method of leaf.
+
+        The leaf is not reopened until it is closed.
+
+        This method is for internal use.
+        """
+        del self.leaves[leaf_key]
+        closing = self._closing[leaf_key] = anyio.Event()
+        try:
+            await anyio.to_thread.run_sync(leaf.close, limiter=leaf.limiter)
+        finally:
+            del self._closing[leaf_key]
+            closing.set()
+
+    async def _maybe_compact(self, leaf_path: Path | str) -> None:
+        """Compact the leaf, if the share of dead records exceeds the threshold.
+
+        This method is for internal use.
+        """
+        leaf = self.leaves.get(str(leaf_path))
+        if (
+            leaf is not None
+            and leaf.compaction is None
+            and leaf.size >= self.min_compaction_size
+            and leaf.dead_bytes >= leaf.size * self.compaction_threshold
+        ):
+            leaf.compaction = anyio.Event()
+            await self._start_background(self._compact, leaf)
+
+    async def _compact(self, leaf: _LogLeaf) -> None:
+        """Rewrite live records of leaf to a new data file.
+
+        Writes continue to the old data file during rewriting,
+        the records appended meanwhile are copied to the new data file before swapping.
+
+        This method is for internal use.
+        """
+        compaction = leaf.compaction
+        compact_path = leaf.data_path.with_suffix(".compact")
+        try:
+            index, covered_size = await anyio.to_thread.run_sync(leaf.snapshot, limiter=leaf.limiter)
+            try:
+                new_fd, new_index, new_size = await anyio.to_thread.run_sync(
+                    _rewrite_live,
+                    leaf.fd,
+                    index,
+                    compact_path,
+                    leaf.mode,
+                )
+            except OSError:
+                # The leaf was closed during compaction.
+                return
+            await anyio.to_thread.run_sync(
+                leaf.swap,
+                new_fd,
+                new_index,
+                new_size,
+                covered_size,
+                compact_path,
+                limiter=leaf.limiter,
+            )
+        finally:
+            leaf.compaction = None
+            if compaction is not None:
+                compaction.set()
+
+    async def compact(self, leaf_path: Path | str) -> None:
+        """Rewrite live records of the leaf to a new data file, regardless of the threshold.
+
+        Args:
+            leaf_path (Path | str): Path to leaf of collection.
+
+        Returns:
+            None.
+        """
+        leaf = await self._leaf(leaf_path)
+        if leaf is None:
+            return
+        if leaf.compaction is None:
+            leaf.compaction = anyio.Event()
+            await self._start_background(self._compact, leaf)
+        # Hint: The compaction was started by another coroutine.
+        if (compaction := leaf.compaction) is not None:
+            await compaction.wait()
+
+    async def leaf_exists(self, leaf_path: Path | str) -> bool:
+        """Return True when the leaf exists."""
+        return str(leaf_path) in self.leaves or await anyio.Path(self._data_path(leaf_path)).exists()
+
+    async def get(self, leaf_path: Path | str, key: str | bytes) -> bytes | None:
+        """Get the value of key. If the key does not exist, return None."""
+        return await self._run(leaf_path, False, _LogLeaf.get, to_bytes(key))
+
+    async def set(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> None:
+        """Set key to hold the value."""
+        await self.set_many(leaf_path, [(key, value)])
+
+    async def delete(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Delete the key. Return False if the key does not exist."""
+        return await self.delete_many(leaf_path, [key]) == 1
+
+    async def keys(self, leaf_path: Path | str) -> list[bytes]:
+        """Return existing keys of the leaf."""
+        leaf = await self._leaf(leaf_path)
+        return list(leaf.index) if leaf is not None else []
+
+    async def keys_with_prefix(self, leaf_path: Path | str, prefix: bytes) -> list[bytes]:
+        """Return existing keys of the leaf that start with the prefix."""
+        return await self._run(leaf_path, False, _LogLeaf.keys_with_prefix, prefix) or []
+
+    async def exists(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Return True when the key exists."""
+        leaf = await self._leaf(leaf_path)
+        return leaf is not None and to_bytes(key) in leaf.index
+
+    async def add(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it does not exist. Return False if the key exists."""
+        return (await self.add_many(leaf_path, [(key, value)]))[0]
+
+    async def replace(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it exists. Return False if the key does not exist."""
+        replaced = bool(await self._run(leaf_path, False, _LogLeaf.replace, to_bytes(key), to_bytes(value)))
+        if replaced:
+            await self._maybe_compact(leaf_path)
+        return replaced
+
+    async def count(self, leaf_path: Path | str) -> int:
+        """Return the number of keys in the leaf."""
+        leaf = await self._leaf(leaf_path)
+        return len(leaf.index) if leaf is not None else 0
+
+    async def items(self, leaf_path: Path | str) -> list[tuple[bytes, bytes]]:
+        """Return all pairs of key and value of the leaf."""
+        return await self._run(leaf_path, False, _LogLeaf.items) or []
+
+    async def get_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bytes | None]:
+        """Get the values of keys, None for missing keys."""
+        values = await self._run(leaf_path, False, _LogLeaf.get_many, [to_bytes(key) for key in keys])
+        return values if values is not None else [None] * len(keys)
+
+    async def exists_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bool]:
+        """Return True for each key that exists."""
+        leaf = await self._leaf(leaf_path)
+        if leaf is None:
+            return [False] * len(keys)
+        return [to_bytes(key) in leaf.index for key in keys]
+
+    async def add_many(self, leaf_path: Path | str, items: list[tuple[str, str]]) -> list[bool]:
+        """Set the keys that do not exist. Return False for each key that exists."""
+        return await self._run(
+            leaf_path,
+            True,
+            _LogLeaf.add_many,
+            [(to_bytes(key), to_bytes(value)) for key, value in items],
+        )
+
+    async def set_many(self, leaf_path: Path | str, items: list[tuple[bytes, str]] | list[tuple[str, str]]) -> None:
+        """Set keys to hold the values."""
+        await self._run(leaf_path, True, _LogLeaf.set_many, [(to_bytes(key), to_bytes(value)) for key, value in items])
+        await self._maybe_compact(leaf_path)
+
+    async def delete_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> int:
+        """Delete the keys. Return the number of deleted keys."""
+        deleted = await self._run(leaf_path, False, _LogLeaf.delete_many, [to_bytes(key) for key in keys]) or 0
+        if deleted:
+            await self._maybe_compact(leaf_path)
+        return deleted
+
+    async def close(self) -> None:
+        """Wait for compaction, save the hint files and close the leaves of collection."""
+        for leaf_key, leaf in list(self.leaves.items()):
+            if (compaction := leaf.compaction) is not None:
+                await compaction.wait()
+            if self.leaves.get(leaf_key) is leaf:
+                await self._close_leaf(leaf_key, leaf)
+        # Wait for the leaves that are being closed by other coroutines.
+        while self._closing:
+            await next(iter(self._closing.values())).wait()
+
+    def close_sync(self) -> None:
+        """Synchronous method for closing the leaves of collection.
+
+        Unfinished compaction is discarded.
+        """
+        leaves = list(self.leaves.values())
+        self.leaves.clear()
+        for leaf in leaves:
+            leaf.close()
+
+    @staticmethod
+    def iter_leaf_sync(leaf_path: Path | str) -> Iterator[tuple[bytes, bytes]]:
+        """Synchronous iteration over pairs of key and value of the leaf.
+
+        It runs in a worker process - the data file is replayed without the index.
+        """
+        data_path = LogBackend._data_path(leaf_path)
+        if not data_path.exists():
+            return
+        buffer = data_path.read_bytes()
+        index: dict[bytes, tuple[int, int]] = {}
+        for op, key, value_offset, value_length, _ in iter_records(buffer):
+            if op == OP_SET:
+                index[key] = (value_offset, value_length)
+            else:
+                index.pop(key, None)
+        for key, (value_offset, value_length) in index.items():
+            yield (key, buffer[value_offset : value_offset + value_length])
@@ -0,0 +1,248 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""In-memory storage backend.
+
+Keeps the same branch/leaf sharding as on disk -
+each leaf is a dictionary of serialized documents.
+For benchmarks, tests and ephemeral workloads,
+and to separate the CPU costs (validation, filtering) from I/O in profiling.
+
+Data lives as long as the process, it is deleted by `Scruby.napalm()` and `clear_collection`.
+With `Scruby.run(memory_snapshot=True)`, the collection is loaded from `<collection>/memory.snapshot`
+and saved to it when the collection is closed and when the process exits.
+"""
+
+from __future__ import annotations
+
+__all__ = ("MemoryBackend",)
+
+import json
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar, final
+
+from scruby.backends.base import LeafBackend
+from scruby.backends.records import sorted_with_prefix, to_bytes
+
+if TYPE_CHECKING:
+    from scruby.config import ScrubyConfig
+
+
+@final
+class MemoryBackend(LeafBackend):
+    """In-memory storage backend.
+
+    Args:
+        collection_path (str): Path to collection directory.
+        config (type[ScrubyConfig]): Database settings.
+    """
+
+    name: ClassVar[str] = "memory"
+    needs_branch_dirs: ClassVar[bool] = False
+    # Leaves of collections by path to collection directory.
+    # Hint: Data survives closing of the collection.
+    _stores: ClassVar[dict[str, dict[str, dict[bytes, bytes]]]] = {}
+    # Sorted keys of leaves by path to collection directory, built by the first read of keys by prefix.
+    _sorted_stores: ClassVar[dict[str, dict[str, list[bytes]]]] = {}
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: str,
+        config: type[ScrubyConfig],
+    ) -> None:
+        super().__init__(collection_path, config)
+        self.snapshot_path: Path | None = Path(collection_path, "memory.snapshot") if config.memory_snapshot else None
+        leaves = MemoryBackend._stores.get(collection_path)
+        if leaves is None:
+            leaves = MemoryBackend._stores[collection_path] = {}
+            if self.snapshot_path is not None:
+                self._load_snapshot(leaves)
+        self.leaves = leaves
+        self.sorted_keys = MemoryBackend._sorted_stores.setdefault(collection_path, {})
+
+    def _leaf(self, leaf_path: Path | str) -> dict[bytes, bytes]:
+        """Get the leaf, create it if necessary.
+
+        This method is for internal use.
+        """
+        leaf_key = str(leaf_path)
+        leaf = self.leaves.get(leaf_key)
+        if leaf is None:
+            leaf = self.leaves[leaf_key] = {}
+        return leaf
+
+    def _keys_added(self, leaf_path: Path | str, keys: list[bytes]) -> None:
+        """Insert the new keys into the sorted keys of leaf, if they are kept.
+
+        This method is for internal use.
+        """
+        sorted_keys = self.sorted_keys.get(str(leaf_path))
+        if sorted_keys is not None:
+            for key in keys:
+                insort(sorted_keys, key)
+
+    def _keys_removed(self, leaf_path: Path | str, keys: list[bytes]) -> None:
+        """Remove the deleted keys from the sorted keys of leaf, if they are kept.
+
+        This method is for internal use.
+        """
+        sorted_keys = self.sorted_keys.get(str(leaf_path))
+        if sorted_keys is not None:
+            for key in keys:
+                del sorted_keys[bisect_left(sorted_keys, key)]
+
+    async def leaf_exists(self, leaf_path: Path | str) -> bool:
+        """Return True when the leaf exists."""
+        return str(leaf_path) in self.leaves
+
+    async def get(self, leaf_path: Path | str, key: str | bytes) -> bytes | None:
+        """Get the value of key. If the key does not exist, return None."""
+        leaf = self.leaves.get(str(leaf_path))
+        return leaf.get(to_bytes(key)) if leaf is not None else None
+
+    async def set(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> None:
+        """Set key to hold the value."""
+        await self.set_many(leaf_path, [(key, value)])
+
+    async def delete(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Delete the key. Return False if the key does not exist."""
+        return await self.delete_many(leaf_path, [key]) == 1
+
+    async def keys(self, leaf_path: Path | str) -> list[bytes]:
+        """Return existing keys of the leaf."""
+        return list(self.leaves.get(str(leaf_path), ()))
+
+    async def keys_with_prefix(self, leaf_path: Path | str, prefix: bytes) -> list[bytes]:
+        """Return existing keys of the leaf that start with the prefix.
+
+        The sorted keys of leaf are built by the first call and then kept up to date by writes.
+        """
+        leaf_key = str(leaf_path)
+        sorted_keys = self.sorted_keys.get(leaf_key)
+        if sorted_keys is None:
+            sorted_keys = self.sorted_keys[leaf_key] = sorted(self.leaves.get(leaf_key, ()))
+        return sorted_with_prefix(sorted_keys, prefix)
+
+    async def exists(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Return True when the key exists."""
+        leaf = self.leaves.get(str(leaf_path))
+        return leaf is not None and to_bytes(key) in leaf
+
+    async def add(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it does not exist. Return False if the key exists."""
+        leaf = self._leaf(leaf_path)
+        key = to_bytes(key)
+        if key in leaf:
+            return False
+        leaf[key] = to_bytes(value)
+        self._keys_added(leaf_path, [key])
+        return True
+
+    async def replace(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it exists. Return False if the key does not exist."""
+        leaf = self.leaves.get(str(leaf_path))
+        key = to_bytes(key)
+        if leaf is None or key not in leaf:
+            return False
+        leaf[key] = to_bytes(value)
+        return True
+
+    async def count(self, leaf_path: Path | str) -> int:
+        """Return the number of keys in the leaf."""
+        return len(self.leaves.get(str(leaf_path), ()))
+
+    async def items(self, leaf_path: Path | str) -> list[tuple[bytes, bytes]]:
+        """Return all pairs of key and value of the leaf."""
+        return list(self.leaves.get(str(leaf_path), {}).items())
+
+    async def get_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bytes | None]:
+        """Get the values of keys, None for missing keys."""
+        leaf = self.leaves.get(str(leaf_path), {})
+        return [leaf.get(to_bytes(key)) for key in keys]
+
+    async def exists_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bool]:
+        """Return True for each key that exists."""
+        leaf = self.leaves.get(str(leaf_path), {})
+        return [to_bytes(key) in leaf for key in keys]
+
+    async def add_many(self, leaf_path: Path | str, items: list[tuple[str, str]]) -> list[bool]:
+        """Set the keys that do not exist. Return False for each key that exists."""
+        return [await self.add(leaf_path, key, value) for key, value in items]
+
+    async def set_many(self, leaf_path: Path | str, items: list[tuple[bytes, str]] | list[tuple[str, str]]) -> None:
+        """Set keys to hold the values."""
+        leaf = self._leaf(leaf_path)
+        new_keys: list[bytes] = []
+        for key, value in items:
+            key_bytes = to_bytes(key)
+            if key_bytes not in leaf:
+                new_keys.append(key_bytes)
+            leaf[key_bytes] = to_bytes(value)
+        self._keys_added(leaf_path, new_keys)
+
+    async def delete_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> int:
+        """Delete the keys. Return the number of deleted keys."""
+        leaf = self.leaves.get(str(leaf_path))
+        if leaf is None:
+            return 0
+        deleted = [key for key in map(to_bytes, keys) if leaf.pop(key, None) is not None]
+        self._keys_removed(leaf_path, deleted)
+        return len(deleted)
+
+    async def close(self) -> None:
+        """Save the snapshot, if enabled. Data stays in memory."""
+        self.close_sync()
+
+    def close_sync(self) -> None:
+        """Synchronous method for saving the snapshot, if enabled. Data stays in memory."""
+        if self.snapshot_path is not None:
+            self.save_snapshot(self.snapshot_path)
+
+    def clear_sync(self) -> None:
+        """Delete all leaves of collection."""
+        self.leaves.clear()
+        self.sorted_keys.clear()
+
+    def save_snapshot(self, snapshot_path: Path | str) -> None:
+        """Atomically save all leaves of collection to a file.
+
+        Args:
+            snapshot_path (Path | str): Path to snapshot file.
+
+        Returns:
+            None.
+        """
+        collection_path = Path(self.collection_path)
+        snapshot = {
+            # Paths are relative, so that the database directory can be moved.
+            str(Path(leaf_path).relative_to(collection_path)): {
+                key.decode("utf-8"): value.decode("utf-8", "surrogateescape") for key, value in leaf.items()
+            }
+            for leaf_path, leaf in self.leaves.items()
+        }
+        snapshot_path = Path(snapshot_path)
+        snapshot_path.parent.mkdir(mode=self.mode, parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(snapshot), "utf-8")
+        tmp_path.replace(snapshot_path)
+
+    def _load_snapshot(self, leaves: dict[str, dict[bytes, bytes]]) -> None:
+        """Load leaves of collection from the snapshot file.
+
+        This method is for internal use.
+        """
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return
+        snapshot: dict[str, dict[str, str]] = json.loads(self.snapshot_path.read_text("utf-8"))
+        for leaf_path, leaf in snapshot.items():
+            leaves[str(Path(self.collection_path, leaf_path))] = {
+                key.encode("utf-8"): value.encode("utf-8", "surrogateescape") for key, value in leaf.items()
+            }
+
+    @classmethod
+    def napalm_sync(cls) -> None:
+        """Delete the data of all collections."""
+        cls._stores.clear()
+        cls._sorted_stores.clear()
@@ -0,0 +1,612 @@
+# ruff:file-ignore[unused-method-argument]
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Memory-mapped storage backend.
+
+The whole collection is stored in two files instead of a tree of branches:
+
+- `collection.seg` - Append-only segment of records (see `scruby.backends.records`).
+- `collection.idx` - Open-addressing hash table of keys to the offsets of records.
+
+Both files are memory-mapped. The slot of key is found by the crc32 of the prepared key -
+the same hash as `Scruby._get_leaf_path` uses, so the branch of key is the low bits of its hash
+(of the part before `branch_separator`, if it is set).
+Point reads are lookups in mapped memory without system calls,
+full scans walk the mapped segment.
+
+- When the share of dead records exceeds `log_compaction_threshold`,
+  the live records are rewritten to new files in a background thread (writes wait for it).
+- After a crash, the index is rebuilt from the segment.
+
+Hint: Only one process should write to the database.
+"""
+
+from __future__ import annotations
+
+__all__ = ("MmapBackend",)
+
+import contextlib
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar, final
+
+import anyio
+import anyio.to_thread
+
+from scruby.backends.base import LeafBackend
+from scruby.backends.records import OP_DELETE, OP_SET, RECORD_HEADER, iter_records, pack_record, to_bytes
+
+if TYPE_CHECKING:
+    from scruby.config import ScrubyConfig
+
+_INDEX_MAGIC = b"SCRBYIDX"
+# Magic, capacity, used slots (live and deleted), live records, size of live records, end of segment.
+_INDEX_HEADER = struct.Struct("<8sQQQQQ")
+# crc32 of key, state, offset of record.
+_SLOT = struct.Struct("<IIQ")
+_EMPTY = 0
+_LIVE = 1
+_DELETED = 2
+_MIN_CAPACITY = 1024
+# Share of used slots, at which the index is resized.
+_MAX_LOAD = 0.7
+# The segment file is grown in steps, so that it is not remapped on each write.
+_MIN_SEGMENT_SIZE = 1 << 20
+
+
+def _record_size(buffer: mmap.mmap, offset: int) -> int:
+    """Size of record at the offset."""
+    _, _, key_length, value_length = RECORD_HEADER.unpack_from(buffer, offset)
+    return RECORD_HEADER.size + key_length + value_length
+
+
+def _capacity_for(live: int) -> int:
+    """Capacity of index for the number of live records - a power of two."""
+    capacity = _MIN_CAPACITY
+    while live >= capacity * _MAX_LOAD / 2:
+        capacity *= 2
+    return capacity
+
+
+@final
+class _Store:
+    """Open files of collection - the segment and the index.
+
+    This class is for internal use.
+    """
+
+    def __init__(self, collection_path: Path, mode: int, branch_mask: int, branch_separator: bytes | None) -> None:
+        self.branch_mask = branch_mask
+        self.branch_separator = branch_separator
+        self.closed = False
+        self.segment_path = collection_path / "collection.seg"
+        self.index_path = collection_path / "collection.idx"
+        self.mode = mode
+        for path in (self.segment_path, self.index_path):
+            path.with_suffix(path.suffix + ".compact").unlink(missing_ok=True)
+        self.segment_fd = os.open(self.segment_path, os.O_RDWR | os.O_CREAT, mode)
+        self.segment = self._map_segment(max(os.fstat(self.segment_fd).st_size, _MIN_SEGMENT_SIZE))
+        self.index_fd = -1
+        self.index: mmap.mmap | None = None
+        self.capacity = 0
+        self.used = 0
+        self.live = 0
+        self.live_bytes = 0
+        self.end = 0
+        if not self._open_index():
+            self.rebuild_index()
+        # Number of branch -> {key: offset of record}, built on the first scan.
+        self.branches: dict[int, dict[bytes, int]] | None = None
+        # Part of key before the separator of branches -> {key: offset of record}, built on the first read by prefix.
+        self.groups: dict[bytes, dict[bytes, int]] | None = None
+
+    # Files.
+
+    def _map_segment(self, size: int) -> mmap.mmap:
+        """Grow the segment file to the size and map it."""
+        if os.fstat(self.segment_fd).st_size < size:
+            os.ftruncate(self.segment_fd, size)
+        return mmap.mmap(self.segment_fd, size)
+
+    def _open_index(self) -> bool:
+        """Map the index file. Return False if the index must be rebuilt."""
+        try:
+            index_fd = os.open(self.index_path, os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            index = mmap.mmap(index_fd, 0)
+        except ValueError:
+            os.close(index_fd)
+            return False
+        with contextlib.suppress(struct.error):
+            magic, capacity, used, live, live_bytes, end = _INDEX_HEADER.unpack_from(index, 0)
+            valid = magic == _INDEX_MAGIC and len(index) == _INDEX_HEADER.size + capacity * _SLOT.size
+            # Records after the end of segment - the process was interrupted during write.
+            if valid and end <= len(self.segment) and next(iter_records(self.segment, start=end), None) is None:
+                self.index_fd, self.index = index_fd, index
+                self.capacity, self.used, self.live, self.live_bytes, self.end = capacity, used, live, live_bytes, end
+                return True
+        index.close()
+        os.close(index_fd)
+        return False
+
+    def _create_index(self, path: Path, capacity: int) -> tuple[int, mmap.mmap]:
+        """Create an empty index file and map it."""
+        index_fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, self.mode)
+        os.ftruncate(index_fd, _INDEX_HEADER.size + capacity * _SLOT.size)
+        return (index_fd, mmap.mmap(index_fd, 0))
+
+    def _close_index(self) -> None:
+        """Close the index file."""
+        if self.index is not None:
+            self.index.close()
+            os.close(self.index_fd)
+            self.index = None
+
+    def rebuild_index(self) -> None:
+        """Rebuild the index from the segment."""
+        self._close_index()
+        offsets: dict[bytes, int] = {}
+        end = 0
+        for op, key, _, _, record_size in iter_records(self.segment):
+            if op == OP_SET:
+                offsets[key] = end
+            else:
+                offsets.pop(key, None)
+            end += record_size
+        self.index_fd, self.index = self._create_index(self.index_path, _capacity_for(len(offsets)))
+        self.capacity = (len(self.index) - _INDEX_HEADER.size) // _SLOT.size
+        self.used = self.live = self.live_bytes = 0
+        self.end = end
+        for key, offset in offsets.items():
+            self._put_slot(self._probe(key)[0], key, offset)
+        self._write_header()
+        self.branches = None
+        self.groups = None
+
+    def _write_header(self) -> None:
+        """Save the counters to the header of index."""
+        assert self.index is not None
+        _INDEX_HEADER.pack_into(
+            self.index, 0, _INDEX_MAGIC, self.capacity, self.used, self.live, self.live_bytes, self.end
+        )
+
+    def close(self) -> None:
+        """Save the index and close the files."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.index is not None:
+            self._write_header()
+            self.index.flush()
+        self._close_index()
+        self.segment.flush()
+        self.segment.close()
+        # Cut off the preallocated tail.
+        os.ftruncate(self.segment_fd, self.end)
+        os.close(self.segment_fd)
+
+    # Index.
+
+    def _key_at(self, offset: int) -> bytes:
+        """Key of record at the offset."""
+        _, _, key_length, _ = RECORD_HEADER.unpack_from(self.segment, offset)
+        start = offset + RECORD_HEADER.size
+        return self.segment[start : start + key_length]
+
+    def _probe(self, key: bytes) -> tuple[int, int]:
+        """Find the slot of key.
+
+        Returns:
+            Number of slot - of key or free one, and offset of record - -1 if the key does not exist.
+        """
+        assert self.index is not None
+        key_hash = zlib.crc32(key)
+        mask = self.capacity - 1
+        slot = key_hash & mask
+        free_slot = -1
+        while True:
+            slot_hash, state, offset = _SLOT.unpack_from(self.index, _INDEX_HEADER.size + slot * _SLOT.size)
+            if state == _EMPTY:
+                return (slot if free_slot == -1 else free_slot, -1)
+            if state == _LIVE and slot_hash == key_hash and self._key_at(offset) == key:
+                return (slot, offset)
+            if state == _DELETED and free_slot == -1:
+                free_slot = slot
+            slot = (slot + 1) & mask
+
+    def _put_slot(self, slot: int, key: bytes, offset: int) -> None:
+        """Put the new key into the free slot."""
+        assert self.index is not None
+        position = _INDEX_HEADER.size + slot * _SLOT.size
+        if _SLOT.unpack_from(self.index, position)[1] == _EMPTY:
+            self.used += 1
+        _SLOT.pack_into(self.index, position, zlib.crc32(key), _LIVE, offset)
+        self.live += 1
+        self.live_bytes += _record_size(self.segment, offset)
+
+    def _resize_index(self) -> None:
+        """Rehash live slots into a larger index."""
+        assert self.index is not None
+        capacity = _capacity_for(self.live)
+        tmp_path = self.index_path.with_suffix(".idx.compact")
+        index_fd, index = self._create_index(tmp_path, capacity)
+        mask = capacity - 1
+        for slot_hash, state, offset in _SLOT.iter_unpack(self.index[_INDEX_HEADER.size :]):
+            if state == _LIVE:
+                slot = slot_hash & mask
+                while _SLOT.unpack_from(index, _INDEX_HEADER.size + slot * _SLOT.size)[1] != _EMPTY:
+                    slot = (slot + 1) & mask
+                _SLOT.pack_into(index, _INDEX_HEADER.size + slot * _SLOT.size, slot_hash, _LIVE, offset)
+        self._close_index()
+        tmp_path.replace(self.index_path)
+        self.index_fd, self.index = index_fd, index
+        self.capacity = capacity
+        self.used = self.live
+        self._write_header()
+
+    # Operations.
+
+    def get(self, key: bytes) -> bytes | None:
+        """Get the value of key."""
+        _, offset = self._probe(key)
+        if offset == -1:
+            return None
+        return self.value_at(offset)
+
+    def value_at(self, offset: int) -> bytes:
+        """Value of record at the offset."""
+        _, _, key_length, value_length = RECORD_HEADER.unpack_from(self.segment, offset)
+        start = offset + RECORD_HEADER.size + key_length
+        return self.segment[start : start + value_length]
+
+    def exists(self, key: bytes) -> bool:
+        """Return True when the key exists."""
+        return self._probe(key)[1] != -1
+
+    def _append(self, record: bytes) -> int:
+        """Append the record to the segment. Return its offset."""
+        offset = self.end
+        if offset + len(record) > len(self.segment):
+            size = max(len(self.segment) * 2, offset + len(record))
+            self.segment.close()
+            self.segment = self._map_segment(size)
+        self.segment[offset : offset + len(record)] = record
+        self.end += len(record)
+        return offset
+
+    def set(self, key: bytes, value: bytes) -> None:
+        """Set key to hold the value."""
+        slot, old_offset = self._probe(key)
+        offset = self._append(pack_record(OP_SET, key, value))
+        if old_offset != -1:
+            assert self.index is not None
+            self.live_bytes += _record_size(self.segment, offset) - _record_size(self.segment, old_offset)
+            _SLOT.pack_into(self.index, _INDEX_HEADER.size + slot * _SLOT.size, zlib.crc32(key), _LIVE, offset)
+        else:
+            self._put_slot(slot, key, offset)
+            if self.used > self.capacity * _MAX_LOAD:
+                self._resize_index()
+        if self.branches is not None:
+            self.branches.setdefault(self._branch_of(key), {})[key] = offset
+        if self.groups is not None:
+            self.groups.setdefault(self._group_of(key), {})[key] = offset
+
+    def delete(self, key: bytes) -> bool:
+        """Delete the key. Return False if the key does not exist."""
+        assert self.index is not None
+        slot, old_offset = self._probe(key)
+        if old_offset == -1:
+            return False
+        self._append(pack_record(OP_DELETE, key))
+        self.live -= 1
+        self.live_bytes -= _record_size(self.segment, old_offset)
+        _SLOT.pack_into(self.index, _INDEX_HEADER.size + slot * _SLOT.size, 0, _DELETED, 0)
+        if self.branches is not None:
+            self.branches.get(self._branch_of(key), {}).pop(key, None)
+        if self.groups is not None:
+            self.groups.get(self._group_of(key), {}).pop(key, None)
+        return True
+
+    def commit(self) -> None:
+        """Save the counters after a write operation."""
+        self._write_header()
+
+    def _branch_of(self, key: bytes) -> int:
+        """Get the number of branch of key."""
+        if self.branch_separator is not None:
+            key = key.partition(self.branch_separator)[0]
+        return zlib.crc32(key) & self.branch_mask
+
+    def _group_of(self, key: bytes) -> bytes:
+        """Get the part of key before the separator of branches."""
+        assert self.branch_separator is not None
+        return key.partition(self.branch_separator)[0]
+
+    def group(self, group: bytes) -> dict[bytes, int]:
+        """Keys and offsets of records whose part before the separator of branches is the group.
+
+        The keys are grouped once, by walking the index.
+        """
+        if self.groups is None:
+            assert self.index is not None
+            groups: dict[bytes, dict[bytes, int]] = {}
+            for _, state, offset in _SLOT.iter_unpack(self.index[_INDEX_HEADER.size :]):
+                if state == _LIVE:
+                    key = self._key_at(offset)
+                    groups.setdefault(self._group_of(key), {})[key] = offset
+            self.groups = groups
+        return self.groups.get(group, {})
+
+    def branch(self, branch_number: int) -> dict[bytes, int]:
+        """Keys and offsets of records of the branch.
+
+        The keys are grouped by branches once, by walking the index.
+        """
+        if self.branches is None:
+            assert self.index is not None
+            branches: dict[int, dict[bytes, int]] = {}
+            for slot_hash, state, offset in _SLOT.iter_unpack(self.index[_INDEX_HEADER.size :]):
+                if state == _LIVE:
+                    key = self._key_at(offset)
+                    branch_number_of_key = (
+                        slot_hash & self.branch_mask if self.branch_separator is None else self._branch_of(key)
+                    )
+                    branches.setdefault(branch_number_of_key, {})[key] = offset
+            self.branches = branches
+        return self.branches.get(branch_number, {})
+
+
+def _compact_files(store: _Store) -> None:
+    """Rewrite live records to new files - runs in a worker thread.
+
+    The files are swapped when the store is closed and reopened.
+    """
+    assert store.index is not None
+    segment_path = store.segment_path.with_suffix(".seg.compact")
+    with segment_path.open("wb") as segment_file:
+        chunk = bytearray()
+        for _, state, offset in _SLOT.iter_unpack(store.index[_INDEX_HEADER.size :]):
+            if state == _LIVE:
+                chunk += store.segment[offset : offset + _record_size(store.segment, offset)]
+                # Sequential writes in large chunks.
+                if len(chunk) >= 1 << 20:
+                    segment_file.write(chunk)
+                    chunk.clear()
+        segment_file.write(chunk)
+
+
+@final
+class MmapBackend(LeafBackend):
+    """Memory-mapped storage backend.
+
+    Args:
+        collection_path (str): Path to collection directory.
+        config (type[ScrubyConfig]): Database settings.
+    """
+
+    name: ClassVar[str] = "mmap"
+    needs_branch_dirs: ClassVar[bool] = False
+    # Segments smaller than this number of bytes are not compacted.
+    min_compaction_size: ClassVar[int] = 1 << 20
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: str,
+        config: type[ScrubyConfig],
+    ) -> None:
+        super().__init__(collection_path, config)
+        self.compaction_threshold = config.log_compaction_threshold
+        # Mask of the branch number in the hash of key.
+        self.branch_mask = (1 << 4 * (8 - config.HASH_REDUCE_LEFT)) - 1
+        self.store: _Store | None = None
+        # It is set when the running compaction is finished.
+        self.compaction: anyio.Event | None = None
+        self._write_lock = anyio.Lock()
+        self._open_lock = anyio.Lock()
+
+    async def _store(self) -> _Store:
+        """Get the open files of collection, open them if necessary.
+
+        Files are opened in a worker thread - the index may be rebuilt from the segment.
+
+        This method is for internal use.
+        """
+        store = self.store
+        if store is None:
+            async with self._open_lock:
+                store = self.store
+                if store is None:
+                    store = await anyio.to_thread.run_sync(
+                        _Store,
+                        Path(self.collection_path),
+                        self.mode,
+                        self.branch_mask,
+                        self.branch_separator,
+                    )
+                    self.store = store
+        return store
+
+    async def _branch_keys(self, leaf_path: Path | str) -> dict[bytes, int]:
+        """Keys and offsets of records of the leaf.
+
+        This method is for internal use.
+        """
+        return (await self._store()).branch(self.branch_number(leaf_path))
+
+    async def _maybe_compact(self, store: _Store) -> None:
+        """Compact the files of collection, if the share of dead records exceeds the threshold.
+
+        This method is for internal use.
+        """
+        if (
+            self.compaction is None
+            and store.end >= self.min_compaction_size
+            and store.end - store.live_bytes >= store.end * self.compaction_threshold
+        ):
+            self.compaction = anyio.Event()
+            await self._start_background(self._compact)
+
+    async def compact(self) -> None:
+        """Rewrite live records of collection to new files, regardless of the threshold.
+
+        Reads continue during compaction, writes wait for it.
+
+        Returns:
+            None.
+        """
+        if self.compaction is None:
+            self.compaction = anyio.Event()
+            await self._start_background(self._compact)
+        # Hint: The compaction was started by another coroutine.
+        if (compaction := self.compaction) is not None:
+            await compaction.wait()
+
+    async def _compact(self) -> None:
+        """Rewrite live records of collection to new files.
+
+        This method is for internal use.
+        """
+        compaction = self.compaction
+        try:
+            async with self._write_lock:
+                store = await self._store()
+                try:
+                    await anyio.to_thread.run_sync(_compact_files, store)
+                except ValueError:
+                    # The files were closed during compaction.
+                    store.segment_path.with_suffix(".seg.compact").unlink(missing_ok=True)
+                    return
+                store.close()
+                self.store = None
+                # Hint: The index is rebuilt from the new segment.
+                store.index_path.unlink(missing_ok=True)
+                store.segment_path.with_suffix(".seg.compact").replace(store.segment_path)
+                await self._store()
+        finally:
+            self.compaction = None
+            if compaction is not None:
+                compaction.set()
+
+    async def leaf_exists(self, leaf_path: Path | str) -> bool:
+        """Return True when the leaf exists."""
+        return bool(await self._branch_keys(leaf_path))
+
+    async def get(self, leaf_path: Path | str, key: str | bytes) -> bytes | None:
+        """Get the value of key. If the key does not exist, return None."""
+        return (await self._store()).get(to_bytes(key))
+
+    async def set(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> None:
+        """Set key to hold the value."""
+        await self.set_many(leaf_path, [(key, value)])
+
+    async def delete(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Delete the key. Return False if the key does not exist."""
+        return await self.delete_many(leaf_path, [key]) == 1
+
+    async def keys(self, leaf_path: Path | str) -> list[bytes]:
+        """Return existing keys of the leaf."""
+        return list(await self._branch_keys(leaf_path))
+
+    async def keys_with_prefix(self, leaf_path: Path | str, prefix: bytes) -> list[bytes]:
+        """Return existing keys of the leaf that start with the prefix.
+
+        A prefix that ends with the separator of branches is read from the groups of keys,
+        other prefixes are filtered from the keys of the leaf.
+        """
+        separator = self.branch_separator
+        if separator is not None and prefix.endswith(separator) and separator not in prefix[: -len(separator)]:
+            return list((await self._store()).group(prefix[: -len(separator)]))
+        return [key for key in await self._branch_keys(leaf_path) if key.startswith(prefix)]
+
+    async def exists(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Return True when the key exists."""
+        return (await self._store()).exists(to_bytes(key))
+
+    async def add(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it does not exist. Return False if the key exists."""
+        return (await self.add_many(leaf_path, [(key, value)]))[0]
+
+    async def replace(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it exists. Return False if the key does not exist."""
+        async with self._write_lock:
+            store = await self._store()
+            key = to_bytes(key)
+            if not store.exists(key):
+                return False
+            store.set(key, to_bytes(value))
+            store.commit()
+        await self._maybe_compact(store)
+        return True
+
+    async def count(self, leaf_path: Path | str) -> int:
+        """Return the number of keys in the leaf."""
+        return len(await self._branch_keys(leaf_path))
+
+    async def items(self, leaf_path: Path | str) -> list[tuple[bytes, bytes]]:
+        """Return all pairs of key and value of the leaf."""
+        store = await self._store()
+        return [(key, store.value_at(offset)) for key, offset in (await self._branch_keys(leaf_path)).items()]
+
+    async def get_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bytes | None]:
+        """Get the values of keys, None for missing keys."""
+        store = await self._store()
+        return [store.get(to_bytes(key)) for key in keys]
+
+    async def exists_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bool]:
+        """Return True for each key that exists."""
+        store = await self._store()
+        return [store.exists(to_bytes(key)) for key in keys]
+
+    async def add_many(self, leaf_path: Path | str, items: list[tuple[str, str]]) -> list[bool]:
+        """Set the keys that do not exist. Return False for each key that exists."""
+        async with self._write_lock:
+            store = await self._store()
+            results: list[bool] = []
+            for key, value in items:
+                key_bytes = to_bytes(key)
+                added = not store.exists(key_bytes)
+                if added:
+                    store.set(key_bytes, to_bytes(value))
+                results.append(added)
+            store.commit()
+        return results
+
+    async def set_many(self, leaf_path: Path | str, items: list[tuple[bytes, str]] | list[tuple[str, str]]) -> None:
+        """Set keys to hold the values."""
+        async with self._write_lock:
+            store = await self._store()
+            for key, value in items:
+                store.set(to_bytes(key), to_bytes(value))
+            store.commit()
+        await self._maybe_compact(store)
+
+    async def delete_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> int:
+        """Delete the keys. Return the number of deleted keys."""
+        async with self._write_lock:
+            store = await self._store()
+            deleted = sum(store.delete(to_bytes(key)) for key in keys)
+            store.commit()
+        await self._maybe_compact(store)
+        return deleted
+
+    async def close(self) -> None:
+        """Wait for compaction and close the files of collection."""
+        if (compaction := self.compaction) is not None:
+            await compaction.wait()
+        self.close_sync()
+
+    def close_sync(self) -> None:
+        """Synchronous method for closing the files of collection.
+
+        Unfinished compaction is discarded.
+        """
+        if self.store is not None:
+            store, self.store = self.store, None
+            store.close()
@@ -0,0 +1,116 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Records of append-only data files.
+
+Used by the log-structured and memory-mapped storage backends.
+
+Record - crc32 of the rest of record, operation (set | delete),
+length of key, length of value, key, value.
+
+Also helpers of keys shared by the storage backends.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "OP_DELETE",
+    "OP_SET",
+    "RECORD_HEADER",
+    "iter_records",
+    "pack_record",
+    "prefix_end",
+    "pread_all",
+    "sorted_with_prefix",
+    "to_bytes",
+)
+
+import os
+import struct
+import zlib
+from bisect import bisect_left
+from collections.abc import Iterator
+from typing import Any
+
+# crc32 of the rest of record, operation, length of key, length of value.
+RECORD_HEADER = struct.Struct("<IBII")
+_RECORD_BODY_HEADER = struct.Struct("<BII")
+OP_SET = 0
+OP_DELETE = 1
+
+
+def to_bytes(value: str | bytes) -> bytes:
+    """Keys and values are stored as bytes, like in `dbm`."""
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def prefix_end(prefix: bytes) -> bytes | None:
+    """The smallest key that is greater than all keys with the prefix, None if there is no such key.
+
+    Keys with the prefix are in the range `prefix <= key < prefix_end(prefix)`.
+    """
+    end = prefix.rstrip(b"\xff")
+    return end[:-1] + bytes((end[-1] + 1,)) if end else None
+
+
+def sorted_with_prefix(sorted_keys: list[bytes], prefix: bytes) -> list[bytes]:
+    """Keys with the prefix from the sorted list of keys."""
+    start = bisect_left(sorted_keys, prefix)
+    end = prefix_end(prefix)
+    return sorted_keys[start : bisect_left(sorted_keys, end, start) if end is not None else len(sorted_keys)]
+
+
+def pack_record(op: int, key: bytes, value: bytes = b"") -> bytes:
+    """Pack the record of data file."""
+    body = _RECORD_BODY_HEADER.pack(op, len(key), len(value)) + key + value
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def iter_records(
+    buffer: Any,
+    base_offset: int = 0,
+    start: int = 0,
+    end: int | None = None,
+) -> Iterator[tuple[int, bytes, int, int, int]]:
+    """Iterate over the valid records of buffer.
+
+    Stops at the first torn or corrupted record.
+
+    Args:
+        buffer (Any): Bytes or memory map of data file.
+        base_offset (int): Offset of buffer in data file.
+        start (int): Position of the first record in buffer.
+        end (int | None): End of records in buffer. None = end of buffer.
+
+    Returns:
+        Operation, key, offset of value in data file, length of value and size of record.
+    """
+    position = start
+    if end is None:
+        end = len(buffer)
+    with memoryview(buffer) as view:
+        while position + RECORD_HEADER.size <= end:
+            crc, op, key_length, value_length = RECORD_HEADER.unpack_from(buffer, position)
+            record_size = RECORD_HEADER.size + key_length + value_length
+            if position + record_size > end or op not in (OP_SET, OP_DELETE):
+                return
+            if zlib.crc32(view[position + 4 : position + record_size]) != crc:
+                return
+            key_offset = position + RECORD_HEADER.size
+            key = bytes(view[key_offset : key_offset + key_length])
+            yield (op, key, base_offset + key_offset + key_length, value_length, record_size)
+            position += record_size
+
+
+def pread_all(fd: int, offset: int, size: int) -> bytes:
+    """Read `size` bytes from the offset of file."""
+    chunks: list[bytes] = []
+    while size > 0:
+        chunk = os.pread(fd, size, offset)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
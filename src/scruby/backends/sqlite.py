@@ -0,0 +1,415 @@
+# ruff:file-ignore[unused-method-argument]
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""SQLite storage backend.
+
+One SQLite database `collection.sqlite3` per collection, table `docs` - key, number of branch and JSON-document.
+The connections are tuned for a key-value workload (see `MODE_PRAGMAS`):
+
+- WAL journal - readers do not block the writer and each other, also across processes.
+- `synchronous = NORMAL`, memory-mapped I/O and a large page cache.
+- Statements are prepared once and reused from the statement cache of connection.
+
+Reads and writes use two connections, each of them runs in the worker threads of `anyio` one call at a time.
+
+The conditions of `Where` are translated into `json_extract` filters,
+so documents that do not match are not deserialised in Python.
+"""
+
+from __future__ import annotations
+
+__all__ = ("SqliteBackend",)
+
+import json
+import sqlite3
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, final
+
+import anyio
+from anyio import CapacityLimiter, to_thread
+
+from scruby.backends.base import LeafBackend
+from scruby.backends.records import prefix_end, to_bytes
+
+if TYPE_CHECKING:
+    from scruby.config import ScrubyConfig
+    from scruby.where import Condition
+
+_DB_NAME = "collection.sqlite3"
+# Maximum number of values of the `IN` operator in SQL.
+_MAX_IN_VALUES = 1000
+_SQL_OPERATORS = {"==": "IS", "!=": "IS NOT", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS docs (key BLOB PRIMARY KEY, branch INTEGER NOT NULL, value BLOB NOT NULL)"
+    " WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS docs_branch ON docs (branch)",
+)
+_SQL_GET = "SELECT value FROM docs WHERE key = ?"
+_SQL_EXISTS = "SELECT 1 FROM docs WHERE key = ?"
+_SQL_SET = "INSERT OR REPLACE INTO docs (key, branch, value) VALUES (?, ?, ?)"
+_SQL_ADD = "INSERT OR IGNORE INTO docs (key, branch, value) VALUES (?, ?, ?)"
+_SQL_REPLACE = "UPDATE docs SET value = ? WHERE key = ?"
+_SQL_DELETE = "DELETE FROM docs WHERE key = ?"
+_SQL_KEYS = "SELECT key FROM docs WHERE branch = ?"
+_SQL_ITEMS = "SELECT key, value FROM docs WHERE branch = ?"
+_SQL_KEYS_RANGE = "SELECT key FROM docs WHERE branch = ? AND key >= ? AND key < ?"
+_SQL_KEYS_FROM = "SELECT key FROM docs WHERE branch = ? AND key >= ?"
+_SQL_COUNT = "SELECT count(*) FROM docs WHERE branch = ?"
+_SQL_BRANCH_EXISTS = "SELECT 1 FROM docs WHERE branch = ? LIMIT 1"
+
+
+def _json_path(path: str) -> str:
+    """Convert the dotted path to field into the JSON path of SQLite."""
+    return "$" + "".join(f".{json.dumps(name)}" for name in path.split("."))
+
+
+def _out_of_range(value: Any) -> bool:
+    """Check if the integer is out of range of SQLite integers."""
+    return isinstance(value, int) and not -(1 << 63) <= value < (1 << 63)
+
+
+def _compile_conditions(conditions: tuple[Condition, ...]) -> tuple[str, list[Any]]:
+    """Translate the conditions into a `WHERE` clause with `json_extract` filters.
+
+    Returns:
+        SQL and parameters.
+    """
+    clauses: list[str] = []
+    params: list[Any] = []
+    for path, operator, value in conditions:
+        if operator == "in":
+            # NULL, integers out of range of SQLite and long lists of values are checked in Python.
+            if not value or len(value) > _MAX_IN_VALUES or any(item is None or _out_of_range(item) for item in value):
+                continue
+            placeholders = ", ".join("?" * len(value))
+            clauses.append(
+                "CASE WHEN substr(value, 1, 1) = X'7B'"
+                f" THEN json_extract(CAST(value AS TEXT), ?) IN ({placeholders}) ELSE 1 END",
+            )
+            params.extend((_json_path(path), *value))
+            continue
+        sql_operator = _SQL_OPERATORS.get(operator)
+        if sql_operator is None or (value is None and operator not in ("==", "!=")):
+            continue
+        if _out_of_range(value):
+            continue
+        # Hint: `value` is stored as BLOB - for SQLite, BLOB is the binary format JSONB.
+        # Compressed documents (not starting with `{`) are passed to the check in Python.
+        clauses.append(
+            "CASE WHEN substr(value, 1, 1) = X'7B'"
+            f" THEN json_extract(CAST(value AS TEXT), ?) {sql_operator} ? ELSE 1 END",
+        )
+        params.extend((_json_path(path), value))
+    return (" AND ".join(clauses), params)
+
+
+def _connect(db_path: Path, readonly: bool = False) -> sqlite3.Connection:
+    """Open and tune the connection.
+
+    Each connection is used by one thread at a time, see `_Connection`,
+    the check of thread is disabled because the worker threads of `anyio` are not fixed.
+    """
+    if readonly:
+        connection = sqlite3.connect(
+            f"{db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=SqliteBackend.cached_statements,
+        )
+    else:
+        connection = sqlite3.connect(
+            db_path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=SqliteBackend.cached_statements,
+        )
+    for pragma, value in SqliteBackend.pragmas.items():
+        if readonly and pragma == "journal_mode":
+            continue
+        connection.execute(f"PRAGMA {pragma} = {value}")
+    return connection
+
+
+@final
+class _Connection:
+    """Connection used by the worker threads of `anyio` one at a time.
+
+    The connection is opened on first use and again after closing.
+
+    This class is for internal use.
+    """
+
+    def __init__(self, db_path: Path, mode: int, writer: bool) -> None:
+        self.db_path = db_path
+        self.mode = mode
+        self.writer = writer
+        self.connection: sqlite3.Connection | None = None
+        # Hint: A single token - the calls of the connection are serialized.
+        self._limiter = CapacityLimiter(1)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a synchronous function with the connection in a worker thread."""
+        return await to_thread.run_sync(self._call, fn, *args, limiter=self._limiter)
+
+    def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Open the connection if necessary and call the function."""
+        if self.connection is None:
+            if self.writer:
+                self.db_path.parent.mkdir(mode=self.mode, parents=True, exist_ok=True)
+            self.connection = _connect(self.db_path)
+            if self.writer:
+                for statement in _SCHEMA:
+                    self.connection.execute(statement)
+        return fn(self.connection, *args)
+
+    def _close_connection(self) -> None:
+        """Close the connection."""
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            connection.close()
+
+    async def close(self) -> None:
+        """Close the connection after the current call."""
+        await to_thread.run_sync(self._close_connection, limiter=self._limiter)
+
+    def close_sync(self) -> None:
+        """Synchronous method for closing the connection."""
+        # The connection is not bound to the thread, see `_connect`.
+        self._close_connection()
+
+
+@final
+class SqliteBackend(LeafBackend):
+    """SQLite storage backend.
+
+    Args:
+        collection_path (str): Path to collection directory.
+        config (type[ScrubyConfig]): Database settings.
+    """
+
+    name: ClassVar[str] = "sqlite"
+    needs_branch_dirs: ClassVar[bool] = False
+    # Settings of connections.
+    pragmas: ClassVar[dict[str, Any]] = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 1 << 28,
+        "cache_size": -(1 << 16),
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    }
+    # The size of statement cache of connection.
+    cached_statements: ClassVar[int] = 256
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: str,
+        config: type[ScrubyConfig],
+    ) -> None:
+        super().__init__(collection_path, config)
+        self.db_path = Path(collection_path, _DB_NAME)
+        self._writer = _Connection(self.db_path, self.mode, writer=True)
+        self._reader = _Connection(self.db_path, self.mode, writer=False)
+
+    async def _read(self, default: Any, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a read function with the connection of reader.
+
+        If the database has not been created yet, return the default value.
+
+        This method is for internal use.
+        """
+        if (
+            self._reader.connection is None
+            and self._writer.connection is None
+            and not await anyio.Path(self.db_path).exists()
+        ):
+            return default
+        if self._reader.connection is None:
+            # The schema is created by the writer.
+            await self._writer.run(_noop)
+        return await self._reader.run(fn, *args)
+
+    async def leaf_exists(self, leaf_path: Path | str) -> bool:
+        """Return True when the leaf exists."""
+        return await self._read(False, _branch_exists, self.branch_number(leaf_path))
+
+    async def get(self, leaf_path: Path | str, key: str | bytes) -> bytes | None:
+        """Get the value of key. If the key does not exist, return None."""
+        return await self._read(None, _get, to_bytes(key))
+
+    async def set(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> None:
+        """Set key to hold the value."""
+        await self.set_many(leaf_path, [(key, value)])
+
+    async def delete(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Delete the key. Return False if the key does not exist."""
+        return await self.delete_many(leaf_path, [key]) == 1
+
+    async def keys(self, leaf_path: Path | str) -> list[bytes]:
+        """Return existing keys of the leaf."""
+        return await self._read([], _keys, self.branch_number(leaf_path))
+
+    async def keys_with_prefix(self, leaf_path: Path | str, prefix: bytes) -> list[bytes]:
+        """Return existing keys of the leaf that start with the prefix - the range of keys is read from the index."""
+        return await self._read([], _keys_with_prefix, prefix, self.branch_number(leaf_path))
+
+    async def exists(self, leaf_path: Path | str, key: str | bytes) -> bool:
+        """Return True when the key exists."""
+        return await self._read(False, _exists, to_bytes(key))
+
+    async def add(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it does not exist. Return False if the key exists."""
+        return (await self.add_many(leaf_path, [(key, value)]))[0]
+
+    async def replace(self, leaf_path: Path | str, key: str | bytes, value: str | bytes) -> bool:
+        """Set the key only if it exists. Return False if the key does not exist."""
+        return await self._writer.run(_replace, to_bytes(key), to_bytes(value))
+
+    async def count(self, leaf_path: Path | str) -> int:
+        """Return the number of keys in the leaf."""
+        return await self._read(0, _count, self.branch_number(leaf_path))
+
+    async def items(self, leaf_path: Path | str) -> list[tuple[bytes, bytes]]:
+        """Return all pairs of key and value of the leaf."""
+        return await self._read([], _items, self.branch_number(leaf_path))
+
+    async def items_where(self, leaf_path: Path | str, conditions: tuple[Condition, ...]) -> list[tuple[bytes, bytes]]:
+        """Return pairs of key and value of the leaf, that match the conditions - filtered by SQLite."""
+        where_sql, params = _compile_conditions(conditions)
+        if not where_sql:
+            return await self.items(leaf_path)
+        sql = f"{_SQL_ITEMS} AND {where_sql}"
+        return await self._read([], _query, sql, [self.branch_number(leaf_path), *params])
+
+    async def get_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bytes | None]:
+        """Get the values of keys, None for missing keys."""
+        return await self._read([None] * len(keys), _get_many, [to_bytes(key) for key in keys])
+
+    async def exists_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> list[bool]:
+        """Return True for each key that exists."""
+        return await self._read([False] * len(keys), _exists_many, [to_bytes(key) for key in keys])
+
+    async def add_many(self, leaf_path: Path | str, items: list[tuple[str, str]]) -> list[bool]:
+        """Set the keys that do not exist. Return False for each key that exists."""
+        branch_number = self.branch_number(leaf_path)
+        rows = [(to_bytes(key), branch_number, to_bytes(value)) for key, value in items]
+        return await self._writer.run(_add_many, rows)
+
+    async def set_many(self, leaf_path: Path | str, items: list[tuple[bytes, str]] | list[tuple[str, str]]) -> None:
+        """Set keys to hold the values."""
+        branch_number = self.branch_number(leaf_path)
+        rows = [(to_bytes(key), branch_number, to_bytes(value)) for key, value in items]
+        await self._writer.run(_set_many, rows)
+
+    async def delete_many(self, leaf_path: Path | str, keys: list[str] | list[bytes]) -> int:
+        """Delete the keys. Return the number of deleted keys."""
+        return await self._writer.run(_delete_many, [to_bytes(key) for key in keys])
+
+    async def close(self) -> None:
+        """Close the connections of collection."""
+        await self._reader.close()
+        await self._writer.close()
+
+    def close_sync(self) -> None:
+        """Synchronous method for closing the connections of collection."""
+        self._reader.close_sync()
+        self._writer.close_sync()
+
+    @staticmethod
+    def iter_leaf_sync(leaf_path: Path | str) -> Iterator[tuple[bytes, bytes]]:
+        """Synchronous iteration over pairs of key and value of the leaf.
+
+        It runs in a worker process.
+        """
+        leaf_path = Path(leaf_path)
+        # The database is in the collection directory - the branch segments are between them.
+        for depth, collection_path in enumerate(leaf_path.parents):
+            db_path = collection_path / _DB_NAME
+            if db_path.exists():
+                branch_number = int("".join(leaf_path.parts[-depth - 1 : -1]), 16)
+                break
+        else:
+            return
+        connection = _connect(db_path, readonly=True)
+        try:
+            yield from connection.execute(_SQL_ITEMS, (branch_number,))
+        finally:
+            connection.close()
+
+
+# Functions run in a worker thread and receive the connection.
+
+
+def _noop(_connection: sqlite3.Connection) -> None:
+    return None
+
+
+def _get(connection: sqlite3.Connection, key: bytes) -> bytes | None:
+    row = connection.execute(_SQL_GET, (key,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def _exists(connection: sqlite3.Connection, key: bytes) -> bool:
+    return connection.execute(_SQL_EXISTS, (key,)).fetchone() is not None
+
+
+def _branch_exists(connection: sqlite3.Connection, branch_number: int) -> bool:
+    return connection.execute(_SQL_BRANCH_EXISTS, (branch_number,)).fetchone() is not None
+
+
+def _keys(connection: sqlite3.Connection, branch_number: int) -> list[bytes]:
+    return [row[0] for row in connection.execute(_SQL_KEYS, (branch_number,))]
+
+
+def _keys_with_prefix(connection: sqlite3.Connection, prefix: bytes, branch_number: int) -> list[bytes]:
+    end = prefix_end(prefix)
+    if end is None:
+        return [row[0] for row in connection.execute(_SQL_KEYS_FROM, (branch_number, prefix))]
+    return [row[0] for row in connection.execute(_SQL_KEYS_RANGE, (branch_number, prefix, end))]
+
+
+def _count(connection: sqlite3.Connection, branch_number: int) -> int:
+    return connection.execute(_SQL_COUNT, (branch_number,)).fetchone()[0]
+
+
+def _items(connection: sqlite3.Connection, branch_number: int) -> list[tuple[bytes, bytes]]:
+    return connection.execute(_SQL_ITEMS, (branch_number,)).fetchall()
+
+
+def _query(connection: sqlite3.Connection, sql: str, params: list[Any]) -> list[tuple[bytes, bytes]]:
+    return connection.execute(sql, params).fetchall()
+
+
+def _get_many(connection: sqlite3.Connection, keys: list[bytes]) -> list[bytes | None]:
+    return [_get(connection, key) for key in keys]
+
+
+def _exists_many(connection: sqlite3.Connection, keys: list[bytes]) -> list[bool]:
+    return [_exists(connection, key) for key in keys]
+
+
+def _replace(connection: sqlite3.Connection, key: bytes, value: bytes) -> bool:
+    return connection.execute(_SQL_REPLACE, (value, key)).rowcount == 1
+
+
+def _add_many(connection: sqlite3.Connection, rows: list[tuple[bytes, int, bytes]]) -> list[bool]:
+    with connection:
+        connection.execute("BEGIN")
+        return [connection.execute(_SQL_ADD, row).rowcount == 1 for row in rows]
+
+
+def _set_many(connection: sqlite3.Connection, rows: list[tuple[bytes, int, bytes]]) -> None:
+    with connection:
+        connection.execute("BEGIN")
+        connection.executemany(_SQL_SET, rows)
+
+
+def _delete_many(connection: sqlite3.Connection, keys: list[bytes]) -> int:
+    with connection:
+        connection.execute("BEGIN")
+        return sum(connection.execute(_SQL_DELETE, (key,)).rowcount for key in keys)
@@ -0,0 +1,73 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Branches of collections.
+
+For `hash_reduce_left` 7 and 6, all branch directories (16 | 256) are created
+when the database is activated, so the existence of the branch is not checked
+on every key operation - the path to the leaf is pure computation.
+For `hash_reduce_left` 0, branches are created on demand.
+"""
+
+from __future__ import annotations
+
+__all__ = ("Branches",)
+
+from pathlib import Path
+from typing import ClassVar, final
+
+
+@final
+class Branches:
+    """Registry of branch directories known to exist."""
+
+    # Paths of existing branches by path to collection directory.
+    _known: ClassVar[dict[str, set[str]]] = {}
+
+    @classmethod
+    def known(cls, collection_path: Path | str) -> set[str]:
+        """Get the set of existing branches of collection.
+
+        Args:
+            collection_path (Path | str): Path to collection directory.
+
+        Returns:
+            Set of branch paths.
+        """
+        return cls._known.setdefault(str(collection_path), set())
+
+    @classmethod
+    def create(
+        cls,
+        db_root: Path | str,
+        collection_name: str,
+        hash_reduce_left: int,
+        mode: int = 0o777,
+    ) -> None:
+        """Create all branch directories of collection.
+
+        Args:
+            db_root (Path | str): Path to root directory of database.
+            collection_name (str): Collection name.
+            hash_reduce_left (int): The length of the hash reduction on the left side.
+            mode (int): Access mode to directories.
+
+        Returns:
+            None.
+        """
+        collection_path = Path(db_root, collection_name)
+        known = cls.known(collection_path)
+        known.clear()
+        if hash_reduce_left == 0:
+            return
+        for branch_number in range(16 ** (8 - hash_reduce_left)):
+            branch_number_as_hash: str = f"{branch_number:08x}"[hash_reduce_left:]
+            branch_path = Path(collection_path, *branch_number_as_hash)
+            branch_path.mkdir(mode=mode, parents=True, exist_ok=True)
+            known.add(str(branch_path))
+
+    @classmethod
+    def forget_all(cls) -> None:
+        """Forget the branches of all collections."""
+        cls._known.clear()
@@ -0,0 +1,227 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Transparent compression of documents.
+
+Compression is enabled per collection, by the `scruby_compression` class variable of model:
+
+    class Car(ScrubyModel):
+        scruby_compression: ClassVar[Compression | None] = Compression("zlib", min_size=128)
+
+Documents are compressed when they are added or updated and decompressed when they are read.
+The stored value is self-describing - JSON-documents start with `{`,
+compressed documents start with a marker byte of the algorithm,
+so collections with compressed and uncompressed documents are read in the same way.
+
+The preset dictionary of zlib (`Compression.train_zdict`) is saved in
+`<collection>/meta/zdict-<crc32>` - documents compressed with the previous dictionaries remain readable.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "Compression",
+    "compress",
+    "decompress",
+    "save_zdict",
+)
+
+import lzma
+import re
+import zlib
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Literal, final
+
+from pydantic import BaseModel
+
+# The first byte of stored values.
+_JSON_START = b"{"
+_MARKER_ZLIB = b"\x01"
+_MARKER_LZMA = b"\x02"
+# Followed by the crc32 of dictionary.
+_MARKER_ZLIB_ZDICT = b"\x03"
+
+# Raw deflate stream - without the header and checksum of zlib.
+_WBITS = -15
+# Fragments of JSON for the preset dictionary - keys with a colon, strings, numbers and literals.
+_FRAGMENT = re.compile(rb'"(?:[^"\\]|\\.)*"\s*:?|-?\d[\d.eE+-]*|true|false|null')
+# Preset dictionaries by collection and crc32.
+_zdicts: dict[tuple[str, int], bytes] = {}
+
+
+@final
+class Compression:
+    """Compression settings of collection.
+
+    Args:
+        algorithm (Literal["zlib", "lzma"]): Compression algorithm of the standard library.
+        level (int | None): Compression level, None = default level of algorithm.
+        min_size (int): Documents shorter than this number of bytes are stored uncompressed.
+        zdict (bytes | None): Preset dictionary of zlib - see `Compression.train_zdict`.
+    """
+
+    __slots__ = ("algorithm", "level", "min_size", "zdict", "zdict_id")
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        algorithm: Literal["zlib", "lzma"] = "zlib",
+        level: int | None = None,
+        min_size: int = 256,
+        zdict: bytes | None = None,
+    ) -> None:
+        if __debug__:
+            if algorithm not in ("zlib", "lzma"):
+                msg = f"Compression(algorithm = {algorithm!r}) - Valid values: 'zlib' | 'lzma'."
+                raise AssertionError(msg)
+            if zdict is not None and algorithm != "zlib":
+                msg = "Compression(zdict) - The preset dictionary is supported only by the 'zlib' algorithm."
+                raise AssertionError(msg)
+            if min_size < 0:
+                msg = "Compression(min_size) - The parameter must not be less than zero."
+                raise AssertionError(msg)
+        self.algorithm = algorithm
+        self.level = level
+        self.min_size = min_size
+        self.zdict = zdict or None
+        self.zdict_id = zlib.crc32(zdict) if zdict else 0
+
+    @staticmethod
+    def train_zdict(samples: Iterable[str | bytes | BaseModel], size: int = 8192) -> bytes:
+        """Build a preset dictionary of zlib from sample documents.
+
+        Fragments of JSON (field names with quotes and colons, strings, numbers)
+        that occur more than once are taken in order of the bytes they save,
+        the most useful fragments are placed at the end of dictionary - closest to the compressed data.
+
+        Args:
+            samples (Iterable[str | bytes | BaseModel]): Sample documents - models or JSON.
+            size (int): Maximum size of dictionary, up to 32768 bytes (window of zlib).
+
+        Returns:
+            Preset dictionary.
+        """
+        size = min(size, 1 << 15)
+        counter: Counter[bytes] = Counter()
+        for sample in samples:
+            doc_json = sample.model_dump_json() if isinstance(sample, BaseModel) else sample
+            counter.update(_FRAGMENT.findall(doc_json.encode("utf-8") if isinstance(doc_json, str) else doc_json))
+        fragments = sorted(
+            (fragment for fragment, count in counter.items() if count > 1),
+            key=lambda fragment: counter[fragment] * len(fragment),
+            reverse=True,
+        )
+        selected: list[bytes] = []
+        total = 0
+        for fragment in fragments:
+            if total + len(fragment) <= size:
+                selected.append(fragment)
+                total += len(fragment)
+        return b"".join(reversed(selected))
+
+    def compress(self, doc_json: str | bytes) -> bytes:
+        """Compress the JSON-document.
+
+        Args:
+            doc_json (str | bytes): JSON-document.
+
+        Returns:
+            Value for storage - compressed, or JSON if it is shorter than `min_size` or does not compress.
+        """
+        data = doc_json.encode("utf-8") if isinstance(doc_json, str) else doc_json
+        if len(data) < self.min_size:
+            return data
+        level = -1 if self.level is None else self.level
+        if self.algorithm == "lzma":
+            value = _MARKER_LZMA + lzma.compress(
+                data,
+                format=lzma.FORMAT_ALONE,
+                preset=lzma.PRESET_DEFAULT if self.level is None else self.level,
+            )
+        elif self.zdict is not None:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS, zdict=self.zdict)
+            header = _MARKER_ZLIB_ZDICT + self.zdict_id.to_bytes(4, "big")
+            value = header + compressor.compress(data) + compressor.flush()
+        else:
+            value = _MARKER_ZLIB + zlib.compress(data, level, _WBITS)
+        return value if len(value) < len(data) else data
+
+
+def compress(doc_json: str, compression: Compression | None) -> str | bytes:
+    """Compress the JSON-document, if compression is enabled.
+
+    Args:
+        doc_json (str): JSON-document.
+        compression (Compression | None): Compression settings of collection.
+
+    Returns:
+        Value for storage.
+    """
+    return doc_json if compression is None else compression.compress(doc_json)
+
+
+def decompress(value: bytes, collection_path: Path | str) -> bytes:
+    """Get the JSON-document from the stored value.
+
+    Args:
+        value (bytes): Stored value.
+        collection_path (Path | str): Path to collection directory - to load preset dictionaries.
+
+    Returns:
+        JSON-document.
+    """
+    marker = value[:1]
+    if marker == _JSON_START:
+        return value
+    if marker == _MARKER_ZLIB:
+        return zlib.decompress(value[1:], _WBITS)
+    if marker == _MARKER_ZLIB_ZDICT:
+        zdict = _load_zdict(collection_path, int.from_bytes(value[1:5], "big"))
+        decompressor = zlib.decompressobj(_WBITS, zdict=zdict)
+        return decompressor.decompress(value[5:]) + decompressor.flush()
+    if marker == _MARKER_LZMA:
+        return lzma.decompress(value[1:], format=lzma.FORMAT_ALONE)
+    # Values that are not JSON-objects are returned as is.
+    return value
+
+
+def _load_zdict(collection_path: Path | str, zdict_id: int) -> bytes:
+    """Get the preset dictionary of collection by crc32.
+
+    This function is for internal use.
+    """
+    cache_key = (str(collection_path), zdict_id)
+    zdict = _zdicts.get(cache_key)
+    if zdict is None:
+        zdict_path = Path(collection_path, "meta", f"zdict-{zdict_id:08x}")
+        try:
+            zdict = zdict_path.read_bytes()
+        except FileNotFoundError as error:
+            msg = f"The preset dictionary `{zdict_path}` of compressed documents is missing."
+            raise FileNotFoundError(msg) from error
+        _zdicts[cache_key] = zdict
+    return zdict
+
+
+def save_zdict(collection_path: Path | str, compression: Compression | None, mode: int = 0o777) -> None:
+    """Save the preset dictionary of collection, if it is not saved yet.
+
+    Args:
+        collection_path (Path | str): Path to collection directory.
+        compression (Compression | None): Compression settings of collection.
+        mode (int): Access mode to directories and files.
+
+    Returns:
+        None.
+    """
+    if compression is None or compression.zdict is None:
+        return
+    _zdicts[str(collection_path), compression.zdict_id] = compression.zdict
+    zdict_path = Path(collection_path, "meta", f"zdict-{compression.zdict_id:08x}")
+    if not zdict_path.exists():
+        zdict_path.parent.mkdir(mode=mode, parents=True, exist_ok=True)
+        tmp_path = zdict_path.with_suffix(".tmp")
+        tmp_path.write_bytes(compression.zdict)
+        tmp_path.replace(zdict_path)
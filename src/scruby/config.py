@@ -13,7 +13,23 @@ The settings class contains the following parameters:
     - `6` - 256 branches in collection.
     - `0` - 4294967296 branches in collection.
 - `MAX_NUMBER_BRANCH` - Maximum number of branches in a collection.
-- `max_workers` - The maximum number of processes that can be used (default = None).
+- `max_workers` - The maximum number of branches scanned concurrently (default = None).
+- `executor` - Where documents are validated and filtered during a search.
+    - `thread` - In the event loop, leaves are read in threads (default).
+    - `process` - In worker processes, the filter function must be picklable.
+- `max_open_leaves` - The maximum number of open leaves per collection (default = 256).
+    - `0` - Do not keep leaves open, for deployments with several writer processes.
+- `leaf_idle_timeout` - Leaves that were not used longer than this number of seconds are closed (default = 60).
+- `counter_flush_interval` - Changes of the document counter are flushed not more often than
+  this number of seconds (default = 1).
+- `backend` - Storage backend of leaves (default = `DbmBackend`).
+- `dbm_flavor` - For the `dbm` backend - flavor of `dbm` for leaves: "sqlite3" | "gnu" | "ndbm" | "dumb"
+  (default = None - the value from `.env.meta`, for new databases the default flavor of `dbm`).
+- `dbm_tuning` - For the `dbm` backend - tuning options of the flavor (default = None).
+- `memory_snapshot` - For the in-memory backend - save collections to disk (default = False).
+- `log_compaction_threshold` - For the log-structured and memory-mapped backends - the share of dead records
+  in the data file, at which the data file is compacted (default = 0.5).
+- `trusted_reads` - Read documents without full validation, by `orjson` and `model_construct` (default = False).
 - `plugins` - For adding plugins.
 - `sys_platform` - Information about the operating system.
 - `mode` - Access mode to directories and files.
@@ -27,6 +43,8 @@ import sys
 from typing import Any, ClassVar, Literal, Never, assert_never, final
 from uuid import uuid4
 
+from scruby.backends import DbmBackend
+from scruby.leaf_pool import DbmFlavor, check_dbm_tuning, dbm_module, default_dbm_flavor
 from scruby.utils import Utils
 
 
@@ -52,11 +70,50 @@ class ScrubyConfig:
     # 16**(8 - HASH_REDUCE_LEFT) = 16 | 256 | 4294967296
     MAX_NUMBER_BRANCH: ClassVar[Literal[16, 256, 4294967296]] = 16
 
-    # The maximum number of processes that can be used to execute the given calls.
-    # If None, then as many worker processes will be
-    # created as the machine has processors.
+    # The maximum number of branches scanned concurrently by the quantum loop.
+    # If None, then `min(32, os.cpu_count() + 4)`.
     max_workers: ClassVar[int | None] = None
 
+    # Where documents are validated and filtered during a search.
+    # "thread" = In the event loop, leaves are read in threads (default).
+    # "process" = In worker processes, the filter function must be picklable.
+    executor: ClassVar[Literal["thread", "process"]] = "thread"
+
+    # The maximum number of open leaves per collection.
+    # 0 = Do not keep leaves open, for deployments with several writer processes.
+    max_open_leaves: ClassVar[int] = 256
+
+    # Leaves that were not used longer than this number of seconds are closed.
+    # None = Never.
+    leaf_idle_timeout: ClassVar[float | None] = 60.0
+
+    # Changes of the document counter are flushed to disk not more often than this number of seconds.
+    # 0 = Flush on every change.
+    counter_flush_interval: ClassVar[float] = 1.0
+
+    # Storage backend of leaves - subclass of `LeafBackend`.
+    backend: ClassVar[type[Any]] = DbmBackend
+
+    # For the `dbm` backend - flavor of `dbm` for leaves, it is recorded in `.env.meta`.
+    # None = The recorded value, for new databases the default flavor of `dbm`.
+    dbm_flavor: ClassVar[DbmFlavor | None] = None
+
+    # For the `dbm` backend - tuning options of the flavor.
+    # "gnu" = {"sync": bool, "lock": bool}, "sqlite3" = PRAGMAs.
+    dbm_tuning: ClassVar[dict[str, Any] | None] = None
+
+    # For the in-memory backend - load collections from `<collection>/memory.snapshot`
+    # and save them when closing.
+    memory_snapshot: ClassVar[bool] = False
+
+    # For the log-structured and memory-mapped backends - the share of dead records
+    # (overwritten and deleted) in the data file, at which the data file is compacted.
+    log_compaction_threshold: ClassVar[float] = 0.5
+
+    # Read documents without full validation - they are parsed by `orjson` and built by `model_construct`.
+    # Only for databases written by Scruby.
+    trusted_reads: ClassVar[bool] = False
+
     # For adding plugins.
     plugins: ClassVar[list[Any] | None] = None
 
@@ -135,6 +192,37 @@ class ScrubyConfig:
             )
             raise ValueError(msg)
 
+    @classmethod
+    def check_dbm_flavor(cls) -> None:
+        """The value of the `dbm_flavor` parameter must match the value in the `.env.meta` of the database.
+
+        If the parameter is None, the recorded value is used.
+        """
+        key = "dbm_flavor"
+        delimiter: str = "/" if cls.sys_platform != "win32" else ""
+        dotenv_path: str = f"{cls.db_root}{delimiter}.env.meta"
+
+        dbm_flavor: str | None = Utils.get_from_env(
+            key=key,
+            dotenv_path=dotenv_path,
+        ) or Utils.add_to_env(
+            key=key,
+            value=cls.dbm_flavor or default_dbm_flavor(),
+            dotenv_path=dotenv_path,
+        )
+
+        if dbm_flavor is None:
+            raise ValueError("The `dbm_flavor` parameter is missing in the `.env.meta` of the database.")
+
+        if cls.dbm_flavor is not None and dbm_flavor != cls.dbm_flavor:
+            msg = f"Scruby.run(dbm_flavor = {cls.dbm_flavor!r}) is not equal to the primary value {dbm_flavor!r}."
+            raise ValueError(msg)
+
+        # Raise an exception if the flavor is not available on this machine.
+        dbm_module(dbm_flavor)
+        check_dbm_tuning(dbm_flavor, cls.dbm_tuning)
+        cls.dbm_flavor = dbm_flavor  # pyrefly: ignore[bad-assignment]
+
     @classmethod
     def restore(cls) -> None:
         """Restore default parameter values."""
@@ -143,5 +231,15 @@ class ScrubyConfig:
         cls.HASH_REDUCE_LEFT = 7
         cls.MAX_NUMBER_BRANCH = 16
         cls.max_workers = None
+        cls.executor = "thread"
+        cls.max_open_leaves = 256
+        cls.leaf_idle_timeout = 60.0
+        cls.counter_flush_interval = 1.0
+        cls.backend = DbmBackend
+        cls.dbm_flavor = None
+        cls.dbm_tuning = None
+        cls.memory_snapshot = False
+        cls.log_compaction_threshold = 0.5
+        cls.trusted_reads = False
         cls.plugins = None
         cls.sys_platform = sys.platform
@@ -0,0 +1,258 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Sharded counters of documents.
+
+Rewriting `meta/meta.json` on every write serializes all writers on one file and
+loses increments when several processes write at the same time.
+Instead, each process accumulates the changes in memory and periodically flushes
+them to its own shard - `meta/counters/<host>-<pid>.cnt`.
+A shard has a single writer, so no increments are lost and no locks are needed.
+
+The number of documents = `counter_documents` from `meta/meta.json` + the sum of all shards.
+`recount` folds the shards of finished processes of this host into `meta/meta.json` and deletes them.
+
+- `counter_flush_interval` - Pending changes are flushed not more often than this number of seconds.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "DocumentCounter",
+    "is_orphan_shard",
+)
+
+import atexit
+import contextlib
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import ClassVar, final
+
+from anyio import Lock, to_thread
+
+
+def is_orphan_shard(shard_path: Path) -> bool:
+    """Check if the per-process file was written by a finished process of this host.
+
+    Files of other hosts are never considered finished - their processes cannot be checked.
+
+    Args:
+        shard_path (Path): Path to file named `<host>-<pid>.<suffix>`.
+
+    Returns:
+        True if the process has finished.
+    """
+    host, _, pid = shard_path.stem.rpartition("-")
+    # Hint: On Windows, `os.kill` terminates the process.
+    if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid() or sys.platform == "win32":
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        # The process exists, but belongs to another user.
+        return False
+    return False
+
+
+@final
+class DocumentCounter:
+    """Document counter of a collection in the current process.
+
+    Args:
+        collection_path (Path | str): Path to collection directory.
+        flush_interval (float): Pending changes are flushed not more often than this number of seconds.
+                                0 = Flush on every change.
+        mode (int): Access mode to directories and files.
+    """
+
+    # Counters of collections by path to collection directory.
+    _counters: ClassVar[dict[str, DocumentCounter]] = {}
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: Path | str,
+        flush_interval: float = 1.0,
+        mode: int = 0o777,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.mode = mode
+        self.shards_dir = Path(collection_path, "meta", "counters")
+        # Hint: The host name is needed when the database is shared by several containers.
+        self.shard_path = Path(self.shards_dir, f"{socket.gethostname()}-{os.getpid()}.cnt")
+        # Value of the shard of the current process.
+        # A shard left by a finished process with the same pid is continued.
+        self.flushed: int = self._read_shard(self.shard_path)
+        # Changes that are not yet written to the shard.
+        self.pending: int = 0
+        self.last_flush: float = time.monotonic()
+        self._lock = Lock()
+
+    @classmethod
+    def of_collection(
+        cls,
+        collection_path: Path | str,
+        flush_interval: float = 1.0,
+        mode: int = 0o777,
+    ) -> DocumentCounter:
+        """Get the counter of collection, create it if necessary.
+
+        Args:
+            collection_path (Path | str): Path to collection directory.
+            flush_interval (float): Pending changes are flushed not more often than this number of seconds.
+            mode (int): Access mode to directories and files.
+
+        Returns:
+            Counter of documents.
+        """
+        key = str(collection_path)
+        counter = cls._counters.get(key)
+        if counter is None:
+            counter = cls(collection_path, flush_interval, mode)
+            cls._counters[key] = counter
+        return counter
+
+    async def add(self, step: int) -> None:
+        """Add the number of added or removed documents.
+
+        Args:
+            step (int): Number of documents added (> 0) or removed (< 0).
+
+        Returns:
+            None.
+        """
+        self.pending += step
+        # If a flush is already running, it is awaited - the change is flushed by this call or by a concurrent one.
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write pending changes to the shard of the current process.
+
+        Returns:
+            None.
+        """
+        async with self._lock:
+            if self.pending == 0:
+                return
+            self.flushed += self.pending
+            self.pending = 0
+            self.last_flush = time.monotonic()
+            # Flushes are serialized by the lock, so the shard is never overwritten by an older value.
+            await to_thread.run_sync(self._write_shard, self.flushed)
+
+    def flush_sync(self) -> None:
+        """Synchronous method for writing pending changes to the shard of the current process."""
+        if self.pending == 0:
+            return
+        self.flushed += self.pending
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self._write_shard(self.flushed)
+
+    async def total(self) -> int:
+        """Get the sum of all shards, including pending changes of the current process.
+
+        Returns:
+            The number of documents added minus removed since the last recount.
+        """
+        return await to_thread.run_sync(self._total_sync)
+
+    def _total_sync(self) -> int:
+        """Synchronous method for getting the sum of all shards.
+
+        This method is for internal use.
+        """
+        total: int = self.flushed + self.pending
+        with contextlib.suppress(FileNotFoundError):
+            for shard_path in self.shards_dir.iterdir():
+                if shard_path.suffix == ".cnt" and shard_path != self.shard_path:
+                    total += self._read_shard(shard_path)
+        return total
+
+    def orphan_shards_sync(self) -> dict[Path, int]:
+        """Synchronous method for reading the shards of finished processes of this host.
+
+        Returns:
+            Values of shards by path.
+        """
+        shards: dict[Path, int] = {}
+        with contextlib.suppress(FileNotFoundError):
+            for shard_path in self.shards_dir.iterdir():
+                if shard_path.suffix == ".cnt" and is_orphan_shard(shard_path):
+                    shards[shard_path] = self._read_shard(shard_path)
+        return shards
+
+    @staticmethod
+    def remove_shards_sync(shard_paths: list[Path]) -> None:
+        """Synchronous method for deleting the shards folded into the metadata.
+
+        Args:
+            shard_paths (list[Path]): Paths to shards.
+
+        Returns:
+            None.
+        """
+        for shard_path in shard_paths:
+            shard_path.unlink(missing_ok=True)
+
+    def reset(self) -> None:
+        """Reset the counter after the collection has been cleared."""
+        self.flushed = 0
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def _write_shard(self, value: int) -> None:
+        """Atomically write the value of the shard.
+
+        This method is for internal use.
+        """
+        if not self.shards_dir.exists():
+            self.shards_dir.mkdir(mode=self.mode, parents=True, exist_ok=True)
+        tmp_path = self.shard_path.with_suffix(".tmp")
+        tmp_path.write_text(str(value), "utf-8")
+        tmp_path.replace(self.shard_path)
+
+    @staticmethod
+    def _read_shard(shard_path: Path) -> int:
+        """Read the value of the shard, 0 if the shard does not exist.
+
+        This method is for internal use.
+        """
+        try:
+            return int(shard_path.read_text("utf-8"))
+        except FileNotFoundError:
+            return 0
+
+    @classmethod
+    def reset_collection(cls, collection_path: Path | str) -> None:
+        """Reset the counter of collection after the collection has been cleared.
+
+        Args:
+            collection_path (Path | str): Path to collection directory.
+
+        Returns:
+            None.
+        """
+        counter = cls._counters.get(str(collection_path))
+        if counter is not None:
+            counter.reset()
+
+    @classmethod
+    def flush_all_sync(cls) -> None:
+        """Synchronous method for flushing the counters of all collections and forgetting them."""
+        counters = list(cls._counters.values())
+        cls._counters.clear()
+        for counter in counters:
+            # The collection may have been deleted.
+            with contextlib.suppress(OSError):
+                counter.flush_sync()
+
+
+# Pending changes are written when the process exits.
+atexit.register(DocumentCounter.flush_all_sync)
@@ -0,0 +1,123 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Cursors of keyset pagination.
+
+`find_page` returns a page of documents and an opaque cursor - the sort key and the key
+of the last document. The next call resumes after this document, so no documents are skipped
+and a deep page costs the same as the first one.
+
+The cursor is URL-safe base64 of JSON - the sort key keeps its type
+(datetimes, dates and tuples are tagged), it is never unpickled.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "Page",
+    "decode_cursor",
+    "encode_cursor",
+)
+
+import base64
+from datetime import date, datetime
+from typing import Any, final
+
+import orjson
+
+
+def _pack(value: Any) -> Any:
+    """Convert the sort key to JSON types, tagging the other types.
+
+    This function is for internal use.
+    """
+    if value is None or isinstance(value, str | int | float):
+        return value
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, tuple):
+        return {"$tuple": [_pack(item) for item in value]}
+    if isinstance(value, list):
+        return [_pack(item) for item in value]
+    msg = f"Cursor => The sort key of type `{type(value).__name__}` is not supported."
+    raise TypeError(msg)
+
+
+def _unpack(value: Any) -> Any:
+    """Restore the sort key from JSON.
+
+    This function is for internal use.
+    """
+    if isinstance(value, list):
+        return [_unpack(item) for item in value]
+    if isinstance(value, dict):
+        ((tag, item),) = value.items()
+        match tag:
+            case "$datetime":
+                return datetime.fromisoformat(item)
+            case "$date":
+                return date.fromisoformat(item)
+            case "$tuple":
+                return tuple(_unpack(element) for element in item)
+            case _:
+                raise ValueError(tag)
+    return value
+
+
+def encode_cursor(sort_key: Any, key: str) -> str:
+    """Encode the position after a document.
+
+    Args:
+        sort_key (Any): Sort key of document - JSON types, datetimes, dates, tuples and lists of them.
+        key (str): Key of document.
+
+    Returns:
+        Opaque cursor.
+    """
+    return base64.urlsafe_b64encode(orjson.dumps([_pack(sort_key), key])).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, str]:
+    """Decode the position after a document.
+
+    Args:
+        cursor (str): Cursor returned by `find_page`.
+
+    Returns:
+        Sort key and key of document.
+    """
+    try:
+        sort_key, key = orjson.loads(base64.urlsafe_b64decode(cursor))
+        if not isinstance(key, str):
+            raise TypeError(key)
+        return (_unpack(sort_key), key)
+    except (TypeError, ValueError) as error:
+        msg = "Cursor => The cursor is not valid."
+        raise ValueError(msg) from error
+
+
+@final
+class Page:
+    """Page of documents returned by `find_page`.
+
+    Args:
+        docs (list[Any] | str): Documents of page - the type depends on `return_type`.
+        cursor (str | None): Cursor of the next page, None if this is the last page.
+    """
+
+    __slots__ = ("cursor", "docs")
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        docs: list[Any] | str,
+        cursor: str | None,
+    ) -> None:
+        self.docs = docs
+        self.cursor = cursor
+
+    def __repr__(self) -> str:
+        """Representation of the page."""
+        return f"Page(docs={len(self.docs) if isinstance(self.docs, list) else '...'}, cursor={self.cursor!r})"
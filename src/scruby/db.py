@@ -10,7 +10,6 @@ __all__ = ("Scruby",)
 
 import contextlib
 import logging
-import re
 import zlib
 from shutil import rmtree
 from typing import Any, Literal, final
@@ -19,7 +18,14 @@ from anyio import Path
 from xloft import NamedTuple
 
 from scruby import mixins
+from scruby.backends import DbmBackend, LeafBackend
+from scruby.branches import Branches
+from scruby.compression import save_zdict
 from scruby.config import ScrubyConfig
+from scruby.counters import DocumentCounter
+from scruby.indexes import BaseIndex, HashIndex, RangeIndex
+from scruby.key_ref import KeyRef, route_key
+from scruby.leaf_pool import DbmFlavor
 from scruby.meta import Meta, Metadata
 from scruby.migration import Migration
 from scruby.models import ScrubyModel
@@ -34,6 +40,7 @@ class Scruby(
     mixins.Count,
     mixins.Delete,
     mixins.Update,
+    mixins.Indexes,
 ):
     """Creation and management of database."""
 
@@ -50,6 +57,10 @@ class Scruby(
             if "key" not in self.model_fields:
                 msg = f"Model: {class_model.__name__} => The `key` field is missing."
                 raise AssertionError(msg)
+            for field_name in (*class_model.scruby_indexes, *class_model.scruby_range_indexes):
+                if field_name.split(".")[0] not in self.model_fields:
+                    msg = f"Model: {class_model.__name__} => The indexed field `{field_name}` is missing."
+                    raise AssertionError(msg)
 
         super().__init__()
         self._class_model = class_model
@@ -58,7 +69,37 @@ class Scruby(
         self._hash_reduce_left = ScrubyConfig.HASH_REDUCE_LEFT
         self._max_number_branch = ScrubyConfig.MAX_NUMBER_BRANCH
         self._max_workers = ScrubyConfig.max_workers
+        self._executor = ScrubyConfig.executor
+        self._trusted_reads = ScrubyConfig.trusted_reads
         self._mode = ScrubyConfig.mode
+        self._backend = ScrubyConfig.backend.of_collection(
+            Path(ScrubyConfig.db_root, class_model.__name__),
+            ScrubyConfig,
+        )
+        self._document_counter = DocumentCounter.of_collection(
+            Path(ScrubyConfig.db_root, class_model.__name__),
+            ScrubyConfig.counter_flush_interval,
+            ScrubyConfig.mode,
+        )
+        # Secondary indexes of collection - hash indexes, then range indexes.
+        self._indexes: tuple[BaseIndex, ...] = (
+            *HashIndex.of_collection(
+                Path(ScrubyConfig.db_root, class_model.__name__),
+                class_model.scruby_indexes,
+                ScrubyConfig.backend,
+                ScrubyConfig,
+                class_model,
+            ),
+            *RangeIndex.of_collection(
+                Path(ScrubyConfig.db_root, class_model.__name__),
+                class_model.scruby_range_indexes,
+                ScrubyConfig.backend,
+                ScrubyConfig,
+                class_model,
+            ),
+        )
+        self._key_ref_owner = (ScrubyConfig.db_root, class_model.__name__, ScrubyConfig.HASH_REDUCE_LEFT)
+        self._known_branches = Branches.known(Path(ScrubyConfig.db_root, class_model.__name__))
         self._meta = Meta
         self._meta_path = Path(
             ScrubyConfig.db_root,
@@ -75,6 +116,30 @@ class Scruby(
                 plugin_list[name] = plugin(scruby_self=self)
         self.plugins = NamedTuple(**plugin_list)
 
+    async def __aenter__(self) -> Scruby:
+        """Asynchronous context manager of collection.
+
+        Open leaves of the collection are closed on exit.
+        """
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        """Close open leaves of the collection."""
+        await self.close()
+
+    async def close(self) -> None:
+        """Asynchronous method for closing open leaves of the collection.
+
+        Pending changes of the document counter are flushed.
+
+        Returns:
+            None.
+        """
+        await self._document_counter.flush()
+        await LeafBackend.close_collection(Path(self._db_root, self._class_model.__name__))
+        for index in self._indexes:
+            await LeafBackend.close_collection(index.index_path)
+
     async def get_meta(self) -> Meta:
         """Asynchronous method for getting metadata of collection.
 
@@ -101,27 +166,73 @@ class Scruby(
         meta_json = meta.model_dump_json()
         await self._meta_path.write_text(meta_json, "utf-8")
 
-    async def _counter_documents(self, step: Literal[1, -1]) -> None:
-        """Asynchronous method for management of documents in metadata of collection.
+    async def _counter_documents(self, step: int) -> None:
+        """Asynchronous method for management of documents counter of collection.
+
+        Changes are accumulated in memory and periodically flushed to
+        the counter shard of the current process, `meta.json` is not rewritten.
 
         This method is for internal use.
 
         Args:
-            step (Literal[1, -1]): Number of documents added or removed.
+            step (int): Number of documents added (> 0) or removed (< 0).
 
         Returns:
             None.
         """
-        meta_path = self._meta_path
-        meta_json = await meta_path.read_text("utf-8")
-        meta: Meta = self._meta.model_validate_json(meta_json)
-        meta.counter_documents += step
-        meta_json = meta.model_dump_json()
-        await meta_path.write_text(meta_json, "utf-8")
+        await self._document_counter.add(step)
+
+    def key_ref(self, key: str) -> KeyRef:
+        """Method for getting a reusable reference to the key.
+
+        The prepared key, branch number and path to leaf are computed once.
+        The reference is accepted by `get_doc`, `has_key`, `update_doc` and `delete_doc`.
+
+        Args:
+            key (str): Key name.
 
-    async def _get_leaf_path(self, key: str) -> tuple[Path, str]:
+        Returns:
+            Reference to the key.
+        """
+        leaf_path, prepared_key = self._compute_leaf_path(key)
+        branch_number = int(f"{zlib.crc32(prepared_key.encode('utf-8')):08x}"[self._hash_reduce_left :], 16)
+        return KeyRef(key, prepared_key, branch_number, leaf_path, self._key_ref_owner)
+
+    async def _get_leaf_path(self, key: str | KeyRef) -> tuple[Path, str]:
         """Asynchronous method for getting path to collection cell by key.
 
+        If the branch does not exist, it is created.
+        Branches known to exist are not checked on the file system.
+
+        This method is for internal use.
+
+        Args:
+            key (str | KeyRef): Key name or reference to the key.
+
+        Returns:
+            Path to cell of collection.
+        """
+        if isinstance(key, KeyRef):
+            if key.owner != self._key_ref_owner:
+                msg = f"The key reference {key!r} does not belong to collection `{self._class_model.__name__}`."
+                raise KeyError(msg)
+            leaf_path, prepared_key = key.leaf_path, key.prepared_key
+        else:
+            leaf_path, prepared_key = self._compute_leaf_path(key)
+        branch_path: Path = leaf_path.parent
+        if not self._backend.needs_branch_dirs or str(branch_path) in self._known_branches:
+            return (leaf_path, prepared_key)
+        # If the branch does not exist, need to create it.
+        if not await branch_path.exists():
+            await branch_path.mkdir(self._mode, parents=True, exist_ok=True)
+        # Hint: For `hash_reduce_left = 0` the number of branches is not limited.
+        if self._hash_reduce_left != 0:
+            self._known_branches.add(str(branch_path))
+        return (leaf_path, prepared_key)
+
+    def _compute_leaf_path(self, key: str) -> tuple[Path, str]:
+        """Method for computing path to collection cell by key without access to the file system.
+
         This method is for internal use.
 
         Args:
@@ -132,17 +243,8 @@ class Scruby(
         """
         if not isinstance(key, str):
             raise KeyError("The key is not a string.")
-        # Prepare key.
-        # Removes spaces at the beginning and end of a string.
-        # Replaces all whitespace characters with a single space.
-        prepared_key = re.sub(r"\s+", " ", key).strip().lower()
-        # Check the key for an empty string.
-        if len(prepared_key) == 0:
-            raise KeyError("The key should not be empty.")
-        # Key to crc32 sum.
-        key_as_hash: str = f"{zlib.crc32(prepared_key.encode('utf-8')):08x}"[self._hash_reduce_left :]
-        # Convert crc32 sum in the segment of path.
-        separated_hash: str = "/".join(list(key_as_hash))
+        # Normalization and hashing of the key are memoized.
+        prepared_key, separated_hash = route_key(key, self._hash_reduce_left)
         # The path of the branch to the database.
         branch_path: Path = Path(
             *(
@@ -151,9 +253,6 @@ class Scruby(
                 separated_hash,
             ),
         )
-        # If the branch does not exist, need to create it.
-        if not await branch_path.exists():
-            await branch_path.mkdir(self._mode, parents=True)
         # Get the path to the collection cell.
         leaf_path: Path = Path(*(branch_path, "leaf.dbm"))
         return (leaf_path, prepared_key)
@@ -170,6 +269,10 @@ class Scruby(
         Returns:
             None.
         """
+        LeafBackend.napalm_all_sync()
+        DocumentCounter.flush_all_sync()
+        Branches.forget_all()
+        BaseIndex.forget_all()
         with contextlib.suppress(FileNotFoundError):
             rmtree(ScrubyConfig.db_root)
         ScrubyConfig.restore()
@@ -182,6 +285,16 @@ class Scruby(
         max_workers: int | None = None,
         plugins: list[Any] | None = None,
         mode: int = 0o777,
+        executor: Literal["thread", "process"] = "thread",
+        max_open_leaves: int = 256,
+        leaf_idle_timeout: float | None = 60.0,
+        counter_flush_interval: float = 1.0,
+        backend: str | type[LeafBackend] = "dbm",
+        dbm_flavor: DbmFlavor | None = None,
+        dbm_tuning: dict[str, Any] | None = None,
+        memory_snapshot: bool = False,
+        log_compaction_threshold: float = 0.5,
+        trusted_reads: bool = False,
     ) -> None:
         """Activate database.
 
@@ -192,11 +305,45 @@ class Scruby(
                                                  7 = 16 branches in collection (default).
                                                  6 = 256 branches in collection.
                                                  0 = 4294967296 branches in collection.
-            max_workers (int | None ): The maximum number of processes that can be used to execute the given calls.
-                                       If None, then as many worker processes will be
-                                       created as the machine has processors.
+            max_workers (int | None ): The maximum number of branches scanned concurrently by the quantum loop.
+                                       If None, then `min(32, os.cpu_count() + 4)`.
             plugins (list[Any] | None): To connect plugins.
             mode (int): Access mode to directories and files.
+            executor (Literal["thread", "process"]): Where documents are validated and filtered during a search.
+                                                     "thread" = In the event loop, leaves are read in threads (default).
+                                                     "process" = In worker processes, for `find_one`, `find_many`,
+                                                     `count_documents` and `run_custom_task`.
+                                                     The `filter_fn` must be picklable -
+                                                     a module-level function or `functools.partial`.
+            max_open_leaves (int): The maximum number of open leaves per collection.
+                                   0 = Do not keep leaves open, for deployments with several writer processes.
+            leaf_idle_timeout (float | None): Leaves that were not used longer than
+                                              this number of seconds are closed. None = Never.
+            counter_flush_interval (float): Changes of the document counter are flushed to disk
+                                            not more often than this number of seconds.
+                                            0 = Flush on every change.
+            backend (str | type[LeafBackend]): Storage backend of leaves - name or subclass of `LeafBackend`.
+                                               "dbm" = The `dbm` module of the standard library (default).
+                                               "memory" = In-memory leaves, for benchmarks and ephemeral workloads.
+                                               "log" = Log-structured leaves - append-only data files.
+                                               "mmap" = The whole collection in one memory-mapped segment file.
+                                               "sqlite" = The whole collection in one SQLite database,
+                                                          filters `Where` are evaluated by SQLite.
+            dbm_flavor (DbmFlavor | None): For the "dbm" backend - flavor of `dbm` for leaves,
+                                           "sqlite3" | "gnu" | "ndbm" | "dumb".
+                                           It is recorded in the `.env.meta` of the database,
+                                           None = The recorded value, for new databases the default flavor of `dbm`.
+            dbm_tuning (dict[str, Any] | None): For the "dbm" backend - tuning options of the flavor.
+                                                "gnu" = `{"sync": bool, "lock": bool}` -
+                                                        synchronized mode, file locking.
+                                                "sqlite3" = PRAGMAs, for example `{"synchronous": "NORMAL"}`.
+            memory_snapshot (bool): For the "memory" backend - load collections from
+                                    `<collection>/memory.snapshot` and save them when closing.
+            log_compaction_threshold (float): For the "log" and "mmap" backends - the share of dead records
+                                              in the data file, at which the data file is compacted.
+            trusted_reads (bool): Documents are read without full validation - parsed by `orjson` and
+                                  built by `model_construct`, validators of models are not run.
+                                  Only for databases written by Scruby.
 
         Returns:
             None.
@@ -205,11 +352,27 @@ class Scruby(
         logger.info("Start database activation")
 
         subclasses: list[Any] = ScrubyModel.__subclasses__()
+        backend_cls = LeafBackend.resolve(backend)
 
         if __debug__:
             # Raise an exception if no models were created
             if len(subclasses) == 0:
                 raise AssertionError("Create least one model of document for your project.")
+            if counter_flush_interval < 0:
+                msg = "Scruby.run(counter_flush_interval) - The parameter must not be less than zero."
+                raise AssertionError(msg)
+            if not 0 < log_compaction_threshold <= 1:
+                msg = "Scruby.run(log_compaction_threshold) - The parameter must be in the range (0, 1]."
+                raise AssertionError(msg)
+            if max_open_leaves < 0:
+                msg = "Scruby.run(max_open_leaves) - The parameter must not be less than zero."
+                raise AssertionError(msg)
+            if executor not in ("thread", "process"):
+                msg = f"Scruby.run(executor = {executor!r}) - Valid values: 'thread' | 'process'."
+                raise AssertionError(msg)
+            if executor == "process" and backend_cls.iter_leaf_sync is LeafBackend.iter_leaf_sync:
+                msg = f"Scruby.run(executor = 'process') - Not supported by the `{backend_cls.__name__}` backend."
+                raise AssertionError(msg)
             # Raise an exception if the plugin does not match the Scruby version
             if plugins is not None:
                 if hash_reduce_left == 0:
@@ -224,13 +387,30 @@ class Scruby(
         ScrubyConfig.db_root = db_root
         ScrubyConfig.HASH_REDUCE_LEFT = hash_reduce_left
         ScrubyConfig.max_workers = max_workers
+        ScrubyConfig.executor = executor
+        ScrubyConfig.max_open_leaves = max_open_leaves
+        ScrubyConfig.leaf_idle_timeout = leaf_idle_timeout
+        ScrubyConfig.counter_flush_interval = counter_flush_interval
+        ScrubyConfig.backend = backend_cls
+        ScrubyConfig.dbm_flavor = dbm_flavor
+        ScrubyConfig.dbm_tuning = dbm_tuning
+        ScrubyConfig.memory_snapshot = memory_snapshot
+        ScrubyConfig.log_compaction_threshold = log_compaction_threshold
+        ScrubyConfig.trusted_reads = trusted_reads
         ScrubyConfig.plugins = plugins
         ScrubyConfig.mode = mode
 
+        logger.info("Closing leaves of the previous activation.")
+        LeafBackend.close_all_sync()
+        logger.info("Flushing document counters of the previous activation.")
+        DocumentCounter.flush_all_sync()
         logger.info("Initializing Configuration Parameters.")
         ScrubyConfig.init_params()
         logger.info("Checking the HASH_REDUCE_LEFT parameter.")
         ScrubyConfig.check_hash_reduce_left()
+        if backend_cls is DbmBackend:
+            logger.info("Checking the dbm_flavor parameter.")
+            ScrubyConfig.check_dbm_flavor()
         logger.info("Start database migration.")
         Migration.run(db_root, subclasses, mode=mode)
 
@@ -244,5 +424,11 @@ class Scruby(
                 subclass.__name__,
                 mode,
             )
+            save_zdict(Path(db_root, subclass.__name__), subclass.scruby_compression, mode)
+
+        if backend_cls.needs_branch_dirs:
+            logger.info("Create branches of collections.")
+            for subclass in subclasses:
+                Branches.create(db_root, subclass.__name__, hash_reduce_left, mode)
 
         logger.info("Database successfully activated.")
@@ -0,0 +1,907 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Secondary indexes on fields of documents.
+
+Hash indexes are declared by the `scruby_indexes` class variable of model,
+range indexes - by the `scruby_range_indexes` class variable:
+
+    class User(ScrubyModel):
+        scruby_indexes: ClassVar[tuple[str, ...]] = ("email", "address.city")
+        scruby_range_indexes: ClassVar[tuple[str, ...]] = ("age", "created_at")
+
+Each index is stored with the storage backend of database in `<collection>/index/<field>`
+(hash) or `<collection>/range/<field>` (range) and is sharded into branches by the crc32 hash
+of the key of index, like the collection by the hash of key.
+
+An entry of index is a pair of the value of field and the key of document - the key of entry is
+the value of field as JSON and the key of document, separated by the zero byte.
+Each change of an entry is a single write, so concurrent writers do not lose entries.
+
+Entries of hash index are sharded by the value of field only - all keys of documents with the value
+are in one leaf. Equality conditions of `Where` and `Q` on an indexed field (`==` and `in`, combined with AND
+at the top level) resolve to the keys of documents, the documents are read by keys instead of scanning all branches.
+
+The entries of range index are loaded into a sorted run in the memory of process - None, numbers,
+datetimes (strings of a field of the datetime type), strings, then other values.
+Each process appends its changes of the index to its own log -
+`<collection>/range/<field>/changes/<host>-<pid>.log`, and before a query the run applies the changes
+that other processes have appended since the previous query.
+Range conditions (`<`, `<=`, `>`, `>=`, `==` with numbers and datetimes) read a slice of the run,
+and `find_many` sorted by `Q.field(<field>)` reads the documents in the order of the run,
+only as many as the page needs.
+
+The index is always a superset of the documents - entries are added before the document is written
+and deleted after the document is deleted, so an interrupted write leaves only stale entries,
+that are skipped because the documents are checked by the filters.
+An index declared for a collection that already has documents is built by the first query that uses it.
+
+Hint: All processes that write to the collection must declare the same indexes.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "BaseIndex",
+    "HashIndex",
+    "IndexUpdate",
+    "RangeIndex",
+    "choose_index",
+    "range_bounds",
+    "range_conditions",
+    "read_items",
+)
+
+import contextlib
+import os
+import socket
+import types
+import zlib
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime
+from operator import itemgetter
+from pathlib import Path
+from shutil import rmtree
+from typing import TYPE_CHECKING, Any, ClassVar, Union, final, get_args, get_origin
+
+import anyio
+import anyio.to_thread
+import orjson
+
+from scruby.counters import is_orphan_shard
+from scruby.query import Q, pushdown_conditions
+from scruby.where import _MISSING, _PUSHDOWN_TYPES, Condition, Where, _get_field
+
+if TYPE_CHECKING:
+    from scruby.backends import LeafBackend
+    from scruby.config import ScrubyConfig
+
+# Key of the mark that the index contains all documents of collection.
+# Hint: JSON does not start with the zero byte.
+_BUILT_KEY = b"\x00built"
+# Operators of conditions that select a slice of range index.
+_RANGE_OPERATORS = ("<", "<=", ">", ">=", "==")
+# Sort key of entry of range index - rank of type and value.
+_ORDER = itemgetter(0, 1)
+# Position of entry of range index - sort key and key of document.
+_POSITION = itemgetter(0, 1, 2)
+# Entry of range index - rank of type, value, key of document, value as JSON.
+_RangeEntry = tuple[int, Any, str, bytes]
+# Size of the change log of range index, after which the log is replaced by an empty file.
+_CHANGES_LIMIT = 1 << 20
+# Range of integers that orjson encodes and decodes as integers.
+_MIN_INT = -(1 << 63)
+_MAX_INT = (1 << 64) - 1
+
+
+def _encode_value(value: Any) -> bytes:
+    """Encode the value of field into the key of index.
+
+    Values that are equal in Python have the same key - `1 == 1.0 == True`.
+
+    This function is for internal use.
+    """
+    if type(value) is bool or (type(value) is float and value.is_integer()):
+        value = int(value)
+    if type(value) is int and not _MIN_INT <= value <= _MAX_INT:
+        # Hint: orjson does not encode integers out of the 64-bit range and decodes them from documents as floats,
+        #       so they are rounded to float - documents with the same key are checked by the filters.
+        with contextlib.suppress(OverflowError):
+            value = int(float(value))
+        return str(value).encode("ascii")
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+
+
+def _entry_key(value_json: bytes, doc_key: str) -> bytes:
+    """Get the key of entry of index - the value of field as JSON and the key of document.
+
+    This function is for internal use.
+    """
+    return value_json + b"\x00" + doc_key.encode("utf-8")
+
+
+def _order_of(value: Any, value_json: bytes, parse_datetime: bool = False) -> tuple[int, Any]:
+    """Get the sort key of the value of field - rank of type and comparable value.
+
+    None < numbers < datetimes (naive ones as UTC) < strings < other values ordered by JSON.
+    Strings are parsed as datetimes only for fields of the datetime type - `parse_datetime`.
+
+    This function is for internal use.
+    """
+    if value is None:
+        return (0, 0)
+    if isinstance(value, int | float):
+        return (1, value)
+    moment = value
+    if isinstance(value, str):
+        if not parse_datetime:
+            return (3, value)
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return (3, value)
+    if not isinstance(moment, datetime):
+        return (4, value_json)
+    return (2, moment if moment.tzinfo is not None else moment.replace(tzinfo=UTC))
+
+
+def _is_datetime_field(class_model: Any, field: str) -> bool:
+    """Check if the field of model has the datetime type - alone or in a union.
+
+    This function is for internal use.
+    """
+    annotations: list[Any] = [class_model]
+    for name in field.split("."):
+        nested: list[Any] = []
+        for annotation in annotations:
+            model_fields = getattr(annotation, "model_fields", None)
+            if isinstance(model_fields, dict) and name in model_fields:
+                nested.extend(_union_args(model_fields[name].annotation))
+        annotations = nested
+    return any(isinstance(annotation, type) and issubclass(annotation, datetime) for annotation in annotations)
+
+
+def _union_args(annotation: Any) -> list[Any]:
+    """Get the types of union, the type itself if it is not a union.
+
+    This function is for internal use.
+    """
+    if get_origin(annotation) in (Union, types.UnionType):
+        return [arg for union_arg in get_args(annotation) for arg in _union_args(union_arg)]
+    return [annotation]
+
+
+class BaseIndex(ABC):
+    """Base class of the indexes of one field of collection.
+
+    Args:
+        collection_path (Path | str): Path to collection directory.
+        field (str): Name of field, dotted path for nested fields.
+        backend_cls (type[LeafBackend]): Storage backend of database.
+        config (type[ScrubyConfig]): Database settings.
+        class_model (Any): Model of collection - the types of fields, None if unknown.
+    """
+
+    # Directory of the indexes of this kind in the collection directory.
+    directory: ClassVar[str] = "index"
+    # Indexes by path to index directory.
+    _indexes: ClassVar[dict[str, BaseIndex]] = {}
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: Path | str,
+        field: str,
+        backend_cls: type[LeafBackend],
+        config: type[ScrubyConfig],
+        class_model: Any = None,
+    ) -> None:
+        self.field = field
+        self.class_model = class_model
+        self.index_path = str(Path(collection_path, self.directory, field))
+        self.hash_reduce_left = config.HASH_REDUCE_LEFT
+        self.mode = config.mode
+        self.backend = backend_cls.of_collection(self.index_path, config)
+        # The index contains all documents of collection.
+        self.built: bool = False
+        # The index is built once by concurrent queries.
+        self.build_lock = anyio.Lock()
+        self._known_dirs: set[str] = set()
+
+    @classmethod
+    def of_collection(
+        cls,
+        collection_path: Path | str,
+        fields: Iterable[str],
+        backend_cls: type[LeafBackend],
+        config: type[ScrubyConfig],
+        class_model: Any = None,
+    ) -> tuple[Any, ...]:
+        """Get the indexes of collection, create them if necessary.
+
+        Args:
+            collection_path (Path | str): Path to collection directory.
+            fields (Iterable[str]): Indexed fields.
+            backend_cls (type[LeafBackend]): Storage backend of database.
+            config (type[ScrubyConfig]): Database settings.
+            class_model (Any): Model of collection - the types of fields, None if unknown.
+
+        Returns:
+            Indexes of collection.
+        """
+        indexes: list[BaseIndex] = []
+        for field in fields:
+            key = str(Path(collection_path, cls.directory, field))
+            index = cls._indexes.get(key)
+            if (
+                index is None
+                or type(index.backend) is not backend_cls
+                or index.hash_reduce_left != config.HASH_REDUCE_LEFT
+                or index.class_model is not class_model
+            ):
+                index = cls._indexes[key] = cls(collection_path, field, backend_cls, config, class_model)
+            indexes.append(index)
+        return tuple(indexes)
+
+    @classmethod
+    def clear_collection_sync(cls, collection_path: Path | str) -> None:
+        """Synchronous method for deleting all entries of the indexes of collection.
+
+        Args:
+            collection_path (Path | str): Path to collection directory.
+
+        Returns:
+            None.
+        """
+        for key, index in cls._indexes.items():
+            if key.startswith(str(Path(collection_path, index.directory)) + "/"):
+                index.clear_sync()
+
+    @classmethod
+    def forget_all(cls) -> None:
+        """Forget the indexes of all collections - after the database has been deleted."""
+        cls._indexes.clear()
+
+    def key_of(self, raw_doc: dict[str, Any]) -> bytes | None:
+        """Get the value of field as JSON for the raw document.
+
+        Args:
+            raw_doc (dict[str, Any]): Document decoded from JSON.
+
+        Returns:
+            Value of field as JSON, None if the document does not have the field.
+        """
+        value = _get_field(raw_doc, self.field)
+        return None if value is _MISSING else _encode_value(value)
+
+    def _leaf_path(self, index_key: bytes) -> Path:
+        """Get the path to the leaf of index for the key.
+
+        This method is for internal use.
+        """
+        key_as_hash: str = f"{zlib.crc32(index_key):08x}"[self.hash_reduce_left :]
+        return Path(self.index_path, *key_as_hash, "leaf.dbm")
+
+    async def _get_leaf_path(self, index_key: bytes) -> Path:
+        """Get the path to the leaf of index for the key, create the directory of leaf if necessary.
+
+        This method is for internal use.
+        """
+        leaf_path = self._leaf_path(index_key)
+        # Backends that store the whole index in one place need only the directory of index.
+        dir_path = str(leaf_path.parent) if self.backend.needs_branch_dirs else self.index_path
+        if dir_path not in self._known_dirs:
+            await anyio.Path(dir_path).mkdir(self.mode, parents=True, exist_ok=True)
+            self._known_dirs.add(dir_path)
+        return leaf_path
+
+    @abstractmethod
+    async def add(self, entries: dict[bytes, set[str]]) -> None:
+        """Add entries to the index.
+
+        Args:
+            entries (dict[bytes, set[str]]): Keys of documents by value of field as JSON.
+
+        Returns:
+            None.
+        """
+
+    @abstractmethod
+    async def remove(self, entries: dict[bytes, set[str]]) -> None:
+        """Delete entries from the index.
+
+        Args:
+            entries (dict[bytes, set[str]]): Keys of documents by value of field as JSON.
+
+        Returns:
+            None.
+        """
+
+    async def is_built(self) -> bool:
+        """Check if the index contains all documents of collection.
+
+        Returns:
+            True if the index is built.
+        """
+        if not self.built:
+            leaf_path = self._leaf_path(_BUILT_KEY)
+            self.built = await self.backend.leaf_exists(leaf_path) and await self.backend.exists(leaf_path, _BUILT_KEY)
+        return self.built
+
+    async def mark_built(self) -> None:
+        """Mark that the index contains all documents of collection.
+
+        Returns:
+            None.
+        """
+        await self.backend.set(await self._get_leaf_path(_BUILT_KEY), _BUILT_KEY, b"1")
+        self.built = True
+
+    def clear_sync(self) -> None:
+        """Synchronous method for deleting all entries of index."""
+        self.backend.clear_sync()
+        rmtree(self.index_path, ignore_errors=True)
+        self._known_dirs.clear()
+        self.built = False
+
+
+@final
+class HashIndex(BaseIndex):
+    """Equality index of one field of collection.
+
+    The key of index is the value of field as JSON and the key of document, separated by the zero byte.
+    Entries are sharded by the value of field, so the keys of documents with a value are read from one leaf.
+
+    Args:
+        collection_path (Path | str): Path to collection directory.
+        field (str): Name of field, dotted path for nested fields.
+        backend_cls (type[LeafBackend]): Storage backend of database.
+        config (type[ScrubyConfig]): Database settings.
+        class_model (Any): Model of collection - the types of fields, None if unknown.
+    """
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: Path | str,
+        field: str,
+        backend_cls: type[LeafBackend],
+        config: type[ScrubyConfig],
+        class_model: Any = None,
+    ) -> None:
+        super().__init__(collection_path, field, backend_cls, config, class_model)
+        # Backends that derive the branch from the key shard the entries by the value of field.
+        self.backend.branch_separator = b"\x00"
+
+    def _leaf_path(self, index_key: bytes) -> Path:
+        """Get the path to the leaf of index for the value of field.
+
+        This method is for internal use.
+        """
+        return super()._leaf_path(index_key.partition(b"\x00")[0])
+
+    async def _change(self, entries: dict[bytes, set[str]], add: bool) -> None:
+        """Add the entries to the index or delete them.
+
+        This method is for internal use.
+        """
+        # Each leaf of index is written with one bulk operation of the backend.
+        groups: dict[Path, list[bytes]] = {}
+        for value_json, doc_keys in entries.items():
+            leaf_path = await self._get_leaf_path(value_json)
+            groups.setdefault(leaf_path, []).extend(_entry_key(value_json, doc_key) for doc_key in doc_keys)
+        for leaf_path, index_keys in groups.items():
+            if add:
+                await self.backend.set_many(leaf_path, [(index_key, b"1") for index_key in index_keys])
+            else:
+                await self.backend.delete_many(leaf_path, index_keys)
+
+    async def add(self, entries: dict[bytes, set[str]]) -> None:
+        """Add entries to the index.
+
+        Args:
+            entries (dict[bytes, set[str]]): Keys of documents by key of index.
+
+        Returns:
+            None.
+        """
+        await self._change(entries, add=True)
+
+    async def remove(self, entries: dict[bytes, set[str]]) -> None:
+        """Delete entries from the index.
+
+        Args:
+            entries (dict[bytes, set[str]]): Keys of documents by key of index.
+
+        Returns:
+            None.
+        """
+        await self._change(entries, add=False)
+
+    async def lookup(self, values: Iterable[Any]) -> set[str]:
+        """Get the keys of documents with the values of field.
+
+        Args:
+            values (Iterable[Any]): Values of field.
+
+        Returns:
+            Prepared keys of documents.
+        """
+        doc_keys: set[str] = set()
+        for value_json in {_encode_value(value) for value in values}:
+            # Hint: The leaf also contains the entries of other values with the same hash -
+            #       only the keys with the prefix of value are read.
+            prefix = value_json + b"\x00"
+            doc_keys.update(
+                index_key[len(prefix) :].decode("utf-8")
+                for index_key in await self.backend.keys_with_prefix(self._leaf_path(value_json), prefix)
+            )
+        return doc_keys
+
+
+@final
+class RangeIndex(BaseIndex):
+    """Ordered index of one field of collection.
+
+    The key of index is the value of field as JSON and the key of document, separated by the zero byte.
+    The entries are loaded into a sorted run, the run is kept up to date by the writes of this process
+    and by the change logs of other processes.
+
+    Args:
+        collection_path (Path | str): Path to collection directory.
+        field (str): Name of field, dotted path for nested fields.
+        backend_cls (type[LeafBackend]): Storage backend of database.
+        config (type[ScrubyConfig]): Database settings.
+        class_model (Any): Model of collection - the types of fields, None if unknown.
+    """
+
+    directory: ClassVar[str] = "range"
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        collection_path: Path | str,
+        field: str,
+        backend_cls: type[LeafBackend],
+        config: type[ScrubyConfig],
+        class_model: Any = None,
+    ) -> None:
+        super().__init__(collection_path, field, backend_cls, config, class_model)
+        # Strings are ordered as datetimes only in a field of the datetime type.
+        self.datetime_field = class_model is not None and _is_datetime_field(class_model, field)
+        # Sorted run of entries, None until it is loaded.
+        self._run: list[_RangeEntry] | None = None
+        # The entries and the sorted run are changed under the lock.
+        self.lock = anyio.Lock()
+        self.changes_dir = Path(self.index_path, "changes")
+        # Hint: The host name is needed when the database is shared by several containers.
+        self.changes_path = Path(self.changes_dir, f"{socket.gethostname()}-{os.getpid()}.log")
+        # Size of the change log of the current process.
+        self._changes_size: int = 0
+        # Read part of the change logs of other processes - inode and offset by name of file.
+        self._seen_changes: dict[str, tuple[int, int]] = {}
+
+    def _entry(self, value_json: bytes, doc_key: str) -> _RangeEntry:
+        """Get the entry of sorted run.
+
+        This method is for internal use.
+        """
+        return (*_order_of(orjson.loads(value_json), value_json, self.datetime_field), doc_key, value_json)
+
+    async def _change(self, entries: dict[bytes, set[str]], add: bool) -> None:
+        """Add the entries to the index or delete them.
+
+        This method is for internal use.
+        """
+        async with self.lock:
+            groups: dict[Path, list[bytes]] = {}
+            for value_json, doc_keys in entries.items():
+                for doc_key in doc_keys:
+                    index_key = _entry_key(value_json, doc_key)
+                    groups.setdefault(await self._get_leaf_path(index_key), []).append(index_key)
+            for leaf_path, index_keys in groups.items():
+                if add:
+                    await self.backend.set_many(leaf_path, [(index_key, b"1") for index_key in index_keys])
+                else:
+                    await self.backend.delete_many(leaf_path, index_keys)
+            changes = [(add, value_json, doc_key) for value_json, doc_keys in entries.items() for doc_key in doc_keys]
+            # Hint: The changes are logged after the entries - other processes apply them to the entries they read.
+            self._log_changes(changes)
+            if self._run is not None:
+                self._apply(self._run, changes)
+
+    def _apply(self, run: list[_RangeEntry], changes: Iterable[tuple[bool, bytes, str]]) -> None:
+        """Apply the changes of entries to the sorted run, in order.
+
+        This method is for internal use.
+        """
+        for add, value_json, doc_key in changes:
+            entry = self._entry(value_json, doc_key)
+            position = bisect_left(run, entry)
+            found = position < len(run) and run[position] == entry
+            if add and not found:
+                run.insert(position, entry)
+            elif not add and found:
+                del run[position]
+
+    def _log_changes(self, changes: list[tuple[bool, bytes, str]]) -> None:
+        """Append the changes to the change log of the current process.
+
+        A log larger than `_CHANGES_LIMIT` is replaced by an empty file -
+        other processes see the new inode and reload the entries.
+
+        This method is for internal use.
+        """
+        records = b"".join(
+            orjson.dumps((add, value_json.decode("utf-8"), doc_key)) + b"\n" for add, value_json, doc_key in changes
+        )
+        # Hint: A short append is cheaper than a hop to a worker thread.
+        if self._changes_size > 0 and self._changes_size + len(records) > _CHANGES_LIMIT:
+            self.changes_dir.mkdir(mode=self.mode, parents=True, exist_ok=True)
+            tmp_path = self.changes_path.with_suffix(".tmp")
+            tmp_path.write_bytes(b"")
+            tmp_path.replace(self.changes_path)
+            self._changes_size = 0
+        try:
+            changes_file = self.changes_path.open("ab")
+        except FileNotFoundError:
+            # The directory is created by the first change or deleted with the collection.
+            self.changes_dir.mkdir(mode=self.mode, parents=True, exist_ok=True)
+            changes_file = self.changes_path.open("ab")
+        with changes_file:
+            changes_file.write(records)
+        self._changes_size += len(records)
+
+    async def add(self, entries: dict[bytes, set[str]]) -> None:
+        """Add entries to the index.
+
+        Args:
+            entries (dict[bytes, set[str]]): Keys of documents by value of field as JSON.
+
+        Returns:
+            None.
+        """
+        await self._change(entries, add=True)
+
+    async def remove(self, entries: dict[bytes, set[str]]) -> None:
+        """Delete entries from the index.
+
+        Args:
+            entries (dict[bytes, set[str]]): Keys of documents by value of field as JSON.
+
+        Returns:
+            None.
+        """
+        await self._change(entries, add=False)
+
+    def _read_changes(self, full: bool) -> tuple[list[tuple[bool, bytes, str]], bool]:
+        """Read the new changes of other processes and delete the logs of finished processes of this host.
+
+        With `full`, only the ends of logs are remembered - the entries are read from the backend.
+
+        This method is for internal use.
+
+        Returns:
+            Changes in order of each log and whether the entries must be read from the backend -
+            a log has been replaced or deleted.
+        """
+        changes: list[tuple[bool, bytes, str]] = []
+        seen: dict[str, tuple[int, int]] = {}
+        # Names of the logs that are read, including the deleted logs of finished processes.
+        read_names: set[str] = set()
+        paths: list[Path] = []
+        with contextlib.suppress(FileNotFoundError):
+            paths = [path for path in self.changes_dir.iterdir() if path.suffix == ".log" and path != self.changes_path]
+        for path in paths:
+            read = self._read_log(path, full)
+            if read is None:
+                continue
+            inode, offset, records = read
+            read_names.add(path.name)
+            if records is None:
+                full = True
+            else:
+                changes.extend(records)
+            if is_orphan_shard(path):
+                # Hint: The changes of a finished process are in the entries - other processes reload them.
+                path.unlink(missing_ok=True)
+            else:
+                seen[path.name] = (inode, offset)
+        # A log that has disappeared may contain unread changes.
+        if not full and not self._seen_changes.keys() <= read_names:
+            full = True
+        self._seen_changes = seen
+        return changes, full
+
+    def _read_log(self, path: Path, full: bool) -> tuple[int, int, list[tuple[bool, bytes, str]] | None] | None:
+        """Read the new changes of the log of another process.
+
+        This method is for internal use.
+
+        Returns:
+            Inode, end of the read part and changes - None if the entries must be read from the backend.
+            None if the log has been deleted.
+        """
+        with contextlib.suppress(FileNotFoundError), path.open("rb") as changes_file:
+            inode = os.fstat(changes_file.fileno()).st_ino
+            known_inode, offset = self._seen_changes.get(path.name, (inode, 0))
+            if full or inode != known_inode:
+                return (inode, changes_file.seek(0, os.SEEK_END), None)
+            changes_file.seek(offset)
+            tail = changes_file.read()
+            # Hint: The last record may be still being written.
+            tail = tail[: tail.rfind(b"\n") + 1]
+            records = [orjson.loads(record) for record in tail.splitlines()]
+            return (
+                inode,
+                offset + len(tail),
+                [(add, value_json.encode("utf-8"), doc_key) for add, value_json, doc_key in records],
+            )
+        return None
+
+    async def load(self) -> None:
+        """Load the entries of index into the sorted run, if it is not loaded, and apply the changes of other processes.
+
+        The change log of each process is read from the end of the previous read,
+        the entries are read from the backend only for the first load or if a log has been replaced or deleted -
+        a log is replaced after `_CHANGES_LIMIT` bytes of changes and deleted after its process has finished.
+
+        Returns:
+            None.
+        """
+        async with self.lock:
+            # Hint: The logs are read before the entries - later changes are applied by the next query.
+            changes, full = await anyio.to_thread.run_sync(self._read_changes, self._run is None)
+            if not full:
+                self._apply(self._run, changes)  # type: ignore[arg-type]
+                return
+            run: list[_RangeEntry] = []
+            for branch_number in range(16 ** (8 - self.hash_reduce_left)):
+                leaf_path = Path(self.index_path, *f"{branch_number:08x}"[self.hash_reduce_left :], "leaf.dbm")
+                if not await self.backend.leaf_exists(leaf_path):
+                    continue
+                for index_key in await self.backend.keys(leaf_path):
+                    value_json, _, doc_key = index_key.partition(b"\x00")
+                    # The mark of built index has no value.
+                    if value_json:
+                        run.append(self._entry(value_json, doc_key.decode("utf-8")))
+            run.sort()
+            self._run = run
+
+    @property
+    def size(self) -> int:
+        """Number of entries of the loaded index."""
+        return len(self._run or ())
+
+    def position_of(self, value: Any, doc_key: str) -> tuple[Any, ...]:
+        """Get the position of document in the sorted run - for resuming an ordered read.
+
+        Args:
+            value (Any): Value of field.
+            doc_key (str): Prepared key of document.
+
+        Returns:
+            Rank of type, value and key of document.
+        """
+        return (*_order_of(value, _encode_value(value), self.datetime_field), doc_key)
+
+    def entries(
+        self,
+        bounds: tuple[tuple[Any, ...] | None, tuple[Any, ...] | None] | None = None,
+        reverse: bool = False,
+        after: tuple[Any, ...] | None = None,
+    ) -> list[_RangeEntry]:
+        """Get the entries of the loaded index between the bounds, in order.
+
+        Args:
+            bounds (tuple | None): Lower and upper sort keys - inclusive, None for an open bound.
+                                   None - all entries.
+            reverse (bool): Descending order.
+            after (tuple | None): Position of document from `position_of` - only the entries after it in order.
+
+        Returns:
+            Entries - rank of type, value, key of document and value as JSON.
+        """
+        run = self._run
+        assert run is not None, "RangeIndex: The index is not loaded."
+        start, stop = 0, len(run)
+        if bounds is not None:
+            lower, upper = bounds
+            # An open bound is limited by the rank of type of the other bound.
+            lower_key = lower if lower is not None else (upper[0],)  # type: ignore[index]
+            upper_key = upper if upper is not None else (lower[0] + 1,)  # type: ignore[index]
+            start = bisect_left(run, lower_key, key=_ORDER)
+            stop = (
+                bisect_right(run, upper_key, key=_ORDER)
+                if upper is not None
+                else bisect_left(run, upper_key, key=_ORDER)
+            )
+        if after is not None:
+            if reverse:
+                stop = min(stop, bisect_left(run, after, key=_POSITION))
+            else:
+                start = max(start, bisect_right(run, after, key=_POSITION))
+        selected = run[start:stop]
+        if reverse:
+            selected.reverse()
+        return selected
+
+    def clear_sync(self) -> None:
+        """Synchronous method for deleting all entries of index."""
+        super().clear_sync()
+        self._run = None
+        self._changes_size = 0
+        self._seen_changes = {}
+
+
+@final
+class IndexUpdate:
+    """Changes of the indexes of collection for a batch of written documents.
+
+    Entries of new values are added before the documents are written - `add_new`,
+    entries of old values are deleted after - `remove_stale`.
+
+    Args:
+        indexes (tuple[BaseIndex, ...]): Indexes of collection.
+        changes (Iterable[tuple[str, bytes | str | None, bytes | str | None]]):
+            Prepared key of document, old and new JSON-document (uncompressed), None if there is no document.
+    """
+
+    __slots__ = ("added", "indexes", "removed")
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        indexes: tuple[BaseIndex, ...],
+        changes: Iterable[tuple[str, bytes | str | None, bytes | str | None]],
+    ) -> None:
+        self.indexes = indexes
+        self.added: list[dict[bytes, set[str]]] = [{} for _ in indexes]
+        self.removed: list[dict[bytes, set[str]]] = [{} for _ in indexes]
+        for doc_key, old_json, new_json in changes:
+            old_doc = orjson.loads(old_json) if old_json is not None else None
+            new_doc = orjson.loads(new_json) if new_json is not None else None
+            for number, index in enumerate(indexes):
+                old_key = index.key_of(old_doc) if old_doc is not None else None
+                new_key = index.key_of(new_doc) if new_doc is not None else None
+                if old_key == new_key:
+                    continue
+                if new_key is not None:
+                    self.added[number].setdefault(new_key, set()).add(doc_key)
+                if old_key is not None:
+                    self.removed[number].setdefault(old_key, set()).add(doc_key)
+
+    async def add_new(self) -> None:
+        """Add entries of the new values - before the documents are written."""
+        for index, entries in zip(self.indexes, self.added, strict=True):
+            if entries:
+                await index.add(entries)
+
+    async def remove_stale(self) -> None:
+        """Delete entries of the old values - after the documents are written."""
+        for index, entries in zip(self.indexes, self.removed, strict=True):
+            if entries:
+                await index.remove(entries)
+
+
+def choose_index(
+    indexes: tuple[BaseIndex, ...],
+    conditions: tuple[Condition, ...],
+) -> tuple[HashIndex, tuple[Any, ...]] | None:
+    """Choose the index for the conditions of filters.
+
+    Args:
+        indexes (tuple[BaseIndex, ...]): Indexes of collection - only hash indexes are chosen.
+        conditions (tuple[Condition, ...]): Conditions combined with AND.
+
+    Returns:
+        Index and values of field, None if no index can be used.
+    """
+    by_field = {index.field: index for index in indexes if isinstance(index, HashIndex)}
+    best: tuple[HashIndex, tuple[Any, ...]] | None = None
+    for path, operator, value in conditions:
+        index = by_field.get(path)
+        if index is None:
+            continue
+        if operator == "==" and isinstance(value, _PUSHDOWN_TYPES):
+            values: tuple[Any, ...] = (value,)
+        elif operator == "in":
+            values = tuple(value)
+        else:
+            continue
+        # The fewer values, the fewer lists of keys are read.
+        if best is None or len(values) < len(best[1]):
+            best = (index, values)
+    return best
+
+
+def range_conditions(*filters: Callable) -> list[Condition]:
+    """Get the conditions of filters that can select a slice of range index.
+
+    Unlike `pushdown_conditions`, conditions with datetime values are included.
+
+    Args:
+        filters (Callable): `Where` filters and `Q` expressions, other filters are skipped.
+
+    Returns:
+        Conditions combined with AND.
+    """
+    conditions: list[Condition] = []
+    for filter_fn in filters:
+        if isinstance(filter_fn, Q):
+            conditions.extend(
+                (node.args[0], node.op, node.args[1]) for node in filter_fn.conjuncts() if node.op in _RANGE_OPERATORS
+            )
+        elif isinstance(filter_fn, Where):
+            conditions.extend(filter_fn.conditions)
+    return conditions
+
+
+def range_bounds(
+    field: str,
+    conditions: Iterable[Condition],
+    datetime_field: bool = True,
+) -> tuple[tuple[Any, ...] | None, tuple[Any, ...] | None] | None:
+    """Get the bounds of the slice of range index for the conditions.
+
+    Only numbers and datetimes are used - strings are compared as strings, not in the order of index.
+
+    Args:
+        field (str): Indexed field.
+        conditions (Iterable[Condition]): Conditions combined with AND.
+        datetime_field (bool): The field has the datetime type - otherwise datetimes are not used.
+
+    Returns:
+        Lower and upper sort keys - inclusive, None for an open bound. None if no condition can be used.
+    """
+    lower: tuple[Any, ...] | None = None
+    upper: tuple[Any, ...] | None = None
+    for path, operator, value in conditions:
+        if (
+            path != field
+            or operator not in _RANGE_OPERATORS
+            or type(value) is bool
+            or not isinstance(value, int | float | datetime)
+            or (isinstance(value, datetime) and not datetime_field)
+            or value != value  # NaN
+        ):
+            continue
+        order = _order_of(value, b"")
+        if operator in (">", ">=", "=="):
+            lower = order if lower is None else max(lower, order)
+        if operator in ("<", "<=", "=="):
+            upper = order if upper is None else min(upper, order)
+    if lower is None and upper is None:
+        return None
+    return (lower, upper)
+
+
+async def read_items(
+    backend: LeafBackend,
+    leaf_path: Path | anyio.Path,
+    filter_fn: Callable,
+    raw_filters: tuple[Callable, ...],
+    candidate_keys: list[str] | None = None,
+) -> list[tuple[bytes, bytes]]:
+    """Read pairs of key and value of the leaf for the search.
+
+    With `candidate_keys` (found by an index), only these documents are read.
+    Otherwise all pairs are read in one call,
+    the backend can skip documents that do not match the conditions of `Where` and `Q`.
+
+    Args:
+        backend (LeafBackend): Storage backend of collection.
+        leaf_path (Path | anyio.Path): Path to leaf of collection.
+        filter_fn (Callable): A function that execute the conditions of filtering.
+        raw_filters (tuple[Callable, ...]): Filters of raw documents.
+        candidate_keys (list[str] | None): Prepared keys of documents found by an index.
+
+    Returns:
+        Pairs of key and stored value.
+    """
+    if candidate_keys is not None:
+        values = await backend.get_many(leaf_path, candidate_keys)
+        return [
+            (key.encode("utf-8"), value) for key, value in zip(candidate_keys, values, strict=True) if value is not None
+        ]
+    conditions = pushdown_conditions(filter_fn, *raw_filters)
+    return await backend.items_where(leaf_path, conditions) if conditions else await backend.items(leaf_path)
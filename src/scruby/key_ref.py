@@ -0,0 +1,104 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Routing of keys to the leaves of collection.
+
+The key is normalized, hashed with crc32 and the hash is converted to the path of branch.
+For hot keys, the result can be computed once with `Scruby.key_ref(key)` and reused.
+Normalization of plain string keys is memoized in a bounded LRU cache.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "KeyRef",
+    "prepare_key",
+    "route_key",
+)
+
+import re
+import zlib
+from functools import lru_cache
+from typing import Any, final
+
+from anyio import Path
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=8192)
+def prepare_key(key: str) -> str:
+    """Normalize the key - documents are stored and ordered by the prepared key.
+
+    Args:
+        key (str): Key name.
+
+    Returns:
+        Prepared key.
+    """
+    if not isinstance(key, str):
+        raise KeyError("The key is not a string.")
+    # Prepare key.
+    # Removes spaces at the beginning and end of a string.
+    # Replaces all whitespace characters with a single space.
+    prepared_key = _WHITESPACE.sub(" ", key).strip().lower()
+    # Check the key for an empty string.
+    if len(prepared_key) == 0:
+        raise KeyError("The key should not be empty.")
+    return prepared_key
+
+
+@lru_cache(maxsize=8192)
+def route_key(key: str, hash_reduce_left: int) -> tuple[str, str]:
+    """Normalize the key and get the segment of path to its branch.
+
+    Args:
+        key (str): Key name.
+        hash_reduce_left (int): The length of the hash reduction on the left side.
+
+    Returns:
+        Prepared key and separated hash - for example `a/b` for `hash_reduce_left = 6`.
+    """
+    prepared_key = prepare_key(key)
+    # Key to crc32 sum.
+    key_as_hash: str = f"{zlib.crc32(prepared_key.encode('utf-8')):08x}"[hash_reduce_left:]
+    # Convert crc32 sum in the segment of path.
+    separated_hash: str = "/".join(list(key_as_hash))
+    return (prepared_key, separated_hash)
+
+
+@final
+class KeyRef:
+    """Reusable reference to a key of collection.
+
+    The prepared key, branch number and path to leaf are computed once.
+    Get it with `Scruby.key_ref(key)`.
+
+    Args:
+        key (str): Key name.
+        prepared_key (str): Normalized key.
+        branch_number (int): Number of branch in collection.
+        leaf_path (Path): Path to leaf of collection.
+        owner (tuple[Any, ...]): Database root, collection name and `hash_reduce_left` the reference belongs to.
+    """
+
+    __slots__ = ("branch_number", "key", "leaf_path", "owner", "prepared_key")
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        key: str,
+        prepared_key: str,
+        branch_number: int,
+        leaf_path: Path,
+        owner: tuple[Any, ...],
+    ) -> None:
+        self.key = key
+        self.prepared_key = prepared_key
+        self.branch_number = branch_number
+        self.leaf_path = leaf_path
+        self.owner = owner
+
+    def __repr__(self) -> str:
+        """Representation of the reference."""
+        return f"KeyRef(key={self.key!r}, branch_number={self.branch_number})"
@@ -0,0 +1,448 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Pool of long-lived leaf database handles.
+
+Opening a leaf and parsing the dbm header on every operation dominates point lookups,
+so open leaves are kept in an LRU pool per collection.
+The pool is used by the `dbm` storage backend.
+
+- `max_open_leaves` - The maximum number of open leaves per collection, 0 = do not keep leaves open.
+- `leaf_idle_timeout` - Leaves that were not used longer than this number of seconds are closed.
+
+Reads open leaves read-only - shared readers do not block each other and missing leaves are not created.
+A read-only leaf is reopened for writing on the first write, after its readers have finished with it.
+
+Handles of a pool run in the worker threads of `anyio`, the number of threads used by a pool is bounded
+and the operations of a handle are serialized.
+
+New leaves are created with the selected flavor of `dbm` (see `DBM_FLAVORS`),
+existing leaves are opened with the flavor they were created with.
+Flavor-specific tuning:
+
+- `gnu` - `{"sync": True}` = synchronized mode, `{"lock": False}` = do not lock the file.
+- `sqlite3` - PRAGMAs, for example `{"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -8192}`.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "DBM_FLAVORS",
+    "DbmFlavor",
+    "LeafHandle",
+    "LeafPool",
+    "check_dbm_tuning",
+    "dbm_module",
+    "default_dbm_flavor",
+    "open_leaf",
+)
+
+import contextlib
+import dbm
+import importlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Callable
+from pathlib import Path
+from types import ModuleType
+from typing import Any, ClassVar, Literal, final
+
+from anyio import CapacityLimiter, Event, Lock, to_thread
+
+type DbmFlavor = Literal["sqlite3", "gnu", "ndbm", "dumb"]
+
+# In the order of preference of the `dbm` module.
+DBM_FLAVORS: tuple[DbmFlavor, ...] = ("sqlite3", "gnu", "ndbm", "dumb")
+# Tuning options of flavors, None = any PRAGMA.
+_TUNING_OPTIONS: dict[str, frozenset[str] | None] = {
+    "sqlite3": None,
+    "gnu": frozenset(("sync", "lock")),
+    "ndbm": frozenset(),
+    "dumb": frozenset(),
+}
+
+
+def dbm_module(flavor: str) -> ModuleType:
+    """Import the module of the `dbm` flavor.
+
+    Args:
+        flavor (str): Flavor of `dbm` - "sqlite3" | "gnu" | "ndbm" | "dumb".
+
+    Returns:
+        Module, for example `dbm.gnu`.
+    """
+    if flavor not in DBM_FLAVORS:
+        msg = f"The `{flavor}` flavor of `dbm` is unknown. Valid values: {', '.join(DBM_FLAVORS)}."
+        raise ValueError(msg)
+    try:
+        return importlib.import_module(f"dbm.{flavor}")
+    except ImportError as error:
+        msg = f"The `dbm.{flavor}` module is not available in this Python installation."
+        raise ImportError(msg) from error
+
+
+def default_dbm_flavor() -> DbmFlavor:
+    """Get the flavor that `dbm` uses for new databases on this machine."""
+    for flavor in DBM_FLAVORS:
+        with contextlib.suppress(ImportError):
+            dbm_module(flavor)
+            return flavor
+    # `dbm.dumb` is always available.
+    return "dumb"
+
+
+def check_dbm_tuning(flavor: str, tuning: dict[str, Any] | None) -> None:
+    """Check the tuning options of the `dbm` flavor.
+
+    Args:
+        flavor (str): Flavor of `dbm`.
+        tuning (dict[str, Any] | None): Tuning options.
+
+    Returns:
+        None.
+    """
+    options = _TUNING_OPTIONS[flavor]
+    for option in tuning or {}:
+        if (options is None and not option.isidentifier()) or (options is not None and option not in options):
+            msg = f"The `{option}` tuning option is not supported by the `{flavor}` flavor of `dbm`."
+            raise ValueError(msg)
+
+
+def open_leaf(
+    leaf_path: str,
+    flag: Literal["r", "c"],
+    mode: int = 0o777,
+    flavor: str | None = None,
+    tuning: dict[str, Any] | None = None,
+) -> Any:
+    """Open the leaf database.
+
+    Args:
+        leaf_path (str): Path to leaf of collection.
+        flag (Literal["r", "c"]): "r" = read-only, "c" = read and write, create if it does not exist.
+        mode (int): Access mode to files.
+        flavor (str | None): Flavor of `dbm` for a new leaf. None = The default flavor of `dbm`.
+        tuning (dict[str, Any] | None): Tuning options of the flavor.
+
+    Returns:
+        The dbm object.
+    """
+    existing = dbm.whichdb(leaf_path)
+    if existing is None:
+        # Hint: Without the "c" flag, missing leaves are not created.
+        if flag == "r":
+            raise FileNotFoundError(leaf_path)
+        module = dbm_module(flavor) if flavor is not None else dbm
+    elif not existing:
+        msg = f"The type of the `{leaf_path}` leaf database cannot be determined."
+        raise dbm.error[0](msg)
+    else:
+        module = importlib.import_module(existing)
+    tuning = tuning or {}
+    match module.__name__:
+        case "dbm.gnu":
+            flags = flag + ("s" if tuning.get("sync") else "") + ("" if tuning.get("lock", True) else "u")
+            return module.open(leaf_path, flags, mode)
+        case "dbm.sqlite3":
+            db = module.open(leaf_path, flag, mode)
+            # Hint: `dbm.sqlite3` does not expose its connection and binds it to the thread that opened it -
+            #       the leaf is reconnected without the check of thread, the handle serializes its operations.
+            uri = f"{module._normalize_uri(leaf_path)}?mode={'ro' if flag == 'r' else 'rw'}"
+            db._cx.close()
+            db._cx = sqlite3.connect(uri, autocommit=True, uri=True, check_same_thread=False)
+            for pragma, value in tuning.items():
+                # The journal mode cannot be changed by a read-only connection.
+                if flag == "r" and pragma == "journal_mode":
+                    continue
+                # Hint: `dbm.sqlite3` does not expose its connection.
+                db._cx.execute(f"PRAGMA {pragma} = {value}")
+            return db
+        case _:
+            return module.open(leaf_path, flag, mode)
+
+
+@final
+class LeafHandle:
+    """Handle of a leaf database.
+
+    Operations run in the worker threads of `anyio` one at a time,
+    because dbm objects are not thread-safe.
+
+    Args:
+        leaf_path (str): Path to leaf of collection.
+        limiter (CapacityLimiter): Limiter of worker threads, it is shared by the handles of a pool.
+        mode (int): Access mode to files.
+        readonly (bool): Open the leaf read-only.
+        flavor (str | None): Flavor of `dbm` for a new leaf. None = The default flavor of `dbm`.
+        tuning (dict[str, Any] | None): Tuning options of the flavor.
+    """
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        leaf_path: str,
+        limiter: CapacityLimiter,
+        mode: int = 0o777,
+        readonly: bool = False,
+        flavor: str | None = None,
+        tuning: dict[str, Any] | None = None,
+    ) -> None:
+        self.leaf_path = leaf_path
+        self.mode = mode
+        self.readonly = readonly
+        self.flavor = flavor
+        self.tuning = tuning
+        # Number of coroutines using the handle, handles in use are never closed.
+        self.in_use: int = 0
+        # The handle is replaced by a writable one and is closed when it is no longer in use.
+        self.retired: bool = False
+        # It is set when the retired handle is no longer in use.
+        self.released = Event()
+        self.last_used: float = time.monotonic()
+        self._db: Any = None
+        self._limiter = limiter
+        self._lock = Lock()
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a synchronous function with the leaf in a worker thread.
+
+        The function receives the dbm object as the first argument.
+        It is used for batch operations - one thread round-trip for many keys.
+
+        Args:
+            fn (Callable): Synchronous function.
+            args (Any): Additional arguments of the function.
+
+        Returns:
+            The result of the function.
+        """
+        async with self._lock:
+            return await to_thread.run_sync(self._call, fn, *args, limiter=self._limiter)
+
+    def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Open the leaf if necessary and call the function.
+
+        This method is for internal use.
+        """
+        if self._db is None:
+            flag = "r" if self.readonly else "c"
+            self._db = open_leaf(self.leaf_path, flag, self.mode, self.flavor, self.tuning)
+        return fn(self._db, *args)
+
+    async def open(self) -> None:
+        """Open the leaf database."""
+        await self.run(lambda _db: None)
+
+    async def get(self, key: str | bytes) -> bytes | None:
+        """Get the value of key. If the key does not exist, return None."""
+        return await self.run(lambda db: db.get(key))
+
+    async def set(self, key: str | bytes, value: str | bytes) -> None:
+        """Set key to hold the value."""
+        await self.run(lambda db: db.__setitem__(key, value))
+
+    async def exists(self, key: str | bytes) -> bool:
+        """Return True when the given key exists."""
+        return await self.run(lambda db: key in db)
+
+    async def delete(self, key: str | bytes) -> None:
+        """Delete given key."""
+        await self.run(lambda db: db.__delitem__(key))
+
+    async def keys(self) -> list[bytes]:
+        """Return existing keys."""
+        return await self.run(lambda db: db.keys())
+
+    async def close(self) -> None:
+        """Close the leaf database after the current operation."""
+        async with self._lock:
+            await to_thread.run_sync(self._close_db, limiter=self._limiter)
+
+    def close_sync(self) -> None:
+        """Synchronous method for closing the leaf database."""
+        # Hint: The dbm object is not bound to a thread, see `open_leaf`.
+        with contextlib.suppress(Exception):
+            self._close_db()
+
+    def _close_db(self) -> None:
+        """Close the dbm object.
+
+        This method is for internal use.
+        """
+        if self._db is not None:
+            db, self._db = self._db, None
+            db.close()
+
+
+@final
+class LeafPool:
+    """LRU pool of open leaves of a collection.
+
+    Args:
+        max_open_leaves (int): The maximum number of open leaves, 0 = do not keep leaves open.
+        leaf_idle_timeout (float | None): Leaves that were not used longer than
+                                          this number of seconds are closed. None = never.
+        mode (int): Access mode to files.
+        flavor (str | None): Flavor of `dbm` for new leaves. None = The default flavor of `dbm`.
+        tuning (dict[str, Any] | None): Tuning options of the flavor.
+    """
+
+    # The maximum number of worker threads used by the leaves of a collection at the same time.
+    max_threads: ClassVar[int] = min(32, (os.cpu_count() or 1) + 4)
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        max_open_leaves: int = 256,
+        leaf_idle_timeout: float | None = 60.0,
+        mode: int = 0o777,
+        flavor: str | None = None,
+        tuning: dict[str, Any] | None = None,
+    ) -> None:
+        assert max_open_leaves >= 0, "LeafPool => The `max_open_leaves` parameter must not be less than zero."
+        self.max_open_leaves = max_open_leaves
+        self.leaf_idle_timeout = leaf_idle_timeout
+        self.mode = mode
+        self.flavor = flavor
+        self.tuning = tuning
+        self._handles: OrderedDict[str, LeafHandle] = OrderedDict()
+        # Leaves that are being closed - they are reopened only after closing.
+        self._closing: dict[str, Event] = {}
+        # Hint: It bounds the worker threads of `anyio` used by the handles of the pool.
+        self.limiter = CapacityLimiter(self.max_threads)
+
+    @contextlib.asynccontextmanager
+    async def leaf(self, leaf_path: Path | str, readonly: bool = False) -> AsyncGenerator[LeafHandle]:
+        """Asynchronous context manager for getting an open leaf.
+
+        Args:
+            leaf_path (Path | str): Path to leaf of collection.
+            readonly (bool): The leaf is only read - an open writable leaf is also suitable.
+                             If the leaf does not exist, FileNotFoundError is raised.
+
+        Returns:
+            Handle of leaf.
+        """
+        handle = await self._acquire(str(leaf_path), readonly)
+        try:
+            yield handle
+        finally:
+            await self._release(handle)
+
+    async def _acquire(self, leaf_path: str, readonly: bool = False) -> LeafHandle:
+        """Get a handle from the pool or open a new one.
+
+        This method is for internal use.
+        """
+        await self._evict_idle()
+        while (closing := self._closing.get(leaf_path)) is not None:
+            await closing.wait()
+        handle = self._handles.get(leaf_path)
+        if handle is not None and handle.readonly and not readonly:
+            # Reopen the leaf for writing after the readers have finished with the read-only handle -
+            # for example, `dbm.gnu` does not open a leaf for writing while it is open for reading.
+            await self._retire_handle(leaf_path, handle)
+            handle = None
+        if handle is None:
+            handle = LeafHandle(leaf_path, self.limiter, self.mode, readonly, self.flavor, self.tuning)
+            self._handles[leaf_path] = handle
+            try:
+                await handle.open()
+            except BaseException:
+                self._handles.pop(leaf_path, None)
+                handle.close_sync()
+                raise
+        else:
+            self._handles.move_to_end(leaf_path)
+        handle.in_use += 1
+        return handle
+
+    async def _release(self, handle: LeafHandle) -> None:
+        """Return the handle to the pool and close the least recently used leaves over the limit.
+
+        This method is for internal use.
+        """
+        handle.in_use -= 1
+        handle.last_used = time.monotonic()
+        if handle.retired:
+            if handle.in_use == 0:
+                handle.released.set()
+            return
+        if len(self._handles) <= self.max_open_leaves:
+            return
+        for leaf_path, lru_handle in list(self._handles.items()):
+            if len(self._handles) <= self.max_open_leaves:
+                break
+            # Hint: The pool can be changed by other coroutines while the leaf is closing.
+            if lru_handle.in_use == 0 and self._handles.get(leaf_path) is lru_handle:
+                await self._close_handle(leaf_path, lru_handle)
+
+    async def _evict_idle(self) -> None:
+        """Close leaves that were not used longer than `leaf_idle_timeout`.
+
+        This method is for internal use.
+        """
+        if self.leaf_idle_timeout is None:
+            return
+        deadline = time.monotonic() - self.leaf_idle_timeout
+        for leaf_path, handle in list(self._handles.items()):
+            if handle.last_used > deadline:
+                # The pool is ordered by last use.
+                break
+            if handle.in_use == 0 and self._handles.get(leaf_path) is handle:
+                await self._close_handle(leaf_path, handle)
+
+    async def _retire_handle(self, leaf_path: str, handle: LeafHandle) -> None:
+        """Remove the handle from the pool and close it when it is no longer in use.
+
+        The leaf is not reopened until the handle is closed.
+
+        This method is for internal use.
+        """
+        del self._handles[leaf_path]
+        handle.retired = True
+        closing = self._closing[leaf_path] = Event()
+        try:
+            if handle.in_use > 0:
+                await handle.released.wait()
+            await handle.close()
+        finally:
+            del self._closing[leaf_path]
+            closing.set()
+
+    async def _close_handle(self, leaf_path: str, handle: LeafHandle) -> None:
+        """Remove the handle from the pool and close it.
+
+        This method is for internal use.
+        """
+        del self._handles[leaf_path]
+        closing = self._closing[leaf_path] = Event()
+        try:
+            await handle.close()
+        finally:
+            del self._closing[leaf_path]
+            closing.set()
+
+    async def close(self) -> None:
+        """Close all leaves of the pool.
+
+        Leaves in use are closed when the operations on them are finished.
+        """
+        for leaf_path, handle in list(self._handles.items()):
+            # Hint: The pool can be changed by other coroutines while the leaf is closing.
+            if self._handles.get(leaf_path) is handle:
+                await self._retire_handle(leaf_path, handle)
+        # Wait for the leaves that are being closed by other coroutines.
+        while self._closing:
+            await next(iter(self._closing.values())).wait()
+
+    def close_sync(self) -> None:
+        """Synchronous method for closing all leaves of the pool.
+
+        It does not wait for the operations on leaves, it is used when the event loop is not running.
+        """
+        handles = list(self._handles.values())
+        self._handles.clear()
+        for handle in handles:
+            handle.close_sync()
@@ -0,0 +1,152 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Loading documents from JSON.
+
+By default, documents are validated by `model_validate_json` in strict mode.
+With `Scruby.run(trusted_reads=True)`, documents written by Scruby (already validated before `model_dump_json`)
+are loaded without full validation:
+
+- models without custom validators are loaded by the core validator in lax mode,
+  it does not check the exact types of JSON values and is faster than the strict mode;
+- for models with custom validators, documents are parsed by `orjson` and built as `model_construct` does -
+  validators of the model are not run, only the fields that are not JSON types
+  (datetime, nested models, enums, ...) are converted.
+"""
+
+from __future__ import annotations
+
+__all__ = ("load_doc",)
+
+import functools
+import types
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any, Literal, Union, get_args, get_origin
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+
+# Types whose JSON values need no conversion.
+_JSON_TYPES: frozenset[Any] = frozenset((str, int, float, bool, type(None), Any))
+
+
+def load_doc(class_model: Any, doc_json: str | bytes, trusted_reads: bool = False) -> Any:
+    """Load the document from JSON.
+
+    Args:
+        class_model (Any): Class of model - derived from `ScrubyModel`.
+        doc_json (str | bytes): JSON-document.
+        trusted_reads (bool): Skip full validation - for documents written by Scruby.
+
+    Returns:
+        Document.
+    """
+    if not trusted_reads:
+        return class_model.model_validate_json(doc_json)
+    return _trusted_loader(class_model)(doc_json)
+
+
+def _is_json_type(annotation: Any) -> bool:
+    """Check if JSON values of the type need no conversion.
+
+    This function is for internal use.
+    """
+    if annotation in _JSON_TYPES:
+        return True
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return all(type(arg) in _JSON_TYPES for arg in get_args(annotation))
+    if origin in (Union, types.UnionType, list, dict):
+        return all(_is_json_type(arg) for arg in get_args(annotation))
+    return False
+
+
+def _has_validators(class_model: Any) -> bool:
+    """Check if the model has custom validators.
+
+    This function is for internal use.
+    """
+    decorators = class_model.__pydantic_decorators__
+    return bool(
+        decorators.validators
+        or decorators.field_validators
+        or decorators.root_validators
+        or decorators.model_validators,
+    )
+
+
+def _construct(class_model: Any, values: dict[str, Any], field_names: frozenset[str]) -> Any:
+    """Build the model from valid values - the same as `model_construct`, without the Python loop over fields.
+
+    This function is for internal use.
+    """
+    doc = class_model.__new__(class_model)
+    object.__setattr__(doc, "__dict__", values)  # ruff:ignore[unnecessary-dunder-call]
+    object.__setattr__(doc, "__pydantic_fields_set__", set(field_names))  # ruff:ignore[unnecessary-dunder-call]
+    object.__setattr__(doc, "__pydantic_extra__", None)  # ruff:ignore[unnecessary-dunder-call]
+    object.__setattr__(doc, "__pydantic_private__", None)  # ruff:ignore[unnecessary-dunder-call]
+    return doc
+
+
+def _converter(annotation: Any) -> Callable[[Any], Any] | None:
+    """Get the converter of JSON values of the type, None if the values need no conversion.
+
+    This function is for internal use.
+    """
+    if _is_json_type(annotation):
+        return None
+    if annotation in (datetime, datetime | None):
+        return datetime.fromisoformat
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _trusted_builder(annotation)
+    adapter: TypeAdapter[Any] = TypeAdapter(annotation)
+    return functools.partial(adapter.validate_python, strict=False)
+
+
+@functools.cache
+def _trusted_builder(class_model: Any) -> Callable[[dict[str, Any]], Any]:
+    """Get the function that builds the model from parsed JSON without full validation.
+
+    This function is for internal use.
+    """
+    field_names = frozenset(class_model.model_fields)
+    converters = tuple(
+        (name, convert)
+        for name, field in class_model.model_fields.items()
+        if (convert := _converter(field.annotation)) is not None
+    )
+    # Private attributes and extra fields are initialized by `model_construct`,
+    # documents written by another version of model get the defaults of missing fields.
+    simple_model = not class_model.__private_attributes__ and class_model.model_config.get("extra") != "allow"
+
+    def build(values: dict[str, Any]) -> Any:
+        if values.keys() != field_names:
+            return class_model.model_validate(values, strict=False)
+        for name, convert in converters:
+            value = values[name]
+            if value is not None:
+                values[name] = convert(value)
+        if simple_model:
+            return _construct(class_model, values, field_names)
+        return class_model.model_construct(**values)
+
+    return build
+
+
+@functools.cache
+def _trusted_loader(class_model: Any) -> Callable[[str | bytes], Any]:
+    """Get the function that loads documents of model without full validation.
+
+    This function is for internal use.
+    """
+    if not _has_validators(class_model):
+        # The core validator is faster than building the model in Python.
+        return functools.partial(class_model.__pydantic_validator__.validate_json, strict=False)
+    build = _trusted_builder(class_model)
+
+    def load(doc_json: str | bytes) -> Any:
+        return build(orjson.loads(doc_json))
+
+    return load
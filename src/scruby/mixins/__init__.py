@@ -12,6 +12,7 @@ __all__ = (
     "CustomTask",
     "Delete",
     "Find",
+    "Indexes",
     "Keys",
     "Update",
 )
@@ -21,5 +22,6 @@ from scruby.mixins.count import Count
 from scruby.mixins.custom_task import CustomTask
 from scruby.mixins.delete import Delete
 from scruby.mixins.find import Find
+from scruby.mixins.indexes import Indexes
 from scruby.mixins.keys import Keys
 from scruby.mixins.update import Update
@@ -11,7 +11,11 @@ __all__ = ("Collection",)
 from shutil import rmtree
 from typing import final
 
+from scruby.branches import Branches
+from scruby.compression import save_zdict
 from scruby.config import ScrubyConfig
+from scruby.counters import DocumentCounter
+from scruby.indexes import BaseIndex
 from scruby.meta import Metadata
 from scruby.models import ScrubyModel
 
@@ -52,7 +56,11 @@ class Collection:
 
         # Delete collection on file system
         target_directory = f"{db_root}/{collection_name}"
+        backend = ScrubyConfig.backend.of_collection(target_directory, ScrubyConfig)
+        backend.clear_sync()
+        BaseIndex.clear_collection_sync(target_directory)
         rmtree(target_directory)
+        DocumentCounter.reset_collection(target_directory)
 
         # Create a directory for the collection and add metadata
         Metadata.create(
@@ -61,5 +69,11 @@ class Collection:
             max_number_branch,
             collection_name,
         )
+        if backend.needs_branch_dirs:
+            Branches.create(db_root, collection_name, hash_reduce_left, ScrubyConfig.mode)
+        # Documents of the collection can be compressed with a preset dictionary.
+        for model in ScrubyModel.__subclasses__():
+            if model.__name__ == collection_name:
+                save_zdict(target_directory, model.scruby_compression, ScrubyConfig.mode)
 
         return
@@ -9,10 +9,15 @@ from __future__ import annotations
 __all__ = ("Count",)
 
 from collections.abc import Callable
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
-from threading import Event
 from typing import Any, final
 
+from anyio import Path, to_process, to_thread
+
+from scruby.backends import LeafBackend
+from scruby.process_scan import ProcessScan
+from scruby.quantum_loop import QuantumLoop
+from scruby.query import match_all, plan_filter
+
 
 class Count:
     """Methods for counting the number of documents."""
@@ -21,18 +26,121 @@ class Count:
     async def estimated_document_count(self) -> int:
         """Asynchronous method.
 
-        Get an estimate of the number of documents in this collection using collection metadata.
+        Get an estimate of the number of documents in this collection using collection metadata
+        and the counter shards of writer processes.
+
+        Returns:
+            The number of documents.
+        """
+        meta = await self.get_meta()
+        return meta.counter_documents + await self._document_counter.total()
+
+    @final
+    @staticmethod
+    async def _task_recount(
+        branch_number: int,
+        hash_reduce_left: int,
+        db_root: str,
+        class_model: Any,
+        backend: LeafBackend,
+    ) -> int:
+        """Task for count all documents in a branch.
+
+        This method is for internal use.
+
+        Returns:
+            The number of documents in the branch.
+        """
+        branch_number_as_hash: str = f"{branch_number:08x}"[hash_reduce_left:]
+        separated_hash: str = "/".join(list(branch_number_as_hash))
+        leaf_path = Path(
+            *(
+                db_root,
+                class_model.__name__,
+                separated_hash,
+                "leaf.dbm",
+            ),
+        )
+        if not await backend.leaf_exists(leaf_path):
+            return 0
+        return await backend.count(leaf_path)
+
+    @final
+    async def recount(self) -> int:
+        """Asynchronous method for rebuilding the document counter of collection.
+
+        Branches are counted concurrently by the quantum loop and
+        the result is written to the collection metadata, so that
+        `estimated_document_count` returns the actual number of documents.
+
+        Attention:
+            - Documents added or removed by other processes during the recount may not be taken into account.
 
         Returns:
             The number of documents.
         """
+        # Variable initialization
+        hash_reduce_left: int = self._hash_reduce_left
+        assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `recount` method."
+
+        quantum_loop = QuantumLoop(range(self._max_number_branch), self._max_workers)
+        counts: list[int] = await quantum_loop.gather(
+            self._task_recount,
+            hash_reduce_left,
+            self._db_root,
+            self._class_model,
+            self._backend,
+        )
+        number_docs: int = sum(counts)
+
+        # The shards of running processes are not rewritten - they keep writing to them,
+        # so the metadata stores the base value. The shards of finished processes are folded into it.
+        document_counter = self._document_counter
+        orphan_shards = await to_thread.run_sync(document_counter.orphan_shards_sync)
         meta = await self.get_meta()
-        return meta.counter_documents
+        meta.counter_documents = number_docs - (await document_counter.total() - sum(orphan_shards.values()))
+        await self._set_meta(meta)
+        await to_thread.run_sync(document_counter.remove_shards_sync, list(orphan_shards))
+
+        return number_docs
+
+    @final
+    @staticmethod
+    async def _task_count_in_process(
+        partition_number: int,
+        partitions: list[range],
+        filter_fn: Callable,
+        hash_reduce_left: int,
+        db_root: str,
+        class_model: Any,
+        backend_cls: type[LeafBackend],
+        trusted_reads: bool = False,
+        raw_filters: tuple[Callable, ...] = (),
+    ) -> int:
+        """Task for count documents in a worker process.
+
+        This method is for internal use.
+
+        Returns:
+            The number of documents matching the filter.
+        """
+        return await to_process.run_sync(
+            ProcessScan.count,
+            partitions[partition_number],
+            filter_fn,
+            hash_reduce_left,
+            db_root,
+            class_model,
+            backend_cls,
+            trusted_reads,
+            raw_filters,
+        )
 
     @final
     async def count_documents(
         self,
-        filter_fn: Callable,
+        filter_fn: Callable = match_all,
+        raw_filter: Callable | None = None,
     ) -> int:
         """Asynchronous method.
 
@@ -43,7 +151,10 @@ class Count:
             - The search effectiveness depends on the number of processor threads.
 
         Args:
-            filter_fn (Callable): A function that execute the conditions of filtering.
+            filter_fn (Callable | Q): A function that execute the conditions of filtering or a query expression.
+                                      By default, it counts all documents.
+            raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents -
+                                          dictionaries decoded from JSON, before validation of documents.
 
         Returns:
             The number of documents.
@@ -52,34 +163,47 @@ class Count:
         hash_reduce_left: int = self._hash_reduce_left
         assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `count_documents` method."
 
-        search_task_fn: Callable = self._task_find
-        branch_numbers: range = range(self._max_number_branch)
-        hash_reduce_left: int = self._hash_reduce_left
-        db_root: str = self._db_root
-        class_model: Any = self._class_model
-        mode = self._mode
-        stop_signal = Event()
+        # `Where` and `Q` filters are checked on raw documents
+        filter_fn, raw_filters = plan_filter(filter_fn, raw_filter)
         counter: int = 0
 
-        # Run quantum loop
-        with ThreadPoolExecutor(self._max_workers) as executor:
-            futures: list[Future] = [
-                executor.submit(
-                    search_task_fn,
-                    filter_fn,
-                    branch_number,
-                    hash_reduce_left,
-                    db_root,
-                    class_model,
-                    mode,
-                    stop_signal,
-                )
-                for branch_number in branch_numbers
-            ]
-
-            for future in as_completed(futures):
-                docs = await future.result()
-                if docs is not None:
-                    counter += len(docs)
+        def accept(result: list[Any] | int | None) -> bool:
+            nonlocal counter
+            if isinstance(result, int):
+                counter += result
+            elif result is not None:
+                counter += len(result)
+            return False
+
+        # Documents found by an index are counted in the event loop
+        if self._executor == "process" and self._choose_index(filter_fn, raw_filters) is None:
+            # Only the number of matching documents is shipped back from worker processes
+            ProcessScan.check_picklable(filter_fn)
+            for check_fn in raw_filters:
+                ProcessScan.check_picklable(check_fn, "raw_filter")
+            partitions = self._get_partitions()
+            quantum_loop = QuantumLoop(range(len(partitions)), self._max_workers)
+            await quantum_loop.run(
+                self._task_count_in_process,
+                partitions,
+                filter_fn,
+                hash_reduce_left,
+                self._db_root,
+                self._class_model,
+                type(self._backend),
+                self._trusted_reads,
+                raw_filters,
+                accept=accept,
+            )
+        else:
+            # Run quantum loop
+            # Hint: If all documents match the filter of models, they are not loaded.
+            await self._run_find_loop(
+                filter_fn,
+                accept,
+                raw_filters=raw_filters,
+                keep_raw=filter_fn is match_all,
+                decode=False,
+            )
 
         return counter
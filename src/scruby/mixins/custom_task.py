@@ -10,10 +10,10 @@ __all__ = ("CustomTask",)
 
 
 from collections.abc import Callable
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
-from threading import Event
 from typing import Any, final
 
+from scruby.query import match_all, plan_filter
+
 
 class CustomTask:
     """For running custom tasks."""
@@ -22,7 +22,8 @@ class CustomTask:
     async def run_custom_task(
         self,
         custom_task: Any,
-        filter_fn: Callable = lambda _: True,
+        filter_fn: Callable = match_all,
+        raw_filter: Callable | None = None,
     ) -> Any:
         """For run a custom task.
 
@@ -32,8 +33,10 @@ class CustomTask:
 
         Args:
             custom_task (Any): Custom task class.
-            filter_fn (Callable): A function that execute the conditions of filtering.
-                                  By default, it searches all documents.
+            filter_fn (Callable | Q): A function that execute the conditions of filtering or a query expression.
+                                      By default, it searches all documents.
+            raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents -
+                                          dictionaries decoded from JSON, before validation of documents.
 
         Returns:
             The result of a custom task.
@@ -41,46 +44,19 @@ class CustomTask:
         hash_reduce_left: int = self._hash_reduce_left
         assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `run_custom_task` method."
 
-        search_task_fn = self._task_find
-        branch_numbers = range(self._max_number_branch)
-        db_root = self._db_root
-        class_model = self._class_model
-        mode = (self._mode,)
-        stop_signal = Event()
-        stop_outer_loop: bool = False
-
-        # Run quantum loop
-        with ThreadPoolExecutor(self._max_workers) as executor:
-            futures: list[Future] = [
-                executor.submit(
-                    search_task_fn,
-                    filter_fn,
-                    branch_number,
-                    hash_reduce_left,
-                    db_root,
-                    class_model,
-                    mode,
-                    stop_signal,
-                )
-                for branch_number in branch_numbers
-            ]
+        # `Where` and `Q` filters are checked on raw documents
+        filter_fn, raw_filters = plan_filter(filter_fn, raw_filter)
 
-            for future in as_completed(futures):
-                docs = await future.result()
+        def accept(docs: list[Any] | None) -> bool:
+            if docs is not None:
+                for doc in docs:
+                    custom_task.accept(doc)
+                    if custom_task.stop_signal:
+                        # Stop the loop
+                        return True
+            return False
 
-                if docs is not None:
-                    for doc in docs:
-                        custom_task.accept(doc)
-                        if custom_task.stop_signal:
-                            # Cancel all pending tasks in the queue instantly
-                            executor.shutdown(wait=False, cancel_futures=True)
-                            # Trigger the event to tell running tasks to exit
-                            stop_signal.set()
-                            # Stop loops
-                            stop_outer_loop = True
-                            break
-
-                    if stop_outer_loop:
-                        break
+        # Run quantum loop
+        await self._run_find_loop(filter_fn, accept, raw_filters=raw_filters)
 
         return custom_task.result()
@@ -9,12 +9,17 @@ from __future__ import annotations
 __all__ = ("Delete",)
 
 from collections.abc import Callable
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from typing import Any, final
 
-import aiodbm
 from anyio import Path
 
+from scruby.backends import LeafBackend
+from scruby.compression import decompress
+from scruby.indexes import BaseIndex, IndexUpdate, read_items
+from scruby.loader import load_doc
+from scruby.quantum_loop import QuantumLoop
+from scruby.query import match_all, match_raw, plan_filter
+
 
 class Delete:
     """Methods for deleting documents."""
@@ -22,15 +27,22 @@ class Delete:
     @final
     @staticmethod
     async def _task_delete(
-        filter_fn: Callable,
         branch_number: int,
+        filter_fn: Callable,
         hash_reduce_left: int,
         db_root: str,
         class_model: Any,
-        mode: int,
+        backend: LeafBackend,
+        trusted_reads: bool = False,
+        raw_filters: tuple[Callable, ...] = (),
+        indexes: tuple[BaseIndex, ...] = (),
+        candidates: dict[int, list[str]] | None = None,
     ) -> int:
         """Asynchronous task for find and delete documents.
 
+        With `candidates` (keys found by an index), only these documents of the branch are read.
+        Entries of `indexes` are deleted after the documents.
+
         This method is for internal use.
 
         Returns:
@@ -48,16 +60,34 @@ class Delete:
         )
         counter: int = 0
 
-        if await leaf_path.exists():
-            async with aiodbm.open(str(leaf_path), flag="c", mode=mode) as leaf_db:
-                keys = await leaf_db.keys()
-
-                for key in keys:
-                    doc_json = await leaf_db.get(key)
-                    doc = class_model.model_validate_json(doc_json)
-                    if filter_fn(doc):
-                        await leaf_db.delete(key)
-                        counter -= 1
+        if await backend.leaf_exists(leaf_path):
+            keys_to_delete: list[bytes] = []
+            # Prepared key and old JSON-document - for the entries of indexes.
+            changes: list[tuple[str, bytes, None]] = []
+
+            items = await read_items(
+                backend,
+                leaf_path,
+                filter_fn,
+                raw_filters,
+                None if candidates is None else candidates[branch_number],
+            )
+            collection_path = Path(db_root, class_model.__name__)
+            for key, stored_value in items:
+                doc_json = decompress(stored_value, collection_path)
+                # Documents that do not match the filters of raw documents are not loaded
+                if raw_filters and not match_raw(raw_filters, doc_json):
+                    continue
+                if filter_fn is match_all or filter_fn(load_doc(class_model, doc_json, trusted_reads)):
+                    keys_to_delete.append(key)
+                    if indexes:
+                        changes.append((key.decode("utf-8"), doc_json, None))
+
+            # Batch write
+            if keys_to_delete:
+                counter -= await backend.delete_many(leaf_path, keys_to_delete)
+            if changes:
+                await IndexUpdate(indexes, changes).remove_stale()
 
         return counter
 
@@ -65,6 +95,7 @@ class Delete:
     async def delete_many(
         self,
         filter_fn: Callable,
+        raw_filter: Callable | None = None,
     ) -> int:
         """Asynchronous method for delete one or more documents matching the filter.
 
@@ -73,39 +104,37 @@ class Delete:
             - The search effectiveness depends on the number of processor threads.
 
         Args:
-            filter_fn (Callable): A function that execute the conditions of filtering.
+            filter_fn (Callable | Q): A function that execute the conditions of filtering or a query expression.
+            raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents -
+                                          dictionaries decoded from JSON, before validation of documents.
 
         Returns:
             The number of deleted documents.
         """
+        # `Where` and `Q` filters are checked on raw documents
+        filter_fn, raw_filters = plan_filter(filter_fn, raw_filter)
         # Variable initialization
         hash_reduce_left: int = self._hash_reduce_left
         assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `delete_many` method."
 
-        search_task_fn: Callable = self._task_delete
-        branch_numbers: range = range(self._max_number_branch)
-        db_root: str = self._db_root
-        class_model: Any = self._class_model
-        mode = self._mode
-        counter: int = 0
+        candidates = await self._index_candidates(filter_fn, raw_filters)
+        branch_numbers = range(self._max_number_branch) if candidates is None else sorted(candidates)
+        quantum_loop = QuantumLoop(branch_numbers, self._max_workers)
 
         # Run quantum loop
-        with ThreadPoolExecutor(self._max_workers) as executor:
-            futures: list[Future] = [
-                executor.submit(
-                    search_task_fn,
-                    filter_fn,
-                    branch_number,
-                    hash_reduce_left,
-                    db_root,
-                    class_model,
-                    mode,
-                )
-                for branch_number in branch_numbers
-            ]
-
-            for future in as_completed(futures):
-                counter += await future.result()
+        results: list[int] = await quantum_loop.gather(
+            self._task_delete,
+            filter_fn,
+            hash_reduce_left,
+            self._db_root,
+            self._class_model,
+            self._backend,
+            self._trusted_reads,
+            raw_filters,
+            self._indexes,
+            candidates,
+        )
+        counter: int = sum(results)
 
         if counter < 0:
             await self._counter_documents(counter)
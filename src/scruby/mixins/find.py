@@ -8,15 +8,26 @@ from __future__ import annotations
 
 __all__ = ("Find",)
 
-import warnings
-from collections.abc import Callable
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import os
+from collections.abc import AsyncIterator, Callable
 from enum import Enum
-from threading import Event
 from typing import Any, Never, assert_never, final
 
-import aiodbm
-from anyio import Path
+from anyio import Event, Path, to_process
+
+from scruby.backends import LeafBackend
+from scruby.compression import decompress
+from scruby.cursor import Page, decode_cursor, encode_cursor
+from scruby.indexes import read_items
+from scruby.key_ref import prepare_key
+from scruby.loader import load_doc
+from scruby.process_scan import ProcessScan
+from scruby.quantum_loop import QuantumLoop
+from scruby.query import QField, match_all, match_raw, plan_filter
+from scruby.top_k import TopK
+
+# Default sorting of `find_many` - by creation date.
+_BY_CREATED_AT = QField("created_at")
 
 
 class ReturnType(Enum):
@@ -39,23 +50,31 @@ class Find:
     @final
     @staticmethod
     async def _task_find(
-        filter_fn: Callable,
         branch_number: int,
+        filter_fn: Callable,
         hash_reduce_left: int,
         db_root: str,
         class_model: Any,
-        mode: int,
+        backend: LeafBackend,
         stop_event: Event,
+        trusted_reads: bool = False,
+        raw_filters: tuple[Callable, ...] = (),
+        keep_raw: bool = False,
+        decode: bool = True,
+        candidates: dict[int, list[str]] | None = None,
     ) -> list[Any] | None:
         """Task for find documents.
 
+        Documents are checked by `raw_filters` before loading, only the documents that match are loaded.
+        With `keep_raw`, the task returns pairs of document and its stored JSON,
+        without `decode`, documents are not loaded (None) - the filter must be `match_all`.
+        With `candidates` (keys found by an index), only these documents of the branch are read.
+
         This method is for internal use.
 
         Returns:
             List of documents or None.
         """
-        # Suppress warning - RuntimeWarning: coroutine 'Find._task_find' was never awaited
-        warnings.filterwarnings("ignore", category=RuntimeWarning)
         # Variable initialization
         branch_number_as_hash: str = f"{branch_number:08x}"[hash_reduce_left:]
         separated_hash: str = "/".join(list(branch_number_as_hash))
@@ -69,19 +88,155 @@ class Find:
         )
         docs: list[Any] = []
 
-        if await leaf_path.exists():
-            async with aiodbm.open(str(leaf_path), flag="c", mode=mode) as leaf_db:
-                keys = await leaf_db.keys()
-
-                for key in keys:
-                    if stop_event.is_set():
-                        return None
-                    doc_json = await leaf_db.get(key)
-                    doc = class_model.model_validate_json(doc_json)
-                    if filter_fn(doc):
-                        docs.append(doc)
+        if await backend.leaf_exists(leaf_path):
+            items = await read_items(
+                backend,
+                leaf_path,
+                filter_fn,
+                raw_filters,
+                None if candidates is None else candidates[branch_number],
+            )
+            collection_path = Path(db_root, class_model.__name__)
+            for _, stored_value in items:
+                if stop_event.is_set():
+                    return None
+                doc_json = decompress(stored_value, collection_path)
+                if raw_filters and not match_raw(raw_filters, doc_json):
+                    continue
+                if keep_raw and not decode:
+                    docs.append((None, doc_json))
+                    continue
+                doc = load_doc(class_model, doc_json, trusted_reads)
+                if filter_fn(doc):
+                    docs.append((doc, doc_json) if keep_raw else doc)
         return docs or None
 
+    @final
+    @staticmethod
+    async def _task_find_in_process(
+        partition_number: int,
+        partitions: list[range],
+        filter_fn: Callable,
+        hash_reduce_left: int,
+        db_root: str,
+        class_model: Any,
+        backend_cls: type[LeafBackend],
+        limit_docs: int | None,
+        trusted_reads: bool = False,
+        raw_filters: tuple[Callable, ...] = (),
+        keep_raw: bool = False,
+        decode: bool = True,
+    ) -> list[Any] | None:
+        """Task for find documents in a worker process.
+
+        Validation and filtering run in the worker process,
+        only the JSON of matching documents is shipped back.
+        `raw_filters`, `keep_raw` and `decode` - as in `_task_find`.
+
+        This method is for internal use.
+
+        Returns:
+            List of documents or None.
+        """
+        docs_json: list[bytes] = await to_process.run_sync(
+            ProcessScan.find,
+            partitions[partition_number],
+            filter_fn,
+            hash_reduce_left,
+            db_root,
+            class_model,
+            backend_cls,
+            limit_docs,
+            trusted_reads,
+            raw_filters,
+        )
+        if keep_raw:
+            return [
+                (load_doc(class_model, doc_json, trusted_reads) if decode else None, doc_json) for doc_json in docs_json
+            ] or None
+        return [load_doc(class_model, doc_json, trusted_reads) for doc_json in docs_json] or None
+
+    @final
+    def _get_partitions(self) -> list[range]:
+        """Split the branches of collection into partitions for worker processes.
+
+        Several partitions per worker process allow to stop the search early.
+
+        This method is for internal use.
+
+        Returns:
+            List of branch ranges.
+        """
+        number_workers: int = self._max_workers or os.cpu_count() or 1
+        return ProcessScan.partition(self._max_number_branch, number_workers * 4)
+
+    @final
+    async def _run_find_loop(
+        self,
+        filter_fn: Callable,
+        accept: Callable[[list[Any] | None], bool],
+        limit_docs: int | None = None,
+        raw_filters: tuple[Callable, ...] = (),
+        keep_raw: bool = False,
+        decode: bool = True,
+    ) -> None:
+        """Run the quantum loop of searching documents with the configured executor.
+
+        This method is for internal use.
+
+        Args:
+            filter_fn (Callable): A function that execute the conditions of filtering.
+            accept (Callable): Handler of found documents. Returns True to stop the loop.
+            limit_docs (int | None): Maximum number of documents required from one worker process.
+            raw_filters (tuple[Callable, ...]): Filters of raw documents - checked before loading the documents.
+            keep_raw (bool): Find pairs of document and its stored JSON.
+            decode (bool): Load the documents, with `keep_raw` only - otherwise the documents are None.
+
+        Returns:
+            None.
+        """
+        # Documents found by an index are read in the event loop
+        if self._executor == "process" and self._choose_index(filter_fn, raw_filters) is None:
+            ProcessScan.check_picklable(filter_fn)
+            for raw_filter in raw_filters:
+                ProcessScan.check_picklable(raw_filter, "raw_filter")
+            partitions = self._get_partitions()
+            quantum_loop = QuantumLoop(range(len(partitions)), self._max_workers)
+            await quantum_loop.run(
+                self._task_find_in_process,
+                partitions,
+                filter_fn,
+                self._hash_reduce_left,
+                self._db_root,
+                self._class_model,
+                type(self._backend),
+                limit_docs,
+                self._trusted_reads,
+                raw_filters,
+                keep_raw,
+                decode,
+                accept=accept,
+            )
+        else:
+            candidates = await self._index_candidates(filter_fn, raw_filters)
+            branch_numbers = range(self._max_number_branch) if candidates is None else sorted(candidates)
+            quantum_loop = QuantumLoop(branch_numbers, self._max_workers)
+            await quantum_loop.run(
+                self._task_find,
+                filter_fn,
+                self._hash_reduce_left,
+                self._db_root,
+                self._class_model,
+                self._backend,
+                quantum_loop.stop_event,
+                self._trusted_reads,
+                raw_filters,
+                keep_raw,
+                decode,
+                candidates,
+                accept=accept,
+            )
+
     @final
     async def find_one(
         self,
@@ -89,20 +244,25 @@ class Find:
         include_fields: set[str] | None = None,
         exclude_fields: set[str] | None = None,
         return_type: ReturnType = ReturnType.MODEL,
+        raw_filter: Callable | None = None,
     ) -> Any | None:
         """Asynchronous method for find one document matching the filter.
 
         Attention:
             - The search is based on the effect of a quantum loop.
             - The search effectiveness depends on the number of processor threads.
+            - `ReturnType.JSON` without `include_fields` and `exclude_fields` returns
+              the stored JSON of document as is, without encoding the model again.
 
         Args:
-            filter_fn (Callable): A function that execute the conditions of filtering.
+            filter_fn (Callable | Q): A function that execute the conditions of filtering or a query expression.
             include_fields: (set[str] | None): A set of fields to include in the output.
                                                Available for `ReturnType.JSON` and `ReturnType.DICT`.
             exclude_fields: (set[str] | None): A set of fields to exclude from the output.
                                                Available for `ReturnType.JSON` and `ReturnType.DICT`.
             return_type (ReturnType): ScrubyModel, JSON-string or Dictionary.
+            raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents -
+                                          dictionaries decoded from JSON, before validation of documents.
 
         Returns:
             Document or None.
@@ -111,44 +271,34 @@ class Find:
         hash_reduce_left: int = self._hash_reduce_left
         assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `find_one` method."
 
+        # `Where` and `Q` filters are checked on raw documents
+        filter_fn, raw_filters = plan_filter(filter_fn, raw_filter)
         model_dump_kwargs = {"include": include_fields, "exclude": exclude_fields}
-        search_task_fn: Callable = self._task_find
-        branch_numbers: range = range(self._max_number_branch)
-        db_root: str = self._db_root
-        class_model: Any = self._class_model
-        mode = self._mode
-        stop_signal = Event()
+        # The stored JSON is returned as is
+        passthrough: bool = return_type is ReturnType.JSON and include_fields is None and exclude_fields is None
         doc: Any | None = None
 
+        def accept(docs: list[Any] | None) -> bool:
+            nonlocal doc
+            if docs is None:
+                return False
+            # Get first document and stop the loop
+            doc = docs[0]
+            return True
+
         # Run quantum loop
-        with ThreadPoolExecutor(self._max_workers) as executor:
-            futures: list[Future] = [
-                executor.submit(
-                    search_task_fn,
-                    filter_fn,
-                    branch_number,
-                    hash_reduce_left,
-                    db_root,
-                    class_model,
-                    mode,
-                    stop_signal,
-                )
-                for branch_number in branch_numbers
-            ]
-
-            for future in as_completed(futures):
-                docs = await future.result()
-                if docs is not None:
-                    # Get first document
-                    doc = docs[0]
-                    # Cancel all pending tasks in the queue instantly
-                    executor.shutdown(wait=False, cancel_futures=True)
-                    # Trigger the event to tell running tasks to exit
-                    stop_signal.set()
-                    # Stop loop
-                    break
+        await self._run_find_loop(
+            filter_fn,
+            accept,
+            limit_docs=1,
+            raw_filters=raw_filters,
+            keep_raw=passthrough,
+            decode=filter_fn is not match_all,
+        )
 
         # Return document
+        if passthrough:
+            return doc[1].decode("utf-8") if doc is not None else None
         match return_type.value:
             case 1:
                 return doc
@@ -162,31 +312,41 @@ class Find:
     @final
     async def find_many(
         self,
-        filter_fn: Callable = lambda _: True,
+        filter_fn: Callable = match_all,
         limit_docs: int = 100,
         page_number: int = 1,
-        sort_fn: Callable | None = lambda doc: doc.created_at,
+        sort_fn: Callable | None = _BY_CREATED_AT,
         sort_reverse: bool = True,
         include_fields: set[str] | None = None,
         exclude_fields: set[str] | None = None,
         return_type: ReturnType = ReturnType.MODEL,
+        raw_filter: Callable | None = None,
     ) -> list[Any] | str | None:
         """Asynchronous method for find many documents matching the filter.
 
         Attention:
             - The search is based on the effect of a quantum loop.
             - The search effectiveness depends on the number of processor threads.
+            - `ReturnType.JSON` without `include_fields` and `exclude_fields` builds
+              the array from the stored JSON of documents, without encoding the models again.
+              With the default filter and `sort_fn=None`, the documents are not even loaded.
+            - With `sort_fn`, the page is taken from the whole sorted collection -
+              all branches are searched and merged into a window of `page_number * limit_docs` documents.
+              Documents with equal sort keys are ordered by the prepared key.
+            - With `sort_fn=Q.field(<field>)` for a field with a range index,
+              the documents are read in the order of index, only as many as the page needs.
+            - With `sort_fn=None`, the search stops when the page is full - the order of documents is not defined.
 
         Args:
-            filter_fn (Callable): A function that execute the conditions of filtering.
-                                  By default, it searches all documents.
+            filter_fn (Callable | Q): A function that execute the conditions of filtering or a query expression.
+                                      By default, it searches all documents.
             limit_docs (int): Limit the number of documents per page.
                               Default = 100.
             page_number (int): Page number (for pagination).
                                Default = 1.
                                Number of documents per page = limit_docs.
-            sort_fn (Callable | None): Sort the list of documents.
-                                       By default, documents are sorted by creation date.
+            sort_fn (Callable | QField | None): Sort the list of documents.
+                                                By default, documents are sorted by creation date.
             sort_reverse: (bool): Sorting direction.
                                   By default, sort descending (newest to oldest).
             include_fields: (set[str] | None): A set of fields to include in the output.
@@ -194,6 +354,8 @@ class Find:
             exclude_fields: (set[str] | None): A set of fields to exclude from the output.
                                                Available for `ReturnType.JSON` and `ReturnType.DICT`.
             return_type (ReturnType): ScrubyModel, JSON-string or Dictionary.
+            raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents -
+                                          dictionaries decoded from JSON, before validation of documents.
 
         Returns:
             Document list or None.
@@ -209,58 +371,65 @@ class Find:
         hash_reduce_left: int = self._hash_reduce_left
         assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `find_many` method."
 
+        # `Where` and `Q` filters are checked on raw documents
+        filter_fn, raw_filters = plan_filter(filter_fn, raw_filter)
         model_dump_kwargs = {"include": include_fields, "exclude": exclude_fields}
-        search_task_fn: Callable = self._task_find
-        branch_numbers: range = range(self._max_number_branch)
-        db_root: str = self._db_root
-        class_model: Any = self._class_model
-        mode = self._mode
-        stop_signal = Event()
-        stop_outer_loop: bool = False
-        counter: int = 0
+        # The array is built from the stored JSON of documents
+        passthrough: bool = return_type is ReturnType.JSON and include_fields is None and exclude_fields is None
         number_docs_skippe: int = limit_docs * (page_number - 1) if page_number > 1 else 0
         result: list[Any] = []
+        range_index = self._range_index(sort_fn.path) if isinstance(sort_fn, QField) else None
+        # Without a range index, the sorted page is merged from the documents of all branches
+        top_k = (
+            TopK(number_docs_skippe + limit_docs, sort_fn, sort_reverse, pairs=passthrough)
+            if sort_fn is not None and range_index is None
+            else None
+        )
 
-        # Run quantum loop
-        with ThreadPoolExecutor(self._max_workers) as executor:
-            futures: list[Future] = [
-                executor.submit(
-                    search_task_fn,
-                    filter_fn,
-                    branch_number,
-                    hash_reduce_left,
-                    db_root,
-                    class_model,
-                    mode,
-                    stop_signal,
-                )
-                for branch_number in branch_numbers
-            ]
-
-            for future in as_completed(futures):
-                docs = await future.result()
-                if docs is not None:
-                    for doc in docs:
-                        if number_docs_skippe == 0:
-                            if counter >= limit_docs:
-                                # Cancel all pending tasks in the queue instantly
-                                executor.shutdown(wait=False, cancel_futures=True)
-                                # Trigger the event to tell running tasks to exit
-                                stop_signal.set()
-                                # Stop loops
-                                stop_outer_loop = True
-                                break
-                            result.append(doc)
-                            counter += 1
-                        else:
-                            number_docs_skippe -= 1
-
-                    if stop_outer_loop:
-                        break
-
-        # Sorting
-        if sort_fn is not None:
-            result.sort(key=sort_fn, reverse=sort_reverse)
+        def accept(docs: list[Any] | None) -> bool:
+            nonlocal number_docs_skippe
+            if docs is None:
+                return False
+            if top_k is not None:
+                top_k.push(docs)
+                return False
+            for doc in docs:
+                if number_docs_skippe > 0:
+                    number_docs_skippe -= 1
+                    continue
+                result.append(doc)
+                if len(result) >= limit_docs:
+                    # The page is full - stop the loop
+                    return True
+            return False
+
+        if range_index is not None:
+            # The documents are read in the order of range index
+            result = await self._find_ordered(
+                range_index,
+                filter_fn,
+                raw_filters,
+                reverse=sort_reverse,
+                skip=number_docs_skippe,
+                limit=limit_docs,
+                keep_raw=passthrough,
+                decode=filter_fn is not match_all,
+            )
+        else:
+            # Run quantum loop
+            await self._run_find_loop(
+                filter_fn,
+                accept,
+                limit_docs=number_docs_skippe + limit_docs if top_k is None else None,
+                raw_filters=raw_filters,
+                keep_raw=passthrough,
+                decode=filter_fn is not match_all or sort_fn is not None,
+            )
+            if top_k is not None:
+                result = top_k.page(number_docs_skippe)
+
+        if passthrough:
+            return (b"[" + b",".join([doc_json for _, doc_json in result]) + b"]").decode("utf-8")
 
         # Return a document list
         match return_type.value:
@@ -276,3 +445,223 @@ class Find:
                 return [doc.model_dump(**model_dump_kwargs) for doc in result] if result is not None else None
             case _ as unreachable:
                 assert_never(Never(unreachable))  # pyrefly: ignore[not-callable]
+
+    @final
+    async def find_page(
+        self,
+        filter_fn: Callable = match_all,
+        limit_docs: int = 100,
+        cursor: str | None = None,
+        sort_fn: Callable = _BY_CREATED_AT,
+        sort_reverse: bool = True,
+        include_fields: set[str] | None = None,
+        exclude_fields: set[str] | None = None,
+        return_type: ReturnType = ReturnType.MODEL,
+        raw_filter: Callable | None = None,
+    ) -> Page:
+        """Asynchronous method for find a page of documents matching the filter - keyset pagination.
+
+        Attention:
+            - The page is continued from the cursor of the previous page, no documents are skipped -
+              a deep page costs the same as the first one.
+            - Documents are ordered by the sort key and then by the prepared key, the cursor is the position
+              of the last document. Pass the same filter and sorting with the cursor.
+            - With `sort_fn=Q.field(<field>)` for a field with a range index,
+              only the documents of page are read. Otherwise all branches are searched
+              and only the `limit_docs` documents after the cursor are kept.
+
+        Args:
+            filter_fn (Callable | Q): A function that execute the conditions of filtering or a query expression.
+                                      By default, it searches all documents.
+            limit_docs (int): Limit the number of documents per page.
+                              Default = 100.
+            cursor (str | None): Cursor of the previous page. None - the first page.
+            sort_fn (Callable | QField): Sort key of documents - JSON types, datetimes, dates and tuples of them.
+                                         By default, documents are sorted by creation date.
+            sort_reverse: (bool): Sorting direction.
+                                  By default, sort descending (newest to oldest).
+            include_fields: (set[str] | None): A set of fields to include in the output.
+                                               Available for `ReturnType.JSON` and `ReturnType.DICT`.
+            exclude_fields: (set[str] | None): A set of fields to exclude from the output.
+                                               Available for `ReturnType.JSON` and `ReturnType.DICT`.
+            return_type (ReturnType): ScrubyModel, JSON-string or Dictionary.
+            raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents -
+                                          dictionaries decoded from JSON, before validation of documents.
+
+        Returns:
+            Page - documents and the cursor of the next page, None if this is the last page.
+        """
+        if __debug__ and limit_docs <= 0:
+            msg = "Method: `find_page` => The `limit_docs` parameter must not be less than one."
+            raise AssertionError(msg)
+        # Variable initialization
+        hash_reduce_left: int = self._hash_reduce_left
+        assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `find_page` method."
+
+        # `Where` and `Q` filters are checked on raw documents
+        filter_fn, raw_filters = plan_filter(filter_fn, raw_filter)
+        model_dump_kwargs = {"include": include_fields, "exclude": exclude_fields}
+        # The array is built from the stored JSON of documents
+        passthrough: bool = return_type is ReturnType.JSON and include_fields is None and exclude_fields is None
+        position: tuple[Any, str] | None = None
+        if cursor is not None:
+            sort_key, cursor_key = decode_cursor(cursor)
+            position = (sort_key, prepare_key(cursor_key))
+        result: list[Any]
+        # One more document tells whether there is a next page
+        window: int = limit_docs + 1
+
+        range_index = self._range_index(sort_fn.path) if isinstance(sort_fn, QField) else None
+        if range_index is not None:
+            # The documents are read in the order of range index, starting after the cursor
+            result = await self._find_ordered(
+                range_index,
+                filter_fn,
+                raw_filters,
+                reverse=sort_reverse,
+                skip=0,
+                limit=window,
+                keep_raw=passthrough,
+                after=(range_index.position_of(*position) if position is not None else None),
+            )
+        else:
+            top_k = TopK(window, sort_fn, sort_reverse, pairs=passthrough)
+
+            def accept(docs: list[Any] | None) -> bool:
+                if docs is None:
+                    return False
+                if position is not None:
+                    # Only the documents after the cursor in order
+                    docs = [
+                        doc
+                        for doc in docs
+                        if (top_k.key(doc) < position if sort_reverse else top_k.key(doc) > position)
+                    ]
+                top_k.push(docs)
+                return False
+
+            # Run quantum loop
+            await self._run_find_loop(
+                filter_fn,
+                accept,
+                limit_docs=None,
+                raw_filters=raw_filters,
+                keep_raw=passthrough,
+            )
+            result = top_k.page(0)
+
+        next_cursor: str | None = None
+        if len(result) > limit_docs:
+            del result[limit_docs:]
+            last_doc = result[-1][0] if passthrough else result[-1]
+            next_cursor = encode_cursor(sort_fn(last_doc), prepare_key(last_doc.key))
+
+        if passthrough:
+            return Page((b"[" + b",".join([doc_json for _, doc_json in result]) + b"]").decode("utf-8"), next_cursor)
+        match return_type.value:
+            case 1:
+                return Page(result, next_cursor)
+            case 2:
+                return Page(
+                    f"[{','.join([doc.model_dump_json(**model_dump_kwargs) for doc in result])}]",
+                    next_cursor,
+                )
+            case 3:
+                return Page([doc.model_dump(**model_dump_kwargs) for doc in result], next_cursor)
+            case _ as unreachable:
+                assert_never(Never(unreachable))  # pyrefly: ignore[not-callable]
+
+    @final
+    async def iter_docs(
+        self,
+        filter_fn: Callable = match_all,
+        return_type: ReturnType = ReturnType.MODEL,
+        batch_size: int | None = None,
+        include_fields: set[str] | None = None,
+        exclude_fields: set[str] | None = None,
+        raw_filter: Callable | None = None,
+    ) -> AsyncIterator[Any]:
+        """Asynchronous generator of the documents matching the filter - streaming of results.
+
+        Attention:
+            - Branches are scanned in steps of `max_workers` branches, concurrently within a step.
+              The next step starts when the consumer has taken the documents of the previous one,
+              so memory is bounded by the documents of one step, not by the size of collection.
+            - Documents are yielded in order of scanning, not sorted.
+            - Branches are scanned in the event loop, also with `Scruby.run(executor="process")`.
+            - `ReturnType.JSON` without `include_fields` and `exclude_fields` yields
+              the stored JSON of documents as is.
+
+        Args:
+            filter_fn (Callable | Q): A function that execute the conditions of filtering or a query expression.
+                                      By default, it searches all documents.
+            return_type (ReturnType): ScrubyModel, JSON-string or Dictionary.
+            batch_size (int | None): Yield lists of up to `batch_size` documents.
+                                     None - yield the documents one by one.
+            include_fields: (set[str] | None): A set of fields to include in the output.
+                                               Available for `ReturnType.JSON` and `ReturnType.DICT`.
+            exclude_fields: (set[str] | None): A set of fields to exclude from the output.
+                                               Available for `ReturnType.JSON` and `ReturnType.DICT`.
+            raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents -
+                                          dictionaries decoded from JSON, before validation of documents.
+
+        Yields:
+            Documents or lists of documents.
+        """
+        if __debug__ and batch_size is not None and batch_size <= 0:
+            msg = "Method: `iter_docs` => The `batch_size` parameter must not be less than one."
+            raise AssertionError(msg)
+        # Variable initialization
+        hash_reduce_left: int = self._hash_reduce_left
+        assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `iter_docs` method."
+
+        # `Where` and `Q` filters are checked on raw documents
+        filter_fn, raw_filters = plan_filter(filter_fn, raw_filter)
+        model_dump_kwargs = {"include": include_fields, "exclude": exclude_fields}
+        # The stored JSON is yielded as is
+        passthrough: bool = return_type is ReturnType.JSON and include_fields is None and exclude_fields is None
+        candidates = await self._index_candidates(filter_fn, raw_filters)
+        branch_numbers = range(self._max_number_branch) if candidates is None else sorted(candidates)
+        step: int = self._max_workers or min(32, (os.cpu_count() or 1) + 4)
+        batch: list[Any] = []
+
+        for start in range(0, len(branch_numbers), step):
+            # The task group is closed before yielding - the consumer may stop at any document
+            quantum_loop = QuantumLoop(list(branch_numbers[start : start + step]), self._max_workers)
+            branches: list[list[Any] | None] = await quantum_loop.gather(
+                self._task_find,
+                filter_fn,
+                hash_reduce_left,
+                self._db_root,
+                self._class_model,
+                self._backend,
+                quantum_loop.stop_event,
+                self._trusted_reads,
+                raw_filters,
+                passthrough,
+                filter_fn is not match_all,
+                candidates,
+            )
+            for docs in branches:
+                for doc in docs or ():
+                    if passthrough:
+                        item = doc[1].decode("utf-8")
+                    else:
+                        match return_type.value:
+                            case 1:
+                                item = doc
+                            case 2:
+                                item = doc.model_dump_json(**model_dump_kwargs)
+                            case 3:
+                                item = doc.model_dump(**model_dump_kwargs)
+                            case _ as unreachable:
+                                assert_never(Never(unreachable))  # pyrefly: ignore[not-callable]
+                    if batch_size is None:
+                        yield item
+                        continue
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
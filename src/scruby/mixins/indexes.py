@@ -0,0 +1,368 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Methods for working with secondary indexes."""
+
+from __future__ import annotations
+
+__all__ = ("Indexes",)
+
+from collections.abc import Callable
+from typing import Any, final
+
+import orjson
+from anyio import Path
+
+from scruby.backends import LeafBackend
+from scruby.compression import decompress
+from scruby.indexes import (
+    BaseIndex,
+    HashIndex,
+    IndexUpdate,
+    RangeIndex,
+    choose_index,
+    range_bounds,
+    range_conditions,
+)
+from scruby.key_ref import route_key
+from scruby.loader import load_doc
+from scruby.quantum_loop import QuantumLoop
+from scruby.query import match_all, pushdown_conditions
+
+# Maximum number of documents read at once in the order of range index.
+_ORDERED_CHUNK = 1024
+
+
+class Indexes:
+    """Methods for working with secondary indexes."""
+
+    @final
+    @staticmethod
+    async def _task_index_branch(
+        branch_number: int,
+        hash_reduce_left: int,
+        db_root: str,
+        class_model: Any,
+        backend: LeafBackend,
+        indexes: tuple[BaseIndex, ...],
+    ) -> None:
+        """Task for adding the documents of a branch to the indexes.
+
+        This method is for internal use.
+
+        Returns:
+            None.
+        """
+        branch_number_as_hash: str = f"{branch_number:08x}"[hash_reduce_left:]
+        separated_hash: str = "/".join(list(branch_number_as_hash))
+        leaf_path = Path(
+            *(
+                db_root,
+                class_model.__name__,
+                separated_hash,
+                "leaf.dbm",
+            ),
+        )
+        if await backend.leaf_exists(leaf_path):
+            collection_path = Path(db_root, class_model.__name__)
+            changes = [
+                (key.decode("utf-8"), None, decompress(stored_value, collection_path))
+                for key, stored_value in await backend.items(leaf_path)
+            ]
+            await IndexUpdate(indexes, changes).add_new()
+
+    @final
+    async def _build_indexes(self, indexes: tuple[BaseIndex, ...]) -> None:
+        """Asynchronous method for adding all documents of collection to the indexes.
+
+        This method is for internal use.
+
+        Args:
+            indexes (tuple[BaseIndex, ...]): Indexes of collection.
+
+        Returns:
+            None.
+        """
+        quantum_loop = QuantumLoop(range(self._max_number_branch), self._max_workers)
+        await quantum_loop.gather(
+            self._task_index_branch,
+            self._hash_reduce_left,
+            self._db_root,
+            self._class_model,
+            self._backend,
+            indexes,
+        )
+        for index in indexes:
+            await index.mark_built()
+
+    @final
+    async def rebuild_indexes(self) -> None:
+        """Asynchronous method for rebuilding the secondary indexes of collection.
+
+        Indexes are built automatically by the first query that uses them.
+        Rebuilding is required if the collection has been changed by a process
+        in which the model did not declare the indexes.
+
+        Returns:
+            None.
+        """
+        hash_reduce_left: int = self._hash_reduce_left
+        assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `rebuild_indexes` method."
+
+        for index in self._indexes:
+            async with index.build_lock:
+                index.clear_sync()
+                await self._build_indexes((index,))
+
+    @final
+    async def _prepare_index(self, index: BaseIndex) -> None:
+        """Asynchronous method for building the index if necessary and loading the range index.
+
+        This method is for internal use.
+
+        Args:
+            index (BaseIndex): Index of collection.
+
+        Returns:
+            None.
+        """
+        if not await index.is_built():
+            # Concurrent queries wait for one build.
+            async with index.build_lock:
+                if not await index.is_built():
+                    await self._build_indexes((index,))
+        if isinstance(index, RangeIndex):
+            await index.load()
+
+    @final
+    def _range_index(self, field: str) -> RangeIndex | None:
+        """Method for getting the range index of field.
+
+        This method is for internal use.
+
+        Args:
+            field (str): Name of field, dotted path for nested fields.
+
+        Returns:
+            Range index or None.
+        """
+        for index in self._indexes:
+            if isinstance(index, RangeIndex) and index.field == field:
+                return index
+        return None
+
+    @final
+    def _choose_index(
+        self,
+        filter_fn: Callable,
+        raw_filters: tuple[Callable, ...] = (),
+    ) -> tuple[BaseIndex, Any] | None:
+        """Method for choosing the index for the filters.
+
+        Hash indexes are preferred, range indexes are used for range conditions.
+
+        This method is for internal use.
+
+        Args:
+            filter_fn (Callable): A function that execute the conditions of filtering.
+            raw_filters (tuple[Callable, ...]): Filters of raw documents.
+
+        Returns:
+            Hash index and values of field or range index and bounds of slice, None if no index can be used.
+        """
+        if not self._indexes:
+            return None
+        choice = choose_index(self._indexes, pushdown_conditions(filter_fn, *raw_filters))
+        if choice is not None:
+            return choice
+        conditions = range_conditions(filter_fn, *raw_filters)
+        for index in self._indexes:
+            if isinstance(index, RangeIndex):
+                bounds = range_bounds(index.field, conditions, index.datetime_field)
+                if bounds is not None:
+                    return (index, bounds)
+        return None
+
+    @final
+    async def _index_candidates(
+        self,
+        filter_fn: Callable,
+        raw_filters: tuple[Callable, ...] = (),
+    ) -> dict[int, list[str]] | None:
+        """Asynchronous method for getting the keys of documents from an index.
+
+        A range index is used if the slice contains at most a quarter of the entries,
+        otherwise scanning the collection is faster.
+
+        This method is for internal use.
+
+        Args:
+            filter_fn (Callable): A function that execute the conditions of filtering.
+            raw_filters (tuple[Callable, ...]): Filters of raw documents.
+
+        Returns:
+            Prepared keys of documents by branch number, None if no index can be used.
+        """
+        choice = self._choose_index(filter_fn, raw_filters)
+        if choice is None:
+            return None
+        index, values = choice
+        await self._prepare_index(index)
+        doc_keys: set[str] = set()
+        if isinstance(index, HashIndex):
+            doc_keys = await index.lookup(values)
+        elif isinstance(index, RangeIndex):
+            entries = index.entries(values)
+            if len(entries) * 4 > index.size:
+                return None
+            doc_keys = {doc_key for _, _, doc_key, _ in entries}
+        candidates: dict[int, list[str]] = {}
+        for key in doc_keys:
+            _, separated_hash = route_key(key, self._hash_reduce_left)
+            candidates.setdefault(int(separated_hash.replace("/", ""), 16), []).append(key)
+        return candidates
+
+    @final
+    async def _read_stored(self, keys: list[str]) -> list[bytes | None]:
+        """Asynchronous method for reading the stored values of documents by prepared keys.
+
+        This method is for internal use.
+
+        Args:
+            keys (list[str]): Prepared keys of documents.
+
+        Returns:
+            Stored values in order of keys, None for missing keys.
+        """
+        groups_by_leaf: dict[str, tuple[Any, list[int], list[str]]] = {}
+        for number, key in enumerate(keys):
+            leaf_path, prepared_key = self._compute_leaf_path(key)
+            group = groups_by_leaf.setdefault(str(leaf_path), (leaf_path, [], []))
+            group[1].append(number)
+            group[2].append(prepared_key)
+        groups = [group for group in groups_by_leaf.values() if await self._backend.leaf_exists(group[0])]
+        quantum_loop = QuantumLoop(range(len(groups)), self._max_workers)
+        fetches: list[list[tuple[int, bytes | None]]] = await quantum_loop.gather(
+            self._task_leaf_group,
+            groups,
+            self._backend.get_many,
+        )
+        stored_values: list[bytes | None] = [None] * len(keys)
+        for fetch in fetches:
+            for number, stored_value in fetch:
+                stored_values[number] = stored_value
+        return stored_values
+
+    @final
+    async def _find_ordered(
+        self,
+        index: RangeIndex,
+        filter_fn: Callable,
+        raw_filters: tuple[Callable, ...],
+        reverse: bool,
+        skip: int,
+        limit: int,
+        keep_raw: bool = False,
+        decode: bool = True,
+        after: tuple[Any, ...] | None = None,
+    ) -> list[Any]:
+        """Asynchronous method for finding documents in the order of range index.
+
+        Documents are read in chunks, only as many as the page needs.
+        Range conditions on the field limit the slice of index.
+        `keep_raw` and `decode` - as in `_task_find`, `after` - as in `RangeIndex.entries`.
+
+        This method is for internal use.
+
+        Args:
+            index (RangeIndex): Range index of the sort field.
+            filter_fn (Callable): A function that execute the conditions of filtering.
+            raw_filters (tuple[Callable, ...]): Filters of raw documents.
+            reverse (bool): Descending order.
+            skip (int): Number of documents to skip.
+            limit (int): Maximum number of documents.
+            keep_raw (bool): Find pairs of document and its stored JSON.
+            decode (bool): Load the documents, with `keep_raw` only - otherwise the documents are None.
+            after (tuple[Any, ...] | None): Position of document - only the documents after it are read.
+
+        Returns:
+            Documents in order.
+        """
+        await self._prepare_index(index)
+        bounds = range_bounds(index.field, range_conditions(filter_fn, *raw_filters), index.datetime_field)
+        entries = index.entries(bounds, reverse, after)
+        collection_path = self._backend.collection_path
+        chunk_size = min(max(skip + limit, 64), _ORDERED_CHUNK)
+        docs: list[Any] = []
+        for start in range(0, len(entries), chunk_size):
+            chunk = entries[start : start + chunk_size]
+            stored_values = await self._read_stored([doc_key for _, _, doc_key, _ in chunk])
+            for (_, _, _, value_json), stored_value in zip(chunk, stored_values, strict=True):
+                if stored_value is None:
+                    continue
+                doc_json = decompress(stored_value, collection_path)
+                raw_doc = orjson.loads(doc_json)
+                # Stale entries of changed documents are skipped.
+                if index.key_of(raw_doc) != value_json:
+                    continue
+                if raw_filters and not all(raw_filter(raw_doc) for raw_filter in raw_filters):
+                    continue
+                doc: Any = None
+                if decode or not keep_raw:
+                    doc = load_doc(self._class_model, doc_json, self._trusted_reads)
+                    if not filter_fn(doc):
+                        continue
+                if skip > 0:
+                    skip -= 1
+                    continue
+                docs.append((doc, doc_json) if keep_raw else doc)
+                if len(docs) >= limit:
+                    return docs
+        return docs
+
+    @final
+    async def find_min(self, field: str) -> Any | None:
+        """Asynchronous method for finding the document with the smallest value of field.
+
+        The field must have a range index.
+        Values are ordered - None, numbers, datetimes, strings, then other values.
+
+        Args:
+            field (str): Name of field, dotted path for nested fields.
+
+        Returns:
+            Document or None.
+        """
+        hash_reduce_left: int = self._hash_reduce_left
+        assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `find_min` method."
+
+        index = self._range_index(field)
+        if index is None:
+            msg = f"Method: `find_min` => The field `{field}` has no range index."
+            raise ValueError(msg)
+        docs = await self._find_ordered(index, match_all, (), reverse=False, skip=0, limit=1)
+        return docs[0] if docs else None
+
+    @final
+    async def find_max(self, field: str) -> Any | None:
+        """Asynchronous method for finding the document with the largest value of field.
+
+        The field must have a range index.
+        Values are ordered - None, numbers, datetimes, strings, then other values.
+
+        Args:
+            field (str): Name of field, dotted path for nested fields.
+
+        Returns:
+            Document or None.
+        """
+        hash_reduce_left: int = self._hash_reduce_left
+        assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `find_max` method."
+
+        index = self._range_index(field)
+        if index is None:
+            msg = f"Method: `find_max` => The field `{field}` has no range index."
+            raise ValueError(msg)
+        docs = await self._find_ordered(index, match_all, (), reverse=True, skip=0, limit=1)
+        return docs[0] if docs else None
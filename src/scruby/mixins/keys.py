@@ -9,16 +9,21 @@ from __future__ import annotations
 __all__ = ("Keys",)
 
 
+from collections.abc import Awaitable, Callable
 from datetime import datetime
-from typing import Any, final
+from typing import Any, Never, assert_never, final
 from zoneinfo import ZoneInfo
 
-import aiodbm
-
+from scruby.compression import compress, decompress
 from scruby.errors import (
     KeyAlreadyExistsError,
     KeyNotExistsError,
 )
+from scruby.indexes import IndexUpdate
+from scruby.key_ref import KeyRef
+from scruby.loader import load_doc
+from scruby.mixins.find import ReturnType
+from scruby.quantum_loop import QuantumLoop
 
 
 class Keys:
@@ -56,23 +61,202 @@ class Keys:
         doc.created_at = datetime.now(tz)
         doc.updated_at = datetime.now(tz)
         # Convert doc to json
-        doc_json: str = doc.model_dump_json()
-
-        async with aiodbm.open(str(leaf_path), flag="c", mode=self._mode) as leaf_db:
-            # Raise an exception if the key is exists
-            if await leaf_db.exists(prepared_key):
-                raise KeyAlreadyExistsError()
-            # Add a new document to the database
-            await leaf_db.set(prepared_key, doc_json)
+        plain_json = doc.model_dump_json()
+        doc_json = compress(plain_json, self._class_model.scruby_compression)
+        # Entries of indexes are added before the document
+        if self._indexes:
+            await IndexUpdate(self._indexes, [(prepared_key, None, plain_json)]).add_new()
+
+        # Add a new document to the database
+        # Raise an exception if the key is exists
+        if not await self._backend.add(leaf_path, prepared_key, doc_json):
+            if self._indexes:
+                await self._remove_rejected_entries([(leaf_path, prepared_key, plain_json)])
+            raise KeyAlreadyExistsError()
         # Update document counter
         await self._counter_documents(1)
 
     @final
-    async def update_doc(self, doc: Any) -> None:
+    async def _remove_rejected_entries(self, rejected: list[tuple[Any, str, str]]) -> None:
+        """Delete the entries of indexes added for documents whose keys already exist.
+
+        `rejected` - path to leaf, prepared key and JSON of each document that was not added.
+        The entries shared with the stored documents are kept.
+
+        This method is for internal use.
+        """
+        changes: list[tuple[str, bytes | str | None, bytes | str | None]] = []
+        for leaf_path, prepared_key, plain_json in rejected:
+            stored_json = await self._backend.get(leaf_path, prepared_key)
+            if stored_json is not None:
+                stored_json = decompress(stored_json, self._backend.collection_path)
+            changes.append((prepared_key, plain_json, stored_json))
+        await IndexUpdate(self._indexes, changes).remove_stale()
+
+    @final
+    @staticmethod
+    async def _task_leaf_group(
+        group_number: int,
+        groups: list[tuple[Any, list[int], list[Any]]],
+        leaf_fn: Callable[[Any, list[Any]], Awaitable[list[Any]]],
+    ) -> list[tuple[int, Any]]:
+        """Task for processing a group of items of one leaf with one bulk operation of the backend.
+
+        This method is for internal use.
+
+        Returns:
+            List of pairs - index of item and result of `leaf_fn`.
+        """
+        leaf_path, indexes, items = groups[group_number]
+        results = await leaf_fn(leaf_path, items)
+        return list(zip(indexes, results, strict=True))
+
+    @final
+    async def add_many(self, docs: list[Any], ordered: bool = False) -> list[bool]:
+        """Asynchronous method for adding many documents to collection.
+
+        Keys are hashed up front and documents are grouped by leaf.
+        Each leaf is written with one bulk operation of the backend, leaves are written concurrently.
+        The document counter is updated once per batch.
+
+        Args:
+            docs (list[Any]): Documents. Type, derived from `ScrubyModel`.
+            ordered (bool): If False (default), all documents whose keys do not exist are added.
+                            If True, documents are added in order up to the first conflict,
+                            the remaining documents are not added.
+
+        Returns:
+            List of results per document - True if the document was added,
+            False if the key already exists (the first document with the same key in the batch wins)
+            or the document follows the first conflict in `ordered` mode.
+        """
+        # Check all documents before writing
+        for doc in docs:
+            # Check if the Model matches the collection
+            if not isinstance(doc, self._class_model):
+                doc_class_name = doc.__class__.__name__
+                collection_name = self._class_model.__name__
+                msg = (
+                    "Method: `add_many` > Parameter: `docs` => "
+                    + f"Model `{doc_class_name}` does not match collection `{collection_name}`!"
+                )
+                raise TypeError(msg)
+            # If a password field is present, it must not be empty
+            if "password" in self.model_fields and not bool(doc.password):
+                msg = "Method: `add_many` => The `password` field is empty"
+                raise ValueError(msg)
+
+        results: list[bool] = [False] * len(docs)
+        tz = ZoneInfo("UTC")
+        seen_keys: set[tuple[str, str]] = set()
+        duplicates: list[int] = []
+        groups_by_leaf: dict[str, tuple[Any, list[int], list[tuple[str, str | bytes]]]] = {}
+        compression = self._class_model.scruby_compression
+        # Uncompressed documents - for the entries of indexes.
+        plain_docs: dict[int, str] = {}
+
+        # Hash all keys and group documents by leaf
+        for index, doc in enumerate(docs):
+            leaf_path, prepared_key = await self._get_leaf_path(doc.key)
+            leaf_id = (str(leaf_path), prepared_key)
+            if leaf_id in seen_keys:
+                duplicates.append(index)
+                continue
+            seen_keys.add(leaf_id)
+            # Init a `created_at` and `updated_at` fields
+            doc.created_at = datetime.now(tz)
+            doc.updated_at = datetime.now(tz)
+            group = groups_by_leaf.setdefault(str(leaf_path), (leaf_path, [], []))
+            group[1].append(index)
+            plain_json = doc.model_dump_json()
+            group[2].append((prepared_key, compress(plain_json, compression)))
+            if self._indexes:
+                plain_docs[index] = plain_json
+
+        groups = list(groups_by_leaf.values())
+
+        if ordered:
+            # Find the first conflict and add only the documents before it
+            quantum_loop = QuantumLoop(range(len(groups)), self._max_workers)
+            checks: list[list[tuple[int, bool]]] = await quantum_loop.gather(
+                self._task_leaf_group,
+                [(leaf_path, indexes, [key for key, _ in items]) for leaf_path, indexes, items in groups],
+                self._backend.exists_many,
+            )
+            conflicts = [index for check in checks for index, exists in check if exists]
+            first_conflict = min(conflicts + duplicates, default=len(docs))
+            groups = [
+                (
+                    leaf_path,
+                    [index for index in indexes if index < first_conflict],
+                    [item for index, item in zip(indexes, items, strict=True) if index < first_conflict],
+                )
+                for leaf_path, indexes, items in groups
+            ]
+            groups = [group for group in groups if group[1]]
+
+        # Entries of indexes are added before the documents
+        if self._indexes:
+            await IndexUpdate(
+                self._indexes,
+                [
+                    (key, None, plain_docs[index])
+                    for _, indexes, items in groups
+                    for index, (key, _) in zip(indexes, items, strict=True)
+                ],
+            ).add_new()
+
+        # Add documents
+        quantum_loop = QuantumLoop(range(len(groups)), self._max_workers)
+        inserts: list[list[tuple[int, bool]]] = await quantum_loop.gather(
+            self._task_leaf_group,
+            groups,
+            self._backend.add_many,
+        )
+        counter: int = 0
+        for insert in inserts:
+            for index, is_added in insert:
+                results[index] = is_added
+                counter += is_added
+        if ordered:
+            # Another writer may have added a key after the check -
+            # the documents after the first conflict are deleted again.
+            first_conflict = min(
+                (index for _, indexes, _ in groups for index in indexes if not results[index]),
+                default=len(docs),
+            )
+            rollback = [
+                (leaf_path, [key for index, (key, _) in zip(indexes, items, strict=True) if index > first_conflict])
+                for leaf_path, indexes, items in groups
+            ]
+            for leaf_path, keys in rollback:
+                if keys:
+                    counter -= await self._backend.delete_many(leaf_path, keys)
+            for index in range(first_conflict + 1, len(docs)):
+                results[index] = False
+        if self._indexes:
+            await self._remove_rejected_entries(
+                [
+                    (leaf_path, key, plain_docs[index])
+                    for leaf_path, indexes, items in groups
+                    for index, (key, _) in zip(indexes, items, strict=True)
+                    if not results[index]
+                ],
+            )
+
+        # Update document counter
+        if counter > 0:
+            await self._counter_documents(counter)
+
+        return results
+
+    @final
+    async def update_doc(self, doc: Any, key_ref: KeyRef | None = None) -> None:
         """Asynchronous method for updating document to collection.
 
         Args:
             doc (Any): Value of key. Type `ScrubyModel`.
+            key_ref (KeyRef | None): Reference to the key of document, from `Scruby.key_ref(doc.key)`.
 
         Returns:
             None.
@@ -92,50 +276,141 @@ class Keys:
             msg = "Method: `update_doc` => The `password` field is empty"
             raise ValueError(msg)
 
+        # The reference must point to the key of document
+        if key_ref is not None and key_ref.key != doc.key:
+            msg = f"Method: `update_doc` > Parameter: `key_ref` => {key_ref!r} does not match the key of document."
+            raise KeyError(msg)
+
         # Get the path to the collection cell
-        leaf_path, prepared_key = await self._get_leaf_path(doc.key)
+        leaf_path, prepared_key = await self._get_leaf_path(key_ref or doc.key)
         # Update a `updated_at` field
         doc.updated_at = datetime.now(ZoneInfo("UTC"))
         # Convert doc to json.
-        doc_json: str = doc.model_dump_json()
-
-        async with aiodbm.open(str(leaf_path), flag="c", mode=self._mode) as leaf_db:
-            # Raise an exception if the key is missing
-            if not await leaf_db.exists(prepared_key):
-                raise KeyNotExistsError()
-            # Update document to the database
-            await leaf_db.set(prepared_key, doc_json)
+        plain_json = doc.model_dump_json()
+        doc_json = compress(plain_json, self._class_model.scruby_compression)
+        # Entries of indexes are added before the document and deleted after
+        index_update: IndexUpdate | None = None
+        if self._indexes:
+            old_json = await self._backend.get(leaf_path, prepared_key)
+            if old_json is not None:
+                old_json = decompress(old_json, self._backend.collection_path)
+            index_update = IndexUpdate(self._indexes, [(prepared_key, old_json, plain_json)])
+            await index_update.add_new()
+
+        # Update document to the database
+        # Raise an exception if the key is missing
+        if not await self._backend.replace(leaf_path, prepared_key, doc_json):
+            raise KeyNotExistsError()
+        if index_update is not None:
+            await index_update.remove_stale()
 
     @final
-    async def get_doc(self, key: str) -> Any | None:
+    async def get_doc(self, key: str | KeyRef) -> Any | None:
         """Asynchronous method for getting document from collection the by key.
 
         Args:
-            key (str): Key name.
+            key (str | KeyRef): Key name or reference to the key from `Scruby.key_ref(key)`.
 
         Returns:
             Value of key or KeyError.
         """
-        if not isinstance(key, str):
+        if not isinstance(key, str | KeyRef):
             raise KeyError("The key is not a string.")
 
         # Get the path to the collection cell
         leaf_path, prepared_key = await self._get_leaf_path(key)
 
-        async with aiodbm.open(str(leaf_path), flag="c", mode=self._mode) as leaf_db:
-            # If the key is missing, return None
-            if not await leaf_db.exists(prepared_key):
-                return None
+        doc_json = await self._backend.get(leaf_path, prepared_key)
+        # If the key is missing, return None
+        if doc_json is None:
+            return None
+        return load_doc(self._class_model, decompress(doc_json, self._backend.collection_path), self._trusted_reads)
 
-            doc_json = await leaf_db.get(prepared_key)
-            return self._class_model.model_validate_json(doc_json)
+    @final
+    async def get_many(
+        self,
+        keys: list[str],
+        include_fields: set[str] | None = None,
+        exclude_fields: set[str] | None = None,
+        return_type: ReturnType = ReturnType.MODEL,
+    ) -> list[Any] | str:
+        """Asynchronous method for getting many documents from collection by keys.
+
+        Keys are grouped by leaf, each leaf is read with one bulk operation of the backend and
+        leaves are read concurrently.
+        `ReturnType.JSON` without `include_fields` and `exclude_fields` builds
+        the array from the stored JSON of documents, without loading the models.
+
+        Args:
+            keys (list[str]): Key names.
+            include_fields: (set[str] | None): A set of fields to include in the output.
+                                               Available for `ReturnType.JSON` and `ReturnType.DICT`.
+            exclude_fields: (set[str] | None): A set of fields to exclude from the output.
+                                               Available for `ReturnType.JSON` and `ReturnType.DICT`.
+            return_type (ReturnType): ScrubyModel, JSON-string or Dictionary.
+
+        Returns:
+            Documents in order of keys, None for missing keys.
+        """
+        model_dump_kwargs = {"include": include_fields, "exclude": exclude_fields}
+        groups_by_leaf: dict[str, tuple[Any, list[int], list[str]]] = {}
+
+        # Group keys by leaf
+        for index, key in enumerate(keys):
+            leaf_path, prepared_key = self._compute_leaf_path(key)
+            group = groups_by_leaf.setdefault(str(leaf_path), (leaf_path, [], []))
+            group[1].append(index)
+            group[2].append(prepared_key)
+
+        # Leaves that do not exist are not opened - so as not to create them
+        groups = [group for group in groups_by_leaf.values() if await self._backend.leaf_exists(group[0])]
+
+        # Get documents
+        quantum_loop = QuantumLoop(range(len(groups)), self._max_workers)
+        fetches: list[list[tuple[int, bytes | None]]] = await quantum_loop.gather(
+            self._task_leaf_group,
+            groups,
+            self._backend.get_many,
+        )
+        result: list[Any] = [None] * len(keys)
+        collection_path = self._backend.collection_path
+
+        # The array is built from the stored JSON of documents
+        if return_type is ReturnType.JSON and include_fields is None and exclude_fields is None:
+            docs_raw: list[bytes] = [b"null"] * len(keys)
+            for fetch in fetches:
+                for index, doc_json in fetch:
+                    if doc_json is not None:
+                        docs_raw[index] = decompress(doc_json, collection_path)
+            return (b"[" + b",".join(docs_raw) + b"]").decode("utf-8")
+
+        for fetch in fetches:
+            for index, doc_json in fetch:
+                if doc_json is not None:
+                    result[index] = load_doc(
+                        self._class_model,
+                        decompress(doc_json, collection_path),
+                        self._trusted_reads,
+                    )
+
+        # Return a document list
+        match return_type.value:
+            case 1:
+                return result
+            case 2:
+                docs_json = [doc.model_dump_json(**model_dump_kwargs) if doc is not None else "null" for doc in result]
+                return f"[{','.join(docs_json)}]"
+            case 3:
+                return [doc.model_dump(**model_dump_kwargs) if doc is not None else None for doc in result]
+            case _ as unreachable:
+                assert_never(Never(unreachable))  # pyrefly: ignore[not-callable]
 
     @final
-    async def has_key(self, key: str) -> bool:
+    async def has_key(self, key: str | KeyRef) -> bool:
         """Asynchronous method for checking presence of key in collection.
 
         Args:
-            key (str): Key name.
+            key (str | KeyRef): Key name or reference to the key from `Scruby.key_ref(key)`.
 
         Returns:
             True, if the key is present.
@@ -143,15 +418,14 @@ class Keys:
         # Get path to cell of collection.
         leaf_path, prepared_key = await self._get_leaf_path(key)
 
-        async with aiodbm.open(str(leaf_path), flag="c", mode=self._mode) as leaf_db:
-            return await leaf_db.exists(prepared_key)
+        return await self._backend.exists(leaf_path, prepared_key)
 
     @final
-    async def delete_doc(self, key: str) -> None:
+    async def delete_doc(self, key: str | KeyRef) -> None:
         """Asynchronous method for deleting document from collection the by key.
 
         Args:
-            key (str): Key name.
+            key (str | KeyRef): Key name or reference to the key from `Scruby.key_ref(key)`.
 
         Returns:
             None.
@@ -159,11 +433,16 @@ class Keys:
         # The path to the database cell.
         leaf_path, prepared_key = await self._get_leaf_path(key)
 
-        # Deleting key.
-        async with aiodbm.open(str(leaf_path), flag="c", mode=self._mode) as leaf_db:
-            # Raise an exception if the key is missing
-            if not await leaf_db.exists(prepared_key):
-                raise KeyNotExistsError()
+        # Entries of indexes are deleted after the document
+        old_json: bytes | None = None
+        if self._indexes:
+            old_json = await self._backend.get(leaf_path, prepared_key)
 
-            await leaf_db.delete(prepared_key)
-            await self._counter_documents(-1)
+        # Deleting key.
+        # Raise an exception if the key is missing
+        if not await self._backend.delete(leaf_path, prepared_key):
+            raise KeyNotExistsError()
+        await self._counter_documents(-1)
+        if old_json is not None:
+            old_json = decompress(old_json, self._backend.collection_path)
+            await IndexUpdate(self._indexes, [(prepared_key, old_json, None)]).remove_stale()
@@ -10,12 +10,17 @@ __all__ = ("Update",)
 
 import copy
 from collections.abc import Callable
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from typing import Any, final
 
-import aiodbm
 from anyio import Path
 
+from scruby.backends import LeafBackend
+from scruby.compression import compress, decompress
+from scruby.indexes import BaseIndex, IndexUpdate, read_items
+from scruby.loader import load_doc
+from scruby.quantum_loop import QuantumLoop
+from scruby.query import match_all, match_raw, plan_filter
+
 
 class Update:
     """Methods for updating documents."""
@@ -23,16 +28,23 @@ class Update:
     @final
     @staticmethod
     async def _task_update(
-        filter_fn: Callable,
         branch_number: int,
+        filter_fn: Callable,
         hash_reduce_left: int,
         db_root: str,
         class_model: Any,
-        mode: int,
+        backend: LeafBackend,
         new_data: dict[str, Any],
+        trusted_reads: bool = False,
+        raw_filters: tuple[Callable, ...] = (),
+        indexes: tuple[BaseIndex, ...] = (),
+        candidates: dict[int, list[str]] | None = None,
     ) -> int:
         """Asynchronous task for find documents.
 
+        With `candidates` (keys found by an index), only these documents of the branch are read.
+        Entries of `indexes` are added before the documents are written and deleted after.
+
         This method is for internal use.
 
         Returns:
@@ -49,26 +61,53 @@ class Update:
             ),
         )
         counter: int = 0
-
-        if await leaf_path.exists():
-            async with aiodbm.open(str(leaf_path), flag="c", mode=mode) as leaf_db:
-                keys = await leaf_db.keys()
-
-                for key in keys:
-                    doc_json = await leaf_db.get(key)
-                    doc = class_model.model_validate_json(doc_json)
-                    if filter_fn(doc):
-                        for field_name, value in new_data.items():
-                            doc.__dict__[field_name] = value
-                        await leaf_db.set(key, doc.model_dump_json())
-                        counter += 1
+        # Each branch gets its own copy of the new data
+        new_data = copy.deepcopy(new_data)
+
+        if await backend.leaf_exists(leaf_path):
+            updated_docs: list[tuple[bytes, str | bytes]] = []
+            # Prepared key, old and new JSON-document - for the entries of indexes.
+            changes: list[tuple[str, bytes, str]] = []
+
+            items = await read_items(
+                backend,
+                leaf_path,
+                filter_fn,
+                raw_filters,
+                None if candidates is None else candidates[branch_number],
+            )
+            collection_path = Path(db_root, class_model.__name__)
+            for key, stored_value in items:
+                doc_json = decompress(stored_value, collection_path)
+                # Documents that do not match the filters of raw documents are not loaded
+                if raw_filters and not match_raw(raw_filters, doc_json):
+                    continue
+                doc = load_doc(class_model, doc_json, trusted_reads)
+                if filter_fn is match_all or filter_fn(doc):
+                    for field_name, value in new_data.items():
+                        doc.__dict__[field_name] = value
+                    plain_json = doc.model_dump_json()
+                    updated_docs.append((key, compress(plain_json, class_model.scruby_compression)))
+                    if indexes:
+                        changes.append((key.decode("utf-8"), doc_json, plain_json))
+
+            # Batch write
+            if updated_docs:
+                index_update = IndexUpdate(indexes, changes) if changes else None
+                if index_update is not None:
+                    await index_update.add_new()
+                await backend.set_many(leaf_path, updated_docs)
+                counter += len(updated_docs)
+                if index_update is not None:
+                    await index_update.remove_stale()
         return counter
 
     @final
     async def update_many(
         self,
         new_data: dict[str, Any],
-        filter_fn: Callable = lambda _: True,
+        filter_fn: Callable = match_all,
+        raw_filter: Callable | None = None,
     ) -> int:
         """Asynchronous method for updates one or more documents matching the filter.
 
@@ -79,41 +118,37 @@ class Update:
             - The search effectiveness depends on the number of processor threads.
 
         Args:
-            filter_fn (Callable): A function that execute the conditions of filtering.
+            filter_fn (Callable | Q): A function that execute the conditions of filtering or a query expression.
             new_data (dict[str, Any]): New data for the fields that need to be updated.
+            raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents -
+                                          dictionaries decoded from JSON, before validation of documents.
 
         Returns:
             The number of updated documents.
         """
+        # `Where` and `Q` filters are checked on raw documents
+        filter_fn, raw_filters = plan_filter(filter_fn, raw_filter)
         # Variable initialization
         hash_reduce_left: int = self._hash_reduce_left
         assert hash_reduce_left != 0, "Scruby.run(hash_reduce_left = 0) - Not valid for `update_many` method."
 
-        update_task_fn: Callable = self._task_update
-        branch_numbers: range = range(self._max_number_branch)
-        hash_reduce_left: int = self._hash_reduce_left
-        db_root: str = self._db_root
-        class_model: Any = self._class_model
-        mode = self._mode
-        counter: int = 0
+        candidates = await self._index_candidates(filter_fn, raw_filters)
+        branch_numbers = range(self._max_number_branch) if candidates is None else sorted(candidates)
+        quantum_loop = QuantumLoop(branch_numbers, self._max_workers)
 
         # Run quantum loop
-        with ThreadPoolExecutor(self._max_workers) as executor:
-            futures: list[Future] = [
-                executor.submit(
-                    update_task_fn,
-                    filter_fn,
-                    branch_number,
-                    hash_reduce_left,
-                    db_root,
-                    class_model,
-                    mode,
-                    copy.deepcopy(new_data),
-                )
-                for branch_number in branch_numbers
-            ]
-
-            for future in as_completed(futures):
-                counter += await future.result()
+        results: list[int] = await quantum_loop.gather(
+            self._task_update,
+            filter_fn,
+            hash_reduce_left,
+            self._db_root,
+            self._class_model,
+            self._backend,
+            new_data,
+            self._trusted_reads,
+            raw_filters,
+            self._indexes,
+            candidates,
+        )
 
-        return counter
+        return sum(results)
@@ -6,16 +6,28 @@ __all__ = ("ScrubyModel",)
 
 
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, ClassVar
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from scruby.compression import Compression
+
 
 class ScrubyModel(BaseModel):
     """A base class for creating Scruby models."""
 
     model_config = ConfigDict(strict=True)
 
+    # Compression of documents of the collection.
+    # None = Documents are stored uncompressed (default).
+    scruby_compression: ClassVar[Compression | None] = None
+    # Fields with secondary hash indexes - names, dotted paths for nested fields.
+    # Equality queries on these fields read the documents by keys instead of scanning the collection.
+    scruby_indexes: ClassVar[tuple[str, ...]] = ()
+    # Fields with ordered range indexes - names, dotted paths for nested fields.
+    # Range queries and `find_many` sorted by `Q.field(<field>)` read only the needed slice of documents.
+    scruby_range_indexes: ClassVar[tuple[str, ...]] = ()
+
     created_at: Annotated[
         datetime | None,
         Field(
@@ -0,0 +1,171 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Scanning of branches in worker processes.
+
+Used by `Scruby.run(executor="process")`.
+Validation of documents and filtering are CPU-bound and hold the GIL,
+so the branch range is partitioned across worker processes and
+only the JSON of matching documents is shipped back.
+
+The filter function is passed to the worker process by pickling,
+so it must be a module-level function (or a `functools.partial` of one) -
+lambdas and nested functions cannot be pickled.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "ProcessScan",
+    "match_all",
+)
+
+import pickle  # ruff:ignore[suspicious-pickle-import]
+from collections.abc import Callable, Iterator
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, final
+
+from scruby.compression import decompress
+from scruby.loader import load_doc
+from scruby.query import match_all, match_raw
+
+if TYPE_CHECKING:
+    from scruby.backends import LeafBackend
+
+
+@final
+class ProcessScan:
+    """Synchronous scanning of branches in worker processes."""
+
+    @staticmethod
+    def partition(max_number_branch: int, number_partitions: int) -> list[range]:
+        """Split the branch range into contiguous partitions.
+
+        Args:
+            max_number_branch (int): Maximum number of branches in a collection.
+            number_partitions (int): Desired number of partitions.
+
+        Returns:
+            List of branch ranges.
+        """
+        number_partitions = max(1, min(number_partitions, max_number_branch))
+        size, remainder = divmod(max_number_branch, number_partitions)
+        partitions: list[range] = []
+        start = 0
+        for index in range(number_partitions):
+            stop = start + size + (1 if index < remainder else 0)
+            partitions.append(range(start, stop))
+            start = stop
+        return partitions
+
+    @staticmethod
+    def check_picklable(filter_fn: Callable, name: str = "filter_fn") -> None:
+        """Raise an exception if the filter function cannot be passed to a worker process.
+
+        Args:
+            filter_fn (Callable): A function that execute the conditions of filtering.
+            name (str): Name of parameter - for the error message.
+
+        Returns:
+            None.
+        """
+        try:
+            pickle.dumps(filter_fn)
+        except (pickle.PicklingError, AttributeError, TypeError) as error:
+            msg = (
+                f"Scruby.run(executor = 'process') - The `{name}` must be picklable: "
+                + "use a module-level function or `functools.partial` instead of a lambda."
+            )
+            raise TypeError(msg) from error
+
+    @staticmethod
+    def iter_matches(
+        branch_numbers: range,
+        filter_fn: Callable,
+        hash_reduce_left: int,
+        db_root: str,
+        class_model: Any,
+        backend_cls: type[LeafBackend],
+        trusted_reads: bool = False,
+        raw_filters: tuple[Callable, ...] = (),
+    ) -> Iterator[bytes]:
+        """Iterate over JSON-documents matching the filter in a partition of branches.
+
+        Documents are checked by `raw_filters` before loading.
+
+        This method runs in a worker process.
+        """
+        collection_path = Path(db_root, class_model.__name__)
+        for branch_number in branch_numbers:
+            branch_number_as_hash: str = f"{branch_number:08x}"[hash_reduce_left:]
+            leaf_path = Path(collection_path, *branch_number_as_hash, "leaf.dbm")
+            for _key, value in backend_cls.iter_leaf_sync(leaf_path):
+                doc_json = decompress(value, collection_path)
+                if raw_filters and not match_raw(raw_filters, doc_json):
+                    continue
+                # All documents match - they are not loaded
+                if filter_fn is match_all or filter_fn(load_doc(class_model, doc_json, trusted_reads)):
+                    yield doc_json
+
+    @staticmethod
+    def find(
+        branch_numbers: range,
+        filter_fn: Callable,
+        hash_reduce_left: int,
+        db_root: str,
+        class_model: Any,
+        backend_cls: type[LeafBackend],
+        limit_docs: int | None = None,
+        trusted_reads: bool = False,
+        raw_filters: tuple[Callable, ...] = (),
+    ) -> list[bytes]:
+        """Find documents in a partition of branches.
+
+        This method runs in a worker process.
+
+        Returns:
+            List of JSON-documents matching the filter.
+        """
+        matches = ProcessScan.iter_matches(
+            branch_numbers,
+            filter_fn,
+            hash_reduce_left,
+            db_root,
+            class_model,
+            backend_cls,
+            trusted_reads,
+            raw_filters,
+        )
+        return list(islice(matches, limit_docs))
+
+    @staticmethod
+    def count(
+        branch_numbers: range,
+        filter_fn: Callable,
+        hash_reduce_left: int,
+        db_root: str,
+        class_model: Any,
+        backend_cls: type[LeafBackend],
+        trusted_reads: bool = False,
+        raw_filters: tuple[Callable, ...] = (),
+    ) -> int:
+        """Count documents in a partition of branches.
+
+        This method runs in a worker process.
+
+        Returns:
+            The number of documents matching the filter.
+        """
+        matches = ProcessScan.iter_matches(
+            branch_numbers,
+            filter_fn,
+            hash_reduce_left,
+            db_root,
+            class_model,
+            backend_cls,
+            trusted_reads,
+            raw_filters,
+        )
+        return sum(1 for _ in matches)
@@ -0,0 +1,110 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Concurrent scan engine of the quantum loop.
+
+Each branch of a collection is scanned in its own task of an anyio task group.
+The number of branches read at the same time is bounded by a capacity limiter,
+so the wall-clock time of a scan scales with the number of branches read in parallel.
+"""
+
+from __future__ import annotations
+
+__all__ = ("QuantumLoop",)
+
+import os
+from collections.abc import Awaitable, Callable
+from typing import Any, final
+
+from anyio import CapacityLimiter, Event, create_task_group
+
+
+@final
+class QuantumLoop:
+    """Concurrent scan engine for the branches of a collection.
+
+    Args:
+        branch_numbers (range | list[int]): Numbers of branches to scan.
+        max_workers (int | None): The maximum number of branches read at the same time.
+                                  If None, then `min(32, os.cpu_count() + 4)`.
+    """
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        branch_numbers: range | list[int],
+        max_workers: int | None = None,
+    ) -> None:
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        assert max_workers > 0, "QuantumLoop => The `max_workers` parameter must not be less than one."
+        self.branch_numbers = branch_numbers
+        self.limiter = CapacityLimiter(max_workers)
+        # Tells running tasks to exit and pending tasks not to start.
+        self.stop_event = Event()
+
+    async def run(
+        self,
+        task_fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        accept: Callable[[Any], bool],
+    ) -> None:
+        """Run the task for each branch and pass the results to `accept`.
+
+        The task is called as `task_fn(branch_number, *args)`.
+        If `accept` returns True, the stop event is set and
+        the remaining branches are not scanned.
+
+        Args:
+            task_fn (Callable): Asynchronous task for scanning one branch.
+            args (Any): Additional arguments of the task.
+            accept (Callable): Result handler. Returns True to stop the loop.
+
+        Returns:
+            None.
+        """
+        async with create_task_group() as tg:
+            for branch_number in self.branch_numbers:
+                tg.start_soon(self._run_task, task_fn, branch_number, args, accept)
+
+    async def gather(
+        self,
+        task_fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+    ) -> list[Any]:
+        """Run the task for each branch and collect the results.
+
+        Args:
+            task_fn (Callable): Asynchronous task for scanning one branch.
+            args (Any): Additional arguments of the task.
+
+        Returns:
+            List of results in order of completion.
+        """
+        results: list[Any] = []
+
+        def accept(result: Any) -> bool:
+            results.append(result)
+            return False
+
+        await self.run(task_fn, *args, accept=accept)
+        return results
+
+    async def _run_task(
+        self,
+        task_fn: Callable[..., Awaitable[Any]],
+        branch_number: int,
+        args: tuple[Any, ...],
+        accept: Callable[[Any], bool],
+    ) -> None:
+        """Scan one branch within the capacity limit.
+
+        This method is for internal use.
+        """
+        async with self.limiter:
+            if self.stop_event.is_set():
+                return
+            result = await task_fn(branch_number, *args)
+        # The handler runs on the event loop, so results are accepted one at a time.
+        if not self.stop_event.is_set() and accept(result):
+            self.stop_event.set()
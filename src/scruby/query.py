@@ -0,0 +1,394 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Declarative queries and filters of raw documents.
+
+`Q` expressions are used instead of a filter function:
+
+    await car_coll.find_many((Q.field("year") > 2020) & Q.field("owner.city").in_(["Paris", "Lyon"]))
+
+Unlike lambdas, the expression can be inspected (`Q.op`, `Q.args`, `Q.conjuncts`), pickled
+and pushed down to the storage backend. It is compiled into a predicate over the raw documents -
+dictionaries decoded from the stored JSON, so the documents that do not match are not validated.
+
+Hint: Comparisons must be wrapped in parentheses - the `&` and `|` operators bind tighter than comparisons.
+
+The `raw_filter` parameter of the search methods accepts any function of the raw document:
+
+    await car_coll.count_documents(raw_filter=lambda doc: doc["year"] > 2020)
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "Q",
+    "QField",
+    "match_all",
+    "match_raw",
+    "plan_filter",
+    "pushdown_conditions",
+)
+
+import contextlib
+import operator
+from collections.abc import Callable, Iterable
+from typing import Any, final
+
+import orjson
+
+from scruby.where import _MISSING, _PUSHDOWN_TYPES, Condition, Where, _get_field
+
+# Operators of comparison by name.
+_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda value, values: value in values,
+}
+
+
+def match_all(_doc: Any) -> bool:
+    """Default filter function - matches all documents.
+
+    Unlike `lambda _: True`, it can be pickled.
+    """
+    return True
+
+
+def _compile_getter(path: str) -> Callable[[dict[str, Any]], Any]:
+    """Get the function that gets the value of field from the raw document, `_MISSING` if the field does not exist.
+
+    This function is for internal use.
+    """
+    names = path.split(".")
+    if len(names) == 1:
+        name = names[0]
+        return lambda doc: doc.get(name, _MISSING)
+
+    def get(doc: dict[str, Any]) -> Any:
+        value: Any = doc
+        for name in names:
+            if not isinstance(value, dict):
+                return _MISSING
+            value = value.get(name, _MISSING)
+        return value
+
+    return get
+
+
+def _compile_model_getter(path: str) -> Callable[[Any], Any]:
+    """Get the function that gets the value of field from the model, `_MISSING` if the field does not exist.
+
+    This function is for internal use.
+    """
+    return lambda doc: _get_field(doc, path)
+
+
+@final
+class Q:
+    """Query expression.
+
+    Expressions are built by `Q.field` and combined with `&` (and), `|` (or) and `~` (not).
+
+    Args:
+        op (str): Operator - `==`, `!=`, `<`, `<=`, `>`, `>=`, `in` for conditions of fields,
+                  `and`, `or`, `not` for combinations of expressions.
+        args (tuple[Any, ...]): Path to field and value for conditions, expressions for combinations.
+    """
+
+    __slots__ = ("_model_predicate", "_predicate", "args", "op")
+
+    def __init__(self, op: str, *args: Any) -> None:  # ruff:ignore[undocumented-public-init]
+        self.op = op
+        self.args = args
+        self._predicate: Callable[[dict[str, Any]], bool] | None = None
+        self._model_predicate: Callable[[Any], bool] | None = None
+
+    @staticmethod
+    def field(path: str) -> QField:
+        """Reference to the field of document.
+
+        Args:
+            path (str): Name of field, dotted path for nested fields.
+
+        Returns:
+            Field for building conditions.
+        """
+        return QField(path)
+
+    def __and__(self, other: Q) -> Q:
+        """Both expressions match."""
+        if not isinstance(other, Q):
+            return NotImplemented
+        return Q("and", *self._operands("and"), *other._operands("and"))
+
+    def __or__(self, other: Q) -> Q:
+        """Any of the expressions matches."""
+        if not isinstance(other, Q):
+            return NotImplemented
+        return Q("or", *self._operands("or"), *other._operands("or"))
+
+    def __invert__(self) -> Q:
+        """The expression does not match."""
+        return Q("not", self)
+
+    def __rand__(self, other: Any) -> Q:
+        """Raise an exception for a comparison that is not wrapped in parentheses."""
+        msg = "Q: Wrap comparisons in parentheses - `(Q.field('a') > 1) & (Q.field('b') < 2)`."
+        raise TypeError(msg)
+
+    __ror__ = __rand__
+
+    def __bool__(self) -> bool:
+        """Raise an exception - use `&`, `|` and `~` instead of `and`, `or` and `not`."""
+        msg = "Q: The expression has no truth value - use `&`, `|` and `~` instead of `and`, `or` and `not`."
+        raise TypeError(msg)
+
+    def _operands(self, op: str) -> tuple[Q, ...]:
+        """Flatten the nested combinations of the same operator.
+
+        This method is for internal use.
+        """
+        return self.args if self.op == op else (self,)
+
+    def conjuncts(self) -> tuple[Q, ...]:
+        """Get the expressions combined with AND at the top level.
+
+        Returns:
+            Expressions - all of them must match.
+        """
+        return self._operands("and")
+
+    def walk(self) -> Iterable[Q]:
+        """Iterate over the expression and all nested expressions.
+
+        Returns:
+            Expressions, depth-first.
+        """
+        yield self
+        if self.op in ("and", "or", "not"):
+            for arg in self.args:
+                yield from arg.walk()
+
+    @property
+    def raw_safe(self) -> bool:
+        """True if the values of conditions are JSON types, so the expression can be checked on raw documents."""
+        for node in self.walk():
+            if node.op == "in":
+                if not all(isinstance(value, _PUSHDOWN_TYPES) for value in node.args[1]):
+                    return False
+            elif node.op not in ("and", "or", "not") and not isinstance(node.args[1], _PUSHDOWN_TYPES):
+                return False
+        return True
+
+    def compile(self) -> Callable[[dict[str, Any]], bool]:
+        """Compile the expression into a predicate over raw documents.
+
+        Returns:
+            Predicate - dictionary decoded from JSON in, True if it matches out.
+        """
+        if self._predicate is None:
+            self._predicate = self._compile(_compile_getter)
+        return self._predicate
+
+    def _compile(self, compile_getter: Callable[[str], Callable[[Any], Any]]) -> Callable[[Any], bool]:
+        """Compile the expression with getters of fields.
+
+        This method is for internal use.
+        """
+        op = self.op
+        if op in ("and", "or"):
+            predicates = tuple(arg._compile(compile_getter) for arg in self.args)
+            if op == "and":
+                return lambda doc: all(predicate(doc) for predicate in predicates)
+            return lambda doc: any(predicate(doc) for predicate in predicates)
+
+        if op == "not":
+            predicate = self.args[0]._compile(compile_getter)
+            return lambda doc: not predicate(doc)
+
+        path, target = self.args
+        get = compile_getter(path)
+        compare = _OPERATORS[op]
+        if op == "in":
+            # Unhashable values are searched in the tuple.
+            with contextlib.suppress(TypeError):
+                target = frozenset(target)
+
+        def match(doc: Any) -> bool:
+            value = get(doc)
+            if value is _MISSING:
+                return False
+            try:
+                return compare(value, target)
+            except TypeError:
+                # Values of different types are not ordered.
+                return False
+
+        return match
+
+    def __call__(self, doc: Any) -> bool:
+        """Return True when the document matches - a model or a raw document."""
+        if type(doc) is dict:
+            return (self._predicate or self.compile())(doc)
+        if self._model_predicate is None:
+            self._model_predicate = self._compile(_compile_model_getter)
+        return self._model_predicate(doc)
+
+    def __getstate__(self) -> tuple[str, tuple[Any, ...]]:
+        """State for pickling - the compiled predicate is not pickled."""
+        return (self.op, self.args)
+
+    def __setstate__(self, state: tuple[str, tuple[Any, ...]]) -> None:
+        """Restore from pickling."""
+        self.op, self.args = state
+        self._predicate = None
+        self._model_predicate = None
+
+    def __eq__(self, other: object) -> bool:
+        """Expressions are equal if they have the same structure."""
+        if not isinstance(other, Q):
+            return NotImplemented
+        return self.op == other.op and self.args == other.args
+
+    def __hash__(self) -> int:
+        """Hash of the structure."""
+        return hash((self.op, repr(self.args)))
+
+    def __repr__(self) -> str:
+        """Representation of the expression."""
+        if self.op in ("and", "or"):
+            separator = " & " if self.op == "and" else " | "
+            return f"({separator.join(repr(arg) for arg in self.args)})"
+        if self.op == "not":
+            return f"~{self.args[0]!r}"
+        path, value = self.args
+        if self.op == "in":
+            return f"Q.field({path!r}).in_({list(value)!r})"
+        return f"(Q.field({path!r}) {self.op} {value!r})"
+
+
+@final
+class QField:
+    """Reference to the field of document, for building conditions of `Q`.
+
+    Args:
+        path (str): Name of field, dotted path for nested fields.
+    """
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str) -> None:  # ruff:ignore[undocumented-public-init]
+        self.path = path
+
+    def __eq__(self, value: object) -> Q:  # type: ignore[override]
+        """The field is equal to the value."""
+        return Q("==", self.path, value)
+
+    def __ne__(self, value: object) -> Q:  # type: ignore[override]
+        """The field is not equal to the value."""
+        return Q("!=", self.path, value)
+
+    def __lt__(self, value: Any) -> Q:
+        """The field is less than the value."""
+        return Q("<", self.path, value)
+
+    def __le__(self, value: Any) -> Q:
+        """The field is less than or equal to the value."""
+        return Q("<=", self.path, value)
+
+    def __gt__(self, value: Any) -> Q:
+        """The field is greater than the value."""
+        return Q(">", self.path, value)
+
+    def __ge__(self, value: Any) -> Q:
+        """The field is greater than or equal to the value."""
+        return Q(">=", self.path, value)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __call__(self, doc: Any) -> Any:
+        """Get the value of field from the document - for `sort_fn=Q.field(<field>)`."""
+        return _get_field(doc, self.path)
+
+    def in_(self, values: Iterable[Any]) -> Q:
+        """The field is equal to any of the values.
+
+        Args:
+            values (Iterable[Any]): Values.
+
+        Returns:
+            Condition.
+        """
+        return Q("in", self.path, tuple(values))
+
+    def __repr__(self) -> str:
+        """Representation of the field."""
+        return f"Q.field({self.path!r})"
+
+
+def pushdown_conditions(*filters: Callable) -> tuple[Condition, ...]:
+    """Get the conditions of filters, that can be evaluated by the storage backend.
+
+    Conditions are taken from `Where` filters and the top-level AND of `Q` expressions.
+
+    Args:
+        filters (Callable): Filter functions - of models or of raw documents.
+
+    Returns:
+        Conditions combined with AND. Empty for filter functions.
+    """
+    conditions: list[Condition] = []
+    for filter_fn in filters:
+        if isinstance(filter_fn, Where):
+            conditions.extend(
+                condition for condition in filter_fn.conditions if isinstance(condition[2], _PUSHDOWN_TYPES)
+            )
+        elif isinstance(filter_fn, Q):
+            for node in filter_fn.conjuncts():
+                if node.op == "in":
+                    if all(isinstance(value, _PUSHDOWN_TYPES) for value in node.args[1]):
+                        conditions.append((node.args[0], "in", node.args[1]))
+                elif node.op in _OPERATORS and isinstance(node.args[1], _PUSHDOWN_TYPES):
+                    conditions.append((node.args[0], node.op, node.args[1]))
+    return tuple(conditions)
+
+
+def plan_filter(filter_fn: Callable, raw_filter: Callable | None = None) -> tuple[Callable, tuple[Callable, ...]]:
+    """Split the filters into the filter of models and the filters of raw documents.
+
+    `Where` and `Q` filters with values of JSON types are checked on raw documents,
+    so only the documents that match are validated.
+
+    Args:
+        filter_fn (Callable): A function that execute the conditions of filtering.
+        raw_filter (Callable | None): A function that execute the conditions of filtering on raw documents.
+
+    Returns:
+        Filter of models and filters of raw documents.
+    """
+    raw_filters: tuple[Callable, ...] = () if raw_filter is None else (raw_filter,)
+    if isinstance(filter_fn, Q) and filter_fn.raw_safe:
+        filter_fn.compile()
+        return (match_all, (filter_fn, *raw_filters))
+    if isinstance(filter_fn, Where) and pushdown_conditions(filter_fn) == filter_fn.conditions:
+        return (match_all, (filter_fn, *raw_filters))
+    return (filter_fn, raw_filters)
+
+
+def match_raw(raw_filters: tuple[Callable, ...], doc_json: bytes | str) -> bool:
+    """Check the raw document by the filters.
+
+    Args:
+        raw_filters (tuple[Callable, ...]): Filters of raw documents.
+        doc_json (bytes | str): JSON-document.
+
+    Returns:
+        True if the document matches all filters.
+    """
+    doc = orjson.loads(doc_json)
+    return all(raw_filter(doc) for raw_filter in raw_filters)
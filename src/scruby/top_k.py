@@ -0,0 +1,87 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Top-k merge of the sorted pages of `find_many`.
+
+Branches are searched concurrently and complete in any order, so the sorted page
+is merged from the documents of all branches. Only the best `page_number * limit_docs`
+documents are kept - memory is bounded by the window of page, not by the size of collection.
+"""
+
+from __future__ import annotations
+
+__all__ = ("TopK",)
+
+import heapq
+from collections.abc import Callable
+from typing import Any, final
+
+from scruby.key_ref import prepare_key
+
+
+@final
+class TopK:
+    """Window of the best documents by the sort key.
+
+    Documents with equal sort keys are ordered by the prepared key, as in the range indexes,
+    so the pages are stable.
+
+    Args:
+        size (int): Number of documents in the window - `page_number * limit_docs`.
+        sort_fn (Callable): Sort key of document.
+        reverse (bool): Descending order.
+        pairs (bool): The items are pairs of document and its stored JSON.
+    """
+
+    __slots__ = ("docs", "key", "reverse", "size")
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        size: int,
+        sort_fn: Callable[[Any], Any],
+        reverse: bool,
+        pairs: bool = False,
+    ) -> None:
+        self.size = size
+        self.reverse = reverse
+        self.key: Callable[[Any], tuple[Any, str]] = (
+            (lambda pair: (sort_fn(pair[0]), prepare_key(pair[0].key)))
+            if pairs
+            else (lambda doc: (sort_fn(doc), prepare_key(doc.key)))
+        )
+        self.docs: list[Any] = []
+
+    def _best(self, docs: list[Any]) -> list[Any]:
+        """Select the best documents, at most `size`.
+
+        This method is for internal use.
+        """
+        select = heapq.nlargest if self.reverse else heapq.nsmallest
+        return select(self.size, docs, key=self.key)
+
+    def push(self, docs: list[Any]) -> None:
+        """Merge the documents of a branch into the window.
+
+        Args:
+            docs (list[Any]): Documents found in the branch.
+
+        Returns:
+            None.
+        """
+        # The branch gives only its locally best documents.
+        self.docs.extend(self._best(docs) if len(docs) > self.size else docs)
+        # The window is trimmed in batches - amortized O(n log k).
+        if len(self.docs) > 2 * self.size:
+            self.docs = self._best(self.docs)
+
+    def page(self, skip: int) -> list[Any]:
+        """Get the sorted page.
+
+        Args:
+            skip (int): Number of documents before the page.
+
+        Returns:
+            Documents of page in order.
+        """
+        return sorted(self.docs, key=self.key, reverse=self.reverse)[skip : self.size]
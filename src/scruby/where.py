@@ -0,0 +1,85 @@
+# Scruby - Asynchronous library for building and managing a hybrid database, by scheme of key-value.
+# Copyright (c) 2025 Gennady Kostyunin
+# SPDX-License-Identifier: MIT
+# SPDX-License-Identifier: GPL-3.0-or-later
+"""Filter by equality of fields, that can be pushed down to the storage backend.
+
+`Where` is used instead of a filter function:
+
+    await car_coll.find_many(Where(brand="Mazda", year=2025))
+    await car_coll.count_documents(Where({"owner.city": "Paris"}))
+
+Backends that can evaluate the conditions (for example "sqlite")
+skip documents that do not match without deserialising them,
+other backends filter the documents like with a filter function.
+The matching documents are always checked again in Python, so the results do not depend on the backend.
+"""
+
+from __future__ import annotations
+
+__all__ = (
+    "Condition",
+    "Where",
+)
+
+from typing import Any, final
+
+# Path to field (dotted for nested fields), operator and value.
+type Condition = tuple[str, str, Any]
+
+# Values that can be compared with the JSON values of the storage.
+_PUSHDOWN_TYPES = (str, int, float, bool, type(None))
+_MISSING = object()
+
+
+def _get_field(doc: Any, path: str) -> Any:
+    """Get the value of field by dotted path, `_MISSING` if the field does not exist.
+
+    This function is for internal use.
+    """
+    value = doc
+    for name in path.split("."):
+        value = value.get(name, _MISSING) if isinstance(value, dict) else getattr(value, name, _MISSING)
+        if value is _MISSING:
+            break
+    return value
+
+
+@final
+class Where:
+    """Filter by equality of fields.
+
+    The filter can be pickled, so it is also suitable for `Scruby.run(executor="process")`.
+
+    Args:
+        fields (dict[str, Any] | None): Paths to fields and values - dotted paths for nested fields.
+        kwargs (Any): Names of fields and values.
+    """
+
+    __slots__ = ("conditions",)
+
+    def __init__(  # ruff:ignore[undocumented-public-init]
+        self,
+        fields: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.conditions: tuple[Condition, ...] = tuple(
+            (path, "==", value) for path, value in {**(fields or {}), **kwargs}.items()
+        )
+
+    def __call__(self, doc: Any) -> bool:
+        """Return True when the document matches all conditions."""
+        return all(_get_field(doc, path) == value for path, _, value in self.conditions)
+
+    def __getstate__(self) -> tuple[Condition, ...]:
+        """State for pickling."""
+        return self.conditions
+
+    def __setstate__(self, state: tuple[Condition, ...]) -> None:
+        """Restore from pickling."""
+        self.conditions = state
+
+    def __repr__(self) -> str:
+        """Representation of the filter."""
+        fields = ", ".join(f"{path!r}: {value!r}" for path, _, value in self.conditions)
+        return f"Where({{{fields}}})"
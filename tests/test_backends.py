@@ -0,0 +1,138 @@
+"""Testing the leaf-storage backends."""
+
+from __future__ import annotations
+
+from typing import Annotated, Any, ClassVar
+
+import pytest
+from pydantic import Field
+
+from scruby import Scruby, ScrubyConfig, ScrubyModel
+from scruby.backends import DbmBackend, LeafBackend
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    year: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+class DictBackend(LeafBackend):
+    """Backend that implements only primitive operations."""
+
+    name: ClassVar[str] = "test-dict"
+
+    def __init__(self, collection_path: str, config: Any) -> None:  # ruff:ignore[undocumented-public-init]
+        super().__init__(collection_path, config)
+        self.leaves: dict[str, dict[bytes, bytes]] = {}
+
+    async def leaf_exists(self, leaf_path: Any) -> bool:
+        """Return True when the leaf exists."""
+        return str(leaf_path) in self.leaves
+
+    async def get(self, leaf_path: Any, key: str | bytes) -> bytes | None:
+        """Get the value of key."""
+        key = key.encode("utf-8") if isinstance(key, str) else key
+        return self.leaves.get(str(leaf_path), {}).get(key)
+
+    async def set(self, leaf_path: Any, key: str | bytes, value: str | bytes) -> None:
+        """Set key to hold the value."""
+        key = key.encode("utf-8") if isinstance(key, str) else key
+        value = value.encode("utf-8") if isinstance(value, str) else value
+        self.leaves.setdefault(str(leaf_path), {})[key] = value
+
+    async def delete(self, leaf_path: Any, key: str | bytes) -> bool:
+        """Delete the key."""
+        key = key.encode("utf-8") if isinstance(key, str) else key
+        return self.leaves.get(str(leaf_path), {}).pop(key, None) is not None
+
+    async def keys(self, leaf_path: Any) -> list[bytes]:
+        """Return existing keys of the leaf."""
+        return list(self.leaves.get(str(leaf_path), {}))
+
+    async def close(self) -> None:
+        """Nothing to close."""
+
+    def close_sync(self) -> None:
+        """Nothing to close."""
+
+
+def test_resolve() -> None:
+    """Backends are selected by name or class."""
+    assert ScrubyConfig.backend is DbmBackend
+    assert LeafBackend.resolve("dbm") is DbmBackend
+    assert LeafBackend.resolve("test-dict") is DictBackend
+    assert LeafBackend.resolve(DictBackend) is DictBackend
+    with pytest.raises(ValueError, match="Valid values"):
+        LeafBackend.resolve("unknown")
+    with pytest.raises(TypeError):
+        LeafBackend.resolve(dict)  # pyrefly: ignore[bad-argument-type]
+
+
+@pytest.mark.asyncio
+async def test_default_implementations() -> None:
+    """The collection works with a backend that implements only primitive operations."""
+    # Activate database.
+    Scruby.run(backend="test-dict")
+
+    car_coll = Scruby(Car)
+    assert isinstance(car_coll._backend, DictBackend)
+
+    cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2020 + num) for num in range(10)]
+    assert await car_coll.add_many(cars) == [True] * 10
+    await car_coll.add_doc(Car(brand="Toyota", model="Camry", year=2024))
+    assert await car_coll.has_key("Toyota:Camry")
+    assert await car_coll.count_documents(lambda doc: doc.brand == "Mazda") == 10
+    assert len(await car_coll.find_many(lambda doc: doc.year >= 2025)) == 5
+    assert await car_coll.update_many({"year": 2000}, lambda doc: doc.brand == "Toyota") == 1
+    assert (await car_coll.get_doc("Toyota:Camry")).year == 2000
+    assert await car_coll.delete_many(lambda doc: doc.year < 2025) == 6
+    assert await car_coll.recount() == 5
+    docs = await car_coll.get_many(["Mazda:EZ-9", "Mazda:EZ-0"])
+    assert docs[0].model == "EZ-9"
+    assert docs[1] is None
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+def test_process_executor_is_not_supported() -> None:
+    """Backends without on-disk iteration do not support worker processes."""
+    with pytest.raises(AssertionError, match="Not supported"):
+        Scruby.run(backend=DictBackend, executor="process")
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+async def test_replaced_backend_is_closed() -> None:
+    """The backend of collection replaced by a backend of another type is closed."""
+    # Activate database.
+    Scruby.run()
+
+    car_coll = Scruby(Car)
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6", year=2025))
+    backend = car_coll._backend
+    assert isinstance(backend, DbmBackend)
+    assert backend.leaf_pool._handles
+    replacement = DictBackend.of_collection(backend.collection_path, ScrubyConfig)
+    assert DictBackend.of_collection(backend.collection_path, ScrubyConfig) is replacement
+    assert not backend.leaf_pool._handles
+    #
+    # Delete DB.
+    Scruby.napalm()
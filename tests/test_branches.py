@@ -0,0 +1,77 @@
+"""Testing the registry of branch directories."""
+
+from __future__ import annotations
+
+from typing import Annotated, Any
+from unittest.mock import patch
+
+import pytest
+from anyio import Path
+from pydantic import Field
+
+from scruby import Scruby, ScrubyModel
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+@pytest.mark.parametrize(("hash_reduce_left", "number_branches"), [(7, 16), (6, 256)])
+async def test_branches_are_created(hash_reduce_left: Any, number_branches: int) -> None:
+    """All branches are created at activation and not checked on key operations."""
+    # Activate database.
+    Scruby.run(hash_reduce_left=hash_reduce_left)
+
+    car_coll = Scruby(Car)
+    assert len(car_coll._known_branches) == number_branches
+    for branch_path in car_coll._known_branches:
+        assert await Path(branch_path).is_dir()
+
+    orig_exists = Path.exists
+    calls: int = 0
+
+    async def exists(self: Path) -> bool:
+        nonlocal calls
+        calls += 1
+        return await orig_exists(self)
+
+    with patch.object(Path, "exists", exists):
+        for num in range(20):
+            await car_coll._get_leaf_path(f"Mazda:EZ-6 {num}")
+    assert calls == 0
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_clear_collection() -> None:
+    """Branches are created again after clearing the collection."""
+    # Activate database.
+    Scruby.run()
+
+    car_coll = Scruby(Car)
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6"))
+    Scruby.clear_collection("Car")
+    assert len(car_coll._known_branches) == 16
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6"))
+    assert await car_coll.has_key("Mazda:EZ-6")
+    #
+    # Delete DB.
+    Scruby.napalm()
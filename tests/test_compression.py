@@ -0,0 +1,210 @@
+"""Testing the compression of documents."""
+
+from __future__ import annotations
+
+from typing import Annotated, ClassVar
+
+import anyio
+import pytest
+from pydantic import Field
+
+from scruby import Compression, Scruby, ScrubyModel, Where
+from scruby.compression import decompress
+from scruby.process_scan import ProcessScan, match_all
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+DESCRIPTION = "A compact crossover with a turbocharged engine and all-wheel drive. " * 4
+
+
+def make_samples() -> list[str]:
+    """Sample documents for the preset dictionary."""
+    return [
+        Car(brand="Mazda", model=f"Sample-{num}", year=2000 + num, description=DESCRIPTION).model_dump_json()
+        for num in range(20)
+    ]
+
+
+class Car(ScrubyModel):
+    """Car model - zlib."""
+
+    scruby_compression: ClassVar[Compression | None] = Compression("zlib", min_size=200)
+
+    brand: str
+    model: str
+    year: int
+    description: str = ""
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+class Truck(ScrubyModel):
+    """Truck model - lzma."""
+
+    scruby_compression: ClassVar[Compression | None] = Compression("lzma", min_size=128)
+
+    brand: str
+    model: str
+    description: str = ""
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+class Bus(ScrubyModel):
+    """Bus model - zlib with a preset dictionary."""
+
+    scruby_compression: ClassVar[Compression | None] = None
+
+    brand: str
+    model: str
+    year: int
+    description: str = ""
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+async def test_compression() -> None:
+    """Documents are compressed on writes and decompressed on reads."""
+    # Activate database.
+    Scruby.run()
+
+    car_coll = Scruby(Car)
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6", year=2025, description=DESCRIPTION))
+    # Short documents are stored uncompressed.
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-3", year=2024))
+    await car_coll.add_many(
+        [Car(brand="Toyota", model=f"C-{num}", year=2020, description=DESCRIPTION) for num in range(5)]
+    )
+
+    leaf_path, prepared_key = await car_coll._get_leaf_path("Mazda:EZ-6")
+    value = await car_coll._backend.get(leaf_path, prepared_key)
+    assert value[:1] == b"\x01"
+    assert len(value) < len(DESCRIPTION)
+    leaf_path, prepared_key = await car_coll._get_leaf_path("Mazda:EZ-3")
+    assert (await car_coll._backend.get(leaf_path, prepared_key))[:1] == b"{"
+
+    assert (await car_coll.get_doc("Mazda:EZ-6")).description == DESCRIPTION
+    docs = await car_coll.get_many(["Mazda:EZ-6", "Mazda:EZ-3", "Lada:Niva"])
+    assert [doc.model if doc is not None else None for doc in docs] == ["EZ-6", "EZ-3", None]
+    assert await car_coll.count_documents(lambda doc: doc.brand == "Toyota") == 5
+    assert len(await car_coll.find_many(Where(brand="Mazda"))) == 2
+    assert await car_coll.update_many({"year": 1999}, lambda doc: doc.brand == "Toyota") == 5
+    doc = await car_coll.get_doc("Toyota:C-1")
+    assert doc.year == 1999
+    assert doc.description == DESCRIPTION
+    doc.year = 2001
+    await car_coll.update_doc(doc)
+    assert (await car_coll.get_doc("Toyota:C-1")).year == 2001
+    assert await car_coll.delete_many(lambda doc: doc.year == 1999) == 4
+
+    # Worker processes decompress documents.
+    docs_json = ProcessScan.find(range(16), match_all, 7, "ScrubyDB", Car, type(car_coll._backend))
+    assert len(docs_json) == 3
+    assert all(doc_json[:1] == b"{" for doc_json in docs_json)
+
+    # Documents are readable without compression.
+    Car.scruby_compression = None
+    try:
+        assert (await car_coll.get_doc("Mazda:EZ-6")).description == DESCRIPTION
+    finally:
+        Car.scruby_compression = Compression("zlib", min_size=200)
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_lzma() -> None:
+    """The lzma algorithm."""
+    # Activate database.
+    Scruby.run()
+
+    truck_coll = Scruby(Truck)
+    await truck_coll.add_doc(Truck(brand="Volvo", model="FH16", description=DESCRIPTION))
+    leaf_path, prepared_key = await truck_coll._get_leaf_path("Volvo:FH16")
+    assert (await truck_coll._backend.get(leaf_path, prepared_key))[:1] == b"\x02"
+    assert (await truck_coll.get_doc("Volvo:FH16")).description == DESCRIPTION
+    assert await truck_coll.count_documents(lambda doc: doc.brand == "Volvo") == 1
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_zdict() -> None:
+    """The preset dictionary is saved and makes short documents smaller."""
+    zdict = Compression.train_zdict(make_samples())
+    assert b'"description":' in zdict
+    plain = Compression("zlib", min_size=0)
+    with_zdict = Compression("zlib", min_size=0, zdict=zdict)
+    doc_json = Car(brand="Mazda", model="EZ-6", year=2025, description=DESCRIPTION).model_dump_json()
+    assert len(with_zdict.compress(doc_json)) < len(plain.compress(doc_json))
+
+    Bus.scruby_compression = with_zdict
+    try:
+        # Activate database.
+        Scruby.run()
+
+        bus_coll = Scruby(Bus)
+        await bus_coll.add_doc(Bus(brand="MAN", model="Lion", year=2025, description=DESCRIPTION))
+        zdict_path = anyio.Path(f"ScrubyDB/Bus/meta/zdict-{with_zdict.zdict_id:08x}")
+        assert await zdict_path.read_bytes() == zdict
+        leaf_path, prepared_key = await bus_coll._get_leaf_path("MAN:Lion")
+        value = await bus_coll._backend.get(leaf_path, prepared_key)
+        assert value[:1] == b"\x03"
+        # The dictionary is loaded from the collection.
+        assert decompress(value, "ScrubyDB/Bus") == (await bus_coll.get_doc("MAN:Lion")).model_dump_json().encode()
+
+        # A new dictionary - documents compressed with the previous one remain readable.
+        Bus.scruby_compression = Compression("zlib", min_size=0, zdict=zdict[:1024])
+        Scruby.run()
+        bus_coll = Scruby(Bus)
+        await bus_coll.add_doc(Bus(brand="MAN", model="City", year=2024, description=DESCRIPTION))
+        assert await bus_coll.count_documents(lambda doc: doc.brand == "MAN") == 2
+
+        # The dictionary is saved again after clearing the collection.
+        Scruby.clear_collection("Bus")
+        zdict_path = anyio.Path(f"ScrubyDB/Bus/meta/zdict-{Bus.scruby_compression.zdict_id:08x}")
+        assert await zdict_path.exists()
+    finally:
+        Bus.scruby_compression = None
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_sqlite_pushdown() -> None:
+    """Compressed documents are checked in Python, not by SQLite."""
+    # Activate database.
+    Scruby.run(backend="sqlite")
+
+    car_coll = Scruby(Car)
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6", year=2025, description=DESCRIPTION))
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-3", year=2024))
+    await car_coll.add_doc(Car(brand="Toyota", model="Camry", year=2024, description=DESCRIPTION))
+    assert await car_coll.count_documents(Where(brand="Mazda")) == 2
+    assert await car_coll.count_documents(Where(year=2024)) == 2
+    assert await car_coll.count_documents(Where(brand="Lada")) == 0
+    #
+    # Delete DB.
+    Scruby.napalm()
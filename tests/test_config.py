@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+import pytest
+
 from scruby import Scruby, ScrubyConfig
+from scruby.backends import DbmBackend
 from scruby.utils import Utils
 
 # Delete DB.
@@ -33,6 +36,46 @@ class TestConfigParams:
         """Test a max_workers parameter."""
         assert ScrubyConfig.max_workers is None
 
+    def test_executor(self) -> None:
+        """Test a executor parameter."""
+        assert ScrubyConfig.executor == "thread"
+
+    def test_max_open_leaves(self) -> None:
+        """Test a max_open_leaves parameter."""
+        assert ScrubyConfig.max_open_leaves == 256
+
+    def test_leaf_idle_timeout(self) -> None:
+        """Test a leaf_idle_timeout parameter."""
+        assert ScrubyConfig.leaf_idle_timeout == pytest.approx(60.0)
+
+    def test_counter_flush_interval(self) -> None:
+        """Test a counter_flush_interval parameter."""
+        assert ScrubyConfig.counter_flush_interval == pytest.approx(1.0)
+
+    def test_backend(self) -> None:
+        """Test a backend parameter."""
+        assert ScrubyConfig.backend is DbmBackend
+
+    def test_dbm_flavor(self) -> None:
+        """Test a dbm_flavor parameter."""
+        assert ScrubyConfig.dbm_flavor is None
+
+    def test_dbm_tuning(self) -> None:
+        """Test a dbm_tuning parameter."""
+        assert ScrubyConfig.dbm_tuning is None
+
+    def test_memory_snapshot(self) -> None:
+        """Test a memory_snapshot parameter."""
+        assert ScrubyConfig.memory_snapshot is False
+
+    def test_log_compaction_threshold(self) -> None:
+        """Test a log_compaction_threshold parameter."""
+        assert ScrubyConfig.log_compaction_threshold == pytest.approx(0.5)
+
+    def test_trusted_reads(self) -> None:
+        """Test a trusted_reads parameter."""
+        assert ScrubyConfig.trusted_reads is False
+
     def test_plugins(self) -> None:
         """Test a plugins parameter."""
         assert ScrubyConfig.plugins is None
@@ -148,3 +191,34 @@ class TestConfigMethods:
         #
         # Delete DB.
         Scruby.napalm()
+
+    def test_check_dbm_flavor(self) -> None:
+        """Test a check_dbm_flavor method."""
+        ScrubyConfig.dbm_flavor = "dumb"
+        ScrubyConfig.check_dbm_flavor()
+        delimiter: str = "/" if ScrubyConfig.sys_platform != "win32" else ""
+        dbm_flavor = Utils.get_from_env(
+            key="dbm_flavor",
+            dotenv_path=f"{ScrubyConfig.db_root}{delimiter}.env.meta",
+        )
+        assert dbm_flavor == "dumb"
+        # None = the recorded value.
+        ScrubyConfig.dbm_flavor = None
+        ScrubyConfig.check_dbm_flavor()
+        assert ScrubyConfig.dbm_flavor == "dumb"
+        # mismatch
+        ScrubyConfig.dbm_flavor = "sqlite3"
+        with pytest.raises(ValueError, match=r"is not equal to the primary value 'dumb'"):
+            ScrubyConfig.check_dbm_flavor()
+        #
+        # Delete DB.
+        Scruby.napalm()
+        #
+        # Unsupported tuning options.
+        ScrubyConfig.dbm_flavor = "dumb"
+        ScrubyConfig.dbm_tuning = {"sync": True}
+        with pytest.raises(ValueError, match=r"The `sync` tuning option is not supported"):
+            ScrubyConfig.check_dbm_flavor()
+        #
+        # Delete DB.
+        Scruby.napalm()
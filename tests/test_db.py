@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import json
 from datetime import datetime
 from typing import Annotated
 from zoneinfo import ZoneInfo
 
+import anyio.lowlevel
 import pytest
 from anyio import Path
 from pydantic import EmailStr, Field
@@ -309,6 +311,25 @@ class TestNegative:
         # Delete DB.
         Scruby.napalm()
 
+    async def test_add_many_value_does_not_match_collection(self) -> None:
+        """Testing a add_many method with a document of another collection."""
+        # Delete DB.
+        Scruby.napalm()
+
+        # Activate database.
+        Scruby.run()
+
+        user_coll = Scruby(User)
+
+        user = User3(username="John")
+
+        with pytest.raises(TypeError):
+            await user_coll.add_many([user])
+        assert await user_coll.estimated_document_count() == 0
+        #
+        # Delete DB.
+        Scruby.napalm()
+
 
 class TestPositive:
     """Positive tests."""
@@ -436,6 +457,115 @@ class TestPositive:
         # Delete DB.
         Scruby.napalm()
 
+    async def test_add_many(self) -> None:
+        """Testing a add_many method."""
+        # Delete DB.
+        Scruby.napalm()
+
+        # Activate database.
+        Scruby.run()
+
+        user_coll = Scruby(User)
+
+        users = [
+            User(
+                first_name="John",
+                last_name="Smith",
+                birthday=datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC")),
+                email="John_Smith@gmail.com",
+                phone=f"+44798612345{num}",
+            )
+            for num in range(10)
+        ]
+
+        assert await user_coll.add_doc(users[3]) is None
+        assert await user_coll.estimated_document_count() == 1
+        # Duplicate key inside the batch.
+        users.append(users[5])
+
+        results = await user_coll.add_many(users)
+        assert results == [True, True, True, False, True, True, True, True, True, True, False]
+        assert await user_coll.estimated_document_count() == 10
+        assert await user_coll.count_documents(lambda doc: doc.last_name == "Smith") == 10
+        doc = await user_coll.get_doc("+447986123459")
+        assert doc is not None
+        assert doc.created_at is not None
+        #
+        # Delete DB.
+        Scruby.napalm()
+
+    async def test_add_many_ordered(self) -> None:
+        """Testing a add_many method in ordered mode."""
+        # Delete DB.
+        Scruby.napalm()
+
+        # Activate database.
+        Scruby.run()
+
+        user_coll = Scruby(User)
+
+        users = [
+            User(
+                first_name="John",
+                last_name="Smith",
+                birthday=datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC")),
+                email="John_Smith@gmail.com",
+                phone=f"+44798612345{num}",
+            )
+            for num in range(10)
+        ]
+
+        await user_coll.add_doc(users[4])
+
+        results = await user_coll.add_many(users, ordered=True)
+        assert results == [True, True, True, True] + [False] * 6
+        assert await user_coll.estimated_document_count() == 5
+        assert await user_coll.has_key("+447986123453")
+        assert not await user_coll.has_key("+447986123455")
+        #
+        # Delete DB.
+        Scruby.napalm()
+
+    async def test_add_many_ordered_race(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Documents after a key added by another writer during `add_many` are not kept."""
+        # Delete DB.
+        Scruby.napalm()
+
+        # Activate database.
+        Scruby.run()
+
+        user_coll = Scruby(User)
+
+        users = [
+            User(
+                first_name="John",
+                last_name="Smith",
+                birthday=datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC")),
+                email="John_Smith@gmail.com",
+                phone=f"+44798612345{num}",
+            )
+            for num in range(10)
+        ]
+
+        await user_coll.add_doc(users[4])
+
+        # The key is added by another writer after the check.
+        async def exists_many(_leaf_path: object, keys: list[str]) -> list[bool]:
+            await anyio.lowlevel.checkpoint()
+            return [False] * len(keys)
+
+        monkeypatch.setattr(user_coll._backend, "exists_many", exists_many)
+
+        results = await user_coll.add_many(users, ordered=True)
+        assert results == [True, True, True, True] + [False] * 6
+        assert await user_coll.estimated_document_count() == 5
+        assert await user_coll.has_key("+447986123453")
+        assert not await user_coll.has_key("+447986123455")
+        assert await user_coll.recount() == 5
+        #
+        # Delete DB.
+        Scruby.napalm()
+
     async def test_update_doc(self) -> None:
         """Testing a update_doc method."""
         # Delete DB.
@@ -492,6 +622,102 @@ class TestPositive:
         # Delete DB.
         Scruby.napalm()
 
+    async def test_get_many(self) -> None:
+        """Testing a get_many method."""
+        # Delete DB.
+        Scruby.napalm()
+
+        # Activate database.
+        Scruby.run()
+
+        user_coll = Scruby(User)
+
+        users = [
+            User(
+                first_name="John",
+                last_name="Smith",
+                birthday=datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC")),
+                email="John_Smith@gmail.com",
+                phone=f"+44798612345{num}",
+            )
+            for num in range(10)
+        ]
+        await user_coll.add_many(users)
+
+        keys = ["+447986123457", "key missing", "+447986123450", "+447986123457"]
+        docs = await user_coll.get_many(keys)
+        assert [doc.key if doc is not None else None for doc in docs] == [
+            "+447986123457",
+            None,
+            "+447986123450",
+            "+447986123457",
+        ]
+        assert docs[2].model_dump() == users[0].model_dump()
+
+        docs_dict = await user_coll.get_many(
+            keys,
+            include_fields={"phone"},
+            return_type=ReturnType.DICT,
+        )
+        assert docs_dict == [{"phone": "+447986123457"}, None, {"phone": "+447986123450"}, {"phone": "+447986123457"}]
+
+        docs_json = await user_coll.get_many(
+            keys[:2],
+            include_fields={"phone"},
+            return_type=ReturnType.JSON,
+        )
+        assert docs_json == '[{"phone":"+447986123457"},null]'
+
+        assert await user_coll.get_many([]) == []
+        #
+        # Delete DB.
+        Scruby.napalm()
+
+    async def test_key_ref(self) -> None:
+        """Testing a key_ref method."""
+        # Delete DB.
+        Scruby.napalm()
+
+        # Activate database.
+        Scruby.run()
+
+        user_coll = Scruby(User)
+
+        user = User(
+            first_name="John",
+            last_name="Smith",
+            birthday=datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC")),
+            email="John_Smith@gmail.com",
+            phone="+447986123456",
+        )
+        await user_coll.add_doc(user)
+
+        key_ref = user_coll.key_ref(" +447986123456 ")
+        assert key_ref.prepared_key == "+447986123456"
+        assert 0 <= key_ref.branch_number < 16
+        assert key_ref.leaf_path == (await user_coll._get_leaf_path("+447986123456"))[0]
+
+        assert await user_coll.has_key(key_ref)
+        data = await user_coll.get_doc(key_ref)
+        assert data.model_dump() == user.model_dump()
+        user.first_name = "Jim"
+        await user_coll.update_doc(user, key_ref=user_coll.key_ref(user.key))
+        assert (await user_coll.get_doc(key_ref)).first_name == "Jim"
+        with pytest.raises(KeyError):
+            await user_coll.update_doc(user, key_ref=user_coll.key_ref("key missing"))
+        await user_coll.delete_doc(key_ref)
+        assert not await user_coll.has_key(key_ref)
+        assert await user_coll.get_doc(key_ref) is None
+
+        # The reference belongs to the collection.
+        with pytest.raises(KeyError):
+            await Scruby(User3).get_doc(key_ref)
+        with pytest.raises(KeyError):
+            user_coll.key_ref("  ")
+        #
+        # Delete DB.
+        Scruby.napalm()
+
     async def test_has_key(self) -> None:
         """Testing a has_key method."""
         # Delete DB.
@@ -719,6 +945,62 @@ class TestPositive:
         # Delete DB.
         Scruby.napalm()
 
+    async def test_raw_json_passthrough(self) -> None:
+        """Stored JSON of documents is returned as is."""
+        # Delete DB.
+        Scruby.napalm()
+
+        # Activate database.
+        Scruby.run()
+
+        user_coll = Scruby(User)
+
+        users = [
+            User(
+                first_name="John",
+                last_name="Smith",
+                birthday=datetime(1970, 1, num, tzinfo=ZoneInfo("UTC")),
+                email=f"John_Smith_{num}@gmail.com",
+                phone=f"+44798612345{num}",
+            )
+            for num in range(1, 10)
+        ]
+        await user_coll.add_many(users)
+
+        # find_one
+        doc_json = await user_coll.find_one(
+            filter_fn=lambda doc: doc.email == "John_Smith_5@gmail.com",
+            return_type=ReturnType.JSON,
+        )
+        assert doc_json == users[4].model_dump_json()
+        assert await user_coll.find_one(filter_fn=lambda doc: doc.email == "???", return_type=ReturnType.JSON) is None
+
+        # find_many - sorted, all documents without loading and with the filter
+        docs_json = await user_coll.find_many(return_type=ReturnType.JSON)
+        sorted_users = sorted(users, key=lambda doc: doc.created_at, reverse=True)
+        assert docs_json == f"[{','.join(doc.model_dump_json() for doc in sorted_users)}]"
+        docs_json = await user_coll.find_many(sort_fn=None, return_type=ReturnType.JSON)
+        assert isinstance(docs_json, str)
+        assert sorted(doc["key"] for doc in json.loads(docs_json)) == sorted(doc.key for doc in users)
+        docs_dict = await user_coll.find_many(sort_fn=None, return_type=ReturnType.DICT)
+        assert isinstance(docs_dict, list)
+        assert len(docs_dict) == 9
+        docs_json = await user_coll.find_many(
+            filter_fn=lambda doc: doc.birthday.day > 7,
+            return_type=ReturnType.JSON,
+            sort_fn=lambda doc: doc.birthday,
+            sort_reverse=False,
+        )
+        assert docs_json == f"[{users[7].model_dump_json()},{users[8].model_dump_json()}]"
+        assert await user_coll.find_many(filter_fn=lambda doc: doc.email == "???", return_type=ReturnType.JSON) == "[]"
+
+        # get_many
+        docs_json = await user_coll.get_many(["+447986123451", "key missing"], return_type=ReturnType.JSON)
+        assert docs_json == f"[{users[0].model_dump_json()},null]"
+        #
+        # Delete DB.
+        Scruby.napalm()
+
     async def test_collection_name(self) -> None:
         """Test a collection_name method."""
         # Delete DB.
@@ -0,0 +1,129 @@
+"""Testing the sharded document counters."""
+
+from __future__ import annotations
+
+import socket
+import sys
+from typing import Annotated
+
+import anyio
+import pytest
+from anyio import Path
+from pydantic import Field
+
+from scruby import Scruby, ScrubyModel
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+async def test_meta_is_not_rewritten() -> None:
+    """Changes are accumulated in memory and flushed to the shard of the process."""
+    try:
+        # Activate database.
+        Scruby.run(counter_flush_interval=3600)
+
+        car_coll = Scruby(Car)
+        meta_json = await car_coll._meta_path.read_text()
+        for num in range(10):
+            await car_coll.add_doc(Car(brand="Mazda", model=f"EZ-6 {num}"))
+        await car_coll.delete_doc("Mazda:EZ-6 0")
+
+        assert await car_coll._meta_path.read_text() == meta_json
+        assert await car_coll.estimated_document_count() == 9
+        counter = car_coll._document_counter
+        assert counter.pending == 9
+        assert not counter.shard_path.exists()
+
+        await car_coll.close()
+        assert counter.pending == 0
+        assert counter.shard_path.read_text("utf-8") == "9"
+        assert await car_coll.estimated_document_count() == 9
+    finally:
+        # Delete DB.
+        Scruby.napalm()
+
+
+async def test_concurrent_writers() -> None:
+    """Increments of concurrent coroutines and other processes are not lost."""
+    try:
+        # Activate database.
+        Scruby.run(counter_flush_interval=0)
+
+        car_coll = Scruby(Car)
+        async with anyio.create_task_group() as tg:
+            for num in range(50):
+                tg.start_soon(car_coll.add_doc, Car(brand="Mazda", model=f"EZ-6 {num}"))
+        assert await car_coll.estimated_document_count() == 50
+        assert car_coll._document_counter.shard_path.read_text("utf-8") == "50"
+
+        # The shard of another process.
+        await Path(car_coll._document_counter.shards_dir, "other-host-1.cnt").write_text("-5", "utf-8")
+        assert await car_coll.estimated_document_count() == 45
+    finally:
+        # Delete DB.
+        Scruby.napalm()
+
+
+async def test_recount() -> None:
+    """The counter is rebuilt from the leaves."""
+    try:
+        # Activate database.
+        Scruby.run(hash_reduce_left=6)
+
+        car_coll = Scruby(Car)
+        await car_coll.add_many([Car(brand="Mazda", model=f"EZ-6 {num}") for num in range(30)])
+        # Shard of a process that crashed before flushing.
+        await Path(car_coll._document_counter.shards_dir).mkdir(parents=True, exist_ok=True)
+        await Path(car_coll._document_counter.shards_dir, "other-host-1.cnt").write_text("7", "utf-8")
+        # Shard of a finished process of this host.
+        async with await anyio.open_process([sys.executable, "-c", "pass"]) as finished:
+            await finished.wait()
+        orphan_path = Path(car_coll._document_counter.shards_dir, f"{socket.gethostname()}-{finished.pid}.cnt")
+        await orphan_path.write_text("-2", "utf-8")
+        assert await car_coll.estimated_document_count() == 35
+
+        assert await car_coll.recount() == 30
+        assert await car_coll.estimated_document_count() == 30
+        # The shard of the finished process is folded into the metadata.
+        assert not await orphan_path.exists()
+        assert await Path(car_coll._document_counter.shards_dir, "other-host-1.cnt").exists()
+        await car_coll.add_doc(Car(brand="Mazda", model="CX-5"))
+        assert await car_coll.estimated_document_count() == 31
+    finally:
+        # Delete DB.
+        Scruby.napalm()
+
+
+async def test_clear_collection() -> None:
+    """The counter is reset when the collection is cleared."""
+    try:
+        # Activate database.
+        Scruby.run(counter_flush_interval=3600)
+
+        car_coll = Scruby(Car)
+        await car_coll.add_many([Car(brand="Mazda", model=f"EZ-6 {num}") for num in range(5)])
+        assert await car_coll.estimated_document_count() == 5
+        Scruby.clear_collection("Car")
+        assert await car_coll.estimated_document_count() == 0
+    finally:
+        # Delete DB.
+        Scruby.napalm()
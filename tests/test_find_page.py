@@ -0,0 +1,184 @@
+"""Testing the keyset pagination of `find_page`."""
+
+from __future__ import annotations
+
+from datetime import UTC, date, datetime
+from typing import Annotated, ClassVar
+
+import orjson
+import pytest
+from pydantic import Field
+
+from scruby import Q, ReturnType, Scruby, ScrubyModel
+from scruby.cursor import decode_cursor, encode_cursor
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Item(ScrubyModel):
+    """Item model."""
+
+    number: int
+    rank: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"item-{data['number']:03d}",
+        ),
+    ]
+
+
+class RankedItem(ScrubyModel):
+    """Item model with a range index."""
+
+    scruby_range_indexes: ClassVar[tuple[str, ...]] = ("rank",)
+
+    number: int
+    rank: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"item-{data['number']:03d}",
+        ),
+    ]
+
+
+class NamedItem(ScrubyModel):
+    """Item model with mixed-case keys."""
+
+    name: str
+    rank: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: data["name"],
+        ),
+    ]
+
+
+class RankedNamedItem(ScrubyModel):
+    """Item model with mixed-case keys and a range index."""
+
+    scruby_range_indexes: ClassVar[tuple[str, ...]] = ("rank",)
+
+    name: str
+    rank: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: data["name"],
+        ),
+    ]
+
+
+def test_cursor() -> None:
+    """Sort keys keep their types in the cursor."""
+    moment = datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC)
+    for sort_key in (None, 1, 2.5, "text", True, moment, date(2025, 1, 2), (1, "a", moment), [1, 2]):
+        assert decode_cursor(encode_cursor(sort_key, "key")) == (sort_key, "key")
+    with pytest.raises(TypeError, match=r"The sort key of type `set` is not supported"):
+        encode_cursor({1}, "key")
+    for cursor in ("???", "bm90IGpzb24=", encode_cursor(1, "key")[:-4]):
+        with pytest.raises(ValueError, match=r"The cursor is not valid"):
+            decode_cursor(cursor)
+
+
+async def read_all_pages(coll: Scruby, limit_docs: int, **kwargs: object) -> list[int]:
+    """Numbers of documents of all pages."""
+    numbers: list[int] = []
+    cursor: str | None = None
+    while True:
+        page = await coll.find_page(limit_docs=limit_docs, cursor=cursor, **kwargs)
+        assert len(page.docs) <= limit_docs
+        numbers.extend(item.number for item in page.docs)
+        if page.cursor is None:
+            return numbers
+        cursor = page.cursor
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "dbm"])
+@pytest.mark.parametrize("model", [Item, RankedItem])
+async def test_find_page(backend: str, model: type[ScrubyModel]) -> None:
+    """Pages continue from the cursor, with and without a range index."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    item_coll = Scruby(model)
+    await item_coll.add_many([model(number=num, rank=(num * 37) % 11) for num in range(60)])
+    ascending = sorted(range(60), key=lambda num: ((num * 37) % 11, f"item-{num:03d}"))
+
+    assert await read_all_pages(item_coll, 7, sort_fn=Q.field("rank"), sort_reverse=False) == ascending
+    assert await read_all_pages(item_coll, 10, sort_fn=Q.field("rank")) == ascending[::-1]
+    assert await read_all_pages(item_coll, 60, sort_fn=lambda doc: doc.rank, sort_reverse=False) == ascending
+    # The filter.
+    numbers = await read_all_pages(item_coll, 4, filter_fn=Q.field("rank") >= 9, sort_fn=Q.field("rank"))
+    assert numbers == [num for num in ascending[::-1] if (num * 37) % 11 >= 9]
+
+    # The stored JSON, documents changed between pages.
+    page = await item_coll.find_page(
+        limit_docs=5,
+        sort_fn=Q.field("rank"),
+        sort_reverse=False,
+        return_type=ReturnType.JSON,
+    )
+    assert [item["number"] for item in orjson.loads(page.docs)] == ascending[:5]
+    await item_coll.delete_doc(f"item-{ascending[4]:03d}")
+    await item_coll.delete_doc(f"item-{ascending[5]:03d}")
+    page = await item_coll.find_page(limit_docs=5, cursor=page.cursor, sort_fn=Q.field("rank"), sort_reverse=False)
+    assert [item.number for item in page.docs] == ascending[6:11]
+
+    # Empty result.
+    page = await item_coll.find_page(Q.field("rank") > 100, sort_fn=Q.field("rank"))
+    assert page.docs == []
+    assert page.cursor is None
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "dbm"])
+async def test_equal_sort_keys(backend: str) -> None:
+    """Documents with equal sort keys are ordered by the prepared key, with and without a range index."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    names = ["alpha", "bravo", "Charlie", "Delta", "echo", "foxtrot", "Golf", "Hotel"]
+    ascending = sorted(names, key=lambda name: (names.index(name) % 2, name.lower()))
+    for model in (NamedItem, RankedNamedItem):
+        item_coll = Scruby(model)
+        await item_coll.add_many([model(name=name, rank=num % 2) for num, name in enumerate(names)])
+
+        docs = await item_coll.find_many(sort_fn=Q.field("rank"), sort_reverse=False)
+        assert [item.name for item in docs] == ascending
+        docs = await item_coll.find_many(sort_fn=Q.field("rank"))
+        assert [item.name for item in docs] == ascending[::-1]
+        for sort_reverse in (False, True):
+            page_names: list[str] = []
+            cursor: str | None = None
+            while True:
+                page = await item_coll.find_page(
+                    limit_docs=3,
+                    cursor=cursor,
+                    sort_fn=Q.field("rank"),
+                    sort_reverse=sort_reverse,
+                )
+                page_names.extend(item.name for item in page.docs)
+                if page.cursor is None:
+                    break
+                cursor = page.cursor
+            assert page_names == (ascending[::-1] if sort_reverse else ascending)
+    #
+    # Delete DB.
+    Scruby.napalm()
@@ -0,0 +1,275 @@
+"""Testing the secondary hash indexes."""
+
+from __future__ import annotations
+
+from typing import Annotated, ClassVar
+
+import anyio
+import pytest
+from pydantic import BaseModel, Field
+
+from scruby import Q, Scruby, ScrubyModel, Where
+from scruby.backends import DbmBackend, MemoryBackend
+from scruby.config import ScrubyConfig
+from scruby.errors import KeyAlreadyExistsError
+from scruby.indexes import HashIndex, IndexUpdate, choose_index
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Address(BaseModel):
+    """Address model."""
+
+    city: str
+
+
+class User(ScrubyModel):
+    """User model."""
+
+    scruby_indexes: ClassVar[tuple[str, ...]] = ("email", "address.city")
+
+    email: str
+    age: int
+    address: Address
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: data["email"],
+        ),
+    ]
+
+
+def make_users() -> list[User]:
+    """Users for tests."""
+    return [
+        User(email=f"User{num}@Mail.io", age=20 + num, address=Address(city="Paris" if num % 2 else "Rome"))
+        for num in range(10)
+    ]
+
+
+def test_index_update() -> None:
+    """Only the changed values of indexed fields give entries."""
+    Scruby.run(backend="memory")
+    indexes = HashIndex.of_collection("ScrubyDB/User", User.scruby_indexes, MemoryBackend, ScrubyConfig)
+    old_json = b'{"email": "a@mail.io", "address": {"city": "Rome"}}'
+    new_json = b'{"email": "a@mail.io", "address": {"city": "Paris"}}'
+    index_update = IndexUpdate(indexes, [("a@mail.io", old_json, new_json)])
+    assert index_update.added == [{}, {b'"Paris"': {"a@mail.io"}}]
+    assert index_update.removed == [{}, {b'"Rome"': {"a@mail.io"}}]
+    # Documents without the field have no entries.
+    index_update = IndexUpdate(indexes, [("b@mail.io", None, b'{"email": "b@mail.io"}')])
+    assert index_update.added == [{b'"b@mail.io"': {"b@mail.io"}}, {}]
+
+    assert choose_index(indexes, (("age", "==", 1), ("address.city", "in", ("Paris", "Rome")))) == (
+        indexes[1],
+        ("Paris", "Rome"),
+    )
+    assert choose_index(indexes, (("address.city", "in", ("Paris", "Rome")), ("email", "==", "a@mail.io"))) == (
+        indexes[0],
+        ("a@mail.io",),
+    )
+    assert choose_index(indexes, (("email", ">", "a"),)) is None
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "dbm", "log", "mmap"])
+async def test_maintenance(backend: str) -> None:
+    """Indexes are maintained by all write methods."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    user_coll = Scruby(User)
+    email_index, city_index = user_coll._indexes
+    users = make_users()
+    await user_coll.add_doc(users[0])
+    assert await user_coll.add_many(users) == [False] + [True] * 9
+    assert await email_index.lookup(["User3@Mail.io"]) == {"user3@mail.io"}
+    assert len(await city_index.lookup(["Paris"])) == 5
+    # Entries of documents whose keys exist are deleted, the entries of stored documents are kept.
+    assert len(await city_index.lookup(["Rome"])) == 5
+    with pytest.raises(KeyAlreadyExistsError):
+        await user_coll.add_doc(User(email="User0@Mail.io", age=99, address=Address(city="Oslo")))
+    assert await user_coll.add_many([User(email="User2@Mail.io", age=99, address=Address(city="Oslo"))]) == [False]
+    assert await city_index.lookup(["Oslo"]) == set()
+    assert {"user0@mail.io", "user2@mail.io"} <= await city_index.lookup(["Rome"])
+    assert await email_index.lookup(["User0@Mail.io"]) == {"user0@mail.io"}
+
+    # Queries on indexed fields.
+    assert await user_coll.count_documents(Q.field("address.city") == "Paris") == 5
+    assert await user_coll.count_documents((Q.field("address.city") == "Paris") & (Q.field("age") > 25)) == 2
+    assert await user_coll.count_documents(Q.field("address.city").in_(["Paris", "Rome", "Oslo"])) == 10
+    assert await user_coll.count_documents(Q.field("address.city") == "Oslo") == 0
+    user = await user_coll.find_one(Where(email="User7@Mail.io"))
+    assert user is not None
+    assert user.age == 27
+
+    # update_doc
+    user.address = Address(city="Oslo")
+    await user_coll.update_doc(user)
+    assert await city_index.lookup(["Oslo"]) == {"user7@mail.io"}
+    assert "user7@mail.io" not in await city_index.lookup(["Paris"])
+    assert await user_coll.count_documents(Q.field("address.city") == "Paris") == 4
+
+    # update_many
+    assert await user_coll.update_many({"address": Address(city="Lyon")}, Q.field("address.city") == "Rome") == 5
+    assert await city_index.lookup(["Rome"]) == set()
+    assert len(await city_index.lookup(["Lyon"])) == 5
+    docs = await user_coll.find_many(Q.field("address.city") == "Lyon", sort_fn=lambda doc: doc.age, sort_reverse=False)
+    assert docs is not None
+    assert [doc.age for doc in docs] == [20, 22, 24, 26, 28]
+
+    # delete_doc
+    await user_coll.delete_doc("User7@Mail.io")
+    assert await city_index.lookup(["Oslo"]) == set()
+    assert await email_index.lookup(["User7@Mail.io"]) == set()
+
+    # delete_many
+    assert await user_coll.delete_many(Q.field("address.city") == "Lyon") == 5
+    assert await city_index.lookup(["Lyon"]) == set()
+    assert await user_coll.count_documents(Q.field("email").in_(["User0@Mail.io", "User1@Mail.io"])) == 1
+    assert await user_coll.recount() == 4
+
+    await user_coll.close()
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "dbm"])
+async def test_build(backend: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Indexes declared for existing documents are built by the first query."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    # The documents are added without indexes.
+    monkeypatch.setattr(User, "scruby_indexes", ())
+    user_coll = Scruby(User)
+    await user_coll.add_many(make_users())
+
+    monkeypatch.setattr(User, "scruby_indexes", ("address.city",))
+    user_coll = Scruby(User)
+    (city_index,) = user_coll._indexes
+    assert not await city_index.is_built()
+    assert await user_coll.count_documents(Q.field("address.city") == "Rome") == 5
+    assert await city_index.is_built()
+    assert len(await city_index.lookup(["Rome"])) == 5
+
+    # Changes of documents without indexes are fixed by rebuilding.
+    monkeypatch.setattr(User, "scruby_indexes", ())
+    await Scruby(User).update_many({"address": Address(city="Oslo")}, Where(email="User0@Mail.io"))
+    monkeypatch.setattr(User, "scruby_indexes", ("address.city",))
+    assert await user_coll.count_documents(Q.field("address.city") == "Oslo") == 0
+    await user_coll.rebuild_indexes()
+    assert await user_coll.count_documents(Q.field("address.city") == "Oslo") == 1
+    assert await user_coll.count_documents(Q.field("address.city") == "Rome") == 4
+
+    # Clearing the collection clears the indexes.
+    Scruby.clear_collection("User")
+    assert await city_index.lookup(["Rome"]) == set()
+    await user_coll.add_many(make_users()[:2])
+    assert await user_coll.count_documents(Q.field("address.city") == "Rome") == 1
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "dbm", "log", "mmap"])
+async def test_big_integers(backend: str) -> None:
+    """Integers out of the 64-bit range are indexed."""
+
+    class Account(ScrubyModel):
+        """Account model."""
+
+        scruby_indexes: ClassVar[tuple[str, ...]] = ("balance",)
+
+        balance: int
+        num: int
+        # key is always at bottom
+        key: Annotated[str, Field(frozen=True, default_factory=lambda data: str(data["num"]))]
+
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    account_coll = Scruby(Account)
+    balances = [2**64, 2**80, -(2**70), 10]
+    await account_coll.add_many([Account(balance=balance, num=num) for num, balance in enumerate(balances)])
+    for num, balance in enumerate(balances):
+        docs = await account_coll.find_many(Q.field("balance") == balance)
+        assert docs is not None
+        assert [doc.num for doc in docs] == [num]
+    assert await account_coll.count_documents(Q.field("balance").in_([2**64, 2**80])) == 2
+    assert await account_coll.delete_many(Q.field("balance") == 2**64) == 1
+    assert await account_coll.count_documents(Q.field("balance") == 2**80) == 1
+    await account_coll.close()
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "dbm", "log", "mmap"])
+async def test_lookup_reads_prefix(backend: str) -> None:
+    """The keys of a value are read by prefix and are kept up to date by writes."""
+    # Activate database.
+    Scruby.run(backend=backend, hash_reduce_left=7)
+
+    user_coll = Scruby(User)
+    email_index, city_index = user_coll._indexes
+    users = make_users()
+    await user_coll.add_many(users)
+    assert len(await city_index.lookup(["Rome"])) == 5
+    # Values with a common prefix of JSON.
+    await city_index.add({b'"Rom"': {"x"}, b'"Rome2"': {"y"}})
+    assert len(await city_index.lookup(["Rome"])) == 5
+    assert await city_index.lookup(["Rom"]) == {"x"}
+    await city_index.remove({b'"Rome"': {"user0@mail.io"}})
+    assert len(await city_index.lookup(["Rome"])) == 4
+    await user_coll.delete_doc("User2@Mail.io")
+    assert len(await city_index.lookup(["Rome"])) == 3
+    await user_coll.add_doc(users[2])
+    assert len(await city_index.lookup(["Rome"])) == 4
+    assert await email_index.lookup(["User5@Mail.io", "User6@Mail.io"]) == {"user5@mail.io", "user6@mail.io"}
+    await user_coll.close()
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writers() -> None:
+    """Entries of concurrent writers with the same value are not lost."""
+    # Activate database.
+    Scruby.run(backend="dbm")
+
+    # Instances of index of two processes.
+    indexes = [HashIndex("ScrubyDB/User", "address.city", DbmBackend, ScrubyConfig) for _ in range(2)]
+    async with anyio.create_task_group() as tg:
+        for num in range(40):
+            tg.start_soon(indexes[num % 2].add, {b'"Rome"': {f"user{num}@mail.io"}})
+    assert len(await indexes[0].lookup(["Rome"])) == 40
+    await indexes[1].remove({b'"Rome"': {"user0@mail.io", "user1@mail.io"}})
+    assert len(await indexes[0].lookup(["Rome"])) == 38
+    await indexes[0].backend.close()
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+def test_missing_field(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Indexed fields must be fields of model."""
+    Scruby.run(backend="memory")
+    monkeypatch.setattr(User, "scruby_indexes", ("phone",))
+    with pytest.raises(AssertionError, match=r"The indexed field `phone` is missing"):
+        Scruby(User)
+    #
+    # Delete DB.
+    Scruby.napalm()
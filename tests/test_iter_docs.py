@@ -0,0 +1,74 @@
+"""Testing the streaming of documents by `iter_docs`."""
+
+from __future__ import annotations
+
+from typing import Annotated, ClassVar
+
+import orjson
+import pytest
+from pydantic import Field
+
+from scruby import Q, ReturnType, Scruby, ScrubyModel, Where
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Item(ScrubyModel):
+    """Item model."""
+
+    scruby_indexes: ClassVar[tuple[str, ...]] = ("color",)
+
+    number: int
+    color: str
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"item-{data['number']:03d}",
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "dbm"])
+async def test_iter_docs(backend: str) -> None:
+    """Documents are streamed one by one or in batches."""
+    # Activate database.
+    Scruby.run(backend=backend, max_workers=4)
+
+    item_coll = Scruby(Item)
+    await item_coll.add_many([Item(number=num, color="red" if num % 3 else "blue") for num in range(100)])
+
+    numbers = [item.number async for item in item_coll.iter_docs()]
+    assert sorted(numbers) == list(range(100))
+
+    # Batches.
+    batches = [batch async for batch in item_coll.iter_docs(Q.field("number") < 50, batch_size=8)]
+    assert [len(batch) for batch in batches] == [8] * 6 + [2]
+    assert sorted(item.number for batch in batches for item in batch) == list(range(50))
+
+    # Return types.
+    items_json = [item async for item in item_coll.iter_docs(Where(color="blue"), return_type=ReturnType.JSON)]
+    assert len(items_json) == 34
+    assert all(orjson.loads(item)["color"] == "blue" for item in items_json)
+    items_dict = [
+        item
+        async for item in item_coll.iter_docs(
+            lambda doc: doc.number >= 95,
+            return_type=ReturnType.DICT,
+            include_fields={"number"},
+        )
+    ]
+    assert sorted(item["number"] for item in items_dict) == [95, 96, 97, 98, 99]
+
+    # The consumer may stop at any document.
+    async for item in item_coll.iter_docs():
+        assert item is not None
+        break
+    assert await item_coll.count_documents(Where(color="red")) == 66
+    #
+    # Delete DB.
+    Scruby.napalm()
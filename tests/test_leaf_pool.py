@@ -0,0 +1,289 @@
+"""Testing the pool of leaf database handles."""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+import anyio
+import pytest
+from pydantic import Field
+
+from scruby import Scruby, ScrubyModel
+from scruby.backends import LeafBackend
+from scruby.leaf_pool import LeafPool, default_dbm_flavor
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+async def test_leaves_stay_open() -> None:
+    """Leaves are reused between operations."""
+    # Activate database.
+    Scruby.run()
+
+    car_coll = Scruby(Car)
+    car = Car(brand="Mazda", model="EZ-6")
+    await car_coll.add_doc(car)
+    leaf_path, _ = await car_coll._get_leaf_path(car.key)
+    pool = car_coll._backend.leaf_pool
+    handle = pool._handles[str(leaf_path)]
+
+    assert await car_coll.has_key(car.key)
+    assert await car_coll.get_doc(car.key) is not None
+    assert pool._handles[str(leaf_path)] is handle
+    assert handle.in_use == 0
+    # The pool is shared by all instances of collection.
+    assert Scruby(Car)._backend.leaf_pool is pool
+    #
+    # Delete DB.
+    Scruby.napalm()
+    assert not pool._handles
+
+
+async def test_max_open_leaves() -> None:
+    """The least recently used leaves are closed over the limit."""
+    # Activate database.
+    Scruby.run(hash_reduce_left=6, max_open_leaves=4)
+
+    car_coll = Scruby(Car)
+    for num in range(30):
+        await car_coll.add_doc(Car(brand="Mazda", model=f"EZ-6 {num}"))
+    assert len(car_coll._backend.leaf_pool._handles) <= 4
+    assert await car_coll.count_documents(filter_fn=lambda doc: doc.brand == "Mazda") == 30
+    assert len(car_coll._backend.leaf_pool._handles) <= 4
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_thread_limiter() -> None:
+    """Open leaves share a bounded number of worker threads."""
+    # Activate database.
+    Scruby.run(hash_reduce_left=6)
+
+    car_coll = Scruby(Car)
+    await car_coll.add_many([Car(brand="Mazda", model=f"EZ-6 {num}") for num in range(200)])
+    pool = car_coll._backend.leaf_pool
+    assert len(pool._handles) > LeafPool.max_threads
+    assert pool.limiter.total_tokens == LeafPool.max_threads
+    assert await car_coll.count_documents(filter_fn=lambda doc: doc.brand == "Mazda") == 200
+    assert pool.limiter.borrowed_tokens == 0
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_max_open_leaves_0() -> None:
+    """Leaves are closed after each operation."""
+    # Activate database.
+    Scruby.run(max_open_leaves=0)
+
+    car_coll = Scruby(Car)
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6"))
+    assert not car_coll._backend.leaf_pool._handles
+    assert await car_coll.get_doc("Mazda:EZ-6") is not None
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_idle_timeout() -> None:
+    """Idle leaves are closed."""
+    # Activate database.
+    Scruby.run(leaf_idle_timeout=0)
+
+    car_coll = Scruby(Car)
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6"))
+    await car_coll.add_doc(Car(brand="Toyota", model="Camry"))
+    # The previous leaf is closed when the next one is acquired.
+    assert len(car_coll._backend.leaf_pool._handles) == 1
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_close() -> None:
+    """Closing of collection."""
+    # Activate database.
+    Scruby.run()
+
+    async with Scruby(Car) as car_coll:
+        await car_coll.add_doc(Car(brand="Mazda", model="EZ-6"))
+        assert car_coll._backend.leaf_pool._handles
+    assert not car_coll._backend.leaf_pool._handles
+    assert car_coll._backend not in LeafBackend._backends.values()
+    # The collection can be used after closing.
+    car_coll = Scruby(Car)
+    assert await car_coll.get_doc("Mazda:EZ-6") is not None
+    await car_coll.close()
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_close_waits_for_operations() -> None:
+    """Leaves in use are closed when the operations on them are finished."""
+    # Activate database.
+    Scruby.run()
+
+    car_coll = Scruby(Car)
+    car = Car(brand="Mazda", model="EZ-6")
+    await car_coll.add_doc(car)
+    leaf_path, prepared_key = await car_coll._get_leaf_path(car.key)
+    pool = car_coll._backend.leaf_pool
+
+    async with anyio.create_task_group() as tg, pool.leaf(leaf_path) as handle:
+        tg.start_soon(pool.close)
+        await anyio.sleep(0.05)
+        # The leaf in use stays open.
+        assert handle.retired
+        assert handle._db is not None
+        assert await handle.get(prepared_key) is not None
+    assert handle._db is None
+    assert not pool._handles
+    assert not pool._closing
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_readonly_leaves() -> None:
+    """Reads open leaves read-only and do not create missing leaves."""
+    # Activate database.
+    Scruby.run()
+
+    car_coll = Scruby(Car)
+    car = Car(brand="Mazda", model="EZ-6")
+    leaf_path, _ = await car_coll._get_leaf_path(car.key)
+    pool = car_coll._backend.leaf_pool
+
+    assert not await car_coll.has_key(car.key)
+    assert await car_coll.count_documents(filter_fn=lambda doc: doc.brand == "Mazda") == 0
+    assert not await leaf_path.exists()
+    assert str(leaf_path) not in pool._handles
+
+    await car_coll.add_doc(car)
+    await car_coll.close()
+    car_coll = Scruby(Car)
+    pool = car_coll._backend.leaf_pool
+    assert await car_coll.get_doc(car.key) is not None
+    readonly_handle = pool._handles[str(leaf_path)]
+    assert readonly_handle.readonly
+    # The leaf is reopened for writing.
+    await car_coll.update_doc(car)
+    handle = pool._handles[str(leaf_path)]
+    assert not handle.readonly
+    assert readonly_handle.retired
+    assert readonly_handle._db is None
+    # Writable leaves are used for reads.
+    assert await car_coll.has_key(car.key)
+    assert pool._handles[str(leaf_path)] is handle
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_write_waits_for_readers() -> None:
+    """The leaf is reopened for writing after the readers have finished with the read-only handle."""
+    # Activate database.
+    Scruby.run()
+
+    car_coll = Scruby(Car)
+    car = Car(brand="Mazda", model="EZ-6")
+    await car_coll.add_doc(car)
+    leaf_path, prepared_key = await car_coll._get_leaf_path(car.key)
+    await car_coll.close()
+    car_coll = Scruby(Car)
+    pool = car_coll._backend.leaf_pool
+
+    async with anyio.create_task_group() as tg, pool.leaf(leaf_path, readonly=True) as readonly_handle:
+        tg.start_soon(car_coll.update_doc, car)
+        await anyio.sleep(0.05)
+        # The writer waits, the read-only handle is still open.
+        assert readonly_handle.retired
+        assert readonly_handle._db is not None
+        assert str(leaf_path) not in pool._handles
+        assert await readonly_handle.get(prepared_key) is not None
+    assert readonly_handle._db is None
+    assert not pool._handles[str(leaf_path)].readonly
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_dbm_flavor() -> None:
+    """New leaves are created with the selected flavor of `dbm`."""
+    # Activate database.
+    Scruby.run(dbm_flavor="dumb")
+
+    car_coll = Scruby(Car)
+    car = Car(brand="Mazda", model="EZ-6")
+    await car_coll.add_doc(car)
+    leaf_path, _ = await car_coll._get_leaf_path(car.key)
+    # Hint: `dbm.dumb` adds extensions to the file names.
+    assert not await leaf_path.exists()
+    assert await leaf_path.with_name("leaf.dbm.dat").exists()
+    assert await car_coll._backend.leaf_exists(leaf_path)
+    assert await car_coll.get_doc(car.key) is not None
+    assert await car_coll.count_documents(filter_fn=lambda doc: doc.brand == "Mazda") == 1
+
+    # The flavor is recorded in `.env.meta`.
+    with pytest.raises(ValueError, match=r"is not equal to the primary value 'dumb'"):
+        Scruby.run(dbm_flavor="sqlite3")
+    Scruby.run()
+    car_coll = Scruby(Car)
+    assert car_coll._backend.dbm_flavor == "dumb"
+    assert await car_coll.get_doc(car.key) is not None
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+    # Activate database.
+    Scruby.run()
+    car_coll = Scruby(Car)
+    assert car_coll._backend.dbm_flavor == default_dbm_flavor()
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_dbm_tuning() -> None:
+    """PRAGMAs of the "sqlite3" flavor."""
+    # Activate database.
+    Scruby.run(dbm_flavor="sqlite3", dbm_tuning={"journal_mode": "WAL", "synchronous": "OFF"})
+
+    car_coll = Scruby(Car)
+    car = Car(brand="Mazda", model="EZ-6")
+    await car_coll.add_doc(car)
+    leaf_path, _ = await car_coll._get_leaf_path(car.key)
+    handle = car_coll._backend.leaf_pool._handles[str(leaf_path)]
+    assert await handle.run(lambda db: db._cx.execute("PRAGMA journal_mode").fetchone()) == ("wal",)
+    assert await handle.run(lambda db: db._cx.execute("PRAGMA synchronous").fetchone()) == (0,)
+    await car_coll.close()
+    # Read-only leaves.
+    car_coll = Scruby(Car)
+    assert await car_coll.get_doc(car.key) is not None
+    handle = car_coll._backend.leaf_pool._handles[str(leaf_path)]
+    assert handle.readonly
+    assert await handle.run(lambda db: db._cx.execute("PRAGMA synchronous").fetchone()) == (0,)
+    #
+    # Delete DB.
+    Scruby.napalm()
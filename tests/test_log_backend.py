@@ -0,0 +1,209 @@
+"""Testing the log-structured storage backend."""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+import anyio
+import pytest
+from pydantic import Field
+
+from scruby import Scruby, ScrubyModel
+from scruby.backends import LogBackend, log
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    year: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+async def test_operations() -> None:
+    """The collection works with the log-structured backend."""
+    # Activate database.
+    Scruby.run(backend="log")
+
+    car_coll = Scruby(Car)
+    assert isinstance(car_coll._backend, LogBackend)
+
+    cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2020 + num) for num in range(10)]
+    assert await car_coll.add_many(cars) == [True] * 10
+    assert await car_coll.add_many(cars[:1]) == [False]
+    await car_coll.add_doc(Car(brand="Toyota", model="Camry", year=2024))
+    assert await car_coll.has_key("Toyota:Camry")
+    assert (await car_coll.get_doc("Mazda:EZ-1")).year == 2021
+    assert await car_coll.count_documents(lambda doc: doc.brand == "Mazda") == 10
+    assert len(await car_coll.find_many(lambda doc: doc.year >= 2025)) == 5
+    assert await car_coll.update_many({"year": 2000}, lambda doc: doc.brand == "Toyota") == 1
+    assert (await car_coll.get_doc("Toyota:Camry")).year == 2000
+    assert await car_coll.delete_many(lambda doc: doc.year < 2025) == 6
+    await car_coll.delete_doc("Mazda:EZ-9")
+    assert not await car_coll.has_key("Mazda:EZ-9")
+    assert await car_coll.recount() == 4
+    docs = await car_coll.get_many(["Mazda:EZ-8", "Mazda:EZ-9"])
+    assert docs[0].model == "EZ-8"
+    assert docs[1] is None
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_reopen() -> None:
+    """The index is restored from the hint file and from the data file."""
+    # Activate database.
+    Scruby.run(backend="log")
+
+    car_coll = Scruby(Car)
+    car = Car(brand="Mazda", model="EZ-6", year=2025)
+    await car_coll.add_doc(car)
+    await car_coll.update_doc(car.model_copy(update={"year": 2026}))
+    leaf_path, _ = await car_coll._get_leaf_path(car.key)
+    await car_coll.close()
+    hint_path = anyio.Path(leaf_path).with_suffix(".hint")
+    assert await hint_path.exists()
+
+    # From the hint file.
+    car_coll = Scruby(Car)
+    assert (await car_coll.get_doc(car.key)).year == 2026
+    await car_coll.add_doc(Car(brand="Mazda", model="CX-5", year=2024))
+    car_coll._backend.close_sync()
+
+    # From the data file.
+    await hint_path.unlink()
+    car_coll = Scruby(Car)
+    assert (await car_coll.get_doc(car.key)).year == 2026
+    assert await car_coll.has_key("Mazda:CX-5")
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_torn_record() -> None:
+    """The torn record of interrupted write is cut off."""
+    # Activate database.
+    Scruby.run(backend="log")
+
+    car_coll = Scruby(Car)
+    car = Car(brand="Mazda", model="EZ-6", year=2025)
+    await car_coll.add_doc(car)
+    leaf_path, _ = await car_coll._get_leaf_path(car.key)
+    await car_coll.close()
+    data_path = anyio.Path(leaf_path).with_suffix(".log")
+    await anyio.Path(leaf_path).with_suffix(".hint").unlink()
+    size = (await data_path.stat()).st_size
+    async with await anyio.open_file(data_path, "ab") as data_file:
+        await data_file.write(b"\x01\x02\x03")
+
+    car_coll = Scruby(Car)
+    assert (await car_coll.get_doc(car.key)).year == 2025
+    assert (await data_path.stat()).st_size == size
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_compaction(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Leaves with many dead records are compacted."""
+    monkeypatch.setattr(LogBackend, "min_compaction_size", 0)
+    # Activate database.
+    Scruby.run(backend="log", hash_reduce_left=7)
+
+    car_coll = Scruby(Car)
+    cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2000) for num in range(20)]
+    await car_coll.add_many(cars)
+    leaf_path, _ = await car_coll._get_leaf_path(cars[0].key)
+    data_path = anyio.Path(leaf_path).with_suffix(".log")
+    for year in range(2001, 2011):
+        await car_coll.update_many({"year": year})
+    leaf = car_coll._backend.leaves[str(leaf_path)]
+    # The writer that starts the compaction waits for it.
+    assert leaf.compaction is None
+    assert leaf.dead_bytes < leaf.size
+    assert (await data_path.stat()).st_size == leaf.size
+
+    await car_coll._backend.compact(leaf_path)
+    assert leaf.dead_bytes == 0
+    assert await car_coll.count_documents(lambda doc: doc.year == 2010) == 20
+    # The process executor reads the data file directly.
+    docs = dict(LogBackend.iter_leaf_sync(leaf_path))
+    assert sorted(docs) == sorted(leaf.index)
+    await car_coll.close()
+
+    car_coll = Scruby(Car)
+    assert await car_coll.count_documents(lambda doc: doc.year == 2010) == 20
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_compaction_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The error of compaction is raised to the writer and the leaf can be compacted again."""
+
+    def fail(*_args: object) -> None:
+        raise RuntimeError("Disk failure.")
+
+    monkeypatch.setattr(LogBackend, "min_compaction_size", 0)
+    # Activate database.
+    Scruby.run(backend="log", hash_reduce_left=7)
+
+    car_coll = Scruby(Car)
+    cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2000) for num in range(20)]
+    await car_coll.add_many(cars)
+    leaf_path, _ = await car_coll._get_leaf_path(cars[0].key)
+    with monkeypatch.context() as patch:
+        patch.setattr(log, "_rewrite_live", fail)
+        with pytest.RaisesGroup(RuntimeError):
+            await car_coll._backend.compact(leaf_path)
+    leaf = car_coll._backend.leaves[str(leaf_path)]
+    assert leaf.compaction is None
+    await car_coll._backend.compact(leaf_path)
+    assert leaf.dead_bytes == 0
+    assert await car_coll.count_documents(lambda doc: doc.year == 2000) == 20
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_concurrent_operations() -> None:
+    """Concurrent operations on leaves that are closed over the limit."""
+    # Activate database.
+    Scruby.run(backend="log", hash_reduce_left=6, max_open_leaves=1)
+
+    car_coll = Scruby(Car)
+    cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2000) for num in range(50)]
+    async with anyio.create_task_group() as tg:
+        for car in cars:
+            tg.start_soon(car_coll.add_doc, car)
+    assert len(car_coll._backend.leaves) == 1
+    results: list[Car | None] = []
+
+    async def get_doc(key: str) -> None:
+        results.append(await car_coll.get_doc(key))
+
+    async with anyio.create_task_group() as tg:
+        for car in cars:
+            tg.start_soon(get_doc, car.key)
+    assert sorted(doc.model for doc in results if doc is not None) == sorted(car.model for car in cars)
+    await car_coll.close()
+    assert not car_coll._backend._closing
+    car_coll = Scruby(Car)
+    assert await car_coll.count_documents(lambda doc: doc.year == 2000) == 50
+    #
+    # Delete DB.
+    Scruby.napalm()
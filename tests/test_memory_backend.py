@@ -0,0 +1,138 @@
+"""Testing the in-memory storage backend."""
+
+from __future__ import annotations
+
+from typing import Annotated, Any
+
+import anyio
+import pytest
+from pydantic import Field
+
+from scruby import CustomTask, Scruby, ScrubyModel
+from scruby.aggregation import Sum
+from scruby.backends import LeafBackend, MemoryBackend
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    year: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+class SumYears(CustomTask):
+    """Calculate the sum of years."""
+
+    def __init__(self) -> None:
+        """Initializing the task."""
+        self.stop_signal = False
+        self.sum_year = Sum()
+
+    def accept(self, doc: Any) -> None:
+        """Operation with a document."""
+        self.sum_year.set(doc.year)
+
+    def result(self) -> Any | None:
+        """Return result."""
+        return int(self.sum_year.get())
+
+
+async def test_operations() -> None:
+    """The collection works with the in-memory backend."""
+    # Activate database.
+    Scruby.run(backend="memory")
+
+    car_coll = Scruby(Car)
+    assert isinstance(car_coll._backend, MemoryBackend)
+
+    cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2020 + num) for num in range(10)]
+    assert await car_coll.add_many(cars) == [True] * 10
+    await car_coll.add_doc(Car(brand="Toyota", model="Camry", year=2024))
+    assert await car_coll.has_key("Toyota:Camry")
+    assert (await car_coll.get_doc("Mazda:EZ-1")).year == 2021
+    assert await car_coll.count_documents(lambda doc: doc.brand == "Mazda") == 10
+    assert len(await car_coll.find_many(lambda doc: doc.year >= 2025)) == 5
+    assert await car_coll.run_custom_task(SumYears()) == sum(range(2020, 2030)) + 2024
+    assert await car_coll.update_many({"year": 2000}, lambda doc: doc.brand == "Toyota") == 1
+    assert (await car_coll.get_doc("Toyota:Camry")).year == 2000
+    assert await car_coll.delete_many(lambda doc: doc.year < 2025) == 6
+    await car_coll.delete_doc("Mazda:EZ-9")
+    assert await car_coll.recount() == 4
+    assert await car_coll.estimated_document_count() == 4
+    # Branches are not created on the file system.
+    assert not await anyio.Path("ScrubyDB/Car/0").exists()
+    #
+    # Delete DB.
+    Scruby.napalm()
+    assert not MemoryBackend._stores
+
+
+async def test_data_survives_closing() -> None:
+    """Data lives as long as the process."""
+    # Activate database.
+    Scruby.run(backend="memory")
+
+    car_coll = Scruby(Car)
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6", year=2025))
+    await car_coll.close()
+    assert "ScrubyDB/Car" not in LeafBackend._backends
+
+    car_coll = Scruby(Car)
+    assert await car_coll.has_key("Mazda:EZ-6")
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_clear_collection() -> None:
+    """Clearing the collection deletes its data."""
+    # Activate database.
+    Scruby.run(backend="memory")
+
+    car_coll = Scruby(Car)
+    await car_coll.add_doc(Car(brand="Mazda", model="EZ-6", year=2025))
+    await car_coll.close()
+    Scruby.clear_collection("Car")
+
+    car_coll = Scruby(Car)
+    assert not await car_coll.has_key("Mazda:EZ-6")
+    assert await car_coll.estimated_document_count() == 0
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_snapshot() -> None:
+    """Collections are saved to the snapshot when closing and loaded from it."""
+    # Activate database.
+    Scruby.run(backend="memory", memory_snapshot=True)
+
+    car_coll = Scruby(Car)
+    cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2020 + num) for num in range(10)]
+    await car_coll.add_many(cars)
+    await car_coll.close()
+    assert await anyio.Path("ScrubyDB/Car/memory.snapshot").exists()
+
+    # Data is loaded from the snapshot, for example in a new process.
+    MemoryBackend._stores.clear()
+    car_coll = Scruby(Car)
+    assert await car_coll.count_documents(lambda doc: doc.brand == "Mazda") == 10
+    assert (await car_coll.get_doc("Mazda:EZ-3")).year == 2023
+    #
+    # Delete DB.
+    Scruby.napalm()
@@ -0,0 +1,135 @@
+"""Testing the memory-mapped storage backend."""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+import anyio
+import pytest
+from pydantic import Field
+
+from scruby import Scruby, ScrubyModel
+from scruby.backends import MmapBackend
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    year: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+async def test_operations() -> None:
+    """The collection works with the memory-mapped backend."""
+    try:
+        # Activate database.
+        Scruby.run(backend="mmap")
+
+        car_coll = Scruby(Car)
+        assert isinstance(car_coll._backend, MmapBackend)
+
+        cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2020 + num) for num in range(10)]
+        assert await car_coll.add_many(cars) == [True] * 10
+        assert await car_coll.add_many(cars[:1]) == [False]
+        await car_coll.add_doc(Car(brand="Toyota", model="Camry", year=2024))
+        assert await car_coll.has_key("Toyota:Camry")
+        assert (await car_coll.get_doc("Mazda:EZ-1")).year == 2021
+        assert await car_coll.count_documents(lambda doc: doc.brand == "Mazda") == 10
+        assert len(await car_coll.find_many(lambda doc: doc.year >= 2025)) == 5
+        assert await car_coll.update_many({"year": 2000}, lambda doc: doc.brand == "Toyota") == 1
+        assert (await car_coll.get_doc("Toyota:Camry")).year == 2000
+        assert await car_coll.delete_many(lambda doc: doc.year < 2025) == 6
+        await car_coll.delete_doc("Mazda:EZ-9")
+        assert not await car_coll.has_key("Mazda:EZ-9")
+        assert await car_coll.recount() == 4
+        # The collection is stored in two files.
+        names = sorted([path.name async for path in anyio.Path("ScrubyDB/Car").iterdir()])
+        assert names == ["collection.idx", "collection.seg", "meta"]
+    finally:
+        # Delete DB.
+        Scruby.napalm()
+
+
+async def test_many_keys() -> None:
+    """The index grows and survives reopening."""
+    try:
+        # Activate database.
+        Scruby.run(backend="mmap", hash_reduce_left=6)
+
+        car_coll = Scruby(Car)
+        cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2000) for num in range(3000)]
+        await car_coll.add_many(cars)
+        assert car_coll._backend.store.capacity > 1024
+        await car_coll.close()
+
+        car_coll = Scruby(Car)
+        assert (await car_coll.get_doc("Mazda:EZ-2999")).year == 2000
+        assert await car_coll.recount() == 3000
+    finally:
+        # Delete DB.
+        Scruby.napalm()
+
+
+async def test_rebuild_index() -> None:
+    """The index is rebuilt from the segment."""
+    try:
+        # Activate database.
+        Scruby.run(backend="mmap")
+
+        car_coll = Scruby(Car)
+        car = Car(brand="Mazda", model="EZ-6", year=2025)
+        await car_coll.add_doc(car)
+        await car_coll.update_doc(car.model_copy(update={"year": 2026}))
+        await car_coll.add_doc(Car(brand="Mazda", model="CX-5", year=2024))
+        await car_coll.delete_doc("Mazda:CX-5")
+        await car_coll.close()
+        await anyio.Path("ScrubyDB/Car/collection.idx").unlink()
+
+        car_coll = Scruby(Car)
+        assert (await car_coll.get_doc(car.key)).year == 2026
+        assert not await car_coll.has_key("Mazda:CX-5")
+    finally:
+        # Delete DB.
+        Scruby.napalm()
+
+
+async def test_compaction(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The segment with many dead records is compacted."""
+    try:
+        monkeypatch.setattr(MmapBackend, "min_compaction_size", 0)
+        # Activate database.
+        Scruby.run(backend="mmap")
+
+        car_coll = Scruby(Car)
+        cars = [Car(brand="Mazda", model=f"EZ-{num}", year=2000) for num in range(20)]
+        await car_coll.add_many(cars)
+        for year in range(2001, 2006):
+            await car_coll.update_many({"year": year})
+        # The writer that starts the compaction waits for it.
+        assert car_coll._backend.compaction is None
+        await car_coll._backend.compact()
+        store = car_coll._backend.store
+        assert store.live_bytes == store.end
+        assert await car_coll.count_documents(lambda doc: doc.year == 2005) == 20
+        await car_coll.close()
+
+        car_coll = Scruby(Car)
+        assert await car_coll.count_documents(lambda doc: doc.year == 2005) == 20
+    finally:
+        # Delete DB.
+        Scruby.napalm()
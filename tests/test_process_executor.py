@@ -0,0 +1,143 @@
+"""Testing the process-pool scan mode."""
+
+from __future__ import annotations
+
+from functools import partial
+from typing import Annotated, Any
+
+import pytest
+from pydantic import Field
+
+from scruby import CustomTask, Q, ReturnType, Scruby, ScrubyConfig, ScrubyModel, Where
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Hint: Worker processes import this module to unpickle the model and the filter functions,
+# so there must be no side effects at the module level (such as `Scruby.napalm()`).
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    year: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+class YearList(CustomTask):
+    """Custom task - collect the years of cars."""
+
+    def __init__(self) -> None:
+        """Initializing the task."""
+        self.stop_signal = False
+        self.years: list[int] = []
+
+    def accept(self, doc: Any) -> None:
+        """Operation with a document."""
+        self.years.append(doc.year)
+
+    def result(self) -> Any | None:
+        """Return result."""
+        return sorted(self.years) or None
+
+
+def is_mazda(doc: Car) -> bool:
+    """Filter function - picklable, defined at the module level."""
+    return doc.brand == "Mazda"
+
+
+def year_from(year: int, doc: Car) -> bool:
+    """Filter function with a parameter - for `functools.partial`."""
+    return doc.year >= year
+
+
+async def test_process_executor() -> None:
+    """Search documents in worker processes."""
+    # Delete DB.
+    Scruby.napalm()
+
+    # Activate database.
+    Scruby.run(executor="process", max_workers=2)
+    assert ScrubyConfig.executor == "process"
+
+    car_coll = Scruby(Car)
+    for num in range(1, 10):
+        car = Car(brand="Mazda", model=f"EZ-6 {num}", year=2015 + num)
+        await car_coll.add_doc(car)
+    await car_coll.add_doc(Car(brand="Toyota", model="Camry", year=2020))
+
+    assert await car_coll.count_documents(filter_fn=is_mazda) == 9
+    assert await car_coll.count_documents(filter_fn=partial(year_from, 2020)) == 6
+
+    car: Car | None = await car_coll.find_one(filter_fn=partial(year_from, 2024))
+    assert car is not None
+    assert car.model == "EZ-6 9"
+
+    cars: list[Car] | str | None = await car_coll.find_many(filter_fn=is_mazda, limit_docs=5)
+    assert cars is not None
+    assert len(cars) == 5
+    cars = await car_coll.find_many(filter_fn=is_mazda, limit_docs=5, page_number=2)
+    assert cars is not None
+    assert len(cars) == 4
+    # Pages are sorted over the whole collection.
+    cars = await car_coll.find_many(filter_fn=is_mazda, limit_docs=3, page_number=2, sort_fn=lambda doc: doc.year)
+    assert cars is not None
+    assert [car.year for car in cars] == [2021, 2020, 2019]
+    cars = await car_coll.find_many()
+    assert cars is not None
+    assert len(cars) == 10
+
+    # The stored JSON of documents is returned as is.
+    cars_json = await car_coll.find_many(filter_fn=is_mazda, return_type=ReturnType.JSON)
+    assert cars_json == f"[{','.join(car.model_dump_json() for car in cars if car.brand == 'Mazda')}]"
+    cars_json = await car_coll.find_many(sort_fn=None, return_type=ReturnType.JSON)
+    assert isinstance(cars_json, str)
+    assert cars_json.count('"brand"') == 10
+
+    years = await car_coll.run_custom_task(custom_task=YearList(), filter_fn=is_mazda)
+    assert years == list(range(2016, 2025))
+
+    # Query expressions can be passed to worker processes.
+    assert await car_coll.count_documents((Q.field("brand") == "Mazda") & (Q.field("year") >= 2020)) == 5
+    cars = await car_coll.find_many(Q.field("year").in_([2016, 2020]))
+    assert cars is not None
+    assert sorted(car.year for car in cars) == [2016, 2020, 2020]
+
+    # Lambdas cannot be passed to worker processes.
+    with pytest.raises(TypeError, match=r"The `filter_fn` must be picklable"):
+        await car_coll.count_documents(filter_fn=lambda doc: doc.brand == "Mazda")
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_process_executor_sqlite() -> None:
+    """Search documents of the SQLite backend in worker processes."""
+    # Delete DB.
+    Scruby.napalm()
+
+    # Activate database.
+    Scruby.run(executor="process", max_workers=2, backend="sqlite")
+
+    car_coll = Scruby(Car)
+    for num in range(1, 10):
+        car = Car(brand="Mazda", model=f"EZ-6 {num}", year=2015 + num)
+        await car_coll.add_doc(car)
+    await car_coll.add_doc(Car(brand="Toyota", model="Camry", year=2020))
+
+    assert await car_coll.count_documents(filter_fn=is_mazda) == 9
+    assert await car_coll.count_documents(filter_fn=Where(year=2020)) == 2
+    cars = await car_coll.find_many()
+    assert cars is not None
+    assert len(cars) == 10
+    #
+    # Delete DB.
+    Scruby.napalm()
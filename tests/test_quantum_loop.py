@@ -0,0 +1,49 @@
+"""Testing the concurrent scan engine."""
+
+from __future__ import annotations
+
+import anyio
+import anyio.lowlevel
+import pytest
+
+from scruby.quantum_loop import QuantumLoop
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+
+async def test_branches_run_concurrently() -> None:
+    """Branches are read in parallel up to the `max_workers` limit."""
+    quantum_loop = QuantumLoop(range(16), max_workers=4)
+    running: int = 0
+    max_running: int = 0
+
+    async def task(branch_number: int) -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await anyio.sleep(0.01)
+        running -= 1
+        return branch_number
+
+    results = await quantum_loop.gather(task)
+
+    assert sorted(results) == list(range(16))
+    assert max_running == 4
+
+
+async def test_early_stop() -> None:
+    """Pending branches are not scanned after `accept` returns True."""
+    quantum_loop = QuantumLoop(range(256), max_workers=2)
+    scanned: list[int] = []
+
+    async def task(branch_number: int, stop_event: anyio.Event) -> int | None:
+        if stop_event.is_set():
+            return None
+        scanned.append(branch_number)
+        await anyio.lowlevel.checkpoint()
+        return branch_number
+
+    await quantum_loop.run(task, quantum_loop.stop_event, accept=lambda _: True)
+
+    assert quantum_loop.stop_event.is_set()
+    assert len(scanned) <= 2
@@ -0,0 +1,136 @@
+"""Testing the query expressions `Q` and the filters of raw documents."""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+import orjson
+import pytest
+from pydantic import BaseModel, Field
+
+from scruby import Q, ReturnType, Scruby, ScrubyModel, Where
+from scruby.query import match_all, plan_filter, pushdown_conditions
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Owner(BaseModel):
+    """Owner model."""
+
+    city: str
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    year: int
+    owner: Owner
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+def make_cars() -> list[Car]:
+    """Cars for tests."""
+    cars = [
+        Car(brand="Mazda", model=f"EZ-{num}", year=2020 + num, owner=Owner(city="Paris" if num % 2 else "Rome"))
+        for num in range(10)
+    ]
+    cars.append(Car(brand="Toyota", model="Camry", year=2024, owner=Owner(city="Paris")))
+    return cars
+
+
+def test_expression() -> None:
+    """Structure and evaluation of expressions."""
+    query = (Q.field("year") > 2024) & Q.field("owner.city").in_(["Paris", "Lyon"]) & (Q.field("brand") != "Lada")
+    assert query.op == "and"
+    assert [node.op for node in query.conjuncts()] == [">", "in", "!="]
+    assert query.conjuncts()[1].args == ("owner.city", ("Paris", "Lyon"))
+    same_query = (Q.field("year") > 2024) & Q.field("owner.city").in_(("Paris", "Lyon")) & (Q.field("brand") != "Lada")
+    assert query == same_query
+    assert repr(Q.field("year") > 1) == "(Q.field('year') > 1)"
+    assert pushdown_conditions(query) == (
+        ("year", ">", 2024),
+        ("owner.city", "in", ("Paris", "Lyon")),
+        ("brand", "!=", "Lada"),
+    )
+    # Only the top-level AND is pushed down.
+    assert pushdown_conditions((Q.field("year") > 1) | (Q.field("year") < 0)) == ()
+    assert pushdown_conditions(~(Q.field("year") > 1), Where(brand="Mazda")) == (("brand", "==", "Mazda"),)
+
+    cars = make_cars()
+    for car in cars:
+        expected = car.year > 2024 and car.owner.city in ("Paris", "Lyon") and car.brand != "Lada"
+        # Models and raw documents give the same result.
+        assert query(car) is expected
+        assert query.compile()(orjson.loads(car.model_dump_json())) is expected
+    assert ((Q.field("year") < 2021) | (Q.field("model") == "Camry"))({"year": 2030, "model": "Camry"})
+    assert (~(Q.field("year") < 2021))({"year": 2030})
+    # Missing fields and values of different types do not match.
+    assert not (Q.field("color") == "red")({"year": 2030})
+    assert not (Q.field("owner.city") == "Paris")({"owner": None})
+    assert not (Q.field("year") > 2020)({"year": "2030"})
+
+    # Comparisons must be wrapped in parentheses.
+    with pytest.raises(TypeError, match=r"Wrap comparisons in parentheses"):
+        Q.field("year") > 2020 & Q.field("brand").in_(["Mazda"])  # ruff:ignore[useless-comparison]
+    with pytest.raises(TypeError, match=r"has no truth value"):
+        (Q.field("year") > 2020) and (Q.field("year") < 2030)
+
+
+def test_plan_filter() -> None:
+    """Filters with values of JSON types are checked on raw documents."""
+    query = Q.field("year") > 2020
+    assert plan_filter(query) == (match_all, (query,))
+    where = Where(brand="Mazda")
+    assert plan_filter(where, bool) == (match_all, (where, bool))
+    # Values that are not JSON types are compared with the fields of models.
+    query = Q.field("owner") == Owner(city="Paris")
+    assert plan_filter(query) == (query, ())
+    assert query(make_cars()[1])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "dbm"])
+async def test_search(backend: str) -> None:
+    """The search methods accept `Q` and `raw_filter`."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    car_coll = Scruby(Car)
+    await car_coll.add_many(make_cars())
+
+    assert await car_coll.count_documents(Q.field("brand") == "Mazda") == 10
+    assert await car_coll.count_documents((Q.field("year") >= 2024) & (Q.field("owner.city") == "Paris")) == 4
+    assert await car_coll.count_documents(Q.field("model").in_(["EZ-1", "Camry", "Golf"])) == 2
+    assert await car_coll.count_documents(raw_filter=lambda doc: doc["owner"]["city"] == "Rome") == 5
+    assert (
+        await car_coll.count_documents(
+            lambda doc: doc.model.startswith("EZ"),
+            raw_filter=lambda doc: doc["year"] < 2023,
+        )
+        == 3
+    )
+    car = await car_coll.find_one((Q.field("brand") == "Toyota") | (Q.field("year") > 2100))
+    assert car is not None
+    assert car.model == "Camry"
+    cars = await car_coll.find_many(~(Q.field("year") < 2027), sort_fn=lambda doc: doc.year, sort_reverse=False)
+    assert [car.model for car in cars] == ["EZ-7", "EZ-8", "EZ-9"]
+    cars_json = await car_coll.find_many(Q.field("model") == "EZ-5", sort_fn=None, return_type=ReturnType.JSON)
+    assert orjson.loads(cars_json)[0]["year"] == 2025
+    assert await car_coll.update_many({"year": 1999}, Q.field("owner.city") == "Rome") == 5
+    assert await car_coll.count_documents(Q.field("year") == 1999) == 5
+    assert await car_coll.delete_many(match_all, raw_filter=lambda doc: doc["year"] == 1999) == 5
+    assert await car_coll.recount() == 6
+    #
+    # Delete DB.
+    Scruby.napalm()
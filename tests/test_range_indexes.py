@@ -0,0 +1,343 @@
+"""Testing the ordered range indexes."""
+
+from __future__ import annotations
+
+import socket
+import sys
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Annotated, ClassVar
+
+import anyio
+import orjson
+import pytest
+from pydantic import Field
+
+from scruby import Q, ReturnType, Scruby, ScrubyModel, Where, indexes
+from scruby.backends import MemoryBackend
+from scruby.config import ScrubyConfig
+from scruby.indexes import BaseIndex, RangeIndex, range_bounds, range_conditions
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+START = datetime(2025, 1, 1, tzinfo=UTC)
+
+
+class Sale(ScrubyModel):
+    """Sale model."""
+
+    scruby_range_indexes: ClassVar[tuple[str, ...]] = ("price", "sold_at")
+
+    number: int
+    price: float | None
+    sold_at: datetime
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"sale-{data['number']}",
+        ),
+    ]
+
+
+class Person(ScrubyModel):
+    """Person model."""
+
+    scruby_range_indexes: ClassVar[tuple[str, ...]] = ("name",)
+
+    name: str
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: data["name"],
+        ),
+    ]
+
+
+def make_sales() -> list[Sale]:
+    """Sales for tests - prices 10.0, 9.5, ..., 0.5, sold one day apart."""
+    return [Sale(number=num, price=10 - num / 2, sold_at=START + timedelta(days=num)) for num in range(20)]
+
+
+def test_bounds() -> None:
+    """Range conditions select a slice of the sorted run."""
+    filter_fn = (Q.field("price") > 2) & (Q.field("price") <= 5.5) & (Q.field("number") != 3)
+    assert range_bounds("price", range_conditions(filter_fn)) == ((1, 2), (1, 5.5))
+    assert range_bounds("price", range_conditions(Where(price=4))) == ((1, 4), (1, 4))
+    assert range_bounds("price", range_conditions(Q.field("price") >= 3)) == ((1, 3), None)
+    # Strings, booleans and other fields are not used.
+    assert range_bounds("price", range_conditions(Q.field("price") > "3")) is None
+    assert range_bounds("price", range_conditions(Where(price=True))) is None
+    assert range_bounds("price", range_conditions(Q.field("number") > 3)) is None
+    # Datetimes, naive ones as UTC.
+    assert range_bounds("sold_at", range_conditions(Q.field("sold_at") < START.replace(tzinfo=None))) == (
+        None,
+        (2, START),
+    )
+    # Datetimes are not used for fields of other types.
+    assert range_bounds("price", range_conditions(Q.field("price") < START), datetime_field=False) is None
+
+
+@pytest.mark.asyncio
+async def test_sorted_run() -> None:
+    """Entries are ordered by type and value."""
+    Scruby.run(backend="memory")
+    (index,) = RangeIndex.of_collection("ScrubyDB/Sale", ("price",), MemoryBackend, ScrubyConfig)
+    await index.load()
+    await index.add({b"2": {"b"}, b"10": {"a"}, b"null": {"c"}, b'"x"': {"d"}, b'"2025-01-01T00:00:00Z"': {"e"}})
+    assert [doc_key for _, _, doc_key, _ in index.entries()] == ["c", "b", "a", "e", "d"]
+    assert [doc_key for _, _, doc_key, _ in index.entries(((1, 2), None), reverse=True)] == ["a", "b"]
+    await index.remove({b"10": {"a"}})
+    assert [doc_key for _, _, doc_key, _ in index.entries((None, (1, 100)))] == ["b"]
+    # The entries are stored with the backend.
+    index._run = None
+    await index.load()
+    assert index.size == 4
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "dbm", "log", "mmap"])
+async def test_range_queries(backend: str) -> None:
+    """Range queries, ordered pages and min/max use the range indexes."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    sale_coll = Scruby(Sale)
+    await sale_coll.add_many(make_sales())
+    assert [index.datetime_field for index in sale_coll._indexes] == [False, True]
+
+    # Range conditions.
+    assert await sale_coll.count_documents(Q.field("price") < 2) == 3
+    assert await sale_coll.count_documents((Q.field("price") >= 2) & (Q.field("price") <= 3)) == 3
+    assert await sale_coll.count_documents(Q.field("sold_at") >= START + timedelta(days=18)) == 2
+    sale = await sale_coll.find_one(Q.field("price") == 7)
+    assert sale is not None
+    assert sale.number == 6
+
+    # Ordered pages - the whole collection is sorted.
+    sales = await sale_coll.find_many(sort_fn=Q.field("price"), sort_reverse=False, limit_docs=3)
+    assert [sale.price for sale in sales] == [0.5, 1.0, 1.5]
+    sales = await sale_coll.find_many(sort_fn=Q.field("price"), sort_reverse=False, limit_docs=3, page_number=2)
+    assert [sale.price for sale in sales] == [2.0, 2.5, 3.0]
+    sales = await sale_coll.find_many(
+        Q.field("price") < 5,
+        sort_fn=Q.field("sold_at"),
+        limit_docs=2,
+    )
+    assert [sale.number for sale in sales] == [19, 18]
+    sales_json = await sale_coll.find_many(
+        Where(number=4),
+        sort_fn=Q.field("price"),
+        return_type=ReturnType.JSON,
+    )
+    assert [sale["number"] for sale in orjson.loads(sales_json)] == [4]
+
+    # Min and max.
+    sale = await sale_coll.find_min("price")
+    assert sale is not None
+    assert sale.number == 19
+    sale = await sale_coll.find_max("sold_at")
+    assert sale is not None
+    assert sale.number == 19
+    with pytest.raises(ValueError, match=r"The field `number` has no range index"):
+        await sale_coll.find_min("number")
+
+    # Changes of documents.
+    sale.price = 100
+    await sale_coll.update_doc(sale)
+    sale = await sale_coll.find_max("price")
+    assert sale is not None
+    assert sale.number == 19
+    assert await sale_coll.update_many({"price": None}, Q.field("price") < 2) == 2
+    assert await sale_coll.count_documents(Q.field("price") < 2) == 0
+    sale = await sale_coll.find_min("price")
+    assert sale is not None
+    assert sale.price is None
+    assert await sale_coll.delete_many(Where(price=None)) == 2
+    await sale_coll.delete_doc("sale-19")
+    sales = await sale_coll.find_many(sort_fn=Q.field("price"), sort_reverse=False, limit_docs=2)
+    assert [sale.price for sale in sales] == [2.0, 2.5]
+    assert await sale_coll.count_documents(Q.field("price") > 0) == 17
+
+    await sale_coll.close()
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+async def test_build(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Range indexes declared for existing documents are built by the first query."""
+    # Activate database.
+    Scruby.run(backend="memory")
+
+    monkeypatch.setattr(Sale, "scruby_range_indexes", ())
+    await Scruby(Sale).add_many(make_sales())
+
+    monkeypatch.setattr(Sale, "scruby_range_indexes", ("price",))
+    sale_coll = Scruby(Sale)
+    (price_index,) = sale_coll._indexes
+    assert not await price_index.is_built()
+    sales = await sale_coll.find_many(sort_fn=Q.field("price"), limit_docs=2)
+    assert [sale.price for sale in sales] == [10.0, 9.5]
+    assert await price_index.is_built()
+    assert price_index.size == 20
+
+    # Clearing the collection clears the indexes.
+    Scruby.clear_collection("Sale")
+    assert await sale_coll.find_min("price") is None
+    await sale_coll.add_many(make_sales()[:2])
+    sale = await sale_coll.find_min("price")
+    assert sale is not None
+    assert sale.number == 1
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+async def test_string_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Strings are in the same order as by the scan, ISO-looking ones are not datetimes."""
+    # Activate database.
+    Scruby.run(backend="memory")
+
+    async def names(coll: Scruby) -> tuple[list[str], list[str]]:
+        people = await coll.find_many(sort_fn=Q.field("name"), sort_reverse=False)
+        pages: list[str] = []
+        cursor: str | None = None
+        while True:
+            page = await coll.find_page(sort_fn=Q.field("name"), sort_reverse=False, limit_docs=2, cursor=cursor)
+            pages.extend(person.name for person in page.docs)
+            cursor = page.cursor
+            if cursor is None:
+                return [person.name for person in people], pages
+
+    monkeypatch.setattr(Person, "scruby_range_indexes", ())
+    scan_coll = Scruby(Person)
+    await scan_coll.add_many([Person(name=name) for name in ("John Smith", "John", "Ann", "Ann!")])
+    monkeypatch.setattr(Person, "scruby_range_indexes", ("name",))
+    person_coll = Scruby(Person)
+    (name_index,) = person_coll._indexes
+    assert not name_index.datetime_field
+
+    expected = ["Ann", "Ann!", "John", "John Smith"]
+    assert await names(scan_coll) == (expected, expected)
+    assert await names(person_coll) == (expected, expected)
+    person = await person_coll.find_min("name")
+    assert person is not None
+    assert person.name == "Ann"
+
+    await person_coll.add_doc(Person(name="20240101"))
+    expected = ["20240101", *expected]
+    assert await names(scan_coll) == (expected, expected)
+    assert await names(person_coll) == (expected, expected)
+    person = await person_coll.find_min("name")
+    assert person is not None
+    assert person.name == "20240101"
+    person = await person_coll.find_max("name")
+    assert person is not None
+    assert person.name == "John Smith"
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["dbm", "sqlite"])
+async def test_other_process(backend: str) -> None:
+    """The sorted run is reloaded when another process has changed the index."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    sale_coll = Scruby(Sale)
+    await sale_coll.add_many(make_sales()[:5])
+    sale = await sale_coll.find_min("price")
+    assert sale is not None
+    assert sale.number == 4
+
+    # Another process.
+    BaseIndex.forget_all()
+    other_coll = Scruby(Sale)
+    for index in other_coll._indexes:
+        index.changes_path = index.changes_dir / "other-host-1.log"
+    await other_coll.add_doc(Sale(number=99, price=0.5, sold_at=START))
+    sales = await sale_coll.find_many(sort_fn=Q.field("price"), sort_reverse=False, limit_docs=2)
+    assert [sale.number for sale in sales] == [99, 4]
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+async def test_change_logs(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The changes of other processes are applied to the sorted run, the logs of finished processes are deleted."""
+    # Activate database.
+    Scruby.run(backend="sqlite")
+
+    sale_coll = Scruby(Sale)
+    await sale_coll.add_many(make_sales()[:5])
+    price_index = sale_coll._indexes[0]
+    await price_index.load()
+    run = price_index._run
+
+    # Another process.
+    BaseIndex.forget_all()
+    other_coll = Scruby(Sale)
+    for index in other_coll._indexes:
+        index.changes_path = index.changes_dir / "other-host-1.log"
+    await other_coll.add_doc(Sale(number=99, price=0.5, sold_at=START))
+    await other_coll.delete_doc("sale-4")
+    sales = await sale_coll.find_many(sort_fn=Q.field("price"), sort_reverse=False, limit_docs=2)
+    assert [sale.number for sale in sales] == [99, 3]
+    # The changes are applied without reading the entries.
+    assert price_index._run is run
+
+    # A finished process of this host.
+    async with await anyio.open_process([sys.executable, "-c", "pass"]) as finished:
+        await finished.wait()
+    orphan_path = Path(price_index.changes_dir, f"{socket.gethostname()}-{finished.pid}.log")
+    for index in other_coll._indexes:
+        index.changes_path = index.changes_dir / orphan_path.name
+    await other_coll.add_doc(Sale(number=98, price=0.25, sold_at=START))
+    sale = await sale_coll.find_min("price")
+    assert sale is not None
+    assert sale.number == 98
+    assert price_index._run is run
+    assert not await anyio.Path(orphan_path).exists()
+
+    # A replaced log - the entries are read again.
+    monkeypatch.setattr(indexes, "_CHANGES_LIMIT", 0)
+    for index in other_coll._indexes:
+        index.changes_path = index.changes_dir / "other-host-1.log"
+    await other_coll.delete_doc("sale-98")
+    sale = await sale_coll.find_min("price")
+    assert sale is not None
+    assert sale.number == 99
+    assert price_index._run is not run
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.asyncio
+async def test_hash_reduce_left_0() -> None:
+    """`find_min` and `find_max` need branches."""
+    # Activate database.
+    Scruby.run(backend="memory", hash_reduce_left=0)
+
+    sale_coll = Scruby(Sale)
+    with pytest.raises(AssertionError, match=r"Not valid for `find_min` method"):
+        await sale_coll.find_min("price")
+    with pytest.raises(AssertionError, match=r"Not valid for `find_max` method"):
+        await sale_coll.find_max("price")
+    #
+    # Delete DB.
+    Scruby.napalm()
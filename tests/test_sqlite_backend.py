@@ -0,0 +1,147 @@
+"""Testing the SQLite storage backend and the filter `Where`."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Annotated
+
+import anyio
+import pytest
+from pydantic import BaseModel, Field
+
+from scruby import Q, Scruby, ScrubyConfig, ScrubyModel, Where
+from scruby.backends import SqliteBackend
+from scruby.query import pushdown_conditions
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Owner(BaseModel):
+    """Owner model."""
+
+    city: str
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    year: int
+    owner: Owner
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+def make_cars() -> list[Car]:
+    """Cars for tests."""
+    cars = [
+        Car(brand="Mazda", model=f"EZ-{num}", year=2020 + num, owner=Owner(city="Paris" if num % 2 else "Rome"))
+        for num in range(10)
+    ]
+    cars.append(Car(brand="Toyota", model="Camry", year=2024, owner=Owner(city="Paris")))
+    return cars
+
+
+async def test_operations() -> None:
+    """The collection works with the SQLite backend."""
+    # Activate database.
+    Scruby.run(backend="sqlite")
+
+    car_coll = Scruby(Car)
+    assert isinstance(car_coll._backend, SqliteBackend)
+
+    cars = make_cars()
+    assert await car_coll.add_many(cars[:10]) == [True] * 10
+    assert await car_coll.add_many(cars[:1]) == [False]
+    await car_coll.add_doc(cars[10])
+    assert await car_coll.has_key("Toyota:Camry")
+    assert (await car_coll.get_doc("Mazda:EZ-1")).year == 2021
+    assert await car_coll.count_documents(lambda doc: doc.brand == "Mazda") == 10
+    assert len(await car_coll.find_many(lambda doc: doc.year >= 2025)) == 5
+    assert await car_coll.update_many({"year": 2000}, lambda doc: doc.brand == "Toyota") == 1
+    assert (await car_coll.get_doc("Toyota:Camry")).year == 2000
+    assert await car_coll.delete_many(lambda doc: doc.year < 2025) == 6
+    await car_coll.delete_doc("Mazda:EZ-9")
+    assert not await car_coll.has_key("Mazda:EZ-9")
+    assert await car_coll.recount() == 4
+    # The collection is stored in one database.
+    names = sorted([path.name async for path in anyio.Path("ScrubyDB/Car").iterdir()])
+    assert names[0] == "collection.sqlite3"
+    assert "meta" in names
+    await car_coll.close()
+
+    # The data survives reopening.
+    car_coll = Scruby(Car)
+    assert (await car_coll.get_doc("Mazda:EZ-8")).year == 2028
+    assert await car_coll.recount() == 4
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "dbm"])
+async def test_where(backend: str) -> None:
+    """The results of `Where` do not depend on the backend."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    car_coll = Scruby(Car)
+    await car_coll.add_many(make_cars())
+
+    assert await car_coll.count_documents(Where(brand="Mazda")) == 10
+    assert await car_coll.count_documents(Where({"owner.city": "Paris"})) == 6
+    assert await car_coll.count_documents(Where({"owner.city": "Paris"}, brand="Mazda")) == 5
+    assert await car_coll.count_documents(Where(brand="Mazda", year=2024)) == 1
+    assert await car_coll.count_documents(Where(brand="Lada")) == 0
+    assert await car_coll.count_documents(Where(color="red")) == 0
+    car = await car_coll.find_one(Where(model="Camry"))
+    assert car is not None
+    assert car.brand == "Toyota"
+    cars = await car_coll.find_many(Where({"owner.city": "Rome"}))
+    assert sorted(car.model for car in cars) == ["EZ-0", "EZ-2", "EZ-4", "EZ-6", "EZ-8"]
+    assert await car_coll.update_many({"year": 1999}, Where({"owner.city": "Rome"})) == 5
+    assert await car_coll.count_documents(Where(year=1999)) == 5
+    assert await car_coll.delete_many(Where(year=1999)) == 5
+    assert await car_coll.recount() == 6
+    #
+    # Delete DB.
+    Scruby.napalm()
+
+
+async def test_pushdown() -> None:
+    """SQLite skips documents that do not match the conditions."""
+    # Activate database.
+    Scruby.run(backend="sqlite", hash_reduce_left=0)
+
+    car_coll = Scruby(Car)
+    await car_coll.add_many(make_cars())
+    backend = car_coll._backend
+    leaf_path, _ = await car_coll._get_leaf_path("Toyota:Camry")
+
+    items = await backend.items_where(leaf_path, Where(brand="Toyota").conditions)
+    assert [key for key, _ in items] == [b"toyota:camry"]
+    assert await backend.items_where(leaf_path, Where({"owner.city": "Rome"}, brand="Toyota").conditions) == []
+    conditions = pushdown_conditions(Q.field("model").in_(["Camry", "Golf"]) & (Q.field("year") > 2023))
+    items = await backend.items_where(leaf_path, conditions)
+    assert [key for key, _ in items] == [b"toyota:camry"]
+    assert await backend.items_where(leaf_path, pushdown_conditions(Q.field("year") < 2020)) == []
+    # A nonexistent collection.
+    other = SqliteBackend("ScrubyDB/Other", ScrubyConfig)
+    other_leaf_path = Path("ScrubyDB/Other", leaf_path.relative_to(backend.collection_path))
+    assert await other.items_where(other_leaf_path, Where(brand="Toyota").conditions) == []
+    assert not await other.leaf_exists(other_leaf_path)
+    assert not await anyio.Path("ScrubyDB/Other").exists()
+    #
+    # Delete DB.
+    Scruby.napalm()
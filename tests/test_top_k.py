@@ -0,0 +1,85 @@
+"""Testing the global sort of `find_many` with the top-k merge."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Annotated
+
+import orjson
+import pytest
+from pydantic import Field
+
+from scruby import Q, ReturnType, Scruby, ScrubyModel
+from scruby.top_k import TopK
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Item(ScrubyModel):
+    """Item model."""
+
+    number: int
+    rank: int
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"item-{data['number']:03d}",
+        ),
+    ]
+
+
+def test_window() -> None:
+    """The window keeps the best documents, equal sort keys are ordered by key."""
+    docs = [SimpleNamespace(key=f"k{num:02d}", rank=num % 5) for num in range(30)]
+    top_k = TopK(4, lambda doc: doc.rank, reverse=False)
+    for start in range(0, 30, 7):
+        top_k.push(docs[start : start + 7])
+        assert len(top_k.docs) <= 2 * 4
+    assert [doc.key for doc in top_k.page(0)] == ["k00", "k05", "k10", "k15"]
+    assert [doc.key for doc in top_k.page(2)] == ["k10", "k15"]
+
+    top_k = TopK(3, lambda doc: doc.rank, reverse=True, pairs=True)
+    top_k.push([(doc, b"{}") for doc in docs])
+    assert [pair[0].key for pair in top_k.page(0)] == ["k29", "k24", "k19"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "dbm"])
+async def test_sorted_pages(backend: str) -> None:
+    """Pages are sorted over the whole collection and do not overlap."""
+    # Activate database.
+    Scruby.run(backend=backend)
+
+    item_coll = Scruby(Item)
+    await item_coll.add_many([Item(number=num, rank=(num * 37) % 11) for num in range(100)])
+    expected = sorted(range(100), key=lambda num: ((num * 37) % 11, num))
+
+    numbers: list[int] = []
+    for page_number in range(1, 16):
+        items = await item_coll.find_many(
+            sort_fn=lambda doc: doc.rank,
+            sort_reverse=False,
+            limit_docs=7,
+            page_number=page_number,
+        )
+        numbers.extend(item.number for item in items or [])
+    assert numbers == expected
+
+    # Descending order, the filter and the stored JSON.
+    items_json = await item_coll.find_many(
+        Q.field("rank") < 3,
+        sort_fn=Q.field("number"),
+        limit_docs=5,
+        return_type=ReturnType.JSON,
+    )
+    assert [item["number"] for item in orjson.loads(items_json)] == sorted(
+        [num for num in range(100) if (num * 37) % 11 < 3],
+        reverse=True,
+    )[:5]
+    #
+    # Delete DB.
+    Scruby.napalm()
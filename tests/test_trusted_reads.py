@@ -0,0 +1,116 @@
+"""Testing the trusted reads of documents."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from enum import Enum
+from typing import Annotated, Literal
+
+import pytest
+from pydantic import BaseModel, Field
+
+from scruby import Scruby, ScrubyConfig, ScrubyModel
+from scruby.loader import load_doc
+
+# Delete DB.
+# Hint: If the previous test failed and the database remains.
+Scruby.napalm()
+
+
+class Color(Enum):
+    """Color of car."""
+
+    RED = "red"
+    BLUE = "blue"
+
+
+class Owner(BaseModel):
+    """Owner model."""
+
+    name: str
+    since: datetime
+
+
+class Car(ScrubyModel):
+    """Car model."""
+
+    brand: str
+    model: str
+    year: int
+    price: float
+    electric: bool
+    color: Color
+    body: Literal["sedan", "hatchback"]
+    tags: list[str]
+    owner: Owner | None = None
+    service_dates: tuple[datetime, ...] = ()
+    # key is always at bottom
+    key: Annotated[
+        str,
+        Field(
+            frozen=True,
+            default_factory=lambda data: f"{data['brand']}:{data['model']}",
+        ),
+    ]
+
+
+def make_car(num: int) -> Car:
+    """Car for tests."""
+    return Car(
+        brand="Mazda",
+        model=f"EZ-{num}",
+        year=2020 + num,
+        price=30000.5,
+        electric=num % 2 == 0,
+        color=Color.RED if num % 2 else Color.BLUE,
+        body="sedan",
+        tags=["new", "sale"],
+        owner=Owner(name="Ann", since=datetime(2024, 5, 1, tzinfo=UTC)) if num % 2 else None,
+        service_dates=(datetime(2025, 1, 2, 3, 4, 5, tzinfo=UTC),),
+        created_at=datetime(2025, 6, 7, 8, 9, 10, 123456, tzinfo=UTC),
+    )
+
+
+def test_load_doc() -> None:
+    """Trusted reads give the same documents as full validation."""
+    for num in range(4):
+        doc_json = make_car(num).model_dump_json()
+        validated = load_doc(Car, doc_json)
+        trusted = load_doc(Car, doc_json, trusted_reads=True)
+        assert trusted == validated
+        assert type(trusted.color) is Color
+        assert isinstance(trusted.created_at, datetime)
+        assert trusted.created_at.tzinfo is not None
+        assert trusted.updated_at is None
+        assert type(trusted.service_dates) is tuple
+        if trusted.owner is not None:
+            assert type(trusted.owner) is Owner
+            assert trusted.owner.since == datetime(2024, 5, 1, tzinfo=UTC)
+        assert trusted.model_dump_json() == doc_json
+
+
+@pytest.mark.asyncio
+async def test_trusted_reads() -> None:
+    """The collection reads documents without full validation."""
+    # Activate database.
+    Scruby.run(trusted_reads=True)
+    assert ScrubyConfig.trusted_reads
+
+    car_coll = Scruby(Car)
+    await car_coll.add_many([make_car(num) for num in range(10)])
+    car = await car_coll.get_doc("Mazda:EZ-1")
+    assert car is not None
+    assert car.owner.name == "Ann"
+    assert len(await car_coll.get_many(["Mazda:EZ-1", "Mazda:EZ-2"])) == 2
+    assert await car_coll.count_documents(lambda doc: doc.color is Color.RED) == 5
+    cars = await car_coll.find_many(lambda doc: doc.owner is not None and doc.owner.since.year == 2024)
+    assert len(cars) == 5
+    assert await car_coll.update_many({"price": 1.5}, lambda doc: doc.electric) == 5
+    car = await car_coll.get_doc("Mazda:EZ-2")
+    assert car.price == pytest.approx(1.5)
+    assert car.created_at is not None
+    assert await car_coll.delete_many(lambda doc: doc.year < 2025) == 5
+    assert await car_coll.count_documents(lambda _: True) == 5
+    #
+    # Delete DB.
+    Scruby.napalm()